@@ -1,87 +1,80 @@
 #!/usr/bin/env python3
 """清理TypeScript/TSX文件中的调试日志"""
-import re
-import os
+import sys
 from pathlib import Path
 
-def clean_log_statement(content):
-    """删除单行和多行的日志语句"""
-    
-    # 模式1: 单行日志 - console.log/info/debug/warn(...) 或 logger.info/debug/warn(...)
-    patterns = [
-        r'^\s*console\.(log|info|debug|warn)\([^)]*\)\s*$',
-        r'^\s*logger\.(info|debug|warn)\([^)]*\)\s*$',
-    ]
-    
-    lines = content.split('\n')
-    result = []
-    skip_until_closing = False
-    paren_count = 0
-    
-    for i, line in enumerate(lines):
-        # 检查是否需要跳过（多行日志语句）
-        if skip_until_closing:
-            paren_count += line.count('(') - line.count(')')
-            if paren_count <= 0:
-                skip_until_closing = False
-            continue
-        
-        # 检查是否匹配单行日志
-        is_log_line = False
-        for pattern in patterns:
-            if re.match(pattern, line):
-                is_log_line = True
-                break
-        
-        if is_log_line:
-            continue
-        
-        # 检查是否是多行日志的开始
-        if re.search(r'(console\.(log|info|debug|warn)|logger\.(info|debug|warn))\s*\(', line):
-            # 计算括号数量
-            open_count = line.count('(')
-            close_count = line.count(')')
-            
-            # 如果括号不匹配，说明是多行
-            if open_count > close_count:
-                paren_count = open_count - close_count
-                skip_until_closing = True
-                continue
-        
-        result.append(line)
-    
-    return '\n'.join(result)
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'scripts'))
+
+from codemod.cache import FileCache
+from codemod.logs import remove_log_statements
+from codemod.profiling import measure, profiler_from_argv
+from codemod.rules import get_rules, ruleset_key
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+
+def clean_log_statement(content, jsx=False):
+    """删除单行和多行的日志语句
+
+    语句结束位置由词法分析得到的括号配对决定，字符串、模板字符串、
+    注释和 JSX 文本中的括号不会被误计数
+    """
+    cleaned, _ = remove_log_statements(content, jsx=jsx)
+    return cleaned
 
-def process_file(filepath):
-    """处理单个文件"""
+def process_file(filepath, cache=None, cache_key=None, profiler=None, writer=None):
+    """处理单个文件，传入 cache 时跳过已知没有日志的未变化文件
+
+    writer 为 Preview 时只输出差异，为 Transaction 时暂存到运行结束一起提交
+    """
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if cache is not None:
+            stale = cache.read_stale(filepath, cache_key)
+            if stale is None:
+                return False
+            data, fingerprint = stale
+            content = data.decode('utf-8')
+        else:
+            with open(filepath, 'rb') as f:
+                content = f.read().decode('utf-8')
         
-        cleaned = clean_log_statement(content)
+        jsx = Path(filepath).suffix == '.tsx'
+        cleaned, _ = measure(profiler, 'logs', filepath,
+                             lambda text: remove_log_statements(text, jsx=jsx), content)
         
         if cleaned != content:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(cleaned)
+            write_text(filepath, cleaned, writer, newline='')
             return True
+        if cache is not None:
+            cache.mark_clean(filepath, cache_key, fingerprint)
         return False
     except Exception as e:
         print(f"处理文件 {filepath} 时出错: {e}")
         return False
 
 def main():
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        sys.exit(code)
     src_dir = Path('src')
     count = 0
+    # 与 run_codemods.py --rules logs 共用缓存
+    cache = None if '--no-cache' in sys.argv else FileCache()
+    rule = get_rules(['logs'])[0]
+    cache_key = ruleset_key([rule])
+    # --profile[=文件] 记录每个文件的耗时和内存
+    profiler = profiler_from_argv()
+    # --preview[=补丁文件] 只输出差异；否则所有写回在结束时一起生效
+    with writer_from_argv() as writer:
+        for filepath in list(src_dir.rglob('*.ts')) + list(src_dir.rglob('*.tsx')):
+            # 测试文件和日志实现不处理（codemod.rules.LOG_EXCLUDE）
+            if rule.accepts(filepath) and process_file(filepath, cache, cache_key, profiler, writer):
+                count += 1
     
-    for filepath in src_dir.rglob('*.ts'):
-        if process_file(filepath):
-            count += 1
-    
-    for filepath in src_dir.rglob('*.tsx'):
-        if process_file(filepath):
-            count += 1
-    
+    if cache is not None:
+        cache.save()
     print(f"✓ 共处理 {count} 个文件")
+    if profiler is not None:
+        profiler.finish()
 
 if __name__ == '__main__':
     main()
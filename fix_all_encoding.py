@@ -4,47 +4,33 @@
 批量修复login文件中的所有乱码和缺失的分号
 """
 
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'scripts'))
+
+from codemod.encoding import ENCODING_REPLACER
+from codemod.profiling import measure, profiler_from_argv
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+
+# --rollback 恢复上次运行之前的内容
+code = rollback_from_argv()
+if code is not None:
+    sys.exit(code)
+
 # 读取文件
 with open('src/pages/login/index.tsx', 'r', encoding='utf-8', errors='ignore') as f:
     content = f.read()
 
-# 定义所有需要修复的乱码和对应的正确文本
-replacements = [
-    ('环�?', '环境'),
-    ('失�?', '失败'),
-    ('�?[', '['),
-    ('错�?', '错误'),
-    ('系�?', '系统'),
-    ('请输�?', '请输入'),
-    ('账�?', '账号'),
-    ('支持�?', '支持'),
-    ('密�?', '密码'),
-    ('登�?', '登录'),
-    ('�?位', '6位'),
-    ('按钮�?', '按钮'),
-    ('登录�?..', '登录中...'),
-    ('验证码登�?', '验证码登录'),
-    ('快速登�?', '快速登录'),
-    ('开发测�?', '开发测试'),
-    ('�?收起', '▲ 收起'),
-    ('�?展开', '▼ 展开'),
-    ('点击填充 �?', '点击填充 ▶'),
-    ('车队长账�?', '车队长账号'),
-    ('车队�?', '车队长'),
-    ('使用说明�?', '使用说明：'),
-    ('登录方式说明�?', '登录方式说明：'),
-    ('�?密码登录', '• 密码登录'),
-    ('�?验证码登录', '• 验证码登录'),
-    ('验证�?', '验证码'),
-    ('�?admin', '• admin'),
-]
-
-# 应用所有替换
-for old, new in replacements:
-    content = content.replace(old, new)
-
-# 写回文件
-with open('src/pages/login/index.tsx', 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("✅ 所有乱码已修复！")
+# 与 fix_encoding_全局.py 共用同一个乱码修复自动机，一次扫描完成所有替换
+profiler = profiler_from_argv()
+content, count = measure(profiler, 'encoding', 'src/pages/login/index.tsx',
+                         ENCODING_REPLACER.replace, content)
+
+# 写回文件（--preview[=补丁文件] 时只输出差异）
+with writer_from_argv() as writer:
+    write_text('src/pages/login/index.tsx', content, writer)
+
+print(f"✅ 所有乱码已修复！共替换 {count} 处")
+if profiler is not None:
+    profiler.finish()
@@ -4,100 +4,23 @@
 全局扫描并修复项目中的编码问题
 """
 import os
-import re
+import sys
+import time
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'scripts'))
+
+from codemod.cache import CACHE_FILE, FileCache
+from codemod.encoding import ENCODING_SCANNER, apply_encoding_fixes, detect_encoding_issues, encoding_ruleset_key
+from codemod.preview import Preview
+from codemod.profiling import measure, profiler_from_argv
+from codemod.transaction import Transaction, rollback_from_argv, write_text, writer_from_argv
+
 # 定义需要扫描的文件扩展名
 EXTENSIONS = ['.ts', '.tsx', '.js', '.jsx', '.md', '.json']
 
 # 定义需要排除的目录
-EXCLUDE_DIRS = ['node_modules', '.git', 'dist', 'build', '.next', '.kiro']
-
-# 常见的乱码模式和修复
-ENCODING_FIXES = {
-    # 中文乱码修复
-    '环�?': '环境',
-    '失�?': '失败',
-    '错�?': '错误',
-    '系�?': '系统',
-    '请输�?': '请输入',
-    '账�?': '账号',
-    '支持�?': '支持',
-    '密�?': '密码',
-    '登�?': '登录',
-    '�?位': '6位',
-    '按钮�?': '按钮',
-    '登录�?..': '登录中...',
-    '验证码登�?': '验证码登录',
-    '快速登�?': '快速登录',
-    '开发测�?': '开发测试',
-    '�?收起': '▲ 收起',
-    '�?展开': '▼ 展开',
-    '点击填充 �?': '点击填充 ▶',
-    '车队长账�?': '车队长账号',
-    '车队�?': '车队长',
-    '使用说明�?': '使用说明：',
-    '登录方式说明�?': '登录方式说明：',
-    '�?密码登录': '• 密码登录',
-    '�?验证码登录': '• 验证码登录',
-    '验证�?': '验证码',
-    '�?admin': '• admin',
-    '仓库�?': '仓库',
-    '司机�?': '司机',
-    '管理�?': '管理',
-    '车辆�?': '车辆',
-    '考勤�?': '考勤',
-    '请假�?': '请假',
-    '计件�?': '计件',
-    '统计�?': '统计',
-    '通知�?': '通知',
-    '权限�?': '权限',
-    '用户�?': '用户',
-    '数据�?': '数据',
-    '信息�?': '信息',
-    '状态�?': '状态',
-    '操作�?': '操作',
-    '查询�?': '查询',
-    '添加�?': '添加',
-    '删除�?': '删除',
-    '修改�?': '修改',
-    '更新�?': '更新',
-    '保存�?': '保存',
-    '取消�?': '取消',
-    '确定�?': '确定',
-    '提交�?': '提交',
-    '审批�?': '审批',
-    '通过�?': '通过',
-    '拒绝�?': '拒绝',
-    '成功�?': '成功',
-    '详情�?': '详情',
-    '列表�?': '列表',
-    '搜索�?': '搜索',
-    '筛选�?': '筛选',
-    '排序�?': '排序',
-    '导出�?': '导出',
-    '导入�?': '导入',
-    '打印�?': '打印',
-    '刷新�?': '刷新',
-    '返回�?': '返回',
-    '下一步�?': '下一步',
-    '上一步�?': '上一步',
-    '完成�?': '完成',
-    '跳过�?': '跳过',
-    '重试�?': '重试',
-    '关闭�?': '关闭',
-    '展开�?': '展开',
-    '收起�?': '收起',
-    '全选�?': '全选',
-    '反选�?': '反选',
-    '清空�?': '清空',
-    '重置�?': '重置',
-    '设置�?': '设置',
-    '配置�?': '配置',
-    '帮助�?': '帮助',
-    '关于�?': '关于',
-    '退出�?': '退出',
-}
+EXCLUDE_DIRS = ['node_modules', '.git', 'dist', 'build', '.next', '.kiro', '.codemod-journal']
 
 def should_process_file(file_path):
     """判断文件是否需要处理"""
@@ -105,6 +28,10 @@ def should_process_file(file_path):
     if not any(file_path.endswith(ext) for ext in EXTENSIONS):
         return False
     
+    # 缓存索引本身不需要扫描
+    if os.path.basename(file_path) == CACHE_FILE:
+        return False
+    
     # 检查是否在排除目录中
     path_parts = Path(file_path).parts
     if any(excluded in path_parts for excluded in EXCLUDE_DIRS):
@@ -112,76 +39,94 @@ def should_process_file(file_path):
     
     return True
 
-def detect_encoding_issues(content):
-    """检测内容中是否存在编码问题"""
-    # 检查是否包含乱码字符
-    if '�' in content:
-        return True
-    
-    # 检查是否包含已知的乱码模式
-    for pattern in ENCODING_FIXES.keys():
-        if pattern in content:
-            return True
-    
-    return False
-
-def fix_encoding(content):
-    """修复内容中的编码问题"""
-    original_content = content
-    
-    # 应用所有已知的修复
-    for old, new in ENCODING_FIXES.items():
-        content = content.replace(old, new)
-    
-    return content, content != original_content
+def scan_and_fix_directory(root_dir='.', use_cache=True, profiler=None, writer=None):
+    """扫描并修复目录中的所有文件
 
-def scan_and_fix_directory(root_dir='.'):
-    """扫描并修复目录中的所有文件"""
+    先在原始字节上预筛乱码特征，只有命中的文件才完整解码和修复；
+    use_cache 为 True 时跳过上次运行后没有变化、且已知没有乱码的文件；
+    传入 profiler 时记录每个需要修复的文件上乱码替换的耗时和内存；
+    writer 为 Preview 时只输出差异；否则所有修复暂存在事务中（默认新建一个
+    记录日志的事务），扫描完成后一起改名生效，中途出错时一个文件都不改
+    """
+    if writer is None:
+        writer = Transaction('fix_encoding_全局')
     fixed_files = []
     error_files = []
+    suspicious_files = []
+    cache = FileCache() if use_cache else None
+    cache_key = encoding_ruleset_key()
+    skipped = 0
+    scanned_bytes = 0
+    scan_seconds = 0.0
     
     print(f"🔍 开始扫描目录: {root_dir}")
     print(f"📝 扫描文件类型: {', '.join(EXTENSIONS)}")
     print(f"🚫 排除目录: {', '.join(EXCLUDE_DIRS)}")
     print("-" * 60)
     
-    for root, dirs, files in os.walk(root_dir):
-        # 过滤排除的目录
-        dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
+    with writer:
+        for root, dirs, files in os.walk(root_dir):
+            # 过滤排除的目录
+            dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
         
-        for file in files:
-            file_path = os.path.join(root, file)
+            for file in files:
+                file_path = os.path.join(root, file)
             
-            if not should_process_file(file_path):
-                continue
+                if not should_process_file(file_path):
+                    continue
             
-            try:
-                # 尝试读取文件
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
+                try:
+                    # 缓存命中时不打开文件
+                    if cache is not None and cache.is_fresh(file_path, cache_key):
+                        skipped += 1
+                        continue
+                
+                    # 字节级预筛：没有乱码特征的文件不需要解码
+                    started = time.perf_counter()
+                    scan = ENCODING_SCANNER.scan_file(file_path)
+                    scan_seconds += time.perf_counter() - started
+                    scanned_bytes += scan.size
+                    if scan.signature is None:
+                        if cache is not None:
+                            cache.mark_clean(file_path, cache_key, scan.fingerprint)
+                        continue
                 
-                # 检测编码问题
-                if detect_encoding_issues(content):
-                    print(f"🔧 发现编码问题: {file_path}")
+                    with open(file_path, 'rb') as f:
+                        content = f.read().decode('utf-8', errors='ignore')
+                
+                    # 检测编码问题
+                    if not detect_encoding_issues(content):
+                        # 命中的特征没有对应的自动修复，只报告
+                        suspicious_files.append((file_path, scan.signature))
+                    else:
+                        print(f"🔧 发现编码问题: {file_path}")
                     
-                    # 修复编码
-                    fixed_content, was_fixed = fix_encoding(content)
+                        # 修复编码
+                        fixed_content, count = measure(profiler, 'encoding', file_path,
+                                                       apply_encoding_fixes, content)
                     
-                    if was_fixed:
-                        # 写回文件
-                        with open(file_path, 'w', encoding='utf-8') as f:
-                            f.write(fixed_content)
+                        if count:
+                            # 写回文件
+                            write_text(file_path, fixed_content, writer, newline='')
                         
-                        fixed_files.append(file_path)
-                        print(f"   ✅ 已修复")
+                            fixed_files.append(file_path)
+                            print(f"   👀 仅预览" if isinstance(writer, Preview) else f"   ✅ 已修复")
                     
-            except Exception as e:
-                error_files.append((file_path, str(e)))
-                print(f"   ❌ 错误: {e}")
+                except Exception as e:
+                    error_files.append((file_path, str(e)))
+                    print(f"   ❌ 错误: {e}")
+    
+    if cache is not None:
+        cache.save()
     
     # 打印总结
     print("-" * 60)
     print(f"\n📊 扫描完成!")
+    if skipped:
+        print(f"⚡ 缓存跳过: {skipped} 个未变化的文件")
+    if scanned_bytes:
+        rate = scanned_bytes / scan_seconds / 1024 / 1024 if scan_seconds else 0
+        print(f"⚡ 字节预筛: {scanned_bytes / 1024 / 1024:.1f} MB，{rate:.0f} MB/s")
     print(f"✅ 成功修复: {len(fixed_files)} 个文件")
     
     if fixed_files:
@@ -189,6 +134,11 @@ def scan_and_fix_directory(root_dir='.'):
         for file in fixed_files:
             print(f"  - {file}")
     
+    if suspicious_files:
+        print(f"\n⚠️  疑似乱码但没有自动修复: {len(suspicious_files)} 个文件")
+        for file, signature in suspicious_files:
+            print(f"  - {file}: {signature}")
+    
     if error_files:
         print(f"\n❌ 错误: {len(error_files)} 个文件")
         for file, error in error_files:
@@ -200,7 +150,16 @@ def scan_and_fix_directory(root_dir='.'):
     return fixed_files, error_files
 
 if __name__ == '__main__':
-    fixed, errors = scan_and_fix_directory('.')
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        sys.exit(code)
+    profiler = profiler_from_argv()
+    # --preview[=补丁文件] 只输出差异，不写文件
+    fixed, errors = scan_and_fix_directory('.', use_cache='--no-cache' not in sys.argv, profiler=profiler,
+                                           writer=writer_from_argv())
+    if profiler is not None:
+        profiler.finish()
     
     if errors:
         exit(1)
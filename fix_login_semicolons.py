@@ -5,6 +5,17 @@
 """
 
 import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'scripts'))
+
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+
+# --rollback 恢复上次运行之前的内容
+code = rollback_from_argv()
+if code is not None:
+    sys.exit(code)
 
 # 读取文件
 with open('src/pages/login/index.tsx', 'r', encoding='utf-8') as f:
@@ -25,8 +36,8 @@ replacements = [
 for old, new in replacements:
     content = content.replace(old, new)
 
-# 写回文件
-with open('src/pages/login/index.tsx', 'w', encoding='utf-8') as f:
-    f.write(content)
+# 写回文件（--preview[=补丁文件] 时只输出差异）
+with writer_from_argv() as writer:
+    write_text('src/pages/login/index.tsx', content, writer)
 
 print("✅ 修复完成！")
@@ -1,74 +1,46 @@
 #!/usr/bin/env python3
-"""修复删除日志后产生的未使用变量"""
-import re
+"""修复删除日志后产生的未使用变量
+
+修复作为一个流水线阶段在内存覆盖层上执行，每个文件最多读一次、写一次，
+改写后校验失败的文件跳过并列出；与其他阶段串联时用 python scripts/run_codemods.py --pipeline。
+"""
+import sys
 from pathlib import Path
 
-def fix_unused_callback_params(content):
-    """修复回调函数中未使用的参数"""
-    # .subscribe((status) => {}) => .subscribe()
-    content = re.sub(r'\.subscribe\(\([^)]*\)\s*=>\s*\{\s*\}\)', '.subscribe()', content)
-    
-    # .on(..., (payload) => {}) => .on(..., () => {})  
-    content = re.sub(r'\(payload\)\s*=>\s*\{\s*\}', '() => {}', content)
-    
-    return content
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'scripts'))
 
-def fix_unused_destructuring(content):
-    """修复解构中未使用的变量"""
-    lines = content.split('\n')
-    result = []
-    
-    for line in lines:
-        # const {data} = ... => const {} = ... 或者整行删除
-        if re.search(r'const\s*\{\s*(data|status|payload)\s*\}\s*=', line):
-            if 'await' in line:
-                # 改为直接调用
-                line = re.sub(r'const\s*\{\s*(data|status|payload)\s*\}\s*=\s*', '', line)
-            else:
-                continue  # 删除整行
-        
-        # const _formatTime = ... => 删除整个函数定义
-        if re.match(r'\s*const\s+_\w+\s*=', line):
-            # 跳过函数定义直到下一个空行或新函数
-            if '=>' in line or 'function' in line:
-                continue
-        
-        result.append(line)
-    
-    return '\n'.join(result)
+from codemod.overlay import Overlay, Pipeline, Stage
+from codemod.preview import Preview
+from codemod.transaction import rollback_from_argv, writer_from_argv
+from codemod.unused_vars import fix_unused_vars
 
-def process_file(filepath):
-    """处理单个文件"""
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        original = content
-        content = fix_unused_callback_params(content)
-        content = fix_unused_destructuring(content)
-        
-        if content != original:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            return True
-        return False
-    except Exception as e:
-        print(f"处理文件 {filepath} 时出错: {e}")
-        return False
+STAGE = Stage('unused-vars', lambda content, path: fix_unused_vars(content), ('.ts', '.tsx'))
 
 def main():
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        return code
     src_dir = Path('src')
-    count = 0
+    files = list(src_dir.rglob('*.ts')) + list(src_dir.rglob('*.tsx'))
     
-    for filepath in src_dir.rglob('*.ts'):
-        if process_file(filepath):
-            count += 1
+    overlay = Overlay()
+    # 校验失败的文件保持原样，其余文件照常写入
+    result = Pipeline([STAGE], per_file=True).run(files, overlay)
+    for _, path, reason in result.skipped:
+        print(f"处理文件 {path} 时出错: {reason}（未写入该文件）")
     
-    for filepath in src_dir.rglob('*.tsx'):
-        if process_file(filepath):
-            count += 1
+    # --preview[=补丁文件] 只输出差异，不写文件
+    writer = writer_from_argv()
+    if isinstance(writer, Preview):
+        overlay.preview(writer)
+        writer.finish()
+        return 0
     
-    print(f"✓ 共处理 {count} 个文件")
+    with writer:
+        overlay.flush(writer)
+    print(f"✓ 共处理 {overlay.writes} 个文件")
+    return 0
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+根据 src/db/api 中的查询给出缺失索引建议
+
+重放 supabase/migrations 得到最终的索引和外键，提取 src/db/api/*.ts 中
+supabase.from('表') 调用链的过滤 / 排序列，列出没有索引覆盖的列和外键，
+按调用点数排序。规则见 codemod/index_advisor.py。
+
+用法：
+    python scripts/advise_indexes.py                  # 建议和引用了不存在的表 / 列的调用点
+    python scripts/advise_indexes.py --out supabase/migrations/99999_add_missing_indexes.sql
+    python scripts/advise_indexes.py --sites          # 同时列出每个建议的全部调用点
+
+生成的迁移使用 CREATE INDEX CONCURRENTLY，不能在事务中执行：
+用 apply_migration.py 执行时这类语句会单独成批。
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from codemod.index_advisor import API_DIR, REASONS, IndexAdvisor, scan_api, to_migration
+from codemod.schema import MIGRATIONS_DIR, migration_files, replay
+
+REPO_ROOT = SCRIPTS_DIR.parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description='根据 src/db/api 中的查询给出缺失索引建议')
+    parser.add_argument('--dir', default=str(REPO_ROOT / MIGRATIONS_DIR), help='迁移目录')
+    parser.add_argument('--api', default=str(REPO_ROOT / API_DIR), help='API 模块目录')
+    parser.add_argument('--out', help='把建议写成迁移文件')
+    parser.add_argument('--sites', action='store_true', help='列出每个建议的全部调用点')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    files = migration_files(args.dir)
+    schema = replay(files)
+    sites = [site._replace(path=os.path.relpath(site.path, REPO_ROOT)) for site in scan_api(args.api)]
+    advisor = IndexAdvisor(schema, sites)
+    suggestions = advisor.suggestions()
+    print(f'🔎 {len(schema.indexes)} 个索引，{len(sites)} 个查询调用点，{len(suggestions)} 条建议，'
+          f'耗时 {time.perf_counter() - started:.2f}s')
+
+    for item in suggestions:
+        reasons = '、'.join(REASONS[reason] for reason in item.reasons)
+        foreign = f'  外键 {item.foreign_key}' if item.foreign_key else ''
+        print(f'  {len(item.sites):4} 处  {item.table} ({", ".join(item.columns)})  {reasons}{foreign}')
+        if item.rename:
+            print(f'          ⚠️ 已有同名索引 {item.default_name}（覆盖不了这些列），改名为 {item.rename}')
+        if args.sites:
+            for location in item.sites:
+                print(f'          {location}')
+
+    unknown = advisor.unknown()
+    if unknown:
+        print(f'\n❓ 引用了最终结构中不存在的表或列（{len(unknown)} 处，索引建议不包括它们）:')
+        for item in unknown:
+            target = f'{item.table}.{item.column}' if item.column else item.table
+            print(f'  {target}  {item.location}')
+
+    if args.out:
+        header = (f'-- 缺失索引：由 scripts/advise_indexes.py 根据 {API_DIR} 的查询生成，合并前逐条确认\n'
+                  f'-- 最后一个迁移：{os.path.basename(files[-1]) if files else "无"}\n'
+                  f'-- CREATE INDEX CONCURRENTLY 不能在事务中执行')
+        with open(args.out, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(to_migration(suggestions, header))
+        print(f'\n📝 {os.path.relpath(args.out)}: {len(suggestions)} 个索引')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+代码清理脚本的基准测试
+
+在按 src/pages、supabase/migrations 形态合成的语料上计时各脚本的核心函数，
+与保存的基线比较，吞吐量回退超过容忍度、或某个基准在基线中没有记录时
+以退出码 1 结束（可直接放进 CI）。基线按固定校准负载的耗时换算到本机，
+仓库中的基线记录了 1× / 10× / 100× 三种倍数。
+
+用法：
+    python scripts/benchmark_codemods.py                    # 1× 语料，全部基准
+    python scripts/benchmark_codemods.py --scale 1,10,100   # 多个倍数
+    python scripts/benchmark_codemods.py --benchmarks logs,encoding-fixes
+    python scripts/benchmark_codemods.py --scale 1,10,100 --save-baseline  # 把本次结果写成基线
+    python scripts/benchmark_codemods.py --no-baseline      # 只计时，不与基线比较
+    python scripts/benchmark_codemods.py --write-corpus /tmp/corpus --scale 10
+    python scripts/benchmark_codemods.py --list
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import migrate_imports
+import remove_boss_id_from_api
+import remove_boss_id_step2
+import remove_boss_id_step3
+from codemod.api_index import API_DIR, default_export_index
+from codemod.bench import (BENCHMARKS, DEFAULT_TOLERANCE, Baseline, calibrate, compare, get_benchmarks,
+                           load_baseline, print_comparisons, register_benchmark, run_benchmarks,
+                           save_baseline)
+from codemod.corpus import DEFAULT_SEED, write_corpus
+from codemod.encoding import ENCODING_SCANNER, apply_encoding_fixes
+from codemod.logs import remove_log_statements
+from codemod.regex_rules import RegexRuleEngine
+from codemod.switch_repair import repair_orphan_switches
+from codemod.unused_vars import fix_unused_vars
+
+REPO_ROOT = SCRIPTS_DIR.parent
+BASELINE_FILE = SCRIPTS_DIR / 'benchmark_baseline.json'
+# 仓库中的基线记录的倍数
+BASELINE_SCALES = (1, 10, 100)
+
+# 正则规则引擎加载一次，所有文件共用
+_ENGINES = {
+    'boss-id-api': RegexRuleEngine(remove_boss_id_from_api.BOSS_ID_RULES),
+    'boss-id-step2': RegexRuleEngine(remove_boss_id_step2.STEP2_RULES),
+    'boss-id-step3': RegexRuleEngine(remove_boss_id_step3.STEP3_RULES),
+}
+
+# migrate-imports 使用的函数 -> 模块映射，不依赖当前目录
+_FUNCTION_TO_MODULE = default_export_index(str(REPO_ROOT / API_DIR)).function_to_module
+
+
+@register_benchmark('logs', 'clean_logs.py / smart_clean_logs.py：词法分析删除日志语句')
+def _bench_logs(document):
+    return remove_log_statements(document.text, jsx=document.path.endswith('.tsx'))
+
+
+@register_benchmark('unused-vars', 'fix_unused_vars.py：清理未使用的参数和变量')
+def _bench_unused_vars(document):
+    return fix_unused_vars(document.text)
+
+
+@register_benchmark('switch-repair', 'fix_syntax_errors.py：修复孤立的 switch')
+def _bench_switch_repair(document):
+    return repair_orphan_switches(document.text, document.path)
+
+
+@register_benchmark('encoding-prefilter', 'fix_encoding_全局.py：原始字节上的乱码特征预筛')
+def _bench_encoding_prefilter(document):
+    return ENCODING_SCANNER.search(document.data)
+
+
+@register_benchmark('encoding-fixes', 'fix_encoding_全局.py / fix_all_encoding.py：乱码替换')
+def _bench_encoding_fixes(document):
+    return apply_encoding_fixes(document.text)
+
+
+@register_benchmark('boss-id-api', 'remove_boss_id_from_api.py 的正则规则')
+def _bench_boss_id_api(document):
+    return _ENGINES['boss-id-api'].apply(document.text)
+
+
+@register_benchmark('boss-id-step2', 'remove_boss_id_step2.py 的正则规则')
+def _bench_boss_id_step2(document):
+    return _ENGINES['boss-id-step2'].apply(document.text)
+
+
+@register_benchmark('boss-id-step3', 'remove_boss_id_step3.py 的正则规则')
+def _bench_boss_id_step3(document):
+    return _ENGINES['boss-id-step3'].apply(document.text)
+
+
+@register_benchmark('migrate-imports', 'migrate_imports.py：解析 @/db/api 导入并改写引用')
+def _bench_migrate_imports(document):
+    return migrate_imports.migrate_source(document.text, jsx=document.path.endswith('.tsx'),
+                                          function_to_module=_FUNCTION_TO_MODULE)
+
+
+@register_benchmark('sql-prefilter', '迁移文件形态语料上的字节级特征扫描', corpus='sql')
+def _bench_sql_prefilter(document):
+    return ENCODING_SCANNER.search(document.data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='代码清理脚本的基准测试')
+    parser.add_argument('--scale', default='1',
+                        help=f'逗号分隔的语料倍数，基线中有 {",".join(map(str, BASELINE_SCALES))}（默认 1）')
+    parser.add_argument('--benchmarks', help='逗号分隔的基准名，默认全部')
+    parser.add_argument('--repeat', type=int, default=1, help='每个文件上重复次数，取最快一次（默认 1）')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='语料随机种子')
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果写入基线文件')
+    parser.add_argument('--no-baseline', action='store_true', help='只计时，不与基线比较')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'允许低于基线的比例（默认 {DEFAULT_TOLERANCE}）')
+    parser.add_argument('--write-corpus', metavar='DIR', help='只把语料写到目录，不执行基准')
+    parser.add_argument('--list', action='store_true', help='列出可用基准')
+    args = parser.parse_args()
+
+    if args.list:
+        for bench in BENCHMARKS.values():
+            print(f'{bench.name:20} [{bench.corpus}] {bench.description}')
+        return 0
+
+    scales = [int(scale) for scale in args.scale.split(',')]
+
+    if args.write_corpus:
+        for scale in scales:
+            for kind in ('ts', 'sql'):
+                out_dir = Path(args.write_corpus) / f'{kind}-{scale}x'
+                files, total = write_corpus(kind, scale, out_dir, args.seed, str(REPO_ROOT))
+                print(f'📝 {out_dir}: {files} 个文件，{total / 1024 / 1024:.1f} MB')
+        return 0
+
+    try:
+        benchmarks = get_benchmarks(args.benchmarks.split(',') if args.benchmarks else None)
+    except KeyError as e:
+        print(f'❌ {e.args[0]}')
+        return 2
+
+    # 前后各校准一次取较快的，减少运行期间机器负载变化的影响
+    calibration = calibrate()
+    results = []
+    try:
+        for scale in scales:
+            print(f'🚀 {scale}× 语料')
+            results.extend(run_benchmarks(benchmarks, scale, args.repeat, args.seed, str(REPO_ROOT)))
+    finally:
+        for engine in _ENGINES.values():
+            engine.close()
+    calibration = min(calibration, calibrate())
+
+    baseline = Baseline({}) if args.no_baseline else load_baseline(args.baseline)
+    comparisons = compare(results, baseline, calibration, args.tolerance)
+    print()
+    if baseline.calibration:
+        print(f'⚖️  校准耗时 {calibration * 1000:.1f} ms（基线 {baseline.calibration * 1000:.1f} ms），'
+              f'基线按 {baseline.calibration / calibration:.2f} 倍换算')
+    print_comparisons(comparisons)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, calibration)
+        print(f'\n📝 基线已写入 {args.baseline}')
+        return 0
+
+    if args.no_baseline:
+        return 0
+    regressed = [item for item in comparisons if item.regressed]
+    if regressed:
+        print(f'\n❌ {len(regressed)} 个基准的吞吐量低于基线 {args.tolerance:.0%} 以上')
+        return 1
+    # 没有基线的基准无法判断回退，不能当作通过
+    missing = [item.result.key for item in comparisons if not item.baseline]
+    if missing:
+        print(f'\n❌ {args.baseline} 中没有这些基准的记录: {", ".join(missing)}')
+        print('   用 --save-baseline 记录，或用 --no-baseline 只计时')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
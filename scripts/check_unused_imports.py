@@ -1,68 +1,97 @@
 #!/usr/bin/env python3
 """
 检查未使用的 API 模块导入
+
+基于项目级导入图（codemod/import_graph.py）：每个文件只分词一次，结果按文件
+指纹缓存，之后的运行只重新分词变化过的文件。报告三类问题：
+- 未使用的导入（命名空间导入和命名导入）
+- XxxAPI.member 引用了模块没有导出的成员（借助 src/db/api 导出索引）
+- src/db/api 中没有任何文件引用的导出
+
+用法：
+    python scripts/check_unused_imports.py              # 检查 src/pages
+    python scripts/check_unused_imports.py src         # 检查指定目录
+    python scripts/check_unused_imports.py --no-cache
 """
 
 import os
-import re
+import sys
+from collections import defaultdict
 from pathlib import Path
 
-def check_file(file_path):
-    """检查单个文件中未使用的导入"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 查找所有 API 导入
-    import_pattern = r'import \* as (\w+API) from [\'"]@/db/api/\w+[\'"]'
-    imports = re.findall(import_pattern, content)
-    
-    unused_imports = []
-    
-    for api_name in imports:
-        # 检查是否在代码中使用了这个 API
-        # 排除导入语句本身
-        usage_pattern = rf'\b{api_name}\.\w+'
-        
-        # 移除导入语句后的内容
-        content_without_imports = re.sub(r'import.*?from.*?\n', '', content)
-        
-        if not re.search(usage_pattern, content_without_imports):
-            unused_imports.append(api_name)
-    
-    return unused_imports
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.api_index import API_MODULE, default_export_index
+from codemod.import_graph import ImportGraph
+
+
+def missing_members(graph, path, index):
+    """文件中 XxxAPI.member 引用了 @/db/api/<模块> 没有导出的成员"""
+    record = graph.records[path]
+    missing = []
+    for decl in record['imports']:
+        if not decl['namespace'] or not decl['source'].startswith(API_MODULE + '/'):
+            continue
+        exports = index.exports_of(decl['source'][len(API_MODULE) + 1:])
+        if exports is None:
+            continue
+        for member in record['members'].get(decl['namespace'], ()):
+            if member not in exports:
+                missing.append(f"{decl['namespace']}.{member}")
+    return missing
+
 
 def main():
     print("🔍 检查未使用的 API 模块导入...\n")
     
-    pages_dir = Path('/workspace/app-7cdqf07mbu9t/src/pages')
+    dirs = [arg for arg in sys.argv[1:] if not arg.startswith('--')] or ['src/pages']
+    graph = ImportGraph(use_cache='--no-cache' not in sys.argv).build()
+    graph.save()
+    index = default_export_index()
+    
+    scope = sorted(path for path in graph.records
+                   if any(os.path.commonpath([path, os.path.normpath(d)]) == os.path.normpath(d) for d in dirs))
+    unused_by_file = defaultdict(list)
+    for item in graph.unused_imports(scope):
+        unused_by_file[item.path].append(item)
     
-    total_files = 0
-    files_with_unused = 0
     total_unused = 0
+    total_missing = 0
+    for path in scope:
+        unused = unused_by_file.get(path, [])
+        missing = missing_members(graph, path, index)
+        if not unused and not missing:
+            continue
+        total_unused += len(unused)
+        total_missing += len(missing)
+        print(f"📄 {path}")
+        for item in unused:
+            kind = '命名空间' if item.kind == 'namespace' else '导入'
+            print(f"   ❌ 未使用的{kind}: {item.local}（{item.source}）")
+        for member in missing:
+            print(f"   ⚠️  模块没有导出: {member}")
+        print()
     
-    for tsx_file in pages_dir.rglob('*.tsx'):
-        total_files += 1
-        unused = check_file(tsx_file)
-        
-        if unused:
-            files_with_unused += 1
-            total_unused += len(unused)
-            rel_path = tsx_file.relative_to(pages_dir)
-            print(f"📄 {rel_path}")
-            for api in unused:
-                print(f"   ❌ 未使用: {api}")
-            print()
+    dead = graph.dead_exports()
+    if dead:
+        print("🪦 src/db/api 中没有被引用的导出:")
+        for item in dead:
+            note = '（仅测试引用）' if item.tested else ''
+            print(f"   • {item.path}: {item.name}{note}")
+        print()
     
     print("=" * 80)
     print(f"📊 统计结果:")
-    print(f"   • 总文件数: {total_files}")
-    print(f"   • 有未使用导入的文件: {files_with_unused}")
+    print(f"   • 总文件数: {len(scope)}（导入图 {len(graph.records)} 个文件，本次分词 {graph.parsed} 个）")
+    print(f"   • 有未使用导入的文件: {len(unused_by_file)}")
     print(f"   • 未使用的导入总数: {total_unused}")
+    print(f"   • 引用了模块未导出的成员: {total_missing}")
+    print(f"   • 没有被引用的 API 导出: {len(dead)}")
     
     if total_unused == 0:
         print("\n✅ 太好了！没有发现未使用的 API 模块导入！")
     else:
-        print(f"\n⚠️  发现 {total_unused} 个未使用的 API 模块导入")
+        print(f"\n⚠️  发现 {total_unused} 个未使用的导入")
 
 if __name__ == '__main__':
     main()
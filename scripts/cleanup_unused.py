@@ -1,47 +1,138 @@
 #!/usr/bin/env python3
 """
 清理未使用的导入和变量
+
+只把自上次检查后变化过的文件交给 Biome（分批调用，JSON 报告边读边解析），
+noUnusedVariables / noUnusedImports 诊断直接交给 codemod/unused_vars.py 的
+fix_reported_unused 按位置修复。没有诊断的文件记入 .codemod-cache.json，
+下次只需 stat 即可跳过。
+
+用法：
+    python scripts/cleanup_unused.py                   # src/pages 中变化过的文件
+    python scripts/cleanup_unused.py src/pages/a.tsx   # 指定文件或目录
+    python scripts/cleanup_unused.py --all             # 忽略缓存，检查全部文件
+    python scripts/cleanup_unused.py --dry-run         # 只报告，不写入
+    python scripts/cleanup_unused.py --preview=u.patch # 不写入，输出差异并保存为可 git apply 的补丁
+    python scripts/cleanup_unused.py --rollback        # 恢复上次运行之前的文件内容
+    python scripts/cleanup_unused.py --biome-fix       # 之后再对这些文件运行 biome check --write --unsafe
 """
 
 import os
-import re
 import subprocess
-import json
-
-def get_unused_variables():
-    """获取所有未使用的变量"""
-    result = subprocess.run(
-        ['npx', 'biome', 'check', 'src/pages', '--diagnostic-level=warn', '--reporter=json'],
-        capture_output=True,
-        text=True,
-        cwd='/workspace/app-7cdqf07mbu9t'
-    )
-    
-    unused_vars = []
-    
-    # 解析输出
-    lines = result.stdout.split('\n')
-    for line in lines:
-        if 'unused' in line.lower():
-            print(f"Found unused: {line}")
-    
-    return unused_vars
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.biome import UNUSED_IMPORTS, UNUSED_VARIABLES, batches, char_span, fix_command, run_biome
+from codemod.cache import FileCache, make_key
+from codemod.preview import Preview
+from codemod.rules import TS_SUFFIXES, get_rules, ruleset_key
+from codemod.runner import iter_source_files
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+from codemod.unused_vars import fix_reported_unused
+
+BIOME_CONFIG = 'biome.json'
+
+
+def cache_key():
+    """Biome 配置或修复实现变化后，所有文件重新检查"""
+    config = Path(BIOME_CONFIG).read_bytes() if os.path.exists(BIOME_CONFIG) else b''
+    return make_key('cleanup-unused', config, ruleset_key(get_rules(['unused-vars'])))
+
+
+def changed_files(paths, cache, key):
+    """返回 [(路径, 原始字节, 指纹)]，内容对当前配置已知干净的文件跳过"""
+    changed = []
+    for path in paths:
+        if cache is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            changed.append((path, data, None))
+            continue
+        stale = cache.read_stale(path, key)
+        if stale is not None:
+            changed.append((path, stale[0], stale[1]))
+    return changed
+
+
+def get_unused_variables(paths):
+    """对 paths 运行 Biome，返回 {路径: {类别: [(字节起点, 字节终点)]}}"""
+    found = defaultdict(lambda: defaultdict(list))
+    for diagnostic in run_biome(paths):
+        if diagnostic.start is None:
+            continue
+        found[diagnostic.path][diagnostic.category].append((diagnostic.start, diagnostic.end))
+    return found
+
+
+def fix_file(path, data, spans, dry_run, writer=None):
+    """按诊断修复单个文件，返回修复处数；writer 为 Preview 时只输出差异"""
+    content = data.decode('utf-8')
+    variables = [char_span(data, start, end) for start, end in spans.get(UNUSED_VARIABLES, ())]
+    imports = [char_span(data, start, end) for start, end in spans.get(UNUSED_IMPORTS, ())]
+    new_content, fixed = fix_reported_unused(content, variables, imports, jsx=path.endswith('.tsx'))
+    if new_content != content and (not dry_run or isinstance(writer, Preview)):
+        write_text(path, new_content, writer, newline='')
+    return fixed
+
 
 def main():
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        return code
     print("🔍 检查未使用的变量和导入...")
     
-    # 运行 biome 自动修复
-    print("\n📝 运行 Biome 自动修复...")
-    result = subprocess.run(
-        ['npx', 'biome', 'check', '--write', '--unsafe', 'src/pages'],
-        capture_output=True,
-        text=True,
-        cwd='/workspace/app-7cdqf07mbu9t'
-    )
+    writer = writer_from_argv()
+    dry_run = '--dry-run' in sys.argv or isinstance(writer, Preview)
+    roots = [arg for arg in sys.argv[1:] if not arg.startswith('--')] or ['src/pages']
+    paths = [os.path.normpath(str(p)) for p in iter_source_files(roots, TS_SUFFIXES)]
+    cache = None if '--all' in sys.argv else FileCache()
+    key = cache_key()
+    
+    changed = changed_files(paths, cache, key)
+    print(f"📊 共 {len(paths)} 个文件，需要检查 {len(changed)} 个")
+    if not changed:
+        print("\n✅ 没有变化的文件，跳过 Biome")
+        return 0
+    
+    try:
+        diagnostics = get_unused_variables([path for path, _, _ in changed])
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    fixed_files = 0
+    fixed_total = 0
+    # 所有修复一起生效，之后的 Biome 修复看到的是完整的结果
+    with writer:
+        for path, data, fingerprint in changed:
+            spans = diagnostics.get(path)
+            if not spans:
+                if cache is not None and not dry_run:
+                    cache.mark_clean(path, key, fingerprint)
+                continue
+            fixed = fix_file(path, data, spans, dry_run, writer)
+            reported = sum(len(items) for items in spans.values())
+            print(f"📄 {path}: {reported} 条诊断，修复 {fixed} 处")
+            if fixed:
+                fixed_files += 1
+                fixed_total += fixed
+    
+    if '--biome-fix' in sys.argv and not dry_run:
+        print("\n📝 运行 Biome 自动修复...")
+        for batch in batches([path for path, _, _ in changed]):
+            result = subprocess.run(fix_command(batch), capture_output=True, text=True)
+            print(result.stdout)
     
-    print(result.stdout)
+    # --dry-run / --preview 不写任何文件，缓存也不更新
+    if cache is not None and not dry_run:
+        cache.save()
     
-    print("\n✅ 清理完成！")
+    print(f"\n✅ 清理完成！{fixed_files} 个文件，修复 {fixed_total} 处" + ("（预览，未写入）" if dry_run else ""))
+    return 0
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
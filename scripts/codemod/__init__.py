@@ -0,0 +1,6 @@
+"""
+代码改写（codemod）脚本共用的基础设施
+
+仓库根目录和 scripts/ 下的清理、迁移脚本都从这里导入公共能力，
+避免每个脚本各自按行数括号、各自遍历 src。
+"""
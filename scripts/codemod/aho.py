@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Aho-Corasick 多模式匹配与替换
+
+自动机只构建一次，之后每个文本一次扫描找出全部模式，按最左最长语义
+选出互不重叠的匹配。结果与模式表的顺序无关，替换结果也不会被再次匹配。
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple
+
+# (起始偏移, 结束偏移, 模式下标)
+Match = Tuple[int, int, int]
+
+
+class AhoCorasick:
+    """多模式匹配自动机"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = [p for p in dict.fromkeys(patterns) if p]
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append(index)
+
+        # 广度优先计算失败链接，并把转移补全成只含模式字符的 DFA
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(edges) for edges in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for char, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(char, 0) if state else 0
+                queue.append(nxt)
+            for char, target in delta[fail[state]].items():
+                delta[state].setdefault(char, target)
+
+        self._delta = delta
+        self._outputs = outputs
+        # 回到初始状态后，用正则直接跳到下一个可能开始匹配的字符
+        first_chars = sorted({p[0] for p in self.patterns})
+        self._first_re = re.compile('[' + ''.join(re.escape(c) for c in first_chars) + ']') \
+            if first_chars else None
+
+    def iter_matches(self, text: str) -> Iterator[Match]:
+        """按结束位置顺序产出所有（可能重叠的）匹配"""
+        if self._first_re is None:
+            return
+        delta = self._delta
+        outputs = self._outputs
+        patterns = self.patterns
+        search = self._first_re.search
+        state = 0
+        pos = 0
+        length = len(text)
+        while pos < length:
+            if state == 0:
+                match = search(text, pos)
+                if match is None:
+                    return
+                pos = match.start()
+            state = delta[state].get(text[pos], 0)
+            pos += 1
+            for index in outputs[state]:
+                yield pos - len(patterns[index]), pos, index
+
+    def search(self, text: str) -> bool:
+        """文本中是否包含任一模式"""
+        for _ in self.iter_matches(text):
+            return True
+        return False
+
+    def find_all(self, text: str) -> List[Match]:
+        """最左最长、互不重叠的匹配列表"""
+        matches = sorted(self.iter_matches(text), key=lambda m: (m[0], m[0] - m[1]))
+        selected = []
+        last_end = 0
+        for match in matches:
+            if match[0] >= last_end:
+                selected.append(match)
+                last_end = match[1]
+        return selected
+
+
+class MultiReplacer(AhoCorasick):
+    """基于 Aho-Corasick 的一次扫描批量替换"""
+
+    def __init__(self, replacements: Mapping[str, str]):
+        super().__init__(replacements.keys())
+        self.replacements = [replacements[p] for p in self.patterns]
+
+    def replace(self, text: str) -> Tuple[str, int]:
+        """替换全部匹配，返回 (新文本, 替换次数)"""
+        matches = self.find_all(text)
+        if not matches:
+            return text, 0
+        parts = []
+        last = 0
+        for start, end, index in matches:
+            parts.append(text[last:start])
+            parts.append(self.replacements[index])
+            last = end
+        parts.append(text[last:])
+        return ''.join(parts), len(matches)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+src/db/api 导出索引
+
+对 src/db/api/*.ts 分词并提取每个模块的导出，结果按文件内容哈希缓存：
+API 模块没有变化时只需 stat，不再读取和分词。索引取代手工维护的
+函数 -> 模块映射表，供 migrate_imports.py 和 check_unused_imports.py 使用。
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from codemod import imports as imports_module
+from codemod import lexer as lexer_module
+from codemod.cache import PARSE_CACHE_FILE, ParseCache, make_key
+from codemod.imports import parse_exports, parse_imports
+from codemod.lexer import tokenize_file
+
+API_DIR = 'src/db/api'
+API_MODULE = '@/db/api'
+
+
+class ModuleExports(NamedTuple):
+    # 模块名，即 @/db/api/ 之后的部分，如 users、users.cached
+    module: str
+    path: str
+    values: List[str]
+    types: List[str]
+    # 从其他模块导入后再导出的名字（不是本模块定义的）
+    reexports: List[str]
+
+
+def is_primary_module(module: str) -> bool:
+    """参与函数 -> 模块映射的模块：排除 index 汇总和 users.cached 之类的变体"""
+    return module != 'index' and '.' not in module
+
+
+def _parser_key() -> str:
+    """解析器版本键，分词或导出解析的实现变化后缓存自动失效"""
+    sources = [Path(module.__file__).read_bytes() for module in (lexer_module, imports_module)]
+    return make_key('api-exports', Path(__file__).read_bytes(), *sources)
+
+
+def _parse_module(path: str, data: bytes) -> dict:
+    lexed = tokenize_file(path, data.decode('utf-8'))
+    names, stars = parse_exports(lexed)
+    imported = {spec.local for decl in parse_imports(lexed) for spec in decl.specifiers or ()}
+    return {
+        'values': [name.name for name in names if not name.type_only],
+        'types': [name.name for name in names if name.type_only],
+        'reexports': [name.name for name in names if name.source or name.local in imported],
+        'stars': stars,
+    }
+
+
+class ExportIndex:
+    """模块 -> 导出，以及由主模块导出推出的函数 -> 模块映射"""
+
+    def __init__(self, modules: Dict[str, ModuleExports]):
+        self.modules = modules
+        # 建立索引时实际分词的文件数（其余命中缓存）
+        self.parsed = 0
+        # 导出名 -> 定义它的主模块（转出不算定义）
+        owners: Dict[str, List[str]] = {}
+        for module in sorted(modules):
+            if not is_primary_module(module):
+                continue
+            reexports = set(modules[module].reexports)
+            for name in modules[module].values:
+                if name not in reexports:
+                    owners.setdefault(name, []).append(module)
+        self.function_to_module: Dict[str, str] = {
+            name: found[0] for name, found in owners.items() if len(found) == 1
+        }
+        # 被多个主模块各自定义的同名函数，无法确定迁移目标，不进入映射
+        self.ambiguous: Dict[str, List[str]] = {
+            name: found for name, found in owners.items() if len(found) > 1
+        }
+
+    def exports_of(self, module: str) -> Optional[Set[str]]:
+        """模块的全部导出名（值和类型），未知模块返回 None"""
+        exports = self.modules.get(module)
+        if exports is None:
+            return None
+        return set(exports.values) | set(exports.types)
+
+    def module_of(self, name: str) -> Optional[str]:
+        return self.function_to_module.get(name)
+
+
+def _resolve_stars(raw: Dict[str, dict]) -> Dict[str, dict]:
+    """把 export * from './x' 展开成 x 的导出（同目录内，防止循环）"""
+    resolved: Dict[str, dict] = {}
+
+    def visit(module: str, stack: Set[str]) -> dict:
+        if module in resolved:
+            return resolved[module]
+        entry = raw[module]
+        values = list(entry['values'])
+        types = list(entry['types'])
+        reexports = list(entry['reexports'])
+        for source in entry['stars']:
+            target = source[2:] if source.startswith('./') else None
+            if target in raw and target not in stack:
+                child = visit(target, stack | {module})
+                reexports.extend(name for name in child['values'] if name not in values)
+                values.extend(name for name in child['values'] if name not in values)
+                types.extend(name for name in child['types'] if name not in types)
+        resolved[module] = {'values': values, 'types': types, 'reexports': reexports}
+        return resolved[module]
+
+    for module in raw:
+        visit(module, {module})
+    return resolved
+
+
+def build_export_index(api_dir=API_DIR, cache_file=PARSE_CACHE_FILE,
+                       use_cache: bool = True) -> ExportIndex:
+    """扫描 api_dir 下的模块（不含 *.test.ts）并建立索引"""
+    api_dir = Path(api_dir)
+    paths = sorted(str(api_dir / name) for name in os.listdir(api_dir)
+                   if name.endswith('.ts') and not name.endswith(('.test.ts', '.d.ts')))
+    cache = ParseCache('api-exports', _parser_key(), cache_file) if use_cache else None
+    raw = {}
+    module_paths = {}
+    for path in paths:
+        module = Path(path).name[:-len('.ts')]
+        module_paths[module] = path
+        if cache is not None:
+            raw[module] = cache.load(path, lambda data, path=path: _parse_module(path, data))
+        else:
+            with open(path, 'rb') as f:
+                raw[module] = _parse_module(path, f.read())
+    if cache is not None:
+        cache.prune(paths)
+        cache.save()
+    resolved = _resolve_stars(raw)
+    index = ExportIndex({
+        module: ModuleExports(module, module_paths[module], **resolved[module])
+        for module in raw
+    })
+    index.parsed = cache.parsed if cache is not None else len(paths)
+    return index
+
+
+@lru_cache(maxsize=None)
+def default_export_index(api_dir: str = API_DIR) -> ExportIndex:
+    """当前目录下 src/db/api 的索引，进程内只建立一次"""
+    return build_export_index(api_dir)
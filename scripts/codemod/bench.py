@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+基准测试注册表与执行器
+
+每个基准是一个作用在单个语料文件上的函数 (Document) -> 任意结果，
+只计时函数本身（语料生成不计入）。吞吐量以 MB/s 计，与保存的基线比较，
+低于基线超过容忍度即视为回退。
+
+不同机器的绝对速度差别很大，基线同时记录一个固定校准负载（正则扫描加逐字符
+循环，与被测代码无关）的耗时；比较时按本机与基线机器的校准耗时之比换算基线，
+提交到仓库的基线在任何机器上都可以用。
+"""
+
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from codemod.corpus import DEFAULT_SEED, Document, iter_corpus
+
+# 2：增加校准耗时
+BASELINE_VERSION = 2
+
+# 吞吐量低于基线的比例超过该值视为回退
+DEFAULT_TOLERANCE = 0.25
+
+# 校准负载重复次数，取最快一次
+CALIBRATION_ROUNDS = 7
+_CALIBRATION_TEXT = ''.join(f'const value{i} = call(arg{i}, "s{i}", {{ k: {i} }}); // note {i}\n'
+                            for i in range(5000))
+_CALIBRATION_TOKEN = re.compile(r'"[^"]*"|//[^\n]*|\w+|\S')
+
+
+class Benchmark(NamedTuple):
+    name: str
+    description: str
+    # 语料种类：ts / sql
+    corpus: str
+    func: Callable[[Document], object]
+
+
+class BenchResult(NamedTuple):
+    name: str
+    scale: int
+    files: int
+    bytes: int
+    seconds: float
+
+    @property
+    def key(self) -> str:
+        return f'{self.name}@{self.scale}x'
+
+    @property
+    def throughput(self) -> float:
+        """MB/s"""
+        return self.bytes / 1024 / 1024 / self.seconds if self.seconds else 0.0
+
+
+class Baseline(NamedTuple):
+    # {基准名@倍数: MB/s}
+    results: Dict[str, float]
+    # 记录基线时校准负载的耗时（秒），没有基线时为 None
+    calibration: Optional[float] = None
+
+
+class Comparison(NamedTuple):
+    result: BenchResult
+    # 按校准换算到本机的基线 MB/s，没有基线时为 None
+    baseline: Optional[float]
+    regressed: bool
+
+    @property
+    def ratio(self) -> Optional[float]:
+        return self.result.throughput / self.baseline if self.baseline else None
+
+
+# 基准名 -> 基准，字典顺序即执行顺序
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def register_benchmark(name: str, description: str, corpus: str = 'ts'):
+    """注册一个基准（装饰器）"""
+    def decorator(func):
+        if name in BENCHMARKS:
+            raise ValueError(f'基准重复注册: {name}')
+        BENCHMARKS[name] = Benchmark(name, description, corpus, func)
+        return func
+    return decorator
+
+
+def get_benchmarks(names: Optional[Sequence[str]] = None) -> List[Benchmark]:
+    """按注册顺序返回基准，names 为空时返回全部"""
+    if not names:
+        return list(BENCHMARKS.values())
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise KeyError(f'未知基准: {", ".join(unknown)}')
+    return [bench for bench in BENCHMARKS.values() if bench.name in names]
+
+
+def run_benchmarks(benchmarks: Sequence[Benchmark], scale: int, repeat: int = 1,
+                   seed: int = DEFAULT_SEED, root: str = '.') -> List[BenchResult]:
+    """在 scale 倍语料上执行基准
+
+    同一种语料只生成一遍，每个文件依次交给所有基准；每个文件上取 repeat 次
+    中最快的一次再累加，减少偶发抖动的影响。
+    """
+    results = []
+    for kind in sorted({bench.corpus for bench in benchmarks}):
+        selected = [bench for bench in benchmarks if bench.corpus == kind]
+        seconds = [0.0] * len(selected)
+        files = 0
+        total = 0
+        for document in iter_corpus(kind, scale, seed, root):
+            files += 1
+            total += len(document.data)
+            for index, bench in enumerate(selected):
+                best = None
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    bench.func(document)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                seconds[index] += best
+        results.extend(BenchResult(bench.name, scale, files, total, seconds[index])
+                       for index, bench in enumerate(selected))
+    order = {bench.name: index for index, bench in enumerate(benchmarks)}
+    results.sort(key=lambda r: order[r.name])
+    return results
+
+
+def _calibration_work() -> int:
+    count = 0
+    for match in _CALIBRATION_TOKEN.finditer(_CALIBRATION_TEXT):
+        count += len(match.group())
+    for char in _CALIBRATION_TEXT:
+        if char == '(' or char == '"':
+            count += 1
+    return count
+
+
+def calibrate(rounds: int = CALIBRATION_ROUNDS) -> float:
+    """固定校准负载的最快耗时（秒），衡量本机单核速度"""
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        _calibration_work()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def load_baseline(path) -> Baseline:
+    """基线文件中的 {基准名@倍数: MB/s} 和校准耗时，文件不存在或版本不符时为空"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return Baseline({})
+    if data.get('version') != BASELINE_VERSION or not data.get('calibration'):
+        return Baseline({})
+    return Baseline({key: entry['mb_per_s'] for key, entry in data.get('results', {}).items()},
+                    data['calibration'])
+
+
+def save_baseline(path, results: Sequence[BenchResult], calibration: float):
+    """把本次结果合并写入基线文件（保留其他基准和倍数的已有记录）
+
+    已有记录是在另一次校准下测得的，先按两次校准耗时之比换算到本次的校准。
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != BASELINE_VERSION or not data.get('calibration'):
+            data = {}
+    except (OSError, ValueError):
+        data = {}
+    entries = data.get('results', {})
+    if entries:
+        factor = data['calibration'] / calibration
+        for entry in entries.values():
+            entry['mb_per_s'] = round(entry['mb_per_s'] * factor, 3)
+    for result in results:
+        entries[result.key] = {
+            'mb_per_s': round(result.throughput, 3),
+            'files': result.files,
+            'bytes': result.bytes,
+        }
+    data = {'version': BASELINE_VERSION, 'calibration': round(calibration, 6),
+            'results': dict(sorted(entries.items()))}
+    tmp = Path(str(path) + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def compare(results: Sequence[BenchResult], baseline: Baseline, calibration: Optional[float] = None,
+            tolerance: float = DEFAULT_TOLERANCE) -> List[Comparison]:
+    """calibration 为本机的校准耗时；基线 MB/s 乘以 基线校准耗时 / 本机校准耗时 后再比较"""
+    factor = baseline.calibration / calibration if baseline.calibration and calibration else 1.0
+    comparisons = []
+    for result in results:
+        expected = baseline.results.get(result.key)
+        if expected is not None:
+            expected *= factor
+        regressed = expected is not None and result.throughput < expected * (1 - tolerance)
+        comparisons.append(Comparison(result, expected, regressed))
+    return comparisons
+
+
+def print_comparisons(comparisons: Sequence[Comparison]):
+    print(f'{"基准":28} {"文件":>8} {"MB":>8} {"秒":>8} {"MB/s":>8} {"基线":>8} {"比例":>7}')
+    for item in comparisons:
+        result = item.result
+        baseline = f'{item.baseline:8.2f}' if item.baseline else f'{"-":>8}'
+        ratio = f'{item.ratio:6.0%}' if item.ratio else f'{"-":>6}'
+        mark = ' ❌' if item.regressed else ''
+        print(f'{result.key:28} {result.files:8} {result.bytes / 1024 / 1024:8.1f} '
+              f'{result.seconds:8.2f} {result.throughput:8.2f} {baseline} {ratio:>7}{mark}')
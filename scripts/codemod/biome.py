@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+按文件分批调用 Biome，流式解析 JSON 报告
+
+Biome 的 JSON 报告是一个大对象，diagnostics 数组里每条诊断都可能带着整段
+源码；这里边读子进程输出边解码数组元素，不必等进程结束、也不必把整份输出
+读进内存再 json.loads。只把需要检查的文件交给 Biome，每批固定数量，避免
+命令行过长，也避免为几个文件跑一遍全量检查。
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+BIOME_COMMAND = ['npx', 'biome']
+# 每次调用 Biome 传入的文件数
+BATCH_SIZE = 50
+UNUSED_VARIABLES = 'lint/correctness/noUnusedVariables'
+UNUSED_IMPORTS = 'lint/correctness/noUnusedImports'
+UNUSED_RULES = (UNUSED_VARIABLES, UNUSED_IMPORTS)
+_READ_SIZE = 64 * 1024
+
+
+class BiomeDiagnostic(NamedTuple):
+    path: str
+    # 如 lint/correctness/noUnusedVariables
+    category: str
+    severity: str
+    description: str
+    # Biome 给出的 UTF-8 字节偏移，没有位置时为 None
+    start: Optional[int]
+    end: Optional[int]
+
+
+def _diagnostic(item: dict) -> BiomeDiagnostic:
+    location = item.get('location') or {}
+    path = location.get('path')
+    if isinstance(path, dict):
+        path = path.get('file')
+    span = location.get('span')
+    start = end = None
+    if isinstance(span, (list, tuple)) and len(span) == 2:
+        start, end = span
+    elif isinstance(span, dict):
+        start, end = span.get('start'), span.get('end')
+    return BiomeDiagnostic(os.path.normpath(path) if path else '', item.get('category') or '',
+                           item.get('severity') or '', item.get('description') or '', start, end)
+
+
+def iter_json_array(chunks: Iterable[str], key: str = 'diagnostics') -> Iterator[dict]:
+    """从分块到达的 JSON 文本中逐个取出顶层对象 key 数组的元素
+
+    先找到 "key": [，之后每个元素完整到达就解码交出，已解码的部分随即丢弃。
+    读到数组结尾时返回 True（即使数组为空），输出中没有完整的数组时返回 False。
+    """
+    decoder = json.JSONDecoder()
+    marker = f'"{key}"'
+    buffer = ''
+    position = None
+    for chunk in chunks:
+        buffer += chunk
+        if position is None:
+            found = buffer.find(marker)
+            if found < 0:
+                # 保留末尾，标记可能跨块
+                buffer = buffer[-len(marker):]
+                continue
+            bracket = buffer.find('[', found + len(marker))
+            if bracket < 0:
+                buffer = buffer[found:]
+                continue
+            position = bracket + 1
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(buffer) or buffer[position] == ']':
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # 元素还没读完整
+                break
+            yield item
+        if position < len(buffer) and buffer[position] == ']':
+            return True
+        buffer = buffer[position:]
+        position = 0
+    return False
+
+
+def _read_chunks(stream) -> Iterator[str]:
+    while True:
+        chunk = stream.read(_READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _diagnostics(stream) -> Iterator[BiomeDiagnostic]:
+    """逐条交出报告中的诊断，返回是否读到了完整的 diagnostics 数组"""
+    items = iter_json_array(_read_chunks(stream))
+    while True:
+        try:
+            item = next(items)
+        except StopIteration as stop:
+            return bool(stop.value)
+        yield _diagnostic(item)
+
+
+def batches(paths: Sequence[str], size: int = BATCH_SIZE) -> Iterator[List[str]]:
+    for index in range(0, len(paths), size):
+        yield list(paths[index:index + size])
+
+
+def lint_command(paths: Sequence[str], rules: Sequence[str] = UNUSED_RULES) -> List[str]:
+    command = BIOME_COMMAND + ['lint', '--reporter=json', '--max-diagnostics=none',
+                               '--diagnostic-level=warn']
+    command += [f'--only={rule[len("lint/"):]}' for rule in rules]
+    return command + ['--'] + list(paths)
+
+
+def run_biome(paths: Sequence[str], rules: Sequence[str] = UNUSED_RULES,
+              batch_size: int = BATCH_SIZE, cwd: Optional[str] = None) -> Iterator[BiomeDiagnostic]:
+    """分批对 paths 运行 biome lint，诊断边解析边交出
+
+    Biome 没有启动成功、或某一批没有输出完整的 JSON 报告时抛出 RuntimeError。
+    配置错误、npx 失败时 Biome 同样以退出码 1 结束，只是没有报告，
+    不能当成“没有诊断”，否则调用方会把这些文件记为干净。
+    """
+    for batch in batches(list(paths), batch_size):
+        # stderr 写到临时文件，避免管道写满后与读 stdout 互相等待
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as errors:
+            try:
+                process = subprocess.Popen(lint_command(batch, rules), cwd=cwd, stdout=subprocess.PIPE,
+                                           stderr=errors, text=True, encoding='utf-8')
+            except OSError as e:
+                raise RuntimeError(f'无法启动 Biome: {e}') from e
+            try:
+                reported = yield from _diagnostics(process.stdout)
+                # 读完数组之后的剩余输出，进程才能正常退出
+                process.stdout.read()
+            finally:
+                process.stdout.close()
+                process.wait()
+            errors.seek(0)
+            stderr = errors.read()
+        # 有诊断时 Biome 以退出码 1 结束；退出码本身不说明成败，以是否读到报告为准
+        if not reported:
+            raise RuntimeError(f'Biome 没有输出 JSON 报告（退出码 {process.returncode}）: {stderr.strip()[:500]}')
+        if process.returncode not in (0, 1):
+            raise RuntimeError(f'Biome 退出码 {process.returncode}: {stderr.strip()[:500]}')
+
+
+def char_span(data: bytes, start: int, end: int) -> Tuple[int, int]:
+    """把 Biome 的 UTF-8 字节偏移换算成解码后字符串中的偏移"""
+    if data.isascii():
+        return start, end
+    head = len(data[:start].decode('utf-8', errors='ignore'))
+    return head, head + len(data[start:end].decode('utf-8', errors='ignore'))
+
+
+def fix_command(paths: Sequence[str]) -> List[str]:
+    """Biome 自己的安全+不安全修复（原 cleanup_unused.py 的做法），限定在 paths"""
+    return BIOME_COMMAND + ['check', '--write', '--unsafe', '--'] + list(paths)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+字节级特征预筛
+
+直接在原始字节上查找乱码特征序列（大文件用 mmap 映射，不整体读入），
+只有命中的文件才需要完整解码和修复。同时顺带计算内容哈希供缓存使用。
+"""
+
+import hashlib
+import mmap
+import os
+import re
+from typing import Mapping, NamedTuple, Optional
+
+from codemod.cache import Fingerprint
+
+# 超过该大小的文件使用 mmap 扫描
+MMAP_THRESHOLD = 256 * 1024
+
+
+class ScanResult(NamedTuple):
+    size: int
+    # 命中的特征名，未命中为 None
+    signature: Optional[str]
+    fingerprint: Fingerprint
+
+
+class SignatureScanner:
+    """在字节流中一次查找多个特征序列"""
+
+    def __init__(self, signatures: Mapping[str, bytes]):
+        self.names = {sig: name for name, sig in signatures.items()}
+        # 长的特征优先，避免前缀相同时命中较短的特征
+        ordered = sorted(self.names, key=len, reverse=True)
+        self._re = re.compile(b'|'.join(re.escape(sig) for sig in ordered))
+
+    def search(self, data) -> Optional[str]:
+        """data 为 bytes 或 mmap，返回命中的特征名"""
+        match = self._re.search(data)
+        return self.names[match.group()] if match else None
+
+    def scan_file(self, path) -> ScanResult:
+        stat = os.stat(path)
+        size = stat.st_size
+        if size == 0:
+            return ScanResult(0, None, (stat.st_mtime_ns, 0, hashlib.sha1(b'').hexdigest()))
+        with open(path, 'rb') as f:
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    signature = self.search(data)
+                    digest = hashlib.sha1(data).hexdigest()
+            else:
+                data = f.read()
+                signature = self.search(data)
+                digest = hashlib.sha1(data).hexdigest()
+        return ScanResult(size, signature, (stat.st_mtime_ns, size, digest))
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+跨运行的文件内容缓存
+
+按规则集版本记录每个文件的 mtime/大小/内容哈希。文件对当前规则集已知是
+干净的（规则不会再修改它）时，下次运行只需一次 stat 即可跳过；mtime 变了
+但内容没变（例如 git checkout）时，比较哈希后同样跳过，不再解码和正则扫描。
+
+ParseCache 用同样的指纹缓存每个文件的解析结果（导出表、导入表等），
+文件没变时直接复用，不再读取和分词。
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CACHE_FILE = '.codemod-cache.json'
+CACHE_VERSION = 1
+
+PARSE_CACHE_FILE = '.codemod-parse-cache.json'
+
+# 最多保留的规则集数量，超出时丢弃最久未使用的
+MAX_RULESETS = 8
+
+# (mtime_ns, size, sha1)
+Fingerprint = Tuple[int, int, str]
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def make_key(*parts) -> str:
+    """由若干部分（规则名、版本、规则源码等）生成规则集版本键"""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+
+def file_fingerprint(path, data: bytes) -> Fingerprint:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, content_hash(data)
+
+
+class FileCache:
+    """sidecar 索引：规则集版本键 -> {路径: 指纹}"""
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = Path(cache_file)
+        self.rulesets: Dict[str, Dict[str, List]] = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == CACHE_VERSION:
+            self.rulesets = data.get('rulesets', {})
+
+    def _entries(self, key: str) -> Dict[str, List]:
+        entries = self.rulesets.pop(key, None)
+        if entries is None:
+            entries = {}
+        # 重新插入，字典顺序即最近使用顺序
+        self.rulesets[key] = entries
+        return entries
+
+    def lookup(self, path, key: str) -> Optional[Fingerprint]:
+        entry = self.rulesets.get(key, {}).get(str(path))
+        return tuple(entry) if entry else None
+
+    def is_fresh(self, path, key: str) -> bool:
+        """只用 stat 判断文件是否仍是已知干净的状态"""
+        entry = self.lookup(path, key)
+        if not entry:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size
+
+    def read_stale(self, path, key: str) -> Optional[Tuple[bytes, Fingerprint]]:
+        """读取需要重新处理的文件，返回 (内容, 指纹)
+
+        文件已知干净（stat 未变，或内容哈希与记录一致）时返回 None
+        """
+        if self.is_fresh(path, key):
+            return None
+        with open(path, 'rb') as f:
+            data = f.read()
+        fingerprint = file_fingerprint(path, data)
+        entry = self.lookup(path, key)
+        if entry and entry[2] == fingerprint[2]:
+            self.mark_clean(path, key, fingerprint)
+            return None
+        return data, fingerprint
+
+    def mark_clean(self, path, key: str, fingerprint: Fingerprint):
+        self._entries(key)[str(path)] = list(fingerprint)
+        self.dirty = True
+
+    def forget(self, path, key: str):
+        if self.rulesets.get(key, {}).pop(str(path), None) is not None:
+            self.dirty = True
+
+    def save(self):
+        """写回索引（先写临时文件再替换，避免中途失败留下损坏的索引）"""
+        if not self.dirty:
+            return
+        while len(self.rulesets) > MAX_RULESETS:
+            del self.rulesets[next(iter(self.rulesets))]
+        tmp = self.cache_file.with_name(self.cache_file.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'rulesets': self.rulesets}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.cache_file)
+        self.dirty = False
+
+
+class ParseCache:
+    """按文件指纹缓存解析结果
+
+    一个缓存文件中可以有多个命名空间（导出索引、导入图等），各自带版本键，
+    解析器实现变化时只丢弃对应命名空间。
+    """
+
+    def __init__(self, namespace: str, key: str, cache_file=PARSE_CACHE_FILE):
+        self.namespace = namespace
+        self.key = key
+        self.cache_file = Path(cache_file)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        # 本次运行中实际解析（未命中缓存）的文件数
+        self.parsed = 0
+        self._load()
+
+    def _read_file(self) -> dict:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if data.get('version') == CACHE_VERSION else {}
+
+    def _load(self):
+        section = self._read_file().get('namespaces', {}).get(self.namespace)
+        if section and section.get('key') == self.key:
+            self.entries = section.get('entries', {})
+
+    def load(self, path, parse: Callable[[bytes], Any]) -> Any:
+        """返回文件的解析结果：stat 未变或内容哈希未变时用缓存，否则调用 parse(原始字节)"""
+        path = str(path)
+        entry = self.entries.get(path)
+        stat = os.stat(path)
+        if entry and entry['fingerprint'][0] == stat.st_mtime_ns and entry['fingerprint'][1] == stat.st_size:
+            return entry['data']
+        with open(path, 'rb') as f:
+            data = f.read()
+        fingerprint = [stat.st_mtime_ns, stat.st_size, content_hash(data)]
+        cached = self.reuse(path, fingerprint)
+        if cached is not None:
+            return cached
+        result = parse(data)
+        self.store(path, fingerprint, result)
+        return result
+
+    def fresh(self, path) -> Any:
+        """stat 未变时返回缓存的解析结果，否则返回 None（解析交给调用方，例如子进程）"""
+        entry = self.entries.get(str(path))
+        if not entry:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if entry['fingerprint'][0] == stat.st_mtime_ns and entry['fingerprint'][1] == stat.st_size:
+            return entry['data']
+        return None
+
+    def reuse(self, path, fingerprint: Fingerprint) -> Any:
+        """内容哈希与缓存一致时更新 stat 并返回缓存的结果，否则返回 None"""
+        entry = self.entries.get(str(path))
+        if entry and entry['fingerprint'][2] == fingerprint[2]:
+            entry['fingerprint'] = list(fingerprint)
+            self.dirty = True
+            return entry['data']
+        return None
+
+    def store(self, path, fingerprint: Fingerprint, result: Any):
+        self.entries[str(path)] = {'fingerprint': list(fingerprint), 'data': result}
+        self.parsed += 1
+        self.dirty = True
+
+    def prune(self, paths):
+        """丢弃不在 paths 中的条目（文件已删除）"""
+        keep = {str(p) for p in paths}
+        for path in [p for p in self.entries if p not in keep]:
+            del self.entries[path]
+            self.dirty = True
+
+    def save(self):
+        """只写回本命名空间，保留文件中其他命名空间的内容"""
+        if not self.dirty:
+            return
+        data = self._read_file()
+        namespaces = data.get('namespaces', {})
+        namespaces[self.namespace] = {'key': self.key, 'entries': self.entries}
+        tmp = self.cache_file.with_name(self.cache_file.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'namespaces': namespaces}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.cache_file)
+        self.dirty = False
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+合成基准语料
+
+按真实目录（src/pages、supabase/migrations）的文件数和平均大小生成
+形态相近的 TS/TSX 与 SQL 文件，可放大到 1×/10×/100×。同一个 (种类, 倍数, 种子)
+总是生成完全相同的内容，基准结果可以跨机器、跨提交对比。
+
+语料逐个文件生成，100× 也不需要把全部内容放进内存。
+"""
+
+import os
+import random
+from pathlib import Path
+from typing import Iterator, NamedTuple, Tuple
+
+TS_ROOT = 'src/pages'
+SQL_ROOT = 'supabase/migrations'
+
+# 真实目录不存在时使用的规模（2025-11 时的 src/pages 和 supabase/migrations）
+DEFAULT_SHAPES = {
+    'ts': (170, 2_112_336),
+    'sql': (634, 2_784_620),
+}
+
+DEFAULT_SEED = 20251122
+
+
+class Document(NamedTuple):
+    path: str
+    text: str
+    data: bytes
+
+
+# 语料中使用的 @/db/api 函数，均能在 src/db/api 的导出索引中唯一确定模块
+API_FUNCTIONS = [
+    'getCurrentUserProfile', 'getAllWarehouses', 'getDriverStats', 'createNotification',
+    'getAllDrivers', 'getMonthlyAttendance', 'getLeaveApplicationsByUser', 'updateVehicle',
+    'getPieceWorkRecordsByUser', 'getWarehouseDashboardStats', 'getPeerAccounts',
+    'getLocalDateString', 'reviewLeaveApplication', 'getAllCategories', 'markNotificationAsRead',
+]
+
+_STATUSES = [
+    ('pending', '待审批'), ('approved', '已通过'), ('rejected', '已拒绝'),
+    ('cancelled', '已取消'), ('draft', '草稿'), ('normal', '正常'), ('late', '迟到'),
+]
+
+_TABLES = [
+    'attendance', 'leave_applications', 'piece_work_records', 'vehicles', 'warehouses',
+    'notifications', 'driver_warehouses', 'manager_warehouses', 'category_prices', 'feedback',
+]
+
+
+def real_shape(kind: str, root: str = '.') -> Tuple[int, int]:
+    """真实目录的 (文件数, 总字节数)，目录不存在时返回默认规模"""
+    directory = Path(root) / (TS_ROOT if kind == 'ts' else SQL_ROOT)
+    suffixes = ('.ts', '.tsx') if kind == 'ts' else ('.sql',)
+    count = 0
+    total = 0
+    if directory.is_dir():
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if filename.endswith(suffixes):
+                    count += 1
+                    total += os.path.getsize(os.path.join(dirpath, filename))
+    return (count, total) if count else DEFAULT_SHAPES[kind]
+
+
+# ---- TS/TSX ----
+
+def _ts_header(rng: random.Random) -> str:
+    functions = rng.sample(API_FUNCTIONS, rng.randint(2, 6))
+    lines = [
+        "import {useCallback, useState} from 'react'",
+        "import Taro, {useDidShow} from '@tarojs/taro'",
+        "import {ScrollView, Text, View} from '@tarojs/components'",
+    ]
+    if len(functions) > 3:
+        lines.append('import {\n' + ''.join(f'  {name},\n' for name in functions) + "} from '@/db/api'")
+    else:
+        lines.append('import {' + ', '.join(functions) + "} from '@/db/api'")
+    lines.append("import type {Profile} from '@/db/types'")
+    lines.append("import {createLogger} from '@/utils/logger'")
+    lines.append('')
+    lines.append("const logger = createLogger('Page')")
+    return '\n'.join(lines) + '\n\n'
+
+
+def _ts_switch_helper(rng: random.Random, index: int) -> str:
+    cases = rng.sample(_STATUSES, rng.randint(3, len(_STATUSES)))
+    body = ''.join(f"    case '{key}':\n      return '{label}'\n" for key, label in cases)
+    return (f'const getStatusText{index} = (status: string) => {{\n'
+            f'  switch (status) {{\n{body}    default:\n      return \'未知\'\n  }}\n}}\n\n')
+
+
+def _ts_handler(rng: random.Random, index: int) -> str:
+    func = rng.choice(API_FUNCTIONS)
+    parts = [f'  const load{index} = useCallback(async () => {{\n']
+    parts.append(f"    console.log('开始加载 {index}', {{page: {index}, size: 20}})\n")
+    parts.append('    try {\n')
+    parts.append(f'      const result = await {func}(user.id)\n')
+    if rng.random() < 0.5:
+        # 多行日志，参数里有括号、模板字符串和嵌套调用
+        parts.append('      console.log(\n'
+                     f"        '加载结果 (第 {index} 批):',\n"
+                     '        `共 ${result.length} 条 (${JSON.stringify({ok: true})})`,\n'
+                     '        result.map((item) => item.id)\n'
+                     '      )\n')
+    if rng.random() < 0.3:
+        parts.append(f"      logger.info('数据', {{count: result.length, tag: '(batch {index})'}})\n")
+    if rng.random() < 0.2:
+        parts.append("      const {data} = await supabase.from('profiles').select('id').eq('id', user.id)\n")
+    if rng.random() < 0.25:
+        # boss_id 相关的旧代码，供 boss_id 规则匹配
+        parts.append("      const query = supabase.from('vehicles').select('boss_id, plate_number')"
+                     ".eq('boss_id', profile.boss_id)\n")
+        parts.append('      const payload = {name: form.name, boss_id: profile.boss_id, status: 1}\n')
+    if rng.random() < 0.1:
+        # 已知乱码
+        parts.append("      Taro.showToast({title: '加载失�?', icon: 'none'})\n")
+    parts.append('      setData(result)\n')
+    parts.append('    } catch (error) {\n')
+    parts.append(f"      console.error('加载失败 {index}:', error)\n")
+    parts.append('    }\n')
+    parts.append('  }, [user])\n\n')
+    if rng.random() < 0.3:
+        parts.append(f"  const channel{index} = supabase.channel('c{index}').on('postgres_changes', "
+                     "{event: '*'}, (payload) => {}).subscribe((status) => {})\n\n")
+    if rng.random() < 0.3:
+        parts.append(f'  const pattern{index} = /\\(([^)]+)\\)/g // 注释里的 console.log(\n\n')
+    return ''.join(parts)
+
+
+def _ts_render(rng: random.Random, helpers: int, jsx: bool) -> str:
+    if not jsx:
+        return '  return {data, reload: load0}\n}\n'
+    helper = rng.randrange(helpers) if helpers else None
+    label = f'{{getStatusText{helper}(item.status)}}' if helper is not None else '{item.status}'
+    return ('  return (\n'
+            '    <View className="min-h-screen bg-gray-50 p-4">\n'
+            '      <ScrollView scrollY className="h-full">\n'
+            '        {data.map((item, index) => (\n'
+            '          <View key={item.id} className="rounded bg-white p-3" onClick={() => load0()}>\n'
+            f'            <Text className="text-sm">{label}</Text>\n'
+            '            {item.count > 0 && <Text>({item.count})</Text>}\n'
+            '          </View>\n'
+            '        ))}\n'
+            '      </ScrollView>\n'
+            '    </View>\n'
+            '  )\n'
+            '}\n')
+
+
+def ts_document(rng: random.Random, index: int, target: int) -> Document:
+    """生成一个形如 src/pages/**/index.tsx 的页面（约 target 字节）"""
+    jsx = rng.random() < 0.85
+    parts = [_ts_header(rng)]
+    size = len(parts[0])
+    helpers = 0
+    while helpers < 3 and (helpers == 0 or rng.random() < 0.5):
+        parts.append(_ts_switch_helper(rng, helpers))
+        size += len(parts[-1])
+        helpers += 1
+    parts.append(f'export default function Page{index}() {{\n'
+                 '  const [data, setData] = useState<any[]>([])\n'
+                 '  const [user] = useState<Profile | null>(null)\n\n')
+    handler = 0
+    while True:
+        parts.append(_ts_handler(rng, handler))
+        size += len(parts[-1].encode('utf-8'))
+        handler += 1
+        if size >= target:
+            break
+    parts.append(_ts_render(rng, helpers, jsx))
+    text = ''.join(parts)
+    suffix = '.tsx' if jsx else '.ts'
+    return Document(f'pages/page-{index:06d}/index{suffix}', text, text.encode('utf-8'))
+
+
+# ---- SQL ----
+
+def _sql_table(rng: random.Random, table: str, serial: int) -> str:
+    name = f'{table}_{serial}'
+    columns = [
+        '  id uuid PRIMARY KEY DEFAULT gen_random_uuid()',
+        '  user_id uuid NOT NULL REFERENCES profiles(id) ON DELETE CASCADE',
+        '  warehouse_id uuid REFERENCES warehouses(id) ON DELETE SET NULL',
+        "  status text DEFAULT 'pending' NOT NULL",
+        "  notes text DEFAULT '' -- 备注; 可为空",
+        '  created_at timestamptz DEFAULT now() NOT NULL',
+    ]
+    statements = [
+        f'-- 创建 {name} 表\nCREATE TABLE IF NOT EXISTS {name} (\n' + ',\n'.join(columns) + '\n);\n',
+        f'CREATE INDEX IF NOT EXISTS idx_{name}_user_id ON {name}(user_id);\n',
+    ]
+    if rng.random() < 0.5:
+        statements.append(f'CREATE INDEX IF NOT EXISTS idx_{name}_status ON {name}(status, created_at);\n')
+    statements.append(f'ALTER TABLE {name} ENABLE ROW LEVEL SECURITY;\n')
+    statements.append(f'DROP POLICY IF EXISTS "用户查看自己的记录" ON {name};\n')
+    statements.append(f'CREATE POLICY "用户查看自己的记录" ON {name}\n'
+                      f'  FOR SELECT TO authenticated\n'
+                      f'  USING (auth.uid() = user_id OR is_admin(auth.uid()));\n')
+    statements.append(f'CREATE POLICY "管理员管理仓库记录" ON {name}\n'
+                      f'  FOR ALL TO authenticated\n'
+                      f'  USING (EXISTS (SELECT 1 FROM manager_warehouses mw\n'
+                      f'    WHERE mw.manager_id = auth.uid() AND mw.warehouse_id = {name}.warehouse_id));\n')
+    return '\n'.join(statements) + '\n'
+
+
+def _sql_function(rng: random.Random, table: str, serial: int) -> str:
+    tag = '$$' if rng.random() < 0.7 else '$function$'
+    body = (f"DECLARE\n  v_count integer;\nBEGIN\n"
+            f"  -- 统计; 注意引号 'it''s'\n"
+            f"  SELECT count(*) INTO v_count FROM {table} WHERE user_id = p_user_id;\n"
+            f"  IF v_count > 0 THEN\n"
+            f"    RAISE NOTICE '已存在 % 条记录; 跳过', v_count;\n"
+            f"    EXECUTE format($q$UPDATE %I SET status = 'done' WHERE id = $1$q$, '{table}') USING p_user_id;\n"
+            f"  END IF;\n  RETURN v_count;\nEND;\n")
+    return (f'CREATE OR REPLACE FUNCTION count_{table}_{serial}(p_user_id uuid)\n'
+            f'RETURNS integer\nLANGUAGE plpgsql\nSECURITY DEFINER\nSET search_path = public\n'
+            f'AS {tag}\n{body}{tag};\n\n'
+            f'GRANT EXECUTE ON FUNCTION count_{table}_{serial}(uuid) TO authenticated;\n\n')
+
+
+def _sql_do_block(rng: random.Random, table: str) -> str:
+    return ('DO $$\nBEGIN\n'
+            f"  IF NOT EXISTS (SELECT 1 FROM information_schema.columns\n"
+            f"    WHERE table_name = '{table}' AND column_name = 'tenant_id') THEN\n"
+            f'    ALTER TABLE {table} ADD COLUMN tenant_id uuid;\n'
+            '  END IF;\nEND $$;\n\n')
+
+
+def sql_document(rng: random.Random, index: int, target: int) -> Document:
+    """生成一个形如 supabase/migrations/*.sql 的迁移（约 target 字节）"""
+    parts = [f'/*\n# 迁移 {index}\n\n## 说明\n- 调整表结构和 RLS 策略; 见下文\n*/\n\n']
+    size = len(parts[0].encode('utf-8'))
+    serial = 0
+    while size < target:
+        table = rng.choice(_TABLES)
+        choice = rng.random()
+        if choice < 0.45:
+            block = _sql_table(rng, table, index * 100 + serial)
+        elif choice < 0.8:
+            block = _sql_function(rng, table, index * 100 + serial)
+        else:
+            block = _sql_do_block(rng, table)
+        parts.append(block)
+        size += len(block.encode('utf-8'))
+        serial += 1
+    text = ''.join(parts)
+    return Document(f'migrations/{index:05d}_generated.sql', text, text.encode('utf-8'))
+
+
+_GENERATORS = {'ts': ts_document, 'sql': sql_document}
+
+
+def iter_corpus(kind: str, scale: int, seed: int = DEFAULT_SEED, root: str = '.') -> Iterator[Document]:
+    """逐个生成语料文件：文件数为真实目录的 scale 倍，单个文件大小在平均值上下浮动"""
+    count, total = real_shape(kind, root)
+    average = max(total // count, 256)
+    generate = _GENERATORS[kind]
+    for index in range(count * scale):
+        # 每个文件独立播种，任意子集都可以复现
+        rng = random.Random(f'{seed}:{kind}:{index}')
+        yield generate(rng, index, int(average * rng.uniform(0.4, 1.6)))
+
+
+def write_corpus(kind: str, scale: int, out_dir, seed: int = DEFAULT_SEED, root: str = '.') -> Tuple[int, int]:
+    """把语料写到 out_dir，供整脚本端到端测量，返回 (文件数, 字节数)"""
+    out_dir = Path(out_dir)
+    files = 0
+    total = 0
+    for document in iter_corpus(kind, scale, seed, root):
+        path = out_dir / document.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(document.data)
+        files += 1
+        total += len(document.data)
+    return files, total
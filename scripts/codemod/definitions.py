@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+函数 / 策略 / 视图 / 触发器定义索引
+
+同一个对象在迁移中往往被 CREATE OR REPLACE 十几次，备份目录里还有一份拷贝。
+这里把每条定义按（对象键, 规范化内容哈希）编入索引：规范化时去掉空白、注释、
+OR REPLACE 和 public. 前缀，单词转小写，函数体按同样的规则逐 token 处理，
+所以只差格式的两份定义哈希相同。
+
+对象键与 codemod/schema.py 一致（函数按规范化的参数类型区分重载）。哪条定义
+是生效的，取自 schema.py 按顺序重放迁移后每个对象的来源位置。每个文件的
+定义记录和重放结果都记入 .codemod-parse-cache.json：文件没变时只做 stat，
+不再读取 4 MB 的迁移；查询是字典查找。
+
+定义的状态：
+  live        最终生效的定义
+  duplicate   与生效定义内容相同（多余的重复定义）
+  superseded  对象仍然存在，但这份定义已被后面不同内容的定义覆盖
+  dropped     对象最终已被删除
+备份目录中的定义从不执行，按同样的规则与迁移目录中生效的定义比较。
+"""
+
+import hashlib
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from codemod.cache import PARSE_CACHE_FILE, ParseCache, make_key
+from codemod.schema import MIGRATIONS_DIR, definition_key, migration_files, replay, short_name
+from codemod.sql import DOLLAR, PUNCT, WORD, split_sql, tokenize_sql
+
+BACKUP_DIR = 'supabase/migrations_backup_20251122_161021'
+DEFAULT_ROOTS = (MIGRATIONS_DIR, BACKUP_DIR)
+KINDS = ('function', 'policy', 'view', 'trigger')
+
+LIVE = 'live'
+DUPLICATE = 'duplicate'
+SUPERSEDED = 'superseded'
+DROPPED = 'dropped'
+STATUSES = (LIVE, DUPLICATE, SUPERSEDED, DROPPED)
+
+
+class Definition(NamedTuple):
+    kind: str
+    # 与 Schema 中一致的对象键
+    key: str
+    # 规范化内容的哈希
+    digest: str
+    path: str
+    line: int
+
+    @property
+    def name(self) -> str:
+        """不带模式和参数的对象名"""
+        name = self.key.split(':', 1)[1] if self.kind in ('policy', 'trigger') else short_name(self.key)
+        return name.split('(', 1)[0]
+
+    @property
+    def location(self) -> str:
+        return f'{self.path}:{self.line}'
+
+
+def _normalized_tokens(text: str) -> Iterable[str]:
+    tokens = tokenize_sql(text)
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.kind == WORD:
+            value = token.value
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+            if value == 'or' and following is not None and following.value == 'replace' and index == 1:
+                index += 2
+                continue
+            if value == 'public' and following is not None and following.kind == PUNCT and following.text == '.':
+                index += 2
+                continue
+            yield value
+        elif token.kind == DOLLAR:
+            # 函数体：去掉标签后按同样的规则规范化
+            tag_end = token.text.index('$', 1) + 1
+            body = token.text[tag_end:len(token.text) - tag_end]
+            yield '$$'
+            yield from _normalized_tokens(body)
+            yield '$$'
+        elif not (token.kind == PUNCT and token.text == ';'):
+            yield token.text
+        index += 1
+
+
+def normalize_definition(text: str) -> str:
+    return ' '.join(_normalized_tokens(text))
+
+
+def definition_digest(text: str) -> str:
+    return hashlib.sha1(normalize_definition(text).encode('utf-8')).hexdigest()[:16]
+
+
+def extract_definitions(data: bytes) -> List[list]:
+    """文件中的定义记录 [[kind, key, digest, line], ...]，可直接写入 JSON 缓存"""
+    records = []
+    for statement in split_sql(data.decode('utf-8', errors='replace')):
+        found = definition_key(statement.text)
+        if found is not None:
+            records.append([found[0], found[1], definition_digest(statement.text), statement.line])
+    return records
+
+
+def _module_key() -> str:
+    here = os.path.dirname(os.path.abspath(__file__))
+    sources = []
+    for name in ('definitions.py', 'schema.py', 'sql.py'):
+        with open(os.path.join(here, name), 'rb') as f:
+            sources.append(f.read())
+    return make_key('definitions', *sources)
+
+
+def _directory_fingerprint(files: Sequence[str]) -> Tuple[int, int, str]:
+    """目录中所有迁移文件的 stat 合成一个指纹（只比较第三项）"""
+    parts = []
+    for path in files:
+        stat = os.stat(path)
+        parts.append(f'{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}')
+    return 0, 0, make_key(*parts)
+
+
+def live_sources(directory: str = MIGRATIONS_DIR) -> Dict[str, str]:
+    """重放迁移，返回 '类别:对象键' -> 生效定义的来源（文件名:行号）"""
+    schema = replay(migration_files(directory))
+    sources = {}
+    for kind, objects in (('function', schema.functions), ('policy', schema.policies),
+                          ('trigger', schema.triggers), ('view', schema.views)):
+        for key, item in objects.items():
+            sources[f'{kind}:{key}'] = item.source
+    return sources
+
+
+class DefinitionIndex:
+    """按对象键、内容哈希和对象名查询定义"""
+
+    def __init__(self, definitions: List[Definition], live: Dict[str, str], migrations_dir: str = MIGRATIONS_DIR):
+        self.definitions = definitions
+        self.migrations_dir = os.path.normpath(migrations_dir)
+        self.by_key: Dict[Tuple[str, str], List[Definition]] = {}
+        self.by_digest: Dict[str, List[Definition]] = {}
+        self.by_name: Dict[str, List[Tuple[str, str]]] = {}
+        for definition in definitions:
+            object_key = (definition.kind, definition.key)
+            if object_key not in self.by_key:
+                self.by_key[object_key] = []
+                self.by_name.setdefault(definition.name.lower(), []).append(object_key)
+            self.by_key[object_key].append(definition)
+            self.by_digest.setdefault(definition.digest, []).append(definition)
+        # (kind, key) -> 生效的定义
+        self.live: Dict[Tuple[str, str], Definition] = {}
+        by_location = {(os.path.basename(d.path), d.line): d for d in definitions
+                       if os.path.normpath(os.path.dirname(d.path)) == self.migrations_dir}
+        for object_key, source in live.items():
+            name, _, line = source.rpartition(':')
+            definition = by_location.get((name, int(line))) if line.isdigit() else None
+            if definition is not None:
+                kind, _, key = object_key.partition(':')
+                self.live[(kind, key)] = definition
+
+    def objects(self, name: str) -> List[Tuple[str, str]]:
+        """对象名（函数名、策略名等，不区分大小写）对应的对象键"""
+        return self.by_name.get(name.lower(), [])
+
+    def live_definition(self, kind: str, key: str) -> Optional[Definition]:
+        return self.live.get((kind, key))
+
+    def status(self, definition: Definition) -> str:
+        live = self.live.get((definition.kind, definition.key))
+        if live is None:
+            return DROPPED
+        if definition == live:
+            return LIVE
+        return DUPLICATE if definition.digest == live.digest else SUPERSEDED
+
+    def duplicates(self, definition: Definition) -> List[Definition]:
+        """内容完全相同的其他定义（同一对象）"""
+        return [other for other in self.by_digest.get(definition.digest, [])
+                if other != definition and other.kind == definition.kind and other.key == definition.key]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """类别 -> 状态 -> 定义数"""
+        counts = {kind: {status: 0 for status in STATUSES} for kind in KINDS}
+        for definition in self.definitions:
+            counts[definition.kind][self.status(definition)] += 1
+        return counts
+
+    def most_redefined(self, limit: int = 20) -> List[Tuple[Tuple[str, str], int]]:
+        ranked = sorted(self.by_key.items(), key=lambda item: (-len(item[1]), item[0]))
+        return [(object_key, len(items)) for object_key, items in ranked[:limit]]
+
+
+def build_definition_index(roots: Sequence[str] = DEFAULT_ROOTS, migrations_dir: str = MIGRATIONS_DIR,
+                           use_cache: bool = True, cache_file=PARSE_CACHE_FILE) -> DefinitionIndex:
+    """扫描 roots 下的 .sql 文件建立索引；文件和迁移都没变时全部来自缓存"""
+    paths = []
+    for root in roots:
+        if os.path.isdir(root):
+            paths.extend(os.path.join(root, name) for name in sorted(os.listdir(root)) if name.endswith('.sql'))
+    cache = ParseCache('definitions', _module_key(), cache_file) if use_cache else None
+
+    definitions: List[Definition] = []
+    for path in paths:
+        if cache is not None:
+            records = cache.load(path, extract_definitions)
+        else:
+            with open(path, 'rb') as f:
+                records = extract_definitions(f.read())
+        definitions.extend(Definition(kind, key, digest, path, line) for kind, key, digest, line in records)
+
+    # 重放结果以整个迁移目录为单位缓存
+    fingerprint = _directory_fingerprint(migration_files(migrations_dir))
+    live = cache.reuse(migrations_dir, fingerprint) if cache is not None else None
+    if live is None:
+        live = live_sources(migrations_dir)
+        if cache is not None:
+            cache.store(migrations_dir, fingerprint, live)
+    if cache is not None:
+        cache.prune(paths + [migrations_dir])
+        cache.save()
+    return DefinitionIndex(definitions, live, migrations_dir)
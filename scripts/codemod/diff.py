@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+按行哈希的 patience 差异算法与 git 风格的统一格式输出
+
+每行先映射成整数编号，之后只比较整数。patience 算法先剥掉公共前后缀，
+再以两边都只出现一次的行为锚点（取最长递增子序列），在锚点之间递归；
+区间内没有唯一行时，退而取出现次数最少的公共行作锚点（histogram 的做法）。
+几千行的文件改动几处时，几乎全部时间都花在剥前后缀和一次计数上，
+不会像 difflib 那样在大段重复行上退化。
+
+输出带 diff --git / --- a/ / +++ b/ 头，可以直接交给 git apply。
+"""
+
+import os
+import re
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+DEFAULT_CONTEXT = 3
+
+# (标记, a 起点, a 终点, b 起点, b 终点)，标记为 equal / replace / delete / insert
+Opcode = Tuple[str, int, int, int, int]
+
+
+def _line_ids(a: Sequence[str], b: Sequence[str]) -> Tuple[List[int], List[int]]:
+    ids: Dict[str, int] = {}
+    return ([ids.setdefault(line, len(ids)) for line in a],
+            [ids.setdefault(line, len(ids)) for line in b])
+
+
+def _longest_increasing(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """pairs 已按第一项排序，返回第二项严格递增的最长子序列（patience 排序）"""
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pile] = j
+            tail_index[pile] = index
+        previous[index] = tail_index[pile - 1] if pile else -1
+    result = []
+    index = tail_index[-1] if tail_index else -1
+    while index >= 0:
+        result.append(pairs[index])
+        index = previous[index]
+    result.reverse()
+    return result
+
+
+def _anchors(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int) -> List[Tuple[int, int]]:
+    # 行编号 -> [a 中次数, a 中首个位置, b 中次数, b 中首个位置]
+    counts: Dict[int, List[int]] = {}
+    for i in range(alo, ahi):
+        entry = counts.get(a[i])
+        if entry is None:
+            counts[a[i]] = [1, i, 0, -1]
+        else:
+            entry[0] += 1
+    for j in range(blo, bhi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[2] += 1
+            if entry[3] < 0:
+                entry[3] = j
+    unique = sorted((entry[1], entry[3]) for entry in counts.values() if entry[0] == 1 and entry[2] == 1)
+    if unique:
+        return _longest_increasing(unique)
+    common = [entry for entry in counts.values() if entry[2]]
+    if not common:
+        return []
+    rarest = min(common, key=lambda entry: (entry[0] + entry[2], entry[1]))
+    return [(rarest[1], rarest[3])]
+
+
+def matching_lines(a: Sequence[str], b: Sequence[str]) -> List[Tuple[int, int]]:
+    """两边匹配上的行 (a 下标, b 下标)，按位置排序"""
+    a_ids, b_ids = _line_ids(a, b)
+    matches: List[Tuple[int, int]] = []
+    stack = [(0, len(a_ids), 0, len(b_ids))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        while alo < ahi and blo < bhi and a_ids[alo] == b_ids[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a_ids[ahi - 1] == b_ids[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+        prev_a, prev_b = alo, blo
+        for i, j in _anchors(a_ids, b_ids, alo, ahi, blo, bhi):
+            matches.append((i, j))
+            stack.append((prev_a, i, prev_b, j))
+            prev_a, prev_b = i + 1, j + 1
+        if prev_a != alo or prev_b != blo:
+            stack.append((prev_a, ahi, prev_b, bhi))
+    matches.sort()
+    return matches
+
+
+def opcodes(a: Sequence[str], b: Sequence[str]) -> List[Opcode]:
+    """与 difflib.SequenceMatcher.get_opcodes 相同格式的操作序列"""
+    result: List[Opcode] = []
+    i = j = 0
+    for mi, mj in matching_lines(a, b) + [(len(a), len(b))]:
+        if i < mi or j < mj:
+            tag = 'replace' if i < mi and j < mj else ('delete' if i < mi else 'insert')
+            result.append((tag, i, mi, j, mj))
+        if mi < len(a) and mj < len(b):
+            if result and result[-1][0] == 'equal':
+                _, i1, _, j1, _ = result[-1]
+                result[-1] = ('equal', i1, mi + 1, j1, mj + 1)
+            else:
+                result.append(('equal', mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return result
+
+
+def grouped_opcodes(codes: List[Opcode], context: int = DEFAULT_CONTEXT) -> Iterator[List[Opcode]]:
+    """按 context 行上下文把操作分成若干 hunk（与 difflib 的分组规则相同）"""
+    if not codes:
+        return
+    codes = list(codes)
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _range(start: int, length: int) -> str:
+    if length == 1:
+        return str(start + 1)
+    if length == 0:
+        return f'{start},0'
+    return f'{start + 1},{length}'
+
+
+def _body_line(prefix: str, line: str) -> Iterator[str]:
+    if line.endswith('\n'):
+        yield prefix + line
+    else:
+        yield prefix + line + '\n'
+        yield '\\ No newline at end of file\n'
+
+
+def split_lines(text: str) -> List[str]:
+    """只按 \\n 切行并保留行尾
+
+    str.splitlines 还会在 \\f、\\x0b、\\x1c-\\x1e、\\x85、U+2028/U+2029 处切开，
+    git 不把它们当换行，生成的补丁 git apply 时对不上
+    """
+    lines = re.split(r'(?<=\n)', text)
+    if lines[-1] == '':
+        lines.pop()
+    return lines
+
+
+def patch_path(path) -> str:
+    """补丁中的路径：相对当前目录（仓库根目录），统一用 /"""
+    path = os.path.relpath(str(path))
+    return path.replace(os.sep, '/')
+
+
+def unified_diff(path, before: str, after: str, context: int = DEFAULT_CONTEXT) -> Iterator[str]:
+    """逐行产出 git 风格的统一差异，内容相同时什么都不产出"""
+    if before == after:
+        return
+    a = split_lines(before)
+    b = split_lines(after)
+    name = patch_path(path)
+    yield f'diff --git a/{name} b/{name}\n'
+    yield f'--- a/{name}\n'
+    yield f'+++ b/{name}\n'
+    for group in grouped_opcodes(opcodes(a, b), context):
+        first, last = group[0], group[-1]
+        yield f'@@ -{_range(first[1], last[2] - first[1])} +{_range(first[3], last[4] - first[3])} @@\n'
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                for line in a[i1:i2]:
+                    yield from _body_line(' ', line)
+                continue
+            for line in a[i1:i2]:
+                yield from _body_line('-', line)
+            for line in b[j1:j2]:
+                yield from _body_line('+', line)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+编辑列表补丁模型
+
+改写不再对整份内容反复 re.sub，而是先对同一份原始内容产生
+(起点, 终点, 替换文本) 编辑，合并时检测重叠，最后一次拼接出结果。
+合并按编辑加入的先后决定优先级：先加入的编辑（先注册的规则）胜出，
+与之重叠的后来者作为冲突返回，由调用方决定报告或在结果上重试。
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, NamedTuple, Sequence, Tuple
+
+
+class Edit(NamedTuple):
+    start: int
+    end: int
+    text: str
+    # 产生该编辑的规则名
+    rule: str = ''
+
+    def overlaps(self, other: 'Edit') -> bool:
+        if self.start == self.end and other.start == other.end:
+            # 同一位置的两处插入先后顺序不确定，也算冲突
+            return self.start == other.start
+        if self.start == self.end:
+            return other.start < self.start < other.end
+        if other.start == other.end:
+            return self.start < other.start < self.end
+        return self.start < other.end and other.start < self.end
+
+
+class EditConflict(NamedTuple):
+    # 被丢弃的编辑
+    edit: Edit
+    # 与之重叠、已被接受的编辑
+    winner: Edit
+
+
+class EditSet:
+    """按优先级逐个加入编辑，保持已接受编辑有序且互不重叠"""
+
+    def __init__(self):
+        self.accepted: List[Edit] = []
+        self._starts: List[int] = []
+        self.conflicts: List[EditConflict] = []
+
+    def add(self, edit: Edit) -> bool:
+        """加入一处编辑，与已接受的编辑重叠时记为冲突并返回 False"""
+        if edit.start > edit.end:
+            raise ValueError(f'编辑范围无效: {edit.start}..{edit.end}')
+        # 可能重叠的只有起点在 edit.end 之前的邻居
+        index = bisect_left(self._starts, edit.start)
+        for neighbour in (index - 1, index):
+            if 0 <= neighbour < len(self.accepted) and self.accepted[neighbour].overlaps(edit):
+                self.conflicts.append(EditConflict(edit, self.accepted[neighbour]))
+                return False
+        stop = bisect_right(self._starts, edit.end)
+        for other in self.accepted[index:stop]:
+            if other.overlaps(edit):
+                self.conflicts.append(EditConflict(edit, other))
+                return False
+        position = bisect_right(self._starts, edit.start)
+        # 同一起点时插入排在删除前面
+        while position > 0 and self._starts[position - 1] == edit.start \
+                and edit.start == edit.end and self.accepted[position - 1].start != self.accepted[position - 1].end:
+            position -= 1
+        self.accepted.insert(position, edit)
+        self._starts.insert(position, edit.start)
+        return True
+
+    def extend(self, edits: Iterable[Edit]) -> int:
+        """依次加入，返回被接受的数量"""
+        return sum(1 for edit in edits if self.add(edit))
+
+
+def merge_edits(edits: Iterable[Edit]) -> Tuple[List[Edit], List[EditConflict]]:
+    """按给出的顺序合并编辑，返回 (按位置排序的已接受编辑, 冲突)"""
+    merged = EditSet()
+    merged.extend(edits)
+    return merged.accepted, merged.conflicts
+
+
+def apply_edits(content: str, edits: Sequence[Edit]) -> str:
+    """一次拼接应用互不重叠、按位置排序的编辑"""
+    if not edits:
+        return content
+    parts = []
+    last = 0
+    for edit in edits:
+        parts.append(content[last:edit.start])
+        parts.append(edit.text)
+        last = edit.end
+    parts.append(content[last:])
+    return ''.join(parts)
+
+
+def map_offset(edits: Sequence[Edit], offset: int) -> int:
+    """原内容中的偏移在应用 edits 之后的位置（落在被替换区域内时取该区域的起点）"""
+    shift = 0
+    for edit in edits:
+        if edit.end <= offset and not (edit.start == edit.end == offset):
+            shift += len(edit.text) - (edit.end - edit.start)
+        elif edit.start < offset:
+            return edit.start + shift
+        else:
+            break
+    return offset + shift
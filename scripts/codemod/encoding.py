@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已知乱码模式及其修复
+"""
+
+import json
+from typing import Tuple
+
+from codemod.aho import MultiReplacer
+from codemod.bytescan import SignatureScanner
+from codemod.cache import make_key
+
+# 常见的乱码模式和修复
+ENCODING_FIXES = {
+    # 中文乱码修复
+    '环�?': '环境',
+    '失�?': '失败',
+    '�?[': '[',
+    '错�?': '错误',
+    '系�?': '系统',
+    '请输�?': '请输入',
+    '账�?': '账号',
+    '支持�?': '支持',
+    '密�?': '密码',
+    '登�?': '登录',
+    '�?位': '6位',
+    '按钮�?': '按钮',
+    '登录�?..': '登录中...',
+    '验证码登�?': '验证码登录',
+    '快速登�?': '快速登录',
+    '开发测�?': '开发测试',
+    '�?收起': '▲ 收起',
+    '�?展开': '▼ 展开',
+    '点击填充 �?': '点击填充 ▶',
+    '车队长账�?': '车队长账号',
+    '车队�?': '车队长',
+    '使用说明�?': '使用说明：',
+    '登录方式说明�?': '登录方式说明：',
+    '�?密码登录': '• 密码登录',
+    '�?验证码登录': '• 验证码登录',
+    '验证�?': '验证码',
+    '�?admin': '• admin',
+    '仓库�?': '仓库',
+    '司机�?': '司机',
+    '管理�?': '管理',
+    '车辆�?': '车辆',
+    '考勤�?': '考勤',
+    '请假�?': '请假',
+    '计件�?': '计件',
+    '统计�?': '统计',
+    '通知�?': '通知',
+    '权限�?': '权限',
+    '用户�?': '用户',
+    '数据�?': '数据',
+    '信息�?': '信息',
+    '状态�?': '状态',
+    '操作�?': '操作',
+    '查询�?': '查询',
+    '添加�?': '添加',
+    '删除�?': '删除',
+    '修改�?': '修改',
+    '更新�?': '更新',
+    '保存�?': '保存',
+    '取消�?': '取消',
+    '确定�?': '确定',
+    '提交�?': '提交',
+    '审批�?': '审批',
+    '通过�?': '通过',
+    '拒绝�?': '拒绝',
+    '成功�?': '成功',
+    '详情�?': '详情',
+    '列表�?': '列表',
+    '搜索�?': '搜索',
+    '筛选�?': '筛选',
+    '排序�?': '排序',
+    '导出�?': '导出',
+    '导入�?': '导入',
+    '打印�?': '打印',
+    '刷新�?': '刷新',
+    '返回�?': '返回',
+    '下一步�?': '下一步',
+    '上一步�?': '上一步',
+    '完成�?': '完成',
+    '跳过�?': '跳过',
+    '重试�?': '重试',
+    '关闭�?': '关闭',
+    '展开�?': '展开',
+    '收起�?': '收起',
+    '全选�?': '全选',
+    '反选�?': '反选',
+    '清空�?': '清空',
+    '重置�?': '重置',
+    '设置�?': '设置',
+    '配置�?': '配置',
+    '帮助�?': '帮助',
+    '关于�?': '关于',
+    '退出�?': '退出',
+}
+
+
+# 由修复表构建一次的多模式替换自动机，重叠的模式按最左最长匹配，与表的顺序无关
+ENCODING_REPLACER = MultiReplacer(ENCODING_FIXES)
+
+
+# 乱码在原始字节中的特征。修复表里的模式都含 U+FFFD，字节预筛命中
+# replacement-char 即可覆盖；不含 U+FFFD 的模式单独作为特征加入
+MOJIBAKE_SIGNATURES = {
+    # U+FFFD 替换字符
+    'replacement-char': '�'.encode('utf-8'),
+    # U+FFFD 被按 GBK 解码后再存成 UTF-8
+    'gbk-replacement': '锟斤拷'.encode('utf-8'),
+    # UTF-8 被按 Windows-1252 解码后再存成 UTF-8（常见于 “ ” — 等标点）
+    'cp1252-double-encoding': 'â€'.encode('utf-8'),
+}
+MOJIBAKE_SIGNATURES.update(
+    (f'pattern:{old}', old.encode('utf-8')) for old in ENCODING_FIXES if '�' not in old
+)
+
+ENCODING_SCANNER = SignatureScanner(MOJIBAKE_SIGNATURES)
+
+
+def detect_encoding_issues(content):
+    """检测内容中是否存在编码问题"""
+    # 检查是否包含乱码字符
+    if '�' in content:
+        return True
+    
+    # 检查是否包含已知的乱码模式（一次扫描）
+    return ENCODING_REPLACER.search(content)
+
+
+def fix_encoding(content):
+    """修复内容中的编码问题"""
+    content, count = apply_encoding_fixes(content)
+    return content, count > 0
+
+
+def apply_encoding_fixes(content: str) -> Tuple[str, int]:
+    """一次扫描应用所有已知的乱码修复，返回 (新内容, 替换次数)"""
+    return ENCODING_REPLACER.replace(content)
+
+
+def encoding_ruleset_key() -> str:
+    """乱码修复表的版本键，修改表后缓存自动失效"""
+    return make_key('encoding', json.dumps(ENCODING_FIXES, ensure_ascii=False))
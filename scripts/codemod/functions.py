@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+函数区间索引：某个偏移落在哪个函数里
+
+在 codemod/lexer.py 的 token 上扫描一遍，收集 function 声明/表达式、
+const/let/var 箭头函数、类和对象字面量的方法，以及作为调用参数传入的回调
+（describe/it 的测试体、useCallback(() => {...})、.map(x => ...) 等）的
+(起点, 终点) 区间。回调以被调用的函数命名，第一个参数是字符串时带上它，
+如 describe('getUsers') › it('返回空列表')。函数体的范围由括号配对决定，
+字符串、模板和注释中的括号不会干扰。函数区间互相嵌套（不会交叉），
+建索引时把整个文件切成若干段，每段记下覆盖它的最内层函数，
+之后“偏移 X 在哪个函数里”只需一次二分查找。
+"""
+
+from bisect import bisect_right
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from codemod.lexer import IDENT, PUNCT, STRING, Lexed, tokenize_file
+
+# 箭头函数的表达式体遇到这些关键字开头的新行即结束
+_STATEMENT_KEYWORDS = {
+    'const', 'let', 'var', 'function', 'export', 'return', 'if', 'for', 'while',
+    'switch', 'try', 'throw', 'class', 'import', 'type', 'interface',
+}
+# 紧跟在这些符号后面的 { 是类型字面量，不是函数体
+_TYPE_CONTEXT = {':', '<', '|', '&', ',', '=>'}
+# 方法名前面可能出现的修饰符
+_METHOD_MODIFIERS = {
+    'async', 'static', 'public', 'private', 'protected', 'readonly', 'get', 'set', 'override', 'abstract', '*',
+}
+# 看起来像 name(...) { 但不是方法
+_NOT_METHODS = {'if', 'for', 'while', 'switch', 'catch', 'with', 'function', 'return', 'await', 'typeof', 'new'}
+# 回调名中字符串参数的最大长度
+_LABEL_LIMIT = 40
+
+
+class FunctionSpan(NamedTuple):
+    name: str
+    # function / arrow / method / callback
+    kind: str
+    # 声明起点（含 export、async、const 等前缀）
+    start: int
+    # 函数结束后的偏移
+    end: int
+    exported: bool = False
+
+
+def _value(lexed: Lexed, index: int) -> str:
+    if 0 <= index < len(lexed.tokens):
+        token = lexed.tokens[index]
+        return lexed.text[token.start:token.end]
+    return ''
+
+
+def _skip_group(lexed: Lexed, index: int) -> int:
+    """index 处是开括号时返回配对闭括号的下标，否则原样返回"""
+    token = lexed.tokens[index]
+    if token.kind == PUNCT and lexed.text[token.start:token.end] in '([{':
+        close = lexed.matching(token.start)
+        if close is not None:
+            return lexed.token_index_at(close)
+    return index
+
+
+def _skip_angles(lexed: Lexed, index: int) -> int:
+    """index 处是泛型参数的 < 时返回配对 > 的下标（尖括号不在括号配对表中，按深度计数）"""
+    depth = 0
+    while index < len(lexed.tokens):
+        value = _value(lexed, index)
+        if value == '<':
+            depth += 1
+        elif value == '>':
+            depth -= 1
+            if depth == 0:
+                return index
+        elif value in ('(', ';', '{', '=>'):
+            return index
+        index = lexed.next_significant(_skip_group(lexed, index) if value == '[' else index)
+    return index
+
+
+def _declaration_start(lexed: Lexed, index: int) -> Tuple[int, bool]:
+    """向前吸收 export / default / async / declare 前缀，返回 (起点下标, 是否导出)"""
+    exported = False
+    while True:
+        prev = lexed.prev_significant(index)
+        value = _value(lexed, prev)
+        if value in ('async', 'default', 'declare'):
+            index = prev
+        elif value == 'export':
+            exported = True
+            index = prev
+        else:
+            return index, exported
+
+
+def _function_body(lexed: Lexed, index: int) -> Optional[int]:
+    """从参数列表的 ( 开始找函数体的 {，返回其下标；找不到时返回 None"""
+    index = _skip_group(lexed, index)
+    count = len(lexed.tokens)
+    while True:
+        index = lexed.next_significant(index)
+        if index >= count:
+            return None
+        value = _value(lexed, index)
+        if value == '{' and _value(lexed, lexed.prev_significant(index)) not in _TYPE_CONTEXT:
+            return index
+        if value in (';', '=') or (value in _STATEMENT_KEYWORDS and lexed.is_first_on_line(index)):
+            return None
+        index = _skip_group(lexed, index)
+
+
+def _arrow(lexed: Lexed, index: int) -> Optional[int]:
+    """index 为箭头函数参数（( 或标识符）的下标，返回 => 的下标，不是箭头函数时返回 None"""
+    count = len(lexed.tokens)
+    if lexed.tokens[index].kind == IDENT:
+        following = lexed.next_significant(index)
+        return following if _value(lexed, following) == '=>' else None
+    index = lexed.next_significant(_skip_group(lexed, index))
+    if _value(lexed, index) == '=>':
+        return index
+    if _value(lexed, index) != ':':
+        return None
+    # 返回值类型
+    while True:
+        index = lexed.next_significant(index)
+        if index >= count:
+            return None
+        value = _value(lexed, index)
+        if value == '=>':
+            return index
+        if value in (';', '=') or (value in _STATEMENT_KEYWORDS and lexed.is_first_on_line(index)):
+            return None
+        index = _skip_group(lexed, index)
+
+
+def _expression_end(lexed: Lexed, index: int) -> int:
+    """箭头函数表达式体从 index 开始，返回其结束偏移"""
+    tokens = lexed.tokens
+    last = index
+    while index < len(tokens):
+        token = tokens[index]
+        value = lexed.text[token.start:token.end]
+        if token.kind == PUNCT and value in (';', ',', ')', ']', '}'):
+            break
+        if index > last and lexed.is_first_on_line(index) and token.kind != PUNCT \
+                and tokens[last].kind != PUNCT:
+            break
+        index = _skip_group(lexed, index)
+        last = index
+        index = lexed.next_significant(index)
+    return tokens[last].end
+
+
+def _method_start(lexed: Lexed, index: int) -> Optional[int]:
+    """index 处的标识符是方法名时返回声明起点（含修饰符）的下标，否则返回 None"""
+    start = index
+    while _value(lexed, lexed.prev_significant(start)) in _METHOD_MODIFIERS:
+        start = lexed.prev_significant(start)
+    prev = lexed.prev_significant(start)
+    # 类体或对象字面量中成员的开头
+    if prev >= 0 and not any(lexed.is_punct(prev, p) for p in ('{', '}', ';', ',')):
+        return None
+    return start
+
+
+def _method_body(lexed: Lexed, paren: int) -> Optional[int]:
+    """方法参数列表之后紧跟 { 或返回值类型时返回函数体 { 的下标"""
+    following = lexed.next_significant(_skip_group(lexed, paren))
+    if lexed.is_punct(following, '{'):
+        return following
+    if lexed.is_punct(following, ':'):
+        return _function_body(lexed, paren)
+    return None
+
+
+def _callback_name(lexed: Lexed, opener: int) -> str:
+    """opener 为调用的 (，返回 callee 或 callee('第一个字符串参数')"""
+    callee = lexed.prev_significant(opener)
+    if callee < 0 or lexed.tokens[callee].kind != IDENT:
+        return '<匿名>'
+    name = _value(lexed, callee)
+    first = lexed.next_significant(opener)
+    if first < len(lexed.tokens) and lexed.tokens[first].kind == STRING:
+        label = _value(lexed, first)
+        if len(label) > _LABEL_LIMIT:
+            label = label[:_LABEL_LIMIT - 1] + '…' + label[0]
+        return f'{name}({label})'
+    return name
+
+
+def _enclosing_paren(lexed: Lexed, index: int) -> Optional[int]:
+    """index 是调用参数的开头（前面是 ( 或 ,）时返回该调用的 ( 下标"""
+    prev = lexed.prev_significant(index)
+    if lexed.is_punct(prev, '('):
+        return prev
+    if not lexed.is_punct(prev, ','):
+        return None
+    # 向前跳过前面的参数，找到未配对的 (
+    cursor = prev
+    while True:
+        cursor = lexed.prev_significant(cursor)
+        if cursor < 0:
+            return None
+        token = lexed.tokens[cursor]
+        value = _value(lexed, cursor)
+        if token.kind != PUNCT:
+            continue
+        if value in (')', ']', '}'):
+            opener = lexed.matching(token.start)
+            if opener is None:
+                return None
+            cursor = lexed.token_index_at(opener)
+        elif value in ('(', '[', '{'):
+            return cursor if value == '(' else None
+        elif value == ';':
+            return None
+
+
+def _callback_span(lexed: Lexed, index: int, require_call: bool = True) -> Optional[FunctionSpan]:
+    """index 处开始的调用参数是箭头函数或 function 表达式时返回其区间
+
+    require_call 为 False 时不要求位于调用的参数中（用于类属性的初始值）
+    """
+    tokens = lexed.tokens
+    if index >= len(tokens):
+        return None
+    value_index = index
+    if _value(lexed, value_index) == 'async':
+        value_index = lexed.next_significant(value_index)
+        if value_index >= len(tokens):
+            return None
+    if _value(lexed, value_index) == 'function':
+        paren = lexed.next_significant(value_index)
+        if paren < len(tokens) and tokens[paren].kind == IDENT:
+            paren = lexed.next_significant(paren)
+        body = _function_body(lexed, paren) if lexed.is_punct(paren, '(') else None
+        close = lexed.matching(tokens[body].start) if body is not None else None
+        if close is None:
+            return None
+        end = close + 1
+    else:
+        if not (lexed.is_punct(value_index, '(') or tokens[value_index].kind == IDENT):
+            return None
+        arrow = _arrow(lexed, value_index)
+        if arrow is None:
+            return None
+        body = lexed.next_significant(arrow)
+        if body >= len(tokens):
+            return None
+        if lexed.is_punct(body, '{'):
+            close = lexed.matching(tokens[body].start)
+            if close is None:
+                return None
+            end = close + 1
+        else:
+            end = _expression_end(lexed, body)
+    if not require_call:
+        return FunctionSpan('<匿名>', 'arrow', tokens[index].start, end)
+    # 参数列表之类的其他括号中的函数不是回调
+    opener = _enclosing_paren(lexed, index)
+    if opener is None:
+        return None
+    return FunctionSpan(_callback_name(lexed, opener), 'callback', tokens[index].start, end)
+
+
+def find_function_spans(lexed: Lexed) -> List[FunctionSpan]:
+    """一次扫描收集所有函数区间，按起点排序"""
+    tokens = lexed.tokens
+    spans = []
+    for i, token in enumerate(tokens):
+        prev = lexed.prev_significant(i)
+        if (lexed.is_punct(prev, '(') or lexed.is_punct(prev, ',')) and \
+                (token.kind == IDENT or lexed.is_punct(i, '(')):
+            callback = _callback_span(lexed, i)
+            if callback is not None:
+                spans.append(callback)
+                continue
+        if token.kind != IDENT:
+            continue
+        word = lexed.text[token.start:token.end]
+        if word not in _NOT_METHODS and word not in _METHOD_MODIFIERS:
+            paren = lexed.next_significant(i)
+            if lexed.is_punct(paren, '<'):
+                paren = lexed.next_significant(_skip_angles(lexed, paren))
+            start = _method_start(lexed, i) if lexed.is_punct(paren, '(') else None
+            body = _method_body(lexed, paren) if start is not None else None
+            close = lexed.matching(tokens[body].start) if body is not None else None
+            if close is not None:
+                spans.append(FunctionSpan(word, 'method', tokens[start].start, close + 1))
+                continue
+            # 类属性箭头函数 handle = () => {...}
+            equals = lexed.next_significant(i)
+            if lexed.is_punct(equals, '=') and _method_start(lexed, i) is not None:
+                arrow = _callback_span(lexed, lexed.next_significant(equals), require_call=False)
+                if arrow is not None:
+                    spans.append(FunctionSpan(word, 'arrow', tokens[_method_start(lexed, i)].start, arrow.end))
+                    continue
+        if word == 'function':
+            if lexed.is_punct(prev, '.'):
+                continue
+            name_index = lexed.next_significant(i)
+            if lexed.is_punct(name_index, '*'):
+                name_index = lexed.next_significant(name_index)
+            name = ''
+            paren = name_index
+            if name_index < len(tokens) and tokens[name_index].kind == IDENT:
+                name = _value(lexed, name_index)
+                paren = lexed.next_significant(name_index)
+            if lexed.is_punct(paren, '<'):
+                while paren < len(tokens) and not lexed.is_punct(paren, '('):
+                    paren = lexed.next_significant(paren)
+            if not lexed.is_punct(paren, '('):
+                continue
+            body = _function_body(lexed, paren)
+            close = lexed.matching(tokens[body].start) if body is not None else None
+            if close is None:
+                continue
+            start, exported = _declaration_start(lexed, i)
+            if lexed.is_punct(lexed.prev_significant(start), '='):
+                # const name = function () {...}，由下面的 const 分支记录
+                continue
+            spans.append(FunctionSpan(name or '<匿名>', 'function', tokens[start].start, close + 1, exported))
+        elif word in ('const', 'let', 'var'):
+            name_index = lexed.next_significant(i)
+            if name_index >= len(tokens) or tokens[name_index].kind != IDENT:
+                continue
+            # 跳过类型注解找到 =
+            equals = lexed.next_significant(name_index)
+            if lexed.is_punct(equals, ':'):
+                while equals < len(tokens) and not lexed.is_punct(equals, '='):
+                    if lexed.is_punct(equals, ';'):
+                        break
+                    # let start: Date 没有初始值，下一行是新语句
+                    if _value(lexed, equals) in _STATEMENT_KEYWORDS and lexed.is_first_on_line(equals):
+                        break
+                    equals = lexed.next_significant(_skip_group(lexed, equals))
+            if not lexed.is_punct(equals, '='):
+                continue
+            value_index = lexed.next_significant(equals)
+            if _value(lexed, value_index) == 'async':
+                value_index = lexed.next_significant(value_index)
+            if value_index >= len(tokens):
+                continue
+            start, exported = _declaration_start(lexed, i)
+            name = _value(lexed, name_index)
+            if _value(lexed, value_index) == 'function':
+                paren = lexed.next_significant(value_index)
+                if paren < len(tokens) and tokens[paren].kind == IDENT:
+                    paren = lexed.next_significant(paren)
+                body = _function_body(lexed, paren) if lexed.is_punct(paren, '(') else None
+                close = lexed.matching(tokens[body].start) if body is not None else None
+                if close is not None:
+                    spans.append(FunctionSpan(name, 'function', tokens[start].start, close + 1, exported))
+                continue
+            if lexed.is_punct(value_index, '<'):
+                # 泛型箭头函数 <T,>(x: T) => ...
+                while value_index < len(tokens) and not lexed.is_punct(value_index, '('):
+                    value_index = lexed.next_significant(value_index)
+                if value_index >= len(tokens):
+                    continue
+            if not (lexed.is_punct(value_index, '(') or tokens[value_index].kind == IDENT):
+                continue
+            arrow = _arrow(lexed, value_index)
+            if arrow is None:
+                continue
+            body = lexed.next_significant(arrow)
+            if body >= len(tokens):
+                continue
+            if lexed.is_punct(body, '{'):
+                close = lexed.matching(tokens[body].start)
+                if close is None:
+                    continue
+                end = close + 1
+            else:
+                end = _expression_end(lexed, body)
+            spans.append(FunctionSpan(name, 'arrow', tokens[start].start, end, exported))
+    spans.sort(key=lambda span: (span.start, -span.end))
+    return spans
+
+
+class FunctionIndex:
+    """嵌套函数区间的索引，containing(offset) 为 O(log n)"""
+
+    def __init__(self, spans: Sequence[FunctionSpan]):
+        self.spans = sorted(spans, key=lambda span: (span.start, -span.end))
+        # parents[i]：直接包含 spans[i] 的函数下标，-1 表示顶层
+        self.parents: List[int] = []
+        # 分段起点与该段最内层函数的下标（-1 表示不在任何函数内）
+        self._bounds: List[int] = [0]
+        self._owners: List[int] = [-1]
+        stack: List[int] = []
+        for i, span in enumerate(self.spans):
+            while stack and self.spans[stack[-1]].end <= span.start:
+                self._close(stack)
+            if stack and span.end > self.spans[stack[-1]].end:
+                # 识别不准导致区间交叉时截断在外层函数的结尾，保持嵌套
+                span = self.spans[i] = span._replace(end=self.spans[stack[-1]].end)
+            self.parents.append(stack[-1] if stack else -1)
+            stack.append(i)
+            self._mark(span.start, i)
+        while stack:
+            self._close(stack)
+
+    def _mark(self, offset: int, owner: int):
+        if self._bounds[-1] == offset:
+            self._owners[-1] = owner
+        else:
+            self._bounds.append(offset)
+            self._owners.append(owner)
+
+    def _close(self, stack: List[int]):
+        end = self.spans[stack.pop()].end
+        self._mark(end, stack[-1] if stack else -1)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def containing(self, offset: int) -> Optional[FunctionSpan]:
+        """包含 offset 的最内层函数，不在任何函数内时返回 None"""
+        owner = self._owners[bisect_right(self._bounds, offset) - 1]
+        return self.spans[owner] if owner >= 0 else None
+
+    def enclosing(self, offset: int) -> List[FunctionSpan]:
+        """包含 offset 的所有函数，由外到内"""
+        owner = self._owners[bisect_right(self._bounds, offset) - 1]
+        chain = []
+        while owner >= 0:
+            chain.append(self.spans[owner])
+            owner = self.parents[owner]
+        chain.reverse()
+        return chain
+
+    def describe(self, offset: int) -> str:
+        """用于报告的函数路径，如 getUsers › mapRow；不在函数内时为空字符串"""
+        return ' › '.join(span.name for span in self.enclosing(offset))
+
+
+def build_function_index(lexed: Lexed) -> FunctionIndex:
+    return FunctionIndex(find_function_spans(lexed))
+
+
+def function_index_for_file(path, text: Optional[str] = None) -> FunctionIndex:
+    """按扩展名分词（.tsx 启用 JSX）并建索引"""
+    return build_function_index(tokenize_file(Path(path), text))
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+项目级导入 / 引用图
+
+每个源文件只分词一次，提取 import 声明、export 声明、文件中用到的标识符
+以及命名空间导入上的成员访问（XxxAPI.member），结果按文件指纹记入
+.codemod-parse-cache.json。之后的运行只 stat 文件，变化的文件才重新分词；
+watch 模式下可以用 update / remove 逐个文件更新。
+
+未使用的导入和没有被引用的导出都直接从图上计算，不再回头扫描文件内容。
+"""
+
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from codemod import imports as imports_module
+from codemod import lexer as lexer_module
+from codemod.api_index import API_DIR
+from codemod.cache import PARSE_CACHE_FILE, ParseCache, make_key
+from codemod.imports import parse_exports, parse_imports
+from codemod.lexer import IDENT, PUNCT, tokenize_file
+
+SRC_DIR = 'src'
+# @/ 别名指向的目录
+ALIAS_PREFIX = '@/'
+SOURCE_SUFFIXES = ('.ts', '.tsx')
+# 解析模块路径时依次尝试的后缀
+RESOLVE_SUFFIXES = ('.ts', '.tsx', '.d.ts', '/index.ts', '/index.tsx')
+_MEMBER_PUNCT = ('.', '?.')
+
+
+class UnusedImport(NamedTuple):
+    path: str
+    # 本文件中的绑定名
+    local: str
+    source: str
+    # namespace / default / named
+    kind: str
+
+
+class DeadExport(NamedTuple):
+    path: str
+    name: str
+    # 只被测试文件引用
+    tested: bool
+
+
+def is_test_file(path: str) -> bool:
+    name = os.path.basename(path)
+    return '.test.' in name or '.spec.' in name
+
+
+def _parser_key() -> str:
+    """解析器版本键，分词或 import/export 解析的实现变化后缓存自动失效"""
+    sources = [Path(module.__file__).read_bytes() for module in (lexer_module, imports_module)]
+    return make_key('import-graph', Path(__file__).read_bytes(), *sources)
+
+
+def parse_record(path: str, data: bytes) -> dict:
+    """单个文件在图中的记录（可直接写入 JSON 缓存）"""
+    lexed = tokenize_file(path, data.decode('utf-8', errors='replace'))
+    tokens = lexed.tokens
+    decls = parse_imports(lexed)
+    names, stars = parse_exports(lexed)
+
+    namespaces = {decl.namespace for decl in decls if decl.namespace}
+    # import 语句自身的范围，其中的名字不算使用
+    ranges = [(decl.start, decl.end) for decl in decls]
+    range_index = 0
+    identifiers: Set[str] = set()
+    members: Dict[str, Set[str]] = defaultdict(set)
+    for index, token in enumerate(tokens):
+        if token.kind != IDENT:
+            continue
+        while range_index < len(ranges) and ranges[range_index][1] <= token.start:
+            range_index += 1
+        if range_index < len(ranges) and ranges[range_index][0] <= token.start:
+            continue
+        prev = lexed.prev_significant(index)
+        if prev >= 0 and tokens[prev].kind == PUNCT and lexed.value(tokens[prev]) in _MEMBER_PUNCT:
+            continue
+        value = lexed.value(token)
+        if '.' in value:
+            # JSX 成员标签 <XxxAPI.Foo>
+            head, member = value.split('.', 1)
+            if head in namespaces:
+                members[head].add(member.split('.', 1)[0])
+            else:
+                identifiers.add(head)
+            continue
+        if value in namespaces:
+            dot = lexed.next_significant(index)
+            member = lexed.next_significant(dot)
+            if lexed.is_punct(dot, '.') or lexed.is_punct(dot, '?.'):
+                if member < len(tokens) and tokens[member].kind == IDENT:
+                    members[value].add(lexed.value(tokens[member]))
+                    continue
+        identifiers.add(value)
+
+    return {
+        'imports': [
+            {
+                'source': decl.source,
+                'type_only': decl.type_only,
+                'default': decl.default,
+                'namespace': decl.namespace,
+                'specifiers': None if decl.specifiers is None else
+                [[spec.imported, spec.local, spec.type_only] for spec in decl.specifiers],
+            }
+            for decl in decls
+        ],
+        'exports': [[name.name, name.type_only, name.source, name.local] for name in names],
+        'stars': stars,
+        'identifiers': sorted(identifiers),
+        'members': {name: sorted(found) for name, found in sorted(members.items())},
+    }
+
+
+def iter_source_files(src_dir=SRC_DIR) -> List[str]:
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(src_dir):
+        dirnames[:] = sorted(name for name in dirnames if name != 'node_modules' and not name.startswith('.'))
+        for name in sorted(filenames):
+            if name.endswith(SOURCE_SUFFIXES):
+                paths.append(os.path.join(dirpath, name))
+    return paths
+
+
+class ImportGraph:
+    """文件 -> 记录，以及由记录推出的模块解析和引用关系"""
+
+    def __init__(self, src_dir=SRC_DIR, cache_file=PARSE_CACHE_FILE, use_cache: bool = True):
+        self.src_dir = str(src_dir)
+        self.records: Dict[str, dict] = {}
+        self.cache = ParseCache('import-graph', _parser_key(), cache_file) if use_cache else None
+        # 本次实际分词的文件数
+        self.parsed = 0
+
+    def _load(self, path: str) -> dict:
+        if self.cache is not None:
+            before = self.cache.parsed
+            record = self.cache.load(path, lambda data: parse_record(path, data))
+            self.parsed += self.cache.parsed - before
+            return record
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.parsed += 1
+        return parse_record(path, data)
+
+    def build(self) -> 'ImportGraph':
+        """扫描 src_dir 下全部源文件；未变化的文件直接取缓存"""
+        paths = iter_source_files(self.src_dir)
+        self.records = {path: self._load(path) for path in paths}
+        if self.cache is not None:
+            self.cache.prune(paths)
+        return self
+
+    def update(self, path) -> bool:
+        """文件新建或修改后更新它的记录，记录有变化时返回 True"""
+        path = str(path)
+        if not os.path.exists(path):
+            return self.remove(path)
+        record = self._load(path)
+        changed = self.records.get(path) != record
+        self.records[path] = record
+        return changed
+
+    def remove(self, path) -> bool:
+        path = str(path)
+        if self.cache is not None and self.cache.entries.pop(path, None) is not None:
+            self.cache.dirty = True
+        return self.records.pop(path, None) is not None
+
+    def save(self):
+        if self.cache is not None:
+            self.cache.save()
+
+    def resolve(self, importer: str, source: str) -> Optional[str]:
+        """把模块说明符解析为图中的文件路径，外部包和找不到的模块返回 None"""
+        if source.startswith(ALIAS_PREFIX):
+            base = os.path.join(self.src_dir, source[len(ALIAS_PREFIX):])
+        elif source.startswith('.'):
+            base = os.path.join(os.path.dirname(importer), source)
+        else:
+            return None
+        base = os.path.normpath(base)
+        if base in self.records:
+            return base
+        for suffix in RESOLVE_SUFFIXES:
+            candidate = os.path.normpath(base + suffix)
+            if candidate in self.records:
+                return candidate
+        return None
+
+    def unused_imports(self, paths: Optional[Iterable[str]] = None) -> List[UnusedImport]:
+        """文件中导入了但没有使用的绑定（副作用导入不算）"""
+        unused = []
+        for path in sorted(self.records if paths is None else paths):
+            record = self.records.get(path)
+            if record is None:
+                continue
+            used = set(record['identifiers']) | set(record['members'])
+            for decl in record['imports']:
+                if decl['namespace'] and decl['namespace'] not in used:
+                    unused.append(UnusedImport(path, decl['namespace'], decl['source'], 'namespace'))
+                if decl['default'] and decl['default'] not in used:
+                    unused.append(UnusedImport(path, decl['default'], decl['source'], 'default'))
+                for _, local, _ in decl['specifiers'] or ():
+                    if local not in used:
+                        unused.append(UnusedImport(path, local, decl['source'], 'named'))
+        return unused
+
+    def references(self, include_tests: bool = True) -> Dict[str, Set[str]]:
+        """每个文件被其他文件引用的导出名，'*' 表示整个模块被当作值使用
+
+        经过 export {...} from 和 export * from 的转出会继续传递到来源模块。
+        """
+        refs: Dict[str, Set[str]] = defaultdict(set)
+        queue = []
+
+        def reference(path: Optional[str], name: str):
+            if path is None or '*' in refs[path] or name in refs[path]:
+                return
+            refs[path].add(name)
+            queue.append((path, name))
+
+        for path, record in self.records.items():
+            if not include_tests and is_test_file(path):
+                continue
+            used = set(record['identifiers'])
+            for decl in record['imports']:
+                target = self.resolve(path, decl['source'])
+                if target is None:
+                    continue
+                if decl['default']:
+                    reference(target, 'default')
+                for imported, _, _ in decl['specifiers'] or ():
+                    reference(target, imported)
+                namespace = decl['namespace']
+                if namespace:
+                    if namespace in used:
+                        reference(target, '*')
+                    for member in record['members'].get(namespace, ()):
+                        reference(target, member)
+
+        while queue:
+            path, name = queue.pop()
+            record = self.records[path]
+            own = {export[0] for export in record['exports']}
+            for exported, _, source, local in record['exports']:
+                if source is None or (name != '*' and exported != name):
+                    continue
+                # export * as ns from 'x' 的 local 为 None，相当于整个模块
+                reference(self.resolve(path, source), local or '*')
+            for source in record['stars']:
+                if name == '*' or name not in own:
+                    reference(self.resolve(path, source), name)
+        return refs
+
+    def dead_exports(self, api_dir=API_DIR) -> List[DeadExport]:
+        """api_dir 中没有被任何其他文件引用的导出（index 和测试文件本身除外）"""
+        api_dir = os.path.normpath(str(api_dir))
+        live = self.references(include_tests=False)
+        tested = self.references(include_tests=True)
+        dead = []
+        for path in sorted(self.records):
+            if os.path.dirname(path) != api_dir or is_test_file(path) \
+                    or os.path.basename(path).startswith('index.'):
+                continue
+            record = self.records[path]
+            if '*' in live.get(path, ()):
+                continue
+            for name, _, source, _ in record['exports']:
+                if source is None and name not in live.get(path, ()):
+                    found = tested.get(path, set())
+                    dead.append(DeadExport(path, name, '*' in found or name in found))
+        return dead
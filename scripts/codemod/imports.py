@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+基于词法分析解析 import / export 声明
+
+import 支持默认导入、命名空间导入、命名导入（含 as 别名和 type 修饰）以及
+仅副作用导入；动态 import() 和 import.meta 不算声明。
+export 支持声明导出（function/class/const/interface/type/enum）、导出列表、
+转出（export {...} from / export * from）和默认导出。
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+
+from codemod.lexer import IDENT, PUNCT, STRING, Lexed
+
+
+class ImportSpecifier(NamedTuple):
+    # 模块导出的名字
+    imported: str
+    # 本文件中的绑定名（有 as 别名时与 imported 不同）
+    local: str
+    type_only: bool
+    # 说明符在源码中的范围
+    start: int
+    end: int
+
+
+class ImportDecl(NamedTuple):
+    # 整条语句的范围（含结尾分号）
+    start: int
+    end: int
+    source: str
+    quote: str
+    # import type {...} / import type X
+    type_only: bool
+    default: Optional[str]
+    namespace: Optional[str]
+    # 没有花括号时为 None
+    specifiers: Optional[List[ImportSpecifier]]
+
+
+def _ident(lexed: Lexed, index: int) -> Optional[str]:
+    if 0 <= index < len(lexed.tokens) and lexed.tokens[index].kind == IDENT:
+        return lexed.value(lexed.tokens[index])
+    return None
+
+
+def _parse_specifiers(lexed: Lexed, index: int, close: int) -> List[ImportSpecifier]:
+    """解析 { ... } 中的说明符，index 为左花括号之后第一个 token"""
+    tokens = lexed.tokens
+    specifiers = []
+    while index < len(tokens) and tokens[index].start < close:
+        if lexed.is_punct(index, ','):
+            index = lexed.next_significant(index)
+            continue
+        start = tokens[index].start
+        type_only = False
+        name = _ident(lexed, index)
+        following = lexed.next_significant(index)
+        # type X / type X as Y；但 {type} 和 {type as x} 中的 type 是名字本身
+        if name == 'type' and _ident(lexed, following) and _ident(lexed, following) != 'as':
+            type_only = True
+            index = following
+            name = _ident(lexed, index)
+        if name is None:
+            if tokens[index].kind == STRING:
+                # 字符串形式的导出名：{'a-b' as c}
+                name = lexed.value(tokens[index])[1:-1]
+            else:
+                index = lexed.next_significant(index)
+                continue
+        local = name
+        end = tokens[index].end
+        index = lexed.next_significant(index)
+        if _ident(lexed, index) == 'as':
+            alias = lexed.next_significant(index)
+            local = _ident(lexed, alias) or name
+            end = tokens[alias].end
+            index = lexed.next_significant(alias)
+        specifiers.append(ImportSpecifier(name, local, type_only, start, end))
+    return specifiers
+
+
+def _parse_import(lexed: Lexed, index: int) -> Optional[ImportDecl]:
+    """index 处为 import 关键字，解析失败（不是声明）时返回 None"""
+    tokens = lexed.tokens
+    start = tokens[index].start
+    index = lexed.next_significant(index)
+    if index >= len(tokens) or lexed.is_punct(index, '(') or lexed.is_punct(index, '.'):
+        return None
+
+    type_only = False
+    default = None
+    namespace = None
+    specifiers = None
+
+    if tokens[index].kind != STRING:
+        if _ident(lexed, index) == 'type':
+            following = lexed.next_significant(index)
+            # import type from 'x' 中 type 是默认导入名
+            if _ident(lexed, following) != 'from' or lexed.is_punct(following, '{') or lexed.is_punct(following, '*'):
+                type_only = True
+                index = following
+        while index < len(tokens):
+            if lexed.is_punct(index, '{'):
+                close = lexed.matching(tokens[index].start)
+                if close is None:
+                    return None
+                specifiers = _parse_specifiers(lexed, lexed.next_significant(index), close)
+                index = lexed.next_significant(lexed.token_index_at(close))
+            elif lexed.is_punct(index, '*'):
+                as_index = lexed.next_significant(index)
+                name_index = lexed.next_significant(as_index)
+                if _ident(lexed, as_index) != 'as' or _ident(lexed, name_index) is None:
+                    return None
+                namespace = _ident(lexed, name_index)
+                index = lexed.next_significant(name_index)
+            elif _ident(lexed, index) == 'from':
+                break
+            elif _ident(lexed, index) is not None and default is None:
+                default = _ident(lexed, index)
+                index = lexed.next_significant(index)
+            else:
+                return None
+            if lexed.is_punct(index, ','):
+                index = lexed.next_significant(index)
+        if _ident(lexed, index) != 'from':
+            return None
+        index = lexed.next_significant(index)
+
+    if index >= len(tokens) or tokens[index].kind != STRING:
+        return None
+    literal = lexed.value(tokens[index])
+    end = tokens[index].end
+    following = lexed.next_significant(index)
+    if lexed.is_punct(following, ';'):
+        end = tokens[following].end
+    return ImportDecl(start, end, literal[1:-1], literal[0], type_only, default, namespace, specifiers)
+
+
+def parse_imports(lexed: Lexed) -> List[ImportDecl]:
+    """按出现顺序返回文件中的所有 import 声明"""
+    imports = []
+    tokens = lexed.tokens
+    for index, token in enumerate(tokens):
+        if token.kind != IDENT or lexed.text[token.start:token.end] != 'import':
+            continue
+        prev = lexed.prev_significant(index)
+        # obj.import / x?.import 是属性访问
+        if prev >= 0 and tokens[prev].kind == PUNCT and lexed.value(tokens[prev]) in ('.', '?.'):
+            continue
+        decl = _parse_import(lexed, index)
+        if decl is not None:
+            imports.append(decl)
+    return imports
+
+
+class ExportName(NamedTuple):
+    # 对外导出的名字，默认导出为 'default'
+    name: str
+    type_only: bool
+    # export 关键字的位置
+    start: int
+    # export {...} from 'x' 转出时为来源模块
+    source: Optional[str] = None
+    # 导出列表中对应的本地绑定名：export {a as b} 中为 a
+    local: Optional[str] = None
+
+
+# export 之后可以跳过的修饰符
+_EXPORT_MODIFIERS = {'declare', 'async', 'abstract'}
+_VALUE_DECLARATIONS = {'function', 'class', 'const', 'let', 'var', 'enum', 'namespace'}
+_TYPE_DECLARATIONS = {'interface', 'type'}
+
+
+def _export_source(lexed: Lexed, index: int) -> Optional[str]:
+    """index 处若为 from '模块'，返回模块名"""
+    if _ident(lexed, index) != 'from':
+        return None
+    literal = lexed.next_significant(index)
+    if literal < len(lexed.tokens) and lexed.tokens[literal].kind == STRING:
+        return lexed.value(lexed.tokens[literal])[1:-1]
+    return None
+
+
+def _parse_export(lexed: Lexed, index: int) -> Tuple[List[ExportName], Optional[str]]:
+    """index 处为 export 关键字，返回 (导出的名字, export * from 的来源模块)"""
+    tokens = lexed.tokens
+    start = tokens[index].start
+    index = lexed.next_significant(index)
+    word = _ident(lexed, index)
+
+    if word == 'default':
+        return [ExportName('default', False, start)], None
+
+    type_only = False
+    if word == 'type' and (lexed.is_punct(lexed.next_significant(index), '{')
+                           or lexed.is_punct(lexed.next_significant(index), '*')):
+        type_only = True
+        index = lexed.next_significant(index)
+
+    if lexed.is_punct(index, '*'):
+        following = lexed.next_significant(index)
+        if _ident(lexed, following) == 'as':
+            name_index = lexed.next_significant(following)
+            name = _ident(lexed, name_index)
+            source = _export_source(lexed, lexed.next_significant(name_index))
+            return ([ExportName(name, type_only, start, source)] if name else []), None
+        return [], _export_source(lexed, following)
+
+    if lexed.is_punct(index, '{'):
+        close = lexed.matching(tokens[index].start)
+        if close is None:
+            return [], None
+        specifiers = _parse_specifiers(lexed, lexed.next_significant(index), close)
+        source = _export_source(lexed, lexed.next_significant(lexed.token_index_at(close)))
+        # export {a as b} 中对外的名字是 b
+        return [ExportName(spec.local, type_only or spec.type_only, start, source, spec.imported)
+                for spec in specifiers], None
+
+    while word in _EXPORT_MODIFIERS:
+        index = lexed.next_significant(index)
+        word = _ident(lexed, index)
+    if word in _VALUE_DECLARATIONS or word in _TYPE_DECLARATIONS:
+        name_index = lexed.next_significant(index)
+        # function* gen
+        if lexed.is_punct(name_index, '*'):
+            name_index = lexed.next_significant(name_index)
+        # const enum X
+        if word == 'const' and _ident(lexed, name_index) == 'enum':
+            name_index = lexed.next_significant(name_index)
+        name = _ident(lexed, name_index)
+        if name:
+            return [ExportName(name, word in _TYPE_DECLARATIONS, start)], None
+    return [], None
+
+
+def parse_exports(lexed: Lexed) -> Tuple[List[ExportName], List[str]]:
+    """返回 (导出的名字, export * from 的来源模块列表)，按出现顺序"""
+    names = []
+    stars = []
+    tokens = lexed.tokens
+    for index, token in enumerate(tokens):
+        if token.kind != IDENT or lexed.text[token.start:token.end] != 'export':
+            continue
+        prev = lexed.prev_significant(index)
+        if prev >= 0 and tokens[prev].kind == PUNCT and lexed.value(tokens[prev]) in ('.', '?.'):
+            continue
+        exported, star = _parse_export(lexed, index)
+        names.extend(exported)
+        if star is not None:
+            stars.append(star)
+    return names, stars
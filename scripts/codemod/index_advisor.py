@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+缺失索引建议
+
+一边是迁移重放后（codemod/schema.py）最终的索引、主键、唯一约束和外键，
+一边是 src/db/api/*.ts 中 supabase.from('表')... 调用链里的过滤和排序列：
+
+  .eq / .in / .is                    等值过滤
+  .gt / .gte / .lt / .lte / .like 等  范围过滤
+  .order                             排序
+
+调用链按词法 token 跟踪，包括 let query = supabase.from(...) 之后的
+query = query.gte(...) 续写。一个调用链算一个调用点；链中有主键 / 唯一键的
+等值过滤时只取一行，其余列不需要索引。
+
+列被某个索引的第一列覆盖即视为有索引；排序列和范围列还可以由
+（同一调用链的等值列, 该列）开头的复合索引覆盖。外键列必须是某个索引的前缀，
+否则删除 / 更新被引用行时要扫全表。带 WHERE 的部分索引不算覆盖，条件只是
+“首列 IS NOT NULL”的除外：按非 NULL 值等值查找首列（含外键查找）时它与完整索引相同。
+建议的默认索引名与已有索引同名时改名并标出，不丢弃。没有覆盖的列和外键按调用点数排序，
+生成 CREATE INDEX CONCURRENTLY 语句。
+"""
+
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from codemod.lexer import IDENT, STRING, Lexed, tokenize_file
+from codemod.schema import DEFAULT_SCHEMA, Schema, display_name, quote_ident
+
+API_DIR = 'src/db/api'
+
+EQUALITY = 'equality'
+RANGE = 'range'
+SORT = 'sort'
+METHODS = {
+    'eq': EQUALITY, 'in': EQUALITY, 'is': EQUALITY,
+    'neq': RANGE, 'gt': RANGE, 'gte': RANGE, 'lt': RANGE, 'lte': RANGE,
+    'like': RANGE, 'ilike': RANGE, 'filter': RANGE,
+    'order': SORT,
+}
+REASONS = {'filter': '过滤', 'sort': '排序', 'foreign': '外键'}
+# Postgres 标识符长度上限
+_MAX_NAME = 63
+
+
+class ColumnUse(NamedTuple):
+    column: str
+    # equality / range / sort
+    kind: str
+    line: int
+    # eq / in / is / order 等
+    method: str = ''
+
+
+class CallSite(NamedTuple):
+    table: str
+    path: str
+    # .from( 所在行（从 1 开始）
+    line: int
+    uses: Tuple[ColumnUse, ...]
+
+    @property
+    def location(self) -> str:
+        return f'{self.path}:{self.line}'
+
+
+class Suggestion(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]
+    # filter / sort / foreign
+    reasons: Tuple[str, ...]
+    # 命中这些列的调用点位置
+    sites: Tuple[str, ...]
+    # 外键约束名
+    foreign_key: str = ''
+    # 默认名与已有索引同名时改用的名字
+    rename: str = ''
+
+    @property
+    def default_name(self) -> str:
+        name = f'idx_{self.table.split(".")[-1]}_{"_".join(self.columns)}'
+        return name[:_MAX_NAME]
+
+    @property
+    def name(self) -> str:
+        return self.rename or self.default_name
+
+    def to_sql(self) -> str:
+        columns = ', '.join(quote_ident(column) for column in self.columns)
+        return (f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote_ident(self.name)} '
+                f'ON {display_name(self.table)} ({columns});')
+
+
+class Unknown(NamedTuple):
+    """调用点引用了最终结构中不存在的表或列"""
+    table: str
+    column: str
+    location: str
+
+
+def _string_value(lexed: Lexed, index: int) -> Optional[str]:
+    token = lexed.tokens[index] if 0 <= index < len(lexed.tokens) else None
+    if token is None or token.kind != STRING:
+        return None
+    return lexed.value(token)[1:-1]
+
+
+def _first_argument(lexed: Lexed, paren: int) -> Optional[str]:
+    """调用的第一个参数是字符串字面量时返回其内容"""
+    first = lexed.next_significant(paren)
+    following = lexed.next_significant(first)
+    if lexed.is_punct(following, ',') or lexed.is_punct(following, ')'):
+        return _string_value(lexed, first)
+    return None
+
+
+def _index_of(lexed: Lexed, offset: int) -> int:
+    return lexed.token_index_at(offset)
+
+
+def _chain(lexed: Lexed, index: int) -> Iterable[ColumnUse]:
+    """从 index（调用链中某个 ')' 或对象名）开始，沿 .method(...) 向后收集列"""
+    while True:
+        dot = lexed.next_significant(index)
+        name = lexed.next_significant(dot)
+        paren = lexed.next_significant(name)
+        if not lexed.is_punct(dot, '.') or not lexed.is_punct(paren, '(') or \
+                lexed.tokens[name].kind != IDENT:
+            return
+        method = lexed.value(lexed.tokens[name])
+        close = lexed.matching(lexed.tokens[paren].start)
+        if close is None:
+            return
+        kind = METHODS.get(method)
+        column = _first_argument(lexed, paren) if kind else None
+        # 'profile.name' 之类的关联表列、JSON 路径不计入
+        if column and column.replace('_', '').isalnum():
+            yield ColumnUse(column, kind, lexed.line_of(lexed.tokens[name].start) + 1, method)
+        index = _index_of(lexed, close)
+
+
+def _declared_name(lexed: Lexed, index: int) -> Optional[str]:
+    """supabase.from 前面是 let / const NAME = [await] 时返回 NAME"""
+    cursor = lexed.prev_significant(index)
+    if cursor >= 0 and lexed.tokens[cursor].kind == IDENT and lexed.value(lexed.tokens[cursor]) == 'await':
+        cursor = lexed.prev_significant(cursor)
+    if not lexed.is_punct(cursor, '='):
+        return None
+    name = lexed.prev_significant(cursor)
+    keyword = lexed.prev_significant(name)
+    if name < 0 or lexed.tokens[name].kind != IDENT or keyword < 0 or \
+            lexed.value(lexed.tokens[keyword]) not in ('let', 'const', 'var'):
+        return None
+    return lexed.value(lexed.tokens[name])
+
+
+def _continuations(lexed: Lexed, name: str, start: int) -> Iterable[ColumnUse]:
+    """NAME 声明之后、下一次声明之前，NAME.method(...) 形式的续写"""
+    tokens = lexed.tokens
+    index = start
+    while index < len(tokens):
+        token = tokens[index]
+        if token.kind == IDENT and lexed.value(token) == name and \
+                not lexed.is_punct(lexed.prev_significant(index), '.'):
+            keyword = lexed.prev_significant(index)
+            if keyword >= 0 and lexed.value(tokens[keyword]) in ('let', 'const', 'var'):
+                return
+            yield from _chain(lexed, index)
+        index += 1
+
+
+def extract_call_sites(path: str, lexed: Optional[Lexed] = None) -> List[CallSite]:
+    """文件中每个 .from('表') 调用链及其过滤 / 排序列"""
+    lexed = lexed or tokenize_file(path)
+    tokens = lexed.tokens
+    sites = []
+    for index, token in enumerate(tokens):
+        if token.kind != IDENT or lexed.value(token) != 'from':
+            continue
+        dot = lexed.prev_significant(index)
+        paren = lexed.next_significant(index)
+        if not lexed.is_punct(dot, '.') or not lexed.is_punct(paren, '('):
+            continue
+        owner = lexed.prev_significant(dot)
+        # supabase.storage.from('bucket') 是存储桶，Array.from(...) 的参数不是字符串
+        if owner >= 0 and lexed.value(tokens[owner]) == 'storage':
+            continue
+        table = _first_argument(lexed, paren)
+        close = lexed.matching(tokens[paren].start)
+        if table is None or close is None:
+            continue
+        uses = list(_chain(lexed, _index_of(lexed, close)))
+        # 找到 supabase.from 调用链的起点，判断是否赋给了变量
+        head = lexed.prev_significant(dot)
+        while head > 0 and lexed.is_punct(lexed.prev_significant(head), '.'):
+            head = lexed.prev_significant(lexed.prev_significant(head))
+        name = _declared_name(lexed, head)
+        if name is not None:
+            uses.extend(_continuations(lexed, name, _index_of(lexed, close) + 1))
+        table = table if '.' in table else f'{DEFAULT_SCHEMA}.{table}'
+        sites.append(CallSite(table, path, lexed.line_of(token.start) + 1, tuple(uses)))
+    return sites
+
+
+def scan_api(api_dir: str = API_DIR) -> List[CallSite]:
+    sites = []
+    for name in sorted(os.listdir(api_dir)):
+        if name.endswith('.ts') and not name.endswith(('.test.ts', '.d.ts')):
+            sites.extend(extract_call_sites(os.path.join(api_dir, name)))
+    return sites
+
+
+def _covers(keys: Sequence[Tuple[str, ...]], columns: Tuple[str, ...]) -> bool:
+    """某个索引键以 columns 开头（顺序不限）"""
+    return any(len(key) >= len(columns) and set(key[:len(columns)]) == set(columns) for key in keys)
+
+
+class IndexAdvisor:
+    def __init__(self, schema: Schema, sites: Sequence[CallSite]):
+        self.schema = schema
+        self.sites = sites
+        self._keys: Dict[Tuple[str, bool], List[Tuple[str, ...]]] = {}
+
+    def keys(self, table: str, lookup: bool = False) -> List[Tuple[str, ...]]:
+        """lookup 为 True 时是按首列等值查找可用的索引键（含“首列 IS NOT NULL”的部分索引）"""
+        if (table, lookup) not in self._keys:
+            self._keys[table, lookup] = self.schema.index_keys(table, lookup)
+        return self._keys[table, lookup]
+
+    def _unique(self, table: str) -> Set[str]:
+        """单列的主键 / 唯一键"""
+        columns = {index.columns[0].strip('"') for index in self.schema.indexes.values()
+                   if index.table == table and index.unique and len(index.columns) == 1
+                   and (not index.partial or index.not_null_only)}
+        for constraint in self.schema.tables[table].constraints.values():
+            if constraint.kind in ('primary', 'unique') and len(constraint.columns) == 1:
+                columns.add(constraint.columns[0])
+        return columns
+
+    def unknown(self) -> List[Unknown]:
+        found = []
+        for site in self.sites:
+            table = self.schema.tables.get(site.table)
+            if table is None:
+                if site.table not in self.schema.views:
+                    found.append(Unknown(site.table, '', site.location))
+                continue
+            for use in site.uses:
+                if use.column not in table.columns:
+                    found.append(Unknown(site.table, use.column, f'{site.path}:{use.line}'))
+        return list(dict.fromkeys(found))
+
+    def uncovered_columns(self) -> Dict[Tuple[str, Tuple[str, ...]], List[Tuple[str, str]]]:
+        """(表, 建议的索引列) -> [(用途, 调用点位置)]，只含没有索引覆盖的列
+
+        排序列和范围列在有等值过滤的调用链中建议（等值列, 该列）复合索引
+        """
+        found: Dict[Tuple[str, Tuple[str, ...]], List[Tuple[str, str]]] = {}
+        for site in self.sites:
+            table = self.schema.tables.get(site.table)
+            if table is None or table.raw:
+                continue
+            uses = [use for use in site.uses if use.column in table.columns]
+            equality = [use.column for use in uses if use.kind == EQUALITY]
+            # 按非 NULL 值查找的列（.is(列, null) 除外），首列 IS NOT NULL 的部分索引可用
+            lookups = {use.column for use in uses if use.kind == EQUALITY and use.method != 'is'}
+            # 按唯一键取单行，其余条件在这一行上判断（.is(列, null) 可能匹配多行）
+            if lookups & self._unique(site.table):
+                continue
+            keys = self.keys(site.table)
+            lookup = self.keys(site.table, lookup=True)
+            seen = set()
+            for use in uses:
+                if use.column in seen:
+                    continue
+                if _covers(lookup if use.column in lookups else keys, (use.column,)):
+                    continue
+                if use.kind != EQUALITY and any(_covers(keys, (column, use.column)) or
+                                                (column in lookups and
+                                                 any(key[:2] == (column, use.column) for key in lookup))
+                                                for column in equality):
+                    continue
+                seen.add(use.column)
+                columns = (equality[0], use.column) if use.kind != EQUALITY and equality else (use.column,)
+                found.setdefault((site.table, columns), []).append(
+                    ('sort' if use.kind == SORT else 'filter', site.location))
+        return found
+
+    def uncovered_foreign_keys(self) -> Iterable[Tuple[str, str, Tuple[str, ...]]]:
+        """(表, 约束名, 列)，外键列不是任何索引的前缀（按外键值查找，首列 IS NOT NULL 的部分索引可用）"""
+        for key, table in self.schema.tables.items():
+            for constraint in table.constraints.values():
+                if constraint.kind == 'foreign' and constraint.columns and \
+                        not _covers(self.keys(key, lookup=True), constraint.columns):
+                    yield key, constraint.name, constraint.columns
+
+    def suggestions(self) -> List[Suggestion]:
+        """按命中的调用点数从多到少排列"""
+        merged: Dict[Tuple[str, Tuple[str, ...]], dict] = {}
+        for (table, columns), uses in self.uncovered_columns().items():
+            item = merged.setdefault((table, columns), {'reasons': set(), 'sites': [], 'foreign_key': ''})
+            for reason, location in uses:
+                item['reasons'].add(reason)
+                if location not in item['sites']:
+                    item['sites'].append(location)
+        for table, name, columns in self.uncovered_foreign_keys():
+            item = merged.setdefault((table, columns), {'reasons': set(), 'sites': [], 'foreign_key': ''})
+            item['reasons'].add('foreign')
+            item['foreign_key'] = name
+        result = [Suggestion(table, columns, tuple(sorted(item['reasons'])), tuple(item['sites']), item['foreign_key'])
+                  for (table, columns), item in merged.items()]
+        # 默认名与已有索引同名时（已有索引覆盖不了这些列）换一个名字，并在结果中标出
+        existing = {key.split('.', 1)[1] for key in self.schema.indexes}
+        for position, item in enumerate(result):
+            if item.name not in existing:
+                existing.add(item.name)
+                continue
+            number = 2
+            while f'{item.name[:_MAX_NAME - 4]}_{number}' in existing:
+                number += 1
+            result[position] = item._replace(rename=f'{item.name[:_MAX_NAME - 4]}_{number}')
+            existing.add(result[position].name)
+        result.sort(key=lambda item: (-len(item.sites), item.table, item.columns))
+        return result
+
+
+def to_migration(suggestions: Sequence[Suggestion], header: str = '') -> str:
+    """建议的索引写成迁移；CONCURRENTLY 不能在事务中执行，用 apply_migration.py 执行时会单独成批"""
+    out = []
+    if header:
+        out.append(header.rstrip() + '\n')
+    for item in suggestions:
+        reasons = '、'.join(REASONS[reason] for reason in item.reasons)
+        comment = f'-- {reasons}，{len(item.sites)} 个调用点'
+        if item.foreign_key:
+            comment += f'，外键 {item.foreign_key}'
+        if item.rename:
+            comment += f'，已有同名索引 {item.default_name} 覆盖不了这些列，改名'
+        out.append(comment)
+        out.extend(f'--   {location}' for location in item.sites[:5])
+        if len(item.sites) > 5:
+            out.append(f'--   ... 另 {len(item.sites) - 5} 处')
+        out.append(item.to_sql() + '\n')
+    return '\n'.join(out)
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+TypeScript/TSX 词法分析器
+
+一次线性扫描得到 token 流和括号配对表，能正确跳过字符串、模板字符串、
+注释、正则字面量以及 JSX 文本中的括号。所有改写脚本都基于它定位语句边界，
+而不是逐行数 ( ) { }。
+"""
+
+import re
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+# token 类型
+IDENT = 'ident'
+NUMBER = 'number'
+STRING = 'string'
+TEMPLATE = 'template'
+REGEX = 'regex'
+COMMENT = 'comment'
+PUNCT = 'punct'
+JSX_TEXT = 'jsx_text'
+
+OPEN_BRACKETS = {'(': ')', '[': ']', '{': '}'}
+CLOSE_BRACKETS = {')': '(', ']': '[', '}': '{'}
+
+# 这些关键字之后出现的 / 是正则，< 可能是 JSX
+_EXPR_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await', 'default',
+}
+
+# 这些标点之后出现的 / 是除号，其余标点之后是正则
+_VALUE_END_PUNCT = {')', ']', '}'}
+
+_PUNCTUATORS = [
+    '>>>=', '...', '===', '!==', '**=', '<<=', '>>=', '>>>', '&&=', '||=', '??=',
+    '=>', '==', '!=', '<=', '>=', '&&', '||', '??', '?.', '++', '--', '+=', '-=',
+    '*=', '/=', '%=', '&=', '|=', '^=', '**', '<<', '>>',
+]
+
+_WS_RE = re.compile(r'\s+')
+_IDENT_RE = re.compile(r'[^\W\d][\w$]*|\$[\w$]*')
+_NUMBER_RE = re.compile(
+    r'0[xX][0-9a-fA-F_]+n?|0[bB][01_]+n?|0[oO][0-7_]+n?'
+    r'|(?:\d[\d_]*\.?[\d_]*|\.\d[\d_]*)(?:[eE][+-]?\d+)?n?'
+)
+_PUNCT_RE = re.compile('|'.join(re.escape(p) for p in _PUNCTUATORS) + r'|[^\s\w]')
+_LINE_COMMENT_RE = re.compile(r'//[^\n]*')
+_BLOCK_COMMENT_RE = re.compile(r'/\*.*?(?:\*/|\Z)', re.DOTALL)
+_STRING_RES = {
+    "'": re.compile(r"'(?:[^'\\\n]|\\.|\\\n)*(?:'|(?=\n)|\Z)"),
+    '"': re.compile(r'"(?:[^"\\\n]|\\.|\\\n)*(?:"|(?=\n)|\Z)'),
+}
+_TEMPLATE_CHUNK_RE = re.compile(r'(?:[^`\\$]|\\.|\$(?!\{))*', re.DOTALL)
+_REGEX_RE = re.compile(r'/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-zA-Z]*')
+_JSX_TEXT_RE = re.compile(r'[^<{]+')
+_JSX_NAME_RE = re.compile(r'[\w$][\w$.:\-]*')
+_JSX_ATTR_STRING_RE = re.compile(r'"[^"]*(?:"|\Z)|\'[^\']*(?:\'|\Z)')
+_NOT_JSX_AFTER_NAME_RE = re.compile(r'\s*(?:,|extends\b)')
+
+# 词法模式
+_CODE = 0
+_TEMPLATE = 1
+_JSX_TAG = 2
+_JSX_CHILDREN = 3
+
+
+class Token(NamedTuple):
+    kind: str
+    start: int
+    end: int
+
+
+class Lexed:
+    """一个文件的词法分析结果"""
+
+    def __init__(self, text: str, tokens: List[Token], pairs: Dict[int, int],
+                 unmatched: List[int]):
+        self.text = text
+        self.tokens = tokens
+        # 括号偏移 -> 配对括号偏移（双向）
+        self.pairs = pairs
+        # 没有配对的括号偏移，文件结构被破坏时非空
+        self.unmatched = unmatched
+        self._starts = [t.start for t in tokens]
+        self.line_starts = [0] + [m.end() for m in re.finditer('\n', text)]
+
+    def value(self, token: Token) -> str:
+        return self.text[token.start:token.end]
+
+    def matching(self, offset: int) -> Optional[int]:
+        """返回 offset 处括号的配对括号偏移"""
+        return self.pairs.get(offset)
+
+    def token_index_at(self, offset: int) -> int:
+        """返回起始偏移 <= offset 的最后一个 token 的下标"""
+        return bisect_right(self._starts, offset) - 1
+
+    def line_of(self, offset: int) -> int:
+        """offset 所在行号（从 0 开始）"""
+        return bisect_right(self.line_starts, offset) - 1
+
+    def line_start(self, offset: int) -> int:
+        return self.line_starts[self.line_of(offset)]
+
+    def line_end(self, offset: int) -> int:
+        """offset 所在行的换行符偏移（最后一行为文本长度）"""
+        end = self.text.find('\n', offset)
+        return len(self.text) if end == -1 else end
+
+    def next_significant(self, index: int) -> int:
+        """index 之后第一个非注释 token 的下标，没有则返回 len(tokens)"""
+        tokens = self.tokens
+        index += 1
+        while index < len(tokens) and tokens[index].kind == COMMENT:
+            index += 1
+        return index
+
+    def prev_significant(self, index: int) -> int:
+        """index 之前第一个非注释 token 的下标，没有则返回 -1"""
+        tokens = self.tokens
+        index -= 1
+        while index >= 0 and tokens[index].kind == COMMENT:
+            index -= 1
+        return index
+
+    def is_punct(self, index: int, value: str) -> bool:
+        if 0 <= index < len(self.tokens):
+            token = self.tokens[index]
+            return token.kind == PUNCT and self.text[token.start:token.end] == value
+        return False
+
+    def is_first_on_line(self, index: int) -> bool:
+        """token 前面同一行只有空白"""
+        start = self.tokens[index].start
+        return self.text[self.line_start(start):start].strip() == ''
+
+
+class _Scanner:
+    def __init__(self, text: str, jsx: bool):
+        self.text = text
+        self.jsx = jsx
+        self.tokens: List[Token] = []
+        self.pairs: Dict[int, int] = {}
+        self.unmatched: List[int] = []
+        self.bracket_stack: List[int] = []
+        # 模式栈，元素为 [模式, 计数]：代码模式记录未闭合的 { 数量，
+        # JSX 标签模式记录是否为闭合标签
+        self.modes = [[_CODE, 0]]
+        # 最近一个有效 token（用于判断 / 和 < 的含义）
+        self.prev_kind: Optional[str] = None
+        self.prev_value = ''
+
+    def emit(self, kind: str, start: int, end: int):
+        self.tokens.append(Token(kind, start, end))
+        if kind != COMMENT:
+            self.prev_kind = kind
+            self.prev_value = self.text[start:end] if kind in (PUNCT, IDENT) else ''
+
+    def open_bracket(self, pos: int):
+        self.bracket_stack.append(pos)
+
+    def close_bracket(self, pos: int):
+        char = self.text[pos]
+        stack = self.bracket_stack
+        # 跳过不配对的开括号，直到找到同类开括号
+        for i in range(len(stack) - 1, -1, -1):
+            if self.text[stack[i]] == CLOSE_BRACKETS[char]:
+                self.unmatched.extend(stack[i + 1:])
+                opener = stack[i]
+                del stack[i:]
+                self.pairs[opener] = pos
+                self.pairs[pos] = opener
+                return
+        self.unmatched.append(pos)
+
+    def expression_expected(self) -> bool:
+        """当前位置是否期待一个表达式（决定 / 是正则、< 是 JSX）"""
+        if self.prev_kind is None:
+            return True
+        if self.prev_kind == IDENT:
+            return self.prev_value in _EXPR_KEYWORDS
+        if self.prev_kind == PUNCT:
+            return self.prev_value not in _VALUE_END_PUNCT
+        return False
+
+    def looks_like_jsx(self, pos: int) -> bool:
+        if not self.jsx or not self.expression_expected():
+            return False
+        text = self.text
+        nxt = text[pos + 1:pos + 2]
+        if nxt == '>':
+            return True
+        match = _JSX_NAME_RE.match(text, pos + 1)
+        if not match or nxt.isdigit():
+            return False
+        # <T,>(x) => x 与 <T extends U> 是泛型而不是 JSX
+        return not _NOT_JSX_AFTER_NAME_RE.match(text, match.end())
+
+    def scan(self) -> Lexed:
+        text = self.text
+        length = len(text)
+        pos = 0
+        while pos < length:
+            mode = self.modes[-1]
+            if mode[0] == _CODE:
+                pos = self.scan_code(pos)
+            elif mode[0] == _TEMPLATE:
+                pos = self.scan_template(pos)
+            elif mode[0] == _JSX_TAG:
+                pos = self.scan_jsx_tag(pos)
+            else:
+                pos = self.scan_jsx_children(pos)
+        self.unmatched.extend(self.bracket_stack)
+        self.unmatched.sort()
+        return Lexed(text, self.tokens, self.pairs, self.unmatched)
+
+    def scan_code(self, pos: int) -> int:
+        text = self.text
+        char = text[pos]
+        if char.isspace():
+            return _WS_RE.match(text, pos).end()
+        if char == '/':
+            nxt = text[pos + 1:pos + 2]
+            if nxt == '/':
+                end = _LINE_COMMENT_RE.match(text, pos).end()
+                self.emit(COMMENT, pos, end)
+                return end
+            if nxt == '*':
+                end = _BLOCK_COMMENT_RE.match(text, pos).end()
+                self.emit(COMMENT, pos, end)
+                return end
+            if self.expression_expected():
+                match = _REGEX_RE.match(text, pos)
+                if match:
+                    self.emit(REGEX, pos, match.end())
+                    return match.end()
+        if char in _STRING_RES:
+            end = _STRING_RES[char].match(text, pos).end()
+            self.emit(STRING, pos, end)
+            return end
+        if char == '`':
+            self.modes.append([_TEMPLATE, 0])
+            return self.scan_template(pos + 1, pos)
+        if char == '<' and self.looks_like_jsx(pos):
+            self.modes.append([_JSX_TAG, 0])
+            self.emit(PUNCT, pos, pos + 1)
+            return pos + 1
+        match = _IDENT_RE.match(text, pos)
+        if match:
+            self.emit(IDENT, pos, match.end())
+            return match.end()
+        if char.isdigit() or (char == '.' and text[pos + 1:pos + 2].isdigit()):
+            end = _NUMBER_RE.match(text, pos).end()
+            self.emit(NUMBER, pos, end)
+            return end
+        if char == '{':
+            self.modes[-1][1] += 1
+        elif char == '}':
+            mode = self.modes[-1]
+            if mode[1] == 0 and len(self.modes) > 1:
+                # 结束模板字符串的 ${...} 或 JSX 的 {...}
+                self.modes.pop()
+                if self.modes[-1][0] == _TEMPLATE:
+                    return self.scan_template(pos + 1, pos)
+                self.close_bracket(pos)
+                self.emit(PUNCT, pos, pos + 1)
+                return pos + 1
+            mode[1] -= 1
+        end = _PUNCT_RE.match(text, pos).end()
+        if char in OPEN_BRACKETS:
+            self.open_bracket(pos)
+        elif char in CLOSE_BRACKETS:
+            self.close_bracket(pos)
+        self.emit(PUNCT, pos, end)
+        return end
+
+    def scan_template(self, pos: int, start: Optional[int] = None) -> int:
+        """扫描模板字符串的一段文本，start 为这一段起始的 ` 或 } 的位置"""
+        text = self.text
+        if start is None:
+            start = pos
+        end = _TEMPLATE_CHUNK_RE.match(text, pos).end()
+        if text.startswith('${', end):
+            self.modes.append([_CODE, 0])
+            self.emit(TEMPLATE, start, end + 2)
+            # ${ 之后是表达式
+            self.prev_kind, self.prev_value = PUNCT, '('
+            return end + 2
+        # 遇到结尾的 ` 或文件结束
+        end = min(end + 1, len(text))
+        self.modes.pop()
+        self.emit(TEMPLATE, start, end)
+        return end
+
+    def scan_jsx_tag(self, pos: int) -> int:
+        text = self.text
+        char = text[pos]
+        if char.isspace():
+            return _WS_RE.match(text, pos).end()
+        if char == '/' and text.startswith('//', pos):
+            end = _LINE_COMMENT_RE.match(text, pos).end()
+            self.emit(COMMENT, pos, end)
+            return end
+        if char == '/' and text.startswith('/*', pos):
+            end = _BLOCK_COMMENT_RE.match(text, pos).end()
+            self.emit(COMMENT, pos, end)
+            return end
+        if char in '"\'':
+            end = _JSX_ATTR_STRING_RE.match(text, pos).end()
+            self.emit(STRING, pos, end)
+            return end
+        if char == '{':
+            self.open_bracket(pos)
+            self.emit(PUNCT, pos, pos + 1)
+            self.modes.append([_CODE, 0])
+            self.prev_kind, self.prev_value = PUNCT, '{'
+            return pos + 1
+        if text.startswith('/>', pos):
+            self.emit(PUNCT, pos, pos + 2)
+            self.end_element()
+            return pos + 2
+        if char == '>':
+            self.emit(PUNCT, pos, pos + 1)
+            closing = self.modes.pop()[1]
+            if closing:
+                self.end_element()
+            else:
+                self.modes.append([_JSX_CHILDREN, 0])
+            return pos + 1
+        match = _JSX_NAME_RE.match(text, pos)
+        if match:
+            self.emit(IDENT, pos, match.end())
+            return match.end()
+        end = _PUNCT_RE.match(text, pos).end()
+        self.emit(PUNCT, pos, end)
+        return end
+
+    def end_element(self):
+        """一个 JSX 元素结束：回到父元素的子节点或外层代码"""
+        if self.modes[-1][0] == _JSX_TAG:
+            # 自闭合标签 <X />
+            self.modes.pop()
+        elif self.modes[-1][0] == _JSX_CHILDREN:
+            # 闭合标签 </X>
+            self.modes.pop()
+        # JSX 元素整体相当于一个值
+        self.prev_kind, self.prev_value = PUNCT, ')'
+
+    def scan_jsx_children(self, pos: int) -> int:
+        text = self.text
+        char = text[pos]
+        if char == '{':
+            self.open_bracket(pos)
+            self.emit(PUNCT, pos, pos + 1)
+            self.modes.append([_CODE, 0])
+            self.prev_kind, self.prev_value = PUNCT, '{'
+            return pos + 1
+        if char == '<':
+            if text.startswith('</', pos):
+                # 闭合标签：标签读完后再结束子节点模式
+                self.modes.append([_JSX_TAG, 1])
+                self.emit(PUNCT, pos, pos + 2)
+                return pos + 2
+            self.modes.append([_JSX_TAG, 0])
+            self.emit(PUNCT, pos, pos + 1)
+            return pos + 1
+        end = _JSX_TEXT_RE.match(text, pos).end()
+        self.emit(JSX_TEXT, pos, end)
+        return end
+
+
+def tokenize(text: str, jsx: bool = False) -> Lexed:
+    """对源码做一次线性扫描，jsx=True 时识别 JSX 元素"""
+    return _Scanner(text, jsx).scan()
+
+
+def tokenize_file(file_path, text: Optional[str] = None) -> Lexed:
+    """按扩展名决定是否启用 JSX，text 为空时读取文件"""
+    path = Path(file_path)
+    if text is None:
+        text = path.read_text(encoding='utf-8')
+    return tokenize(text, jsx=path.suffix in ('.tsx', '.jsx'))
+
+
+def find_member_calls(lexed: Lexed, objects, methods) -> List[tuple]:
+    """
+    查找 obj.method(...) 形式的调用
+
+    返回 (对象 token 下标, 左括号偏移, 右括号偏移) 列表，右括号缺失时为 None
+    """
+    tokens = lexed.tokens
+    text = lexed.text
+    calls = []
+    for i, token in enumerate(tokens):
+        if token.kind != IDENT or text[token.start:token.end] not in objects:
+            continue
+        if i > 0 and lexed.is_punct(lexed.prev_significant(i), '.'):
+            continue
+        dot = lexed.next_significant(i)
+        name = lexed.next_significant(dot)
+        paren = lexed.next_significant(name)
+        if not lexed.is_punct(dot, '.') or not lexed.is_punct(paren, '('):
+            continue
+        if tokens[name].kind != IDENT or lexed.value(tokens[name]) not in methods:
+            continue
+        open_offset = tokens[paren].start
+        calls.append((i, open_offset, lexed.matching(open_offset)))
+    return calls
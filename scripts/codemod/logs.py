@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+基于词法分析删除调试日志语句
+
+只删除独立成句的 console.log/info/debug/warn 和 logger.info/debug/warn，
+保留 console.error 和 logger.error。语句边界由括号配对表决定，
+字符串、模板字符串、注释里的括号不会干扰判断。
+"""
+
+from typing import Tuple
+
+from codemod.lexer import IDENT, PUNCT, Lexed, find_member_calls, tokenize
+
+LOG_CALLS = {
+    'console': {'log', 'info', 'debug', 'warn'},
+    'logger': {'info', 'debug', 'warn'},
+}
+
+# 这些关键字后面紧跟的日志调用是控制语句的唯一子句，删除会改变语义
+_CONTROL_KEYWORDS = {'if', 'for', 'while', 'else', 'do', 'with'}
+
+# 这些关键字后面必须跟表达式，换行也不会结束语句
+_OPERATOR_KEYWORDS = {
+    'return', 'throw', 'case', 'await', 'yield', 'typeof', 'void', 'delete',
+    'new', 'in', 'of', 'instanceof',
+}
+
+
+def _starts_statement(lexed: Lexed, index: int) -> bool:
+    """index 处的 token 是否位于一条语句的开头"""
+    if not lexed.is_first_on_line(index):
+        return False
+    prev = lexed.prev_significant(index)
+    if prev < 0:
+        return True
+    token = lexed.tokens[prev]
+    value = lexed.value(token)
+    if token.kind == PUNCT:
+        if value in (';', '{', '}'):
+            return True
+        if value == ')':
+            # if (...) console.log(...) 之类
+            opener = lexed.matching(token.start)
+            if opener is None:
+                return False
+            before = lexed.prev_significant(lexed.token_index_at(opener))
+            return not (before >= 0 and lexed.value(lexed.tokens[before]) in _CONTROL_KEYWORDS)
+        return value == ']'
+    if token.kind == IDENT:
+        return value not in _CONTROL_KEYWORDS and value not in _OPERATOR_KEYWORDS
+    # 字符串、数字、模板字符串结尾可以自动插入分号
+    return True
+
+
+def _ends_statement(lexed: Lexed, close_offset: int) -> int:
+    """调用的右括号之后是否结束语句，是则返回语句结束偏移，否则返回 -1"""
+    close_index = lexed.token_index_at(close_offset)
+    nxt = lexed.next_significant(close_index)
+    if nxt >= len(lexed.tokens):
+        return close_offset + 1
+    token = lexed.tokens[nxt]
+    if lexed.is_punct(nxt, ';'):
+        return token.end
+    if lexed.is_punct(nxt, '}') or lexed.line_of(token.start) > lexed.line_of(close_offset):
+        return close_offset + 1
+    return -1
+
+
+def remove_log_statements(content: str, jsx: bool = False) -> Tuple[str, int]:
+    """删除完整的调试日志语句，返回 (新内容, 删除条数)"""
+    # 先用字符串判断，绝大多数文件不需要分词
+    if not any(name in content for name in LOG_CALLS):
+        return content, 0
+    lexed = tokenize(content, jsx=jsx)
+    methods = set().union(*LOG_CALLS.values())
+    spans = []
+    for index, _, close in find_member_calls(lexed, LOG_CALLS.keys(), methods):
+        if close is None:
+            continue
+        obj = lexed.value(lexed.tokens[index])
+        method = lexed.value(lexed.tokens[lexed.next_significant(lexed.next_significant(index))])
+        if method not in LOG_CALLS[obj] or not _starts_statement(lexed, index):
+            continue
+        end = _ends_statement(lexed, close)
+        if end < 0:
+            continue
+        start = lexed.tokens[index].start
+        line_end = lexed.line_end(end)
+        if content[end:line_end].strip() == '':
+            # 整行删除（连同缩进和换行）
+            start = lexed.line_start(start)
+            end = min(line_end + 1, len(content))
+        else:
+            # 同一行后面还有代码，只删除语句本身
+            while end < line_end and content[end] in ' \t':
+                end += 1
+        if spans and start < spans[-1][1]:
+            continue
+        spans.append((start, end))
+
+    if not spans:
+        return content, 0
+    parts = []
+    last = 0
+    for start, end in spans:
+        parts.append(content[last:start])
+        last = end
+    parts.append(content[last:])
+    return ''.join(parts), len(spans)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+内存覆盖层与多阶段流水线
+
+Overlay 在磁盘之上保存文件的当前内容：每个文件第一次用到时从磁盘读一次，
+之后各阶段的读写都在内存中进行，flush 时每个有变化的文件只写一次。
+Pipeline 按阶段依次处理所有文件（后一阶段看到的是前一阶段在整棵树上的
+结果），每个阶段之后校验；任何文件校验失败时整条链回滚到开始前的状态，
+磁盘上什么都没有写。per_file=True 时只把失败的文件恢复原样、不再参与后续阶段，
+其余文件照常处理。flush 经过 codemod/transaction.py 的事务，全部文件
+暂存完毕后才一起改名生效。
+"""
+
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from codemod.cache import Fingerprint, file_fingerprint
+from codemod.lexer import tokenize_file
+from codemod.preview import Preview
+from codemod.transaction import Transaction, write_text
+
+
+class OverlayConflict(Exception):
+    """flush 时发现磁盘上的文件在读入之后被其他进程修改"""
+
+
+class Overlay:
+    """路径 -> 内存中的当前内容"""
+
+    def __init__(self):
+        # 路径 -> (磁盘上读到的内容, 读入时的指纹)
+        self.base: Dict[str, Tuple[str, Fingerprint]] = {}
+        self.current: Dict[str, str] = {}
+        self.reads = 0
+        self.writes = 0
+
+    def read(self, path) -> str:
+        path = str(path)
+        if path not in self.current:
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.reads += 1
+            content = data.decode('utf-8')
+            self.base[path] = (content, file_fingerprint(path, data))
+            self.current[path] = content
+        return self.current[path]
+
+    def write(self, path, content: str):
+        path = str(path)
+        if path not in self.current:
+            self.read(path)
+        self.current[path] = content
+
+    def changed(self) -> List[str]:
+        return sorted(path for path, content in self.current.items() if content != self.base[path][0])
+
+    def checkpoint(self) -> Dict[str, str]:
+        """当前内容的快照（字符串不可变，只复制字典）"""
+        return dict(self.current)
+
+    def restore(self, checkpoint: Dict[str, str]):
+        """回到快照时的内容；快照之后才读入的文件恢复成磁盘上的内容"""
+        for path in self.current:
+            self.current[path] = checkpoint.get(path, self.base[path][0])
+
+    def revert(self, path):
+        """把一个文件恢复成磁盘上读到的内容"""
+        path = str(path)
+        if path in self.current:
+            self.current[path] = self.base[path][0]
+
+    def flush(self, transaction: Optional[Transaction] = None) -> List[str]:
+        """把有变化的文件写回磁盘，每个文件一次，返回写入的路径
+
+        写之前用 stat 检查磁盘上的文件是否仍是读入时的状态，被外部修改过的
+        文件不覆盖，全部检查通过后才开始写。传入 transaction 时只暂存，
+        由调用方提交；否则在这里一次提交（不记日志）。
+        """
+        changed = self.changed()
+        conflicts = []
+        for path in changed:
+            fingerprint = self.base[path][1]
+            try:
+                stat = os.stat(path)
+            except OSError:
+                conflicts.append(path)
+                continue
+            if (stat.st_mtime_ns, stat.st_size) != fingerprint[:2]:
+                conflicts.append(path)
+        if conflicts:
+            raise OverlayConflict(f'文件在读入后被修改: {", ".join(conflicts)}')
+        own = transaction is None
+        if own:
+            transaction = Transaction()
+        try:
+            for path in changed:
+                write_text(path, self.current[path], transaction, newline='')
+                self.writes += 1
+            if own:
+                transaction.commit()
+        except BaseException:
+            if own:
+                transaction.abort()
+            raise
+        return changed
+
+    def preview(self, preview: Preview) -> List[str]:
+        """不写磁盘，把有变化的文件输出为差异，返回这些路径"""
+        changed = self.changed()
+        for path in changed:
+            preview.record(path, self.base[path][0], self.current[path])
+        return changed
+
+
+class Stage(NamedTuple):
+    name: str
+    # (内容, 路径) -> (新内容, 修改处数)，与 codemod.rules 的规则函数相同
+    apply: Callable[[str, Path], Tuple[str, int]]
+    # 只处理这些后缀的文件，None 表示全部
+    suffixes: Optional[Tuple[str, ...]] = None
+    # 不处理的文件，glob 模式从路径右端匹配（Path.match）
+    exclude: Tuple[str, ...] = ()
+
+    def accepts(self, path: Path) -> bool:
+        return (self.suffixes is None or path.suffix in self.suffixes) and \
+            not any(path.match(pattern) for pattern in self.exclude)
+
+
+class PipelineResult(NamedTuple):
+    # 路径 -> {阶段名: 修改处数}
+    counts: Dict[str, Dict[str, int]]
+    # 校验失败时为 (阶段名, 路径, 原因)，此时覆盖层已回滚
+    failure: Optional[Tuple[str, str, str]] = None
+    # per_file 模式下失败并恢复原样的文件 [(阶段名, 路径, 原因)]
+    skipped: Tuple[Tuple[str, str, str], ...] = ()
+
+    @property
+    def ok(self) -> bool:
+        return self.failure is None
+
+
+def brackets_balanced(before: str, after: str, path: Path) -> Optional[str]:
+    """默认校验：改写前括号配对完整的文件，改写后仍要完整"""
+    if tokenize_file(path, after).unmatched and not tokenize_file(path, before).unmatched:
+        return '改写后括号不再配对'
+    return None
+
+
+class Pipeline:
+    """按阶段处理一组文件，阶段之间只经过覆盖层"""
+
+    def __init__(self, stages: Sequence[Stage],
+                 validate: Optional[Callable[[str, str, Path], Optional[str]]] = brackets_balanced,
+                 per_file: bool = False):
+        self.stages = list(stages)
+        self.validate = validate
+        self.per_file = per_file
+
+    def run(self, paths: Sequence, overlay: Overlay) -> PipelineResult:
+        """依次执行所有阶段；某个阶段之后任一文件校验失败，整条链回滚
+
+        per_file 为 True 时只恢复失败的文件，记入 skipped，其余文件继续处理
+        """
+        start = overlay.checkpoint()
+        counts: Dict[str, Dict[str, int]] = {}
+        skipped: List[Tuple[str, str, str]] = []
+        failed = set()
+        for stage in self.stages:
+            for path in paths:
+                path = Path(path)
+                if not stage.accepts(path) or str(path) in failed:
+                    continue
+                before = overlay.read(path)
+                try:
+                    after, count = stage.apply(before, path)
+                    reason = None
+                    if after != before and self.validate is not None:
+                        reason = self.validate(before, after, path)
+                except Exception as e:
+                    reason = str(e)
+                if reason:
+                    if not self.per_file:
+                        overlay.restore(start)
+                        return PipelineResult({}, (stage.name, str(path), reason))
+                    overlay.revert(path)
+                    counts.pop(str(path), None)
+                    failed.add(str(path))
+                    skipped.append((stage.name, str(path), reason))
+                    continue
+                if after == before:
+                    continue
+                overlay.write(path, after)
+                if count:
+                    counts.setdefault(str(path), {})[stage.name] = count
+        return PipelineResult(counts, skipped=tuple(skipped))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+预览模式：不写任何文件，把将要发生的改动输出为统一差异
+
+所有脚本的写回都经过 codemod/transaction.py 的 write_text：传入 Preview
+时只输出差异，否则照常写回。差异边生成边输出；指定补丁文件时同时写入该文件，
+确认无误后可以在仓库根目录执行 git apply <补丁文件> 应用。
+"""
+
+import sys
+from typing import List, Optional, Sequence, TextIO
+
+from codemod.diff import DEFAULT_CONTEXT, unified_diff
+
+
+class Preview:
+    """收集并输出差异，不修改磁盘上的文件"""
+
+    def __init__(self, patch_file: Optional[str] = None, stream: Optional[TextIO] = None,
+                 context: int = DEFAULT_CONTEXT):
+        self.patch_file = patch_file
+        self.stream = sys.stdout if stream is None else stream
+        self.context = context
+        # 有差异的文件，按记录顺序
+        self.paths: List[str] = []
+        self._patch = open(patch_file, 'w', encoding='utf-8', newline='') if patch_file else None
+
+    def record(self, path, before: str, after: str) -> bool:
+        """输出 path 从 before 到 after 的差异，没有差异时返回 False"""
+        return self.emit(path, unified_diff(path, before, after, self.context))
+
+    def emit(self, path, lines) -> bool:
+        """输出已经生成好的差异行（并行执行时由子进程生成）"""
+        wrote = False
+        for line in lines:
+            self.stream.write(line)
+            if self._patch is not None:
+                self._patch.write(line)
+            wrote = True
+        if wrote:
+            self.paths.append(str(path))
+        return wrote
+
+    def finish(self):
+        """关闭补丁文件并打印汇总"""
+        if self._patch is not None:
+            self._patch.close()
+            self._patch = None
+        self.stream.flush()
+        print(f'\n👀 预览模式：{len(self.paths)} 个文件将被修改，没有写入任何文件', file=sys.stderr)
+        if self.patch_file and self.paths:
+            print(f'   补丁已写入 {self.patch_file}，确认后执行 git apply {self.patch_file}', file=sys.stderr)
+
+    def __enter__(self) -> 'Preview':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish()
+        return False
+
+
+def preview_from_argv(argv: Optional[Sequence[str]] = None) -> Optional[Preview]:
+    """根据 --preview[=补丁文件] 创建预览，未开启时返回 None"""
+    argv = sys.argv[1:] if argv is None else argv
+    for arg in argv:
+        if arg == '--preview':
+            return Preview()
+        if arg.startswith('--preview='):
+            return Preview(arg.split('=', 1)[1])
+    return None
+
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+按规则、按文件的性能剖析
+
+每次规则执行记录一条样本：耗时、匹配（修改）处数、改动字节数和
+tracemalloc 峰值内存。运行结束后按规则汇总、列出最慢的 (文件, 规则)，
+并可导出 JSON 供对比分析。
+
+脚本统一用 --profile[=文件] 开启，--profile-top=N 控制热点条数。
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+PROFILE_FILE = 'codemod-profile.json'
+
+# 结束时列出的热点条数
+DEFAULT_TOP = 10
+
+
+class RuleSample(NamedTuple):
+    path: str
+    rule: str
+    seconds: float
+    matches: int
+    bytes_changed: int
+    # 规则执行期间新增的峰值内存（字节），未开启 tracemalloc 时为 0
+    peak_memory: int
+
+
+def _common_prefix(a: str, b: str, limit: int) -> int:
+    """二分查找公共前缀长度，比较在 C 层完成"""
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def changed_bytes(before: str, after: str) -> int:
+    """两个版本之间改动区域的 UTF-8 字节数（去掉公共前后缀后取较长的一侧）"""
+    if before == after:
+        return 0
+    limit = min(len(before), len(after))
+    prefix = _common_prefix(before, after, limit)
+    suffix = _common_suffix(before, after, limit - prefix)
+    old = before[prefix:len(before) - suffix]
+    new = after[prefix:len(after) - suffix]
+    return max(len(old.encode('utf-8')), len(new.encode('utf-8')))
+
+
+class Profiler:
+    """收集规则执行样本
+
+    trace_memory 为 True 时在 start() 中开启 tracemalloc，每条样本记录
+    规则执行期间相对开始时的峰值增量。tracemalloc 会明显拖慢执行，
+    耗时数字适合相互比较，不代表未剖析时的绝对速度。
+    """
+
+    def __init__(self, output: Optional[str] = PROFILE_FILE, top: int = DEFAULT_TOP,
+                 trace_memory: bool = True):
+        self.output = output
+        self.top = top
+        self.trace_memory = trace_memory
+        self.samples: List[RuleSample] = []
+        self._owns_tracing = False
+        self._started = None
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self):
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def measure(self, rule: str, path, apply: Callable[[str], Tuple[str, int]],
+                content: str) -> Tuple[str, int]:
+        """执行 apply(content) 并记录一条样本，返回 apply 的结果
+
+        apply 抛出异常（如超时）时同样记录耗时，匹配数和改动字节记为 0
+        """
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        result = None
+        try:
+            result = apply(content)
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            peak = max(tracemalloc.get_traced_memory()[1] - baseline, 0) if tracing else 0
+            if result is None:
+                matches, delta = 0, 0
+            else:
+                matches, delta = int(result[1]), changed_bytes(content, result[0])
+            self.samples.append(RuleSample(str(path), rule, elapsed, matches, delta, peak))
+
+    def extend(self, samples: Iterable[RuleSample]):
+        """合并子进程带回的样本"""
+        self.samples.extend(RuleSample(*sample) for sample in samples)
+
+    def rule_totals(self) -> Dict[str, Dict[str, float]]:
+        """按规则汇总，按总耗时从高到低排列"""
+        totals: Dict[str, Dict[str, float]] = {}
+        files: Dict[str, set] = {}
+        for sample in self.samples:
+            stats = totals.setdefault(sample.rule, {
+                'files': 0, 'seconds': 0.0, 'matches': 0, 'bytes_changed': 0, 'peak_memory': 0,
+            })
+            files.setdefault(sample.rule, set()).add(sample.path)
+            stats['files'] = len(files[sample.rule])
+            stats['seconds'] += sample.seconds
+            stats['matches'] += sample.matches
+            stats['bytes_changed'] += sample.bytes_changed
+            stats['peak_memory'] = max(stats['peak_memory'], sample.peak_memory)
+        return dict(sorted(totals.items(), key=lambda item: -item[1]['seconds']))
+
+    def file_breakdown(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """路径 -> 规则 -> 指标（同一文件上多次执行的同一规则累加）"""
+        files: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for sample in sorted(self.samples, key=lambda s: s.path):
+            stats = files.setdefault(sample.path, {}).setdefault(sample.rule, {
+                'seconds': 0.0, 'matches': 0, 'bytes_changed': 0, 'peak_memory': 0,
+            })
+            stats['seconds'] += sample.seconds
+            stats['matches'] += sample.matches
+            stats['bytes_changed'] += sample.bytes_changed
+            stats['peak_memory'] = max(stats['peak_memory'], sample.peak_memory)
+        return files
+
+    def hot_spots(self, count: Optional[int] = None) -> List[RuleSample]:
+        """耗时最高的 (文件, 规则) 样本"""
+        ranked = sorted(self.samples, key=lambda s: -s.seconds)
+        return ranked if count is None else ranked[:count]
+
+    def to_dict(self) -> dict:
+        return {
+            'wall_seconds': time.perf_counter() - self._started if self._started else None,
+            'trace_memory': self.trace_memory,
+            'rules': self.rule_totals(),
+            'files': self.file_breakdown(),
+            'hot_spots': [sample._asdict() for sample in self.hot_spots(self.top)],
+        }
+
+    def export_json(self, output: Optional[str] = None):
+        with open(output or self.output, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def print_summary(self):
+        """打印按规则的汇总和前 N 个热点"""
+        if not self.samples:
+            print('\n⏱️  没有规则执行样本')
+            return
+        print('\n⏱️  规则耗时（按总耗时排序）')
+        for name, stats in self.rule_totals().items():
+            print(f'   • {name}: {stats["seconds"] * 1000:.1f} ms，{stats["files"]} 个文件，'
+                  f'{stats["matches"]} 处匹配，改动 {stats["bytes_changed"]} 字节，'
+                  f'峰值 {_format_bytes(stats["peak_memory"])}')
+        print(f'\n🔥 最慢的 {min(self.top, len(self.samples))} 处')
+        for sample in self.hot_spots(self.top):
+            print(f'   {sample.seconds * 1000:8.1f} ms  {sample.rule:24} {sample.path}'
+                  f'（{sample.matches} 处，峰值 {_format_bytes(sample.peak_memory)}）')
+
+    def finish(self):
+        """停止剖析，打印汇总并导出 JSON"""
+        self.stop()
+        self.print_summary()
+        if self.output:
+            self.export_json()
+            print(f'\n📝 剖析结果已写入 {self.output}')
+
+
+def _format_bytes(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f'{size / 1024 / 1024:.1f} MB'
+    if size >= 1024:
+        return f'{size / 1024:.1f} KB'
+    return f'{size} B'
+
+
+def profiler_from_argv(argv: Optional[Sequence[str]] = None) -> Optional[Profiler]:
+    """根据 --profile[=文件] 和 --profile-top=N 创建并启动剖析器，未开启时返回 None"""
+    argv = sys.argv[1:] if argv is None else argv
+    enabled = False
+    output = PROFILE_FILE
+    top = DEFAULT_TOP
+    for arg in argv:
+        if arg == '--profile':
+            enabled = True
+        elif arg.startswith('--profile='):
+            enabled = True
+            output = arg.split('=', 1)[1]
+        elif arg.startswith('--profile-top='):
+            top = int(arg.split('=', 1)[1])
+    if not enabled:
+        return None
+    return Profiler(output, top).start()
+
+
+def measure(profiler: Optional[Profiler], rule: str, path,
+            apply: Callable[[str], Tuple[str, int]], content: str) -> Tuple[str, int]:
+    """有剖析器时记录样本，否则直接执行"""
+    if profiler is None:
+        return apply(content)
+    return profiler.measure(rule, path, apply, content)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+多符号引用扫描：替代 grep -r 统计标识符 / 列名的引用
+
+一组符号编译成一个字节正则，在 src 和 supabase/migrations 中扫描，
+得到每个文件中每个符号的出现次数和命中的行号。不解码文件内容；
+结果按文件指纹记入 .codemod-parse-cache.json（整词和子串两种匹配方式各占一个
+命名空间，键包含符号集合，换一组符号时重新扫描），文件没变时只做 stat。
+需要重新扫描的内容较多时交给进程池并行处理。
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from codemod.cache import PARSE_CACHE_FILE, Fingerprint, ParseCache, file_fingerprint, make_key
+from codemod.runner import balanced_chunks, iter_source_files
+
+DEFAULT_ROOTS = ('src', 'supabase/migrations')
+SUFFIXES = ('.ts', '.tsx', '.sql')
+# 需要重新扫描的字节数超过该值时才启动进程池，否则进程启动比扫描本身还慢
+PARALLEL_THRESHOLD = 4 * 1024 * 1024
+
+# 整词匹配时符号两侧不能是标识符字符
+_BOUNDARY_BEFORE = rb'(?<![A-Za-z0-9_$])'
+_BOUNDARY_AFTER = rb'(?![A-Za-z0-9_$])'
+
+
+class FileReferences(NamedTuple):
+    path: str
+    # 符号 -> 出现次数（只含出现过的符号）
+    counts: Dict[str, int]
+    # 有命中的行号（从 1 开始）
+    lines: List[int]
+
+
+class ReferenceReport(NamedTuple):
+    symbols: List[str]
+    # 有命中的文件，按路径排序
+    files: List[FileReferences]
+    # 扫描的文件总数
+    scanned: int
+    # 未命中缓存、实际读取扫描的文件数
+    parsed: int
+
+    def totals(self) -> Dict[str, int]:
+        """每个符号在所有文件中的出现次数"""
+        totals = {symbol: 0 for symbol in self.symbols}
+        for item in self.files:
+            for symbol, count in item.counts.items():
+                totals[symbol] += count
+        return totals
+
+    def line_count(self, prefix: str = '') -> int:
+        """命中的行数（与 grep -r 输出的行数对应），prefix 限定路径前缀"""
+        return sum(len(item.lines) for item in self.files if item.path.startswith(prefix))
+
+
+def compile_symbols(symbols: Sequence[str], substring: bool = False) -> 're.Pattern[bytes]':
+    """长的符号在前，boss_id 与 boss_id_old 同时给出时取较长的"""
+    alternatives = b'|'.join(re.escape(symbol.encode('utf-8'))
+                             for symbol in sorted(set(symbols), key=lambda s: (-len(s), s)))
+    if substring:
+        return re.compile(b'(?:' + alternatives + b')')
+    return re.compile(_BOUNDARY_BEFORE + b'(?:' + alternatives + b')' + _BOUNDARY_AFTER)
+
+
+def scan_bytes(data: bytes, pattern: 're.Pattern[bytes]') -> dict:
+    """单个文件的扫描记录 {'counts': {...}, 'lines': [...]}，可直接写入 JSON 缓存"""
+    counts: Dict[str, int] = {}
+    lines: List[int] = []
+    line = 1
+    position = 0
+    for match in pattern.finditer(data):
+        line += data.count(b'\n', position, match.start())
+        position = match.start()
+        symbol = match.group().decode('utf-8')
+        counts[symbol] = counts.get(symbol, 0) + 1
+        if not lines or lines[-1] != line:
+            lines.append(line)
+    return {'counts': counts, 'lines': lines}
+
+
+def _scan_file(path, pattern: 're.Pattern[bytes]') -> Tuple[str, Fingerprint, dict]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    return str(path), file_fingerprint(path, data), scan_bytes(data, pattern)
+
+
+def _scan_chunk(paths: List[Path], symbols: List[str], substring: bool) -> List[Tuple[str, Fingerprint, dict]]:
+    """子进程入口：符号列表传入后在子进程中重新编译"""
+    pattern = compile_symbols(symbols, substring)
+    return [_scan_file(path, pattern) for path in paths]
+
+
+def _scanner_key(symbols: Sequence[str]) -> str:
+    return make_key('references', Path(__file__).read_bytes(), '\0'.join(sorted(set(symbols))))
+
+
+def scan_references(symbols: Sequence[str], roots: Iterable = DEFAULT_ROOTS,
+                    suffixes: Sequence[str] = SUFFIXES, jobs: int = 0, substring: bool = False,
+                    use_cache: bool = True, cache_file=PARSE_CACHE_FILE) -> ReferenceReport:
+    """统计 roots 下每个文件中 symbols 的出现次数
+
+    默认按整词匹配（boss_id 不匹配 tenant_boss_id）；substring 为 True 时
+    与 grep 一样按子串匹配。jobs 为 0 时使用全部 CPU 核心。
+    """
+    symbols = list(dict.fromkeys(symbols))
+    pattern = compile_symbols(symbols, substring)
+    paths = iter_source_files([root for root in roots if os.path.exists(root)], suffixes)
+    namespace = 'references-substring' if substring else 'references'
+    cache = ParseCache(namespace, _scanner_key(symbols), cache_file) if use_cache else None
+
+    records: Dict[str, dict] = {}
+    stale: List[Path] = []
+    for path in paths:
+        record = cache.fresh(path) if cache is not None else None
+        if record is None:
+            stale.append(path)
+        else:
+            records[str(path)] = record
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(stale) > 1 and sum(os.path.getsize(p) for p in stale) > PARALLEL_THRESHOLD:
+        chunks = balanced_chunks(stale, min(len(stale), jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(_scan_chunk, chunk, symbols, substring) for chunk in chunks]
+            scanned = [item for future in futures for item in future.result()]
+    else:
+        scanned = [_scan_file(path, pattern) for path in stale]
+
+    for path, fingerprint, record in scanned:
+        if cache is not None and cache.reuse(path, fingerprint) is None:
+            cache.store(path, fingerprint, record)
+        records[path] = record
+    parsed = len(stale)
+    if cache is not None:
+        cache.prune(paths)
+        cache.save()
+
+    files = [FileReferences(path, record['counts'], record['lines'])
+             for path, record in sorted(records.items()) if record['counts']]
+    return ReferenceReport(symbols, files, len(paths), parsed)
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+防回溯的正则规则引擎
+
+加载规则时先检查模式：嵌套的无界量词（如 (a+)+）直接拒绝；
+可以等价或安全改写的模式自动改写——紧跟排除字符的否定字符类改为占有量词
+（[^}]+\\} -> [^}]++\\}），DOTALL 下的 .* / .*? 限定最大跨度。
+执行时每条规则在每个文件上都有时间预算，超时的规则记录下来并跳过，
+其余规则继续执行。
+
+规则不再逐条 re.sub 整份内容：同一阶段（phase）的规则都在同一份内容上
+匹配，产生编辑列表，按规则顺序合并（先注册的规则胜出），每个阶段只拼接
+一次。依赖前面改写结果的规则（清理逗号、空行等）放在后面的阶段；与胜出
+编辑重叠的规则会在拼接后的内容上、只在冲突区域内再试一次。
+"""
+
+import multiprocessing
+import re
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from codemod.edits import Edit, EditSet, apply_edits, map_offset
+from codemod.profiling import Profiler, measure
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+# 每条规则在单个文件上的默认时间预算（秒）
+DEFAULT_BUDGET = 2.0
+
+# DOTALL 下 .* / .*? 允许跨越的最大字符数（约一个较长函数的长度）
+MAX_DOT_SPAN = 5000
+
+# 同一阶段内因冲突重试的最多轮数
+MAX_PASSES = 4
+
+# 占有量词需要 Python 3.11+
+_HAS_POSSESSIVE = sys.version_info >= (3, 11)
+
+_QUANT_RE = re.compile(r'[*+?]|\{\d*,?\d*\}')
+_SIMPLE_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v'}
+
+
+class RiskyPatternError(ValueError):
+    """模式存在灾难性回溯风险且无法安全改写"""
+
+
+class RuleTimeout(Exception):
+    """规则超出时间预算"""
+
+
+class RegexRule(NamedTuple):
+    name: str
+    pattern: str
+    repl: str
+    flags: int = 0
+    # 阶段号小的先执行；同一阶段的规则匹配同一份内容
+    phase: int = 0
+
+
+class CompiledRule(NamedTuple):
+    name: str
+    regex: re.Pattern
+    repl: str
+    # 加载时做过的改写说明
+    notes: Tuple[str, ...]
+    phase: int = 0
+
+
+class RuleOutcome(NamedTuple):
+    name: str
+    # ok / timeout / error
+    status: str
+    count: int
+    elapsed: float
+    message: str = ''
+
+
+def _scan_atoms(pattern: str) -> List[Tuple[str, int, int]]:
+    """把模式源码切成 (类型, 起始, 结束) 原子序列，只区分改写需要的几类"""
+    atoms = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        char = pattern[i]
+        if char == '\\':
+            atoms.append(('escape', i, min(i + 2, n)))
+            i += 2
+        elif char == '[':
+            j = i + 1
+            if pattern.startswith('^', j):
+                j += 1
+            if pattern.startswith(']', j):
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 2 if pattern[j] == '\\' else 1
+            atoms.append(('class', i, min(j + 1, n)))
+            i = j + 1
+        elif char == '(':
+            atoms.append(('open', i, i + 1))
+            i += 1
+        elif char == ')':
+            atoms.append(('close', i, i + 1))
+            i += 1
+        elif char == '.':
+            atoms.append(('dot', i, i + 1))
+            i += 1
+        elif char in '|^$':
+            atoms.append(('meta', i, i + 1))
+            i += 1
+        else:
+            match = _QUANT_RE.match(pattern, i)
+            if match:
+                end = match.end()
+                # 惰性 ? 或占有 + 修饰符
+                if pattern[end:end + 1] in ('?', '+'):
+                    end += 1
+                atoms.append(('quant', i, end))
+                i = end
+            else:
+                atoms.append(('literal', i, i + 1))
+                i += 1
+    return atoms
+
+
+def _atom_char(pattern: str, atom) -> Optional[str]:
+    """字面字符原子代表的字符，不是单个确定字符时返回 None"""
+    kind, start, end = atom
+    if kind == 'literal':
+        return pattern[start]
+    if kind == 'escape' and end - start == 2:
+        char = pattern[start + 1]
+        if char in _SIMPLE_ESCAPES:
+            return _SIMPLE_ESCAPES[char]
+        if not char.isalnum():
+            return char
+    return None
+
+
+def _negated_class_chars(body: str) -> Optional[set]:
+    """否定字符类 [^...] 排除的字符集合，含范围或类别转义时返回 None"""
+    chars = set()
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if char == '\\':
+            escaped = body[i + 1:i + 2]
+            if escaped in _SIMPLE_ESCAPES:
+                chars.add(_SIMPLE_ESCAPES[escaped])
+            elif escaped and not escaped.isalnum():
+                chars.add(escaped)
+            # \s \w 等类别转义不影响其他字符的判断
+            i += 2
+        elif char == '-' and 0 < i < len(body) - 1:
+            return None
+        else:
+            chars.add(char)
+            i += 1
+    return chars
+
+
+def _has_nested_unbounded(items, inside_unbounded: bool = False) -> bool:
+    """解析树中是否存在无界量词嵌套在另一个无界量词里"""
+    for op, av in items:
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            _, max_count, sub = av
+            unbounded = max_count == sre_constants.MAXREPEAT
+            if unbounded and inside_unbounded:
+                return True
+            if _has_nested_unbounded(sub, inside_unbounded or unbounded):
+                return True
+        elif op == sre_constants.SUBPATTERN:
+            if _has_nested_unbounded(av[-1], inside_unbounded):
+                return True
+        elif op == sre_constants.BRANCH:
+            if any(_has_nested_unbounded(branch, inside_unbounded) for branch in av[1]):
+                return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _has_nested_unbounded(av[1], inside_unbounded):
+                return True
+        # 占有量词和原子组内部不会回溯，不再检查
+    return False
+
+
+def harden_pattern(pattern: str, flags: int = 0) -> Tuple[str, List[str]]:
+    """检查并改写模式，返回 (改写后的模式, 改写说明)
+
+    存在嵌套无界量词时抛出 RiskyPatternError
+    """
+    parsed = sre_parse.parse(pattern, flags)
+    if _has_nested_unbounded(parsed.data):
+        raise RiskyPatternError('嵌套的无界量词可能导致灾难性回溯')
+    dotall = bool(re.compile(pattern, flags).flags & re.DOTALL)
+
+    atoms = _scan_atoms(pattern)
+    notes = []
+    replacements = []  # (起始, 结束, 新文本)
+    for index in range(len(atoms) - 1):
+        kind, start, end = atoms[index]
+        quant_kind, quant_start, quant_end = atoms[index + 1]
+        if quant_kind != 'quant':
+            continue
+        quant = pattern[quant_start:quant_end]
+
+        if kind == 'dot' and dotall and quant in ('*', '+', '*?', '+?'):
+            minimum = '0' if quant[0] == '*' else '1'
+            lazy = '?' if quant.endswith('?') else ''
+            replacements.append((quant_start, quant_end, f'{{{minimum},{MAX_DOT_SPAN}}}{lazy}'))
+            notes.append(f'.{quant} 限定最大跨度 {MAX_DOT_SPAN}')
+            continue
+
+        if kind == 'class' and _HAS_POSSESSIVE and quant in ('*', '+') and index + 2 < len(atoms):
+            body = pattern[start + 1:end - 1]
+            if not body.startswith('^'):
+                continue
+            excluded = _negated_class_chars(body[1:])
+            following = _atom_char(pattern, atoms[index + 2])
+            # 后面的字符本身带量词（可选或重复）时不等价
+            optional = index + 3 < len(atoms) and atoms[index + 3][0] == 'quant'
+            if excluded is not None and following is not None and following in excluded and not optional:
+                # 字符类不可能匹配后面的字符，回溯没有意义，改为占有量词是等价的
+                replacements.append((quant_end, quant_end, '+'))
+                notes.append(f'{pattern[start:end]}{quant} 改为占有量词')
+
+    for start, end, text in reversed(replacements):
+        pattern = pattern[:start] + text + pattern[end:]
+    return pattern, notes
+
+
+def compile_rule(rule: RegexRule) -> CompiledRule:
+    pattern, notes = harden_pattern(rule.pattern, rule.flags)
+    return CompiledRule(rule.name, re.compile(pattern, rule.flags), rule.repl, tuple(notes), rule.phase)
+
+
+def _find_edits(regex: re.Pattern, repl: str, content: str) -> List[Tuple[int, int, str]]:
+    """规则在 content 上的全部匹配，按 re.sub 的语义展开替换文本"""
+    return [(m.start(), m.end(), m.expand(repl)) for m in regex.finditer(content)]
+
+
+def _edits_in_child(pattern: str, flags: int, repl: str, content: str) -> List[Tuple[int, int, str]]:
+    return _find_edits(re.compile(pattern, flags), repl, content)
+
+
+class _Budget:
+    """在时间预算内查找规则的匹配
+
+    POSIX 主线程上用 SIGALRM 中断正在进行的匹配（sre 匹配循环会检查信号）；
+    其他平台或非主线程时在子进程中执行，超时直接终止子进程。
+    """
+
+    def __init__(self):
+        self._pool = None
+
+    @staticmethod
+    def _can_use_alarm() -> bool:
+        return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+    def edits(self, rule: CompiledRule, content: str, budget: float) -> List[Tuple[int, int, str]]:
+        if self._can_use_alarm():
+            return self._edits_with_alarm(rule, content, budget)
+        return self._edits_in_pool(rule, content, budget)
+
+    def _edits_with_alarm(self, rule: CompiledRule, content: str, budget: float) -> List[Tuple[int, int, str]]:
+        def on_alarm(signum, frame):
+            raise RuleTimeout()
+
+        previous = signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, budget)
+        try:
+            return _find_edits(rule.regex, rule.repl, content)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    def _edits_in_pool(self, rule: CompiledRule, content: str, budget: float) -> List[Tuple[int, int, str]]:
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(1)
+        result = self._pool.apply_async(
+            _edits_in_child, (rule.regex.pattern, rule.regex.flags, rule.repl, content))
+        try:
+            return result.get(timeout=budget)
+        except multiprocessing.TimeoutError:
+            self._pool.terminate()
+            self._pool = None
+            raise RuleTimeout()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+
+class RegexRuleEngine:
+    """按顺序执行一组正则替换规则"""
+
+    def __init__(self, rules: Sequence[RegexRule], budget: float = DEFAULT_BUDGET,
+                 profiler: Optional[Profiler] = None):
+        self.budget = budget
+        self.profiler = profiler
+        self.rules: List[CompiledRule] = []
+        # 加载时被拒绝的规则：(规则名, 原因)
+        self.rejected: List[Tuple[str, str]] = []
+        for rule in rules:
+            try:
+                self.rules.append(compile_rule(rule))
+            except (RiskyPatternError, re.error) as e:
+                self.rejected.append((rule.name, str(e)))
+        self._budget = _Budget()
+
+    def _rule_edits(self, rule: CompiledRule, content: str, path: str, stats: dict) -> List[Edit]:
+        """收集一条规则的编辑，超时或出错时记入 stats 并返回空列表"""
+        started = time.perf_counter()
+        found: List[Tuple[int, int, str]] = []
+
+        def collect(text):
+            found.extend(self._budget.edits(rule, text, self.budget))
+            return text, len(found)
+
+        try:
+            measure(self.profiler, rule.name, path, collect, content)
+        except RuleTimeout:
+            stats['status'], stats['message'] = 'timeout', f'超过 {self.budget:g}s 预算，已跳过'
+        except re.error as e:
+            stats['status'], stats['message'] = 'error', str(e)
+        stats['elapsed'] += time.perf_counter() - started
+        return [Edit(start, end, text, rule.name) for start, end, text in found
+                if content[start:end] != text]
+
+    def _apply_phase(self, rules: List[CompiledRule], content: str, path: str,
+                     stats: Dict[str, dict]) -> str:
+        pending = rules
+        # 重试时只接受落在这些区域（拼接后的坐标）内的编辑
+        regions: Optional[List[Tuple[int, int]]] = None
+        for _ in range(MAX_PASSES):
+            merged = EditSet()
+            losers = []
+            for rule in pending:
+                if stats[rule.name]['status'] != 'ok':
+                    continue
+                edits = self._rule_edits(rule, content, path, stats[rule.name])
+                if regions is not None:
+                    edits = [e for e in edits if any(e.start <= end and e.end >= start for start, end in regions)]
+                conflicts = len(merged.conflicts)
+                stats[rule.name]['count'] += merged.extend(edits)
+                if len(merged.conflicts) > conflicts:
+                    losers.append(rule)
+            content = apply_edits(content, merged.accepted)
+            if not losers or not merged.accepted:
+                for conflict in merged.conflicts:
+                    stats[conflict.edit.rule]['conflicts'] += 1
+                break
+            regions = [(map_offset(merged.accepted, c.edit.start), map_offset(merged.accepted, c.edit.end))
+                       for c in merged.conflicts]
+            pending = losers
+        return content
+
+    def apply(self, content: str, path: str = '') -> Tuple[str, List[RuleOutcome]]:
+        """按阶段执行规则，超时或出错的规则跳过，返回 (新内容, 每条规则的结果)
+
+        每个阶段只拼接一次内容；path 只用于剖析样本的归属
+        """
+        stats = {rule.name: {'status': 'ok', 'count': 0, 'elapsed': 0.0, 'message': '', 'conflicts': 0}
+                 for rule in self.rules}
+        for phase in sorted({rule.phase for rule in self.rules}):
+            content = self._apply_phase([r for r in self.rules if r.phase == phase], content, path, stats)
+        outcomes = []
+        for rule in self.rules:
+            item = stats[rule.name]
+            message = item['message']
+            if item['status'] == 'ok' and item['conflicts']:
+                message = f'{item["conflicts"]} 处与先执行的规则重叠，已丢弃'
+            outcomes.append(RuleOutcome(rule.name, item['status'], item['count'], item['elapsed'], message))
+        return content, outcomes
+
+    def close(self):
+        self._budget.close()
+
+    def print_report(self, outcomes: Sequence[RuleOutcome]):
+        """打印加载改写、拒绝和执行结果"""
+        for rule in self.rules:
+            for note in rule.notes:
+                print(f'  🔧 {rule.name}: {note}')
+        for name, reason in self.rejected:
+            print(f'  🚫 {name}: 已拒绝（{reason}）')
+        for outcome in outcomes:
+            if outcome.status == 'ok':
+                note = f'，{outcome.message}' if outcome.message else ''
+                print(f'  ✓ {outcome.name}: {outcome.count} 处 ({outcome.elapsed * 1000:.1f} ms){note}')
+            else:
+                print(f'  ⚠️  {outcome.name}: {outcome.message}')
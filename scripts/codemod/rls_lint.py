@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+RLS 策略性能检查
+
+只检查迁移重放后最终生效的策略（codemod/schema.py），按 token 分析 USING /
+WITH CHECK 表达式以及其中调用的辅助函数的函数体：
+
+  unwrapped-call        auth.uid() 等调用没有包成 (select auth.uid())，每行求值一次；
+                        参数不引用行内列的辅助函数调用同样可以包起来，只求值一次；
+                        已报的调用参数里的调用随外层一起包起来，不再单独报
+  volatile-helper       策略调用的辅助函数没有标 STABLE / IMMUTABLE，不能内联也不能缓存，每行执行一次
+  unindexed-subquery    子查询（或辅助函数体里的查询）按某些列过滤，但表上没有以这些列开头的索引
+  missing-table         子查询引用的表在最终结构中不存在（多半是表已删除而函数没有更新）
+  duplicate-permissive  同一张表、同一角色、同一命令上有多条 PERMISSIVE 策略，每条都要求值再 OR
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from codemod.schema import DEFAULT_SCHEMA, Function, Policy, Schema
+from codemod.sql import DOLLAR, PUNCT, QUOTED, WORD, SqlToken, tokenize_sql
+
+RULES = {
+    'unwrapped-call': '未包成 (select ...) 的每行调用',
+    'volatile-helper': '策略调用的辅助函数不是 STABLE',
+    'unindexed-subquery': '子查询的过滤列没有索引',
+    'missing-table': '子查询引用的表不存在',
+    'duplicate-permissive': '同一表 / 角色 / 命令上的多条 PERMISSIVE 策略',
+}
+
+# 每次调用结果相同、适合包成 initplan 的内置函数
+WRAPPABLE_BUILTINS = {'auth.uid', 'auth.jwt', 'auth.role', 'auth.email', 'current_setting'}
+COMMANDS = ('select', 'insert', 'update', 'delete')
+# 比较运算符两侧的列视为过滤列
+_COMPARISONS = {'=', 'in', 'any'}
+
+
+class Finding(NamedTuple):
+    rule: str
+    # public.表 或函数名
+    table: str
+    # 策略名；函数体中的问题为空
+    policy: str
+    message: str
+    # 定义所在的迁移位置（文件名:行号）
+    source: str = ''
+
+
+def _pairs(tokens: List[SqlToken]) -> Dict[int, int]:
+    """开括号下标 -> 配对的闭括号下标"""
+    pairs = {}
+    stack = []
+    for index, token in enumerate(tokens):
+        if token.kind == PUNCT and token.text == '(':
+            stack.append(index)
+        elif token.kind == PUNCT and token.text == ')' and stack:
+            pairs[stack.pop()] = index
+    return pairs
+
+
+def _is_select_group(tokens: List[SqlToken], open_index: int) -> bool:
+    following = tokens[open_index + 1] if open_index + 1 < len(tokens) else None
+    return following is not None and following.kind == WORD and following.value in ('select', 'with')
+
+
+def _enclosing(pairs: Dict[int, int], index: int) -> List[int]:
+    """包含 index 的所有开括号下标，由内到外"""
+    return sorted((start for start, end in pairs.items() if start < index < end), reverse=True)
+
+
+class _Call(NamedTuple):
+    # schema.name（未写模式时为 public）
+    name: str
+    # 名字第一个 token 与开括号的下标
+    start: int
+    open: int
+    close: int
+
+
+def _calls(tokens: List[SqlToken], pairs: Dict[int, int]) -> Iterable[_Call]:
+    for index, token in enumerate(tokens):
+        if token.kind != PUNCT or token.text != '(' or index == 0 or index not in pairs:
+            continue
+        name_token = tokens[index - 1]
+        if name_token.kind not in (WORD, QUOTED):
+            continue
+        start = index - 1
+        name = name_token.value
+        if start >= 2 and tokens[start - 1].kind == PUNCT and tokens[start - 1].text == '.' and \
+                tokens[start - 2].kind in (WORD, QUOTED):
+            start -= 2
+            name = f'{tokens[start].value}.{name}'
+        elif name != 'current_setting':
+            name = f'{DEFAULT_SCHEMA}.{name}'
+        yield _Call(name, start, index, pairs[index])
+
+
+def _argument_count(tokens: List[SqlToken], pairs: Dict[int, int], call: _Call) -> int:
+    if call.close == call.open + 1:
+        return 0
+    count = 1
+    index = call.open + 1
+    while index < call.close:
+        if index in pairs:
+            index = pairs[index] + 1
+            continue
+        if tokens[index].kind == PUNCT and tokens[index].text == ',':
+            count += 1
+        index += 1
+    return count
+
+
+def _leading_columns(schema: Schema, table: str) -> Set[str]:
+    """表上索引（含主键、唯一约束）的第一列"""
+    return {key[0] for key in schema.index_keys(table) if key and key[0]}
+
+
+class _Query(NamedTuple):
+    table: str
+    # 过滤条件中与比较运算符相邻的本表列
+    filters: Tuple[str, ...]
+
+
+def _queries(tokens: List[SqlToken], pairs: Dict[int, int], schema: Schema) -> Iterable[_Query]:
+    """FROM 表 [别名] ... WHERE ... 形式的查询，只看 FROM 后的第一张表"""
+    for index, token in enumerate(tokens):
+        if token.kind != WORD or token.value != 'from':
+            continue
+        cursor = index + 1
+        if cursor >= len(tokens) or tokens[cursor].kind not in (WORD, QUOTED):
+            continue
+        name = tokens[cursor].value
+        table = f'{DEFAULT_SCHEMA}.{name}'
+        if cursor + 2 < len(tokens) and tokens[cursor + 1].text == '.' and tokens[cursor + 2].kind in (WORD, QUOTED):
+            table = f'{name}.{tokens[cursor + 2].value}'
+            name = tokens[cursor + 2].value
+            cursor += 2
+        cursor += 1
+        if cursor < len(tokens) and tokens[cursor].kind == PUNCT and tokens[cursor].text == '(':
+            # FROM 函数调用（集合返回函数）
+            continue
+        if cursor < len(tokens) and tokens[cursor].kind == WORD and tokens[cursor].value == 'as':
+            cursor += 1
+        alias = name
+        if cursor < len(tokens) and tokens[cursor].kind in (WORD, QUOTED) and \
+                tokens[cursor].value not in ('where', 'join', 'left', 'inner', 'on', 'limit', 'order', 'group'):
+            alias = tokens[cursor].value
+        # 查询范围：到所在括号结束，或同一层的分号
+        end = len(tokens)
+        depth = 0
+        for scan in range(index + 1, len(tokens)):
+            text = tokens[scan].text if tokens[scan].kind == PUNCT else ''
+            if text == '(':
+                depth += 1
+            elif text == ')':
+                if depth == 0:
+                    end = scan
+                    break
+                depth -= 1
+            elif text == ';' and depth == 0:
+                end = scan
+                break
+        if not table.startswith(DEFAULT_SCHEMA + '.'):
+            # auth.users 等其他模式的表不在模型中
+            continue
+        if table not in schema.tables:
+            yield _Query(table, ())
+            continue
+        columns = schema.tables[table].columns
+        filters = []
+        scan = index + 1
+        in_where = False
+        while scan < end:
+            current = tokens[scan]
+            if current.kind == PUNCT and current.text == '(' and scan in pairs and _is_select_group(tokens, scan):
+                # 嵌套子查询单独处理
+                scan = pairs[scan] + 1
+                continue
+            if current.kind == WORD and current.value == 'where':
+                in_where = True
+            elif in_where and current.kind in (WORD, QUOTED) and current.value in columns:
+                qualified = scan >= 2 and tokens[scan - 1].text == '.'
+                if not qualified or tokens[scan - 2].value in (alias, name):
+                    before = tokens[scan - 1] if scan >= 1 else None
+                    after = tokens[scan + 1] if scan + 1 < end else None
+                    if (before is not None and before.value in _COMPARISONS) or \
+                            (after is not None and after.value in _COMPARISONS):
+                        filters.append(current.value)
+            scan += 1
+        if filters:
+            yield _Query(table, tuple(dict.fromkeys(filters)))
+
+
+def _function_body(function: Function) -> List[SqlToken]:
+    """函数体（美元引号内）的 token；没有美元引号时返回空"""
+    for token in tokenize_sql(function.text):
+        if token.kind == DOLLAR:
+            tag_end = token.text.index('$', 1) + 1
+            return tokenize_sql(token.text[tag_end:len(token.text) - tag_end])
+    return []
+
+
+class RlsLinter:
+    def __init__(self, schema: Schema):
+        self.schema = schema
+        # schema.name -> 所有重载
+        self.functions: Dict[str, List[Function]] = {}
+        for function in schema.functions.values():
+            self.functions.setdefault(function.name, []).append(function)
+        self._checked_functions: Set[str] = set()
+
+    def lint(self, rules: Optional[Iterable[str]] = None) -> List[Finding]:
+        rules = set(rules or RULES)
+        findings: List[Finding] = []
+        for policy in self.schema.policies.values():
+            if policy.table not in self.schema.tables:
+                continue
+            for clause in (policy.using, policy.check):
+                if clause:
+                    findings.extend(self._lint_expression(policy, clause, rules))
+        if 'duplicate-permissive' in rules:
+            findings.extend(self._duplicate_permissive())
+        # 同一条策略的 USING 和 WITH CHECK 相同时只报一次
+        return list(dict.fromkeys(findings))
+
+    def _resolve(self, call: _Call, arguments: int) -> List[Function]:
+        overloads = self.functions.get(call.name, [])
+        matched = [f for f in overloads if len(f.arguments) == arguments]
+        return matched or overloads
+
+    def _lint_expression(self, policy: Policy, expression: str, rules: Set[str]) -> Iterable[Finding]:
+        tokens = tokenize_sql(expression)
+        pairs = _pairs(tokens)
+        columns = self.schema.tables[policy.table].columns
+        # 已报 unwrapped-call 的调用；包起外层调用后，其参数里的调用随之只求值一次，不再单独报
+        flagged: List[_Call] = []
+        for call in _calls(tokens, pairs):
+            inner = tokens[call.open + 1:call.close]
+            functions = self._resolve(call, _argument_count(tokens, pairs, call))
+            if call.name not in WRAPPABLE_BUILTINS and not functions:
+                continue
+            wrapped = any(_is_select_group(tokens, start) for start in _enclosing(pairs, call.start))
+            display = expression[tokens[call.start].start:tokens[call.close].end]
+            nested = any(outer.open < call.start and call.close < outer.close for outer in flagged)
+            if 'unwrapped-call' in rules and not wrapped and not nested:
+                # 参数引用了行内的列时每行结果不同，不能包起来
+                row_dependent = any(token.kind in (WORD, QUOTED) and token.value in columns and
+                                    not (index + 1 < len(inner) and inner[index + 1].text == '(')
+                                    for index, token in enumerate(inner))
+                if not row_dependent:
+                    flagged.append(call)
+                    yield Finding('unwrapped-call', policy.table, policy.name,
+                                  f'{display} 每行求值一次，改为 (select {display})', policy.source)
+            for function in functions:
+                if 'volatile-helper' in rules and function.volatility == 'volatile':
+                    yield Finding('volatile-helper', policy.table, policy.name,
+                                  f'{display} 调用的 {function.key} 是 VOLATILE，标为 STABLE 后才能内联 / 缓存',
+                                  policy.source)
+                yield from self._lint_function(function, rules)
+        yield from self._lint_queries(tokens, pairs, policy.table, policy.name, policy.source, rules)
+
+    def _lint_function(self, function: Function, rules: Set[str]) -> Iterable[Finding]:
+        """辅助函数体中的查询，每个函数只检查一次"""
+        if function.key in self._checked_functions:
+            return
+        self._checked_functions.add(function.key)
+        tokens = _function_body(function)
+        yield from self._lint_queries(tokens, _pairs(tokens), function.key, '', function.source, rules)
+
+    def _lint_queries(self, tokens: List[SqlToken], pairs: Dict[int, int], table: str, policy: str,
+                      source: str, rules: Set[str]) -> Iterable[Finding]:
+        for query in _queries(tokens, pairs, self.schema):
+            if query.table not in self.schema.tables:
+                if 'missing-table' in rules:
+                    yield Finding('missing-table', table, policy, f'子查询引用的 {query.table} 在最终结构中不存在',
+                                  source)
+                continue
+            if 'unindexed-subquery' not in rules:
+                continue
+            leading = _leading_columns(self.schema, query.table)
+            if not leading & set(query.filters):
+                columns = ', '.join(query.filters)
+                yield Finding('unindexed-subquery', table, policy,
+                              f'子查询按 {query.table}({columns}) 过滤，但没有以这些列开头的索引', source)
+
+    def _duplicate_permissive(self) -> Iterable[Finding]:
+        # (表, 角色, 命令) -> 策略
+        groups: Dict[Tuple[str, str, str], List[Policy]] = {}
+        for policy in self.schema.policies.values():
+            if not policy.permissive or policy.table not in self.schema.tables:
+                continue
+            commands = COMMANDS if policy.command == 'all' else (policy.command,)
+            for role in policy.roles or ('public',):
+                for command in commands:
+                    groups.setdefault((policy.table, role, command), []).append(policy)
+        for (table, role, command), policies in groups.items():
+            if len(policies) < 2:
+                continue
+            names = '、'.join(policy.name for policy in policies)
+            yield Finding('duplicate-permissive', table, '',
+                          f'{role} 的 {command.upper()} 有 {len(policies)} 条 PERMISSIVE 策略：{names}',
+                          policies[-1].source)
+
+
+def lint_policies(schema: Schema, rules: Optional[Iterable[str]] = None) -> List[Finding]:
+    return RlsLinter(schema).lint(rules)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+改写规则注册表
+
+每条规则是一个纯函数 (内容, 路径) -> (新内容, 修改处数)，
+按注册顺序依次作用在同一份内存内容上，由 runner 统一读写文件。
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from codemod.cache import make_key
+from codemod.encoding import apply_encoding_fixes
+from codemod.logs import remove_log_statements
+from codemod.switch_repair import repair_orphan_switches
+from codemod.unused_vars import fix_unused_vars
+
+TS_SUFFIXES = ('.ts', '.tsx')
+# 日志规则不处理的文件：测试要调用被测的日志函数，日志实现本身就是这些调用的定义处
+LOG_EXCLUDE = ('*.test.ts', '*.test.tsx', 'src/utils/logger.ts', 'src/utils/loggerWrapper.ts')
+
+
+class Rule(NamedTuple):
+    name: str
+    description: str
+    suffixes: Tuple[str, ...]
+    apply: Callable[[str, Path], Tuple[str, int]]
+    # 不指定 --rules 时是否执行；按模式删行的规则容易破坏代码，只在点名时执行
+    default: bool = True
+    # 不处理的文件，glob 模式从路径右端匹配（Path.match）
+    exclude: Tuple[str, ...] = ()
+
+    def accepts(self, path: Path) -> bool:
+        return path.suffix in self.suffixes and not any(path.match(pattern) for pattern in self.exclude)
+
+
+# 规则名 -> 规则，字典顺序即执行顺序
+RULES: Dict[str, Rule] = {}
+
+
+def register_rule(name: str, description: str, suffixes: Sequence[str] = TS_SUFFIXES, default: bool = True,
+                  exclude: Sequence[str] = ()):
+    """注册一条规则（装饰器）"""
+    def decorator(func):
+        if name in RULES:
+            raise ValueError(f'规则重复注册: {name}')
+        RULES[name] = Rule(name, description, tuple(suffixes), func, default, tuple(exclude))
+        return func
+    return decorator
+
+
+def get_rules(names: Optional[Sequence[str]] = None) -> List[Rule]:
+    """按注册顺序返回规则，names 为空时返回全部默认规则"""
+    if not names:
+        return [rule for rule in RULES.values() if rule.default]
+    unknown = [name for name in names if name not in RULES]
+    if unknown:
+        raise KeyError(f'未知规则: {", ".join(unknown)}')
+    return [rule for rule in RULES.values() if rule.name in names]
+
+
+@lru_cache(maxsize=None)
+def _toolkit_source() -> bytes:
+    """codemod 包全部源码，规则实现有任何改动都会使缓存失效"""
+    package_dir = Path(__file__).resolve().parent
+    return b''.join(p.read_bytes() for p in sorted(package_dir.glob('*.py')))
+
+
+def ruleset_key(rules: Sequence[Rule]) -> str:
+    """规则集版本键：规则名、顺序和实现源码共同决定"""
+    return make_key(','.join(rule.name for rule in rules), _toolkit_source())
+
+
+@register_rule('logs', '删除 console.log/info/debug/warn 和 logger.info/debug/warn 语句', exclude=LOG_EXCLUDE)
+def _remove_logs(content: str, path: Path) -> Tuple[str, int]:
+    return remove_log_statements(content, jsx=path.suffix == '.tsx')
+
+
+@register_rule('unused-vars', '清理删除日志后残留的未使用参数和变量', default=False)
+def _fix_unused_vars(content: str, path: Path) -> Tuple[str, int]:
+    return fix_unused_vars(content)
+
+
+@register_rule('switch-repair', '为删除日志后孤立的 switch 补回函数定义')
+def _repair_switches(content: str, path: Path) -> Tuple[str, int]:
+    return repair_orphan_switches(content, path)
+
+
+@register_rule('encoding', '修复已知的中文乱码', suffixes=('.ts', '.tsx', '.js', '.jsx', '.md', '.json'))
+def _fix_encoding(content: str, path: Path) -> Tuple[str, int]:
+    return apply_encoding_fixes(content)
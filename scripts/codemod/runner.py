@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+单次遍历的多规则改写执行器
+
+每个文件只读一次，在内存中依次应用所有选中的规则，有变化时只写一次，
+并汇总每条规则的修改统计。写回用临时文件 + 改名；传入事务时全部暂存，
+由调用方统一提交。改写后括号不再配对的文件不写回，记为错误，其余文件照常处理。
+"""
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from codemod.cache import FileCache, Fingerprint, file_fingerprint
+from codemod.diff import unified_diff
+from codemod.overlay import Overlay, Pipeline, PipelineResult, Stage, brackets_balanced
+from codemod.preview import Preview
+from codemod.profiling import Profiler, RuleSample, measure
+from codemod.rules import Rule, get_rules, ruleset_key
+from codemod.transaction import Transaction, write_text
+
+# 遍历时跳过的目录
+EXCLUDE_DIRS = {'node_modules', '.git', 'dist', 'build', '.next', '.kiro', '__pycache__', '.codemod-journal'}
+
+
+class FileResult(NamedTuple):
+    path: str
+    # 规则名 -> 修改处数（只记录有修改的规则）
+    counts: Dict[str, int]
+    changed: bool
+    error: Optional[str] = None
+    # 规则没有修改文件时记录指纹，写入缓存
+    fingerprint: Optional[Fingerprint] = None
+    # 命中缓存，没有执行规则
+    cached: bool = False
+    # 预览模式下的统一差异，没有写回文件
+    diff: Optional[str] = None
+    # 交给事务暂存的新内容（暂存后即清空）
+    content: Optional[str] = None
+
+
+def iter_source_files(roots: Iterable, suffixes: Sequence[str]) -> List[Path]:
+    """一次遍历收集所有目标文件，按路径排序保证结果稳定"""
+    suffixes = tuple(suffixes)
+    files = set()
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            if root.suffix in suffixes:
+                files.add(root)
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in EXCLUDE_DIRS]
+            for filename in filenames:
+                if filename.endswith(suffixes):
+                    files.add(Path(dirpath) / filename)
+    return sorted(files)
+
+
+def apply_rules(content: str, path: Path, rules: Sequence[Rule],
+                profiler: Optional[Profiler] = None) -> Tuple[str, Dict[str, int]]:
+    """在内存中按顺序应用规则，返回 (新内容, 各规则修改处数)"""
+    counts = {}
+    for rule in rules:
+        if not rule.accepts(path):
+            continue
+        content, count = measure(profiler, rule.name, path,
+                                 lambda text: rule.apply(text, path), content)
+        if count:
+            counts[rule.name] = count
+    return content, counts
+
+
+def process_file(path: Path, rules: Sequence[Rule], write: bool = True,
+                 known_hash: Optional[str] = None,
+                 profiler: Optional[Profiler] = None, preview: bool = False,
+                 keep: bool = False) -> FileResult:
+    """读一次、改写、最多写一次
+
+    known_hash 为缓存中记录的干净内容哈希，内容未变时直接跳过规则；
+    preview 为 True 时不写回，把差异放在结果中；
+    keep 为 True 时不写回，把新内容放在结果中交给调用方的事务
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        fingerprint = file_fingerprint(path, data)
+        if known_hash is not None and fingerprint[2] == known_hash:
+            return FileResult(str(path), {}, False, fingerprint=fingerprint, cached=True)
+        original = data.decode('utf-8')
+        content, counts = apply_rules(original, path, rules, profiler)
+        if content == original:
+            return FileResult(str(path), counts, False, fingerprint=fingerprint)
+        reason = brackets_balanced(original, content, path)
+        if reason:
+            return FileResult(str(path), counts, False, f'{reason}，未写入')
+        if preview:
+            return FileResult(str(path), counts, True, diff=''.join(unified_diff(path, original, content)))
+        if keep:
+            return FileResult(str(path), counts, True, content=content)
+        if write:
+            write_text(path, content, newline='')
+        return FileResult(str(path), counts, True)
+    except Exception as e:
+        return FileResult(str(path), {}, False, str(e))
+
+
+def balanced_chunks(paths: Sequence[Path], count: int) -> List[List[Path]]:
+    """按文件大小把文件分成 count 组，每组总字节数尽量接近（最大优先贪心）"""
+    sized = sorted(((os.path.getsize(p), str(p), p) for p in paths), reverse=True)
+    heap = [(0, i) for i in range(count)]
+    chunks: List[List[Path]] = [[] for _ in range(count)]
+    for size, _, path in sized:
+        total, index = heapq.heappop(heap)
+        chunks[index].append(path)
+        heapq.heappush(heap, (total + size, index))
+    return [chunk for chunk in chunks if chunk]
+
+
+def _process_chunk(items: List[Tuple[Path, Optional[str]]], rule_names: List[str],
+                   write: bool, profile: bool = False,
+                   preview: bool = False, keep: bool = False) -> Tuple[List[FileResult], List[RuleSample]]:
+    """子进程入口：规则按名字传入，在子进程中重新取得
+
+    profile 为 True 时在子进程中剖析，样本随结果带回主进程；
+    preview 为 True 时差异也在子进程中生成；keep 为 True 时新内容带回主进程暂存
+    """
+    rules = get_rules(rule_names)
+    profiler = Profiler(output=None).start() if profile else None
+    try:
+        results = [process_file(path, rules, write, known_hash, profiler, preview, keep)
+                   for path, known_hash in items]
+    finally:
+        if profiler is not None:
+            profiler.stop()
+    return results, profiler.samples if profiler is not None else []
+
+
+def run(roots: Iterable, rules: Sequence[Rule], write: bool = True, jobs: int = 1,
+        cache: Optional[FileCache] = None, profiler: Optional[Profiler] = None,
+        preview: Optional[Preview] = None, transaction: Optional[Transaction] = None) -> List[FileResult]:
+    """对 roots 下所有匹配文件执行规则
+
+    传入 cache 时，stat 未变的已知干净文件直接跳过，内容哈希未变的文件
+    不再执行规则；执行后规则没有修改的文件记入缓存。
+    jobs > 1 时把文件按大小均衡分组交给进程池并行处理；
+    无论是否并行，结果都按路径排序，保证报告和日志可复现。
+    传入 profiler 时记录每个文件上每条规则的执行样本（缓存跳过的文件不执行规则）。
+    传入 preview 时不写任何文件（也不更新缓存文件），差异按路径顺序输出（串行时边处理边输出）。
+    传入 transaction 时新内容只暂存到事务中，由调用方提交。
+    """
+    suffixes = sorted({suffix for rule in rules for suffix in rule.suffixes})
+    key = ruleset_key(rules)
+    results: List[FileResult] = []
+    todo: List[Tuple[Path, Optional[str]]] = []
+    for path in iter_source_files(roots, suffixes):
+        if cache is not None and cache.is_fresh(path, key):
+            results.append(FileResult(str(path), {}, False, cached=True))
+            continue
+        entry = cache.lookup(path, key) if cache is not None else None
+        todo.append((path, entry[2] if entry else None))
+
+    diff = preview is not None
+    keep = transaction is not None and not diff
+
+    def stage(result: FileResult) -> FileResult:
+        if result.content is None:
+            return result
+        write_text(result.path, result.content, transaction, newline='')
+        return result._replace(content=None)
+
+    if jobs <= 1 or len(todo) <= 1:
+        for path, known_hash in todo:
+            result = stage(process_file(path, rules, write, known_hash, profiler, diff, keep))
+            results.append(result)
+            if result.diff:
+                preview.emit(result.path, (result.diff,))
+    else:
+        # 分组数多于进程数，避免某个大文件拖住整组
+        known = dict(todo)
+        chunks = balanced_chunks([path for path, _ in todo], min(len(todo), jobs * 4))
+        rule_names = [rule.name for rule in rules]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(_process_chunk, [(p, known[p]) for p in chunk], rule_names, write,
+                                profiler is not None, diff, keep)
+                for chunk in chunks
+            ]
+            for future in futures:
+                chunk_results, samples = future.result()
+                results.extend(stage(result) for result in chunk_results)
+                if profiler is not None:
+                    profiler.extend(samples)
+        if diff:
+            for result in sorted(results, key=lambda r: r.path):
+                if result.diff:
+                    preview.emit(result.path, (result.diff,))
+
+    # 预览不改变任何文件，缓存只读
+    if cache is not None and preview is None:
+        for result in results:
+            if result.fingerprint is not None:
+                cache.mark_clean(result.path, key, result.fingerprint)
+            elif result.changed or result.error:
+                cache.forget(result.path, key)
+        cache.save()
+    results.sort(key=lambda r: r.path)
+    return results
+
+
+def run_pipeline(roots: Iterable, rules: Sequence[Rule], write: bool = True,
+                 validate: bool = True, preview: Optional[Preview] = None,
+                 transaction: Optional[Transaction] = None) -> Tuple[PipelineResult, Overlay]:
+    """每条规则作为一个阶段，在内存覆盖层上逐阶段处理全部文件
+
+    与 run 不同，后一条规则看到的是前一条规则在整棵树上的结果，每个阶段之后
+    校验改写结果；任一文件校验失败时全部回滚，不写任何文件。
+    传入 preview 时只输出最终结果相对磁盘的差异；传入 transaction 时只暂存，由调用方提交。
+    """
+    suffixes = sorted({suffix for rule in rules for suffix in rule.suffixes})
+    stages = [Stage(rule.name, rule.apply, rule.suffixes, rule.exclude) for rule in rules]
+    pipeline = Pipeline(stages) if validate else Pipeline(stages, validate=None)
+    overlay = Overlay()
+    result = pipeline.run(iter_source_files(roots, suffixes), overlay)
+    if result.ok and preview is not None:
+        overlay.preview(preview)
+    elif result.ok and write:
+        overlay.flush(transaction)
+    return result, overlay
+
+
+def summarize(results: Sequence[FileResult], rules: Sequence[Rule]) -> Dict[str, Dict[str, int]]:
+    """按规则汇总：修改的文件数和修改处数"""
+    summary = {rule.name: {'files': 0, 'changes': 0} for rule in rules}
+    for result in results:
+        for name, count in result.counts.items():
+            summary[name]['files'] += 1
+            summary[name]['changes'] += count
+    return summary
+
+
+def print_report(results: Sequence[FileResult], rules: Sequence[Rule]):
+    """打印每个文件的修改和按规则的汇总"""
+    changed = [r for r in results if r.changed]
+    errors = [r for r in results if r.error]
+
+    for result in changed:
+        detail = ', '.join(f'{name} {count}' for name, count in result.counts.items())
+        print(f'✓ {result.path}: {detail}')
+    for result in errors:
+        print(f'✗ {result.path}: {result.error}')
+
+    print('\n' + '=' * 60)
+    cached = sum(1 for r in results if r.cached)
+    print(f'📊 扫描 {len(results)} 个文件（缓存跳过 {cached} 个），修改 {len(changed)} 个，错误 {len(errors)} 个')
+    for name, stats in summarize(results, rules).items():
+        print(f'   • {name}: {stats["files"]} 个文件，{stats["changes"]} 处修改')
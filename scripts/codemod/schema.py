@@ -0,0 +1,2017 @@
+#!/usr/bin/env python3
+"""
+迁移重放：在内存中按顺序执行 DDL，得到最终的数据库结构
+
+Schema.apply 逐条处理 codemod/sql.py 切出的语句，维护表（列、约束、RLS 开关）、
+索引、函数、策略、触发器、视图、类型、序列和扩展。DROP ... CASCADE 按依赖
+一并删除：表上的索引/策略/触发器、指向它的外键、引用它的视图；函数被删时
+删除调用它的触发器和策略。列上的 PRIMARY KEY / UNIQUE / CHECK / REFERENCES
+统一转成带名字的表约束（名字按 Postgres 的默认规则生成），之后按名字删除。
+
+不建模的语句分四类：
+  - 数据语句（INSERT / UPDATE / DELETE / SELECT 等）和会话设置：不属于结构，丢弃并计数；
+  - DO 块：内容是动态 DDL，无法离线重放，丢弃并逐条列出，供人工确认。只是“已存在则跳过”
+    地建对象的 DO 块（EXCEPTION WHEN duplicate_object THEN null 或 IF NOT EXISTS (...) THEN 包裹
+    的 CREATE / ALTER TABLE ... ADD）按顶层语句重放；其余 DO 块中建的类型或表被最终结构引用时，
+    该 DO 块原样进入基线；
+  - 目标此时不存在的 ALTER TABLE / COMMENT / GRANT：原迁移中会失败（或目标由 DO 块创建），
+    丢弃并列出；
+  - GRANT / REVOKE / COMMENT / 其他 ALTER：挂在目标对象上原样保留（COMMENT 只保留最后一次），
+    目标被删除时一起删除，没有具体目标的按原顺序放在最后。
+
+to_sql 按依赖顺序输出等价的基线迁移：扩展、类型、带入的 DO 块、序列、函数、表、外键、
+索引、视图、RLS 与策略、触发器，最后是保留的附属语句。undefined_references 列出基线中
+引用了、但基线没有定义的类型和表，这样的基线在新库上执行会失败。
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from codemod.sql import DOLLAR, PUNCT, QUOTED, STRING, WORD, Statement, split_file, split_sql, tokenize_sql
+
+MIGRATIONS_DIR = 'supabase/migrations'
+DEFAULT_SCHEMA = 'public'
+# supabase 只执行 <版本号>_<名字>.sql 形式的迁移，按文件名排序
+_MIGRATION_NAME = re.compile(r'^\d+_.*\.sql$')
+_SIMPLE_IDENT = re.compile(r'^[a-z_][a-z0-9_$]*$')
+# 需要加引号才能作为标识符的常见保留字
+_RESERVED = {
+    'all', 'and', 'any', 'as', 'asc', 'check', 'column', 'constraint', 'create', 'default', 'desc',
+    'distinct', 'do', 'else', 'end', 'for', 'foreign', 'from', 'grant', 'group', 'having', 'in',
+    'limit', 'not', 'null', 'offset', 'on', 'or', 'order', 'primary', 'references', 'select', 'table',
+    'then', 'to', 'union', 'unique', 'user', 'using', 'when', 'where', 'with',
+}
+# 列定义中类型之后的约束关键字
+_COLUMN_CONSTRAINTS = {
+    'constraint', 'default', 'not', 'null', 'primary', 'unique', 'check', 'references', 'generated', 'collate',
+}
+_TABLE_CONSTRAINTS = {'constraint', 'primary', 'unique', 'check', 'foreign', 'exclude'}
+_FUNCTION_ATTRIBUTES = {
+    'language', 'as', 'immutable', 'stable', 'volatile', 'security', 'set', 'cost', 'rows', 'strict',
+    'called', 'parallel', 'leakproof', 'not', 'window', 'external', 'support', 'transform', 'begin',
+}
+_VOLATILITY = {'immutable', 'stable', 'volatile'}
+_TYPE_ALIASES = {
+    'int': 'integer', 'int4': 'integer', 'int8': 'bigint', 'int2': 'smallint', 'bool': 'boolean',
+    'varchar': 'character varying', 'char': 'character', 'timestamptz': 'timestamp with time zone',
+    'timestamp': 'timestamp without time zone', 'timetz': 'time with time zone',
+    'time': 'time without time zone', 'float8': 'double precision', 'float4': 'real', 'decimal': 'numeric',
+}
+# 这些单词开头、后面跟着第二个类型单词时，整体是一个类型而不是“参数名 类型”
+_MULTIWORD_TYPES = {
+    'double': {'precision'}, 'character': {'varying'}, 'bit': {'varying'},
+    'timestamp': {'with', 'without'}, 'time': {'with', 'without'},
+}
+_DATA_COMMANDS = {'insert', 'update', 'delete', 'select', 'with', 'truncate', 'copy', 'merge', 'values', 'table'}
+_SESSION_COMMANDS = {
+    'set', 'reset', 'begin', 'start', 'commit', 'end', 'rollback', 'savepoint', 'release', 'analyze',
+    'vacuum', 'notify', 'listen', 'refresh', 'cluster', 'checkpoint', 'discard', 'lock', 'explain',
+    'reindex', 'show', 'prepare', 'execute', 'deallocate', 'load',
+}
+# 其他 CREATE / ALTER / DROP 语句原样保留
+_DDL_COMMANDS = {'create', 'alter', 'drop', 'grant', 'revoke', 'comment', 'security'}
+# 内置类型（含别名和伪类型），引用它们不需要在基线中定义
+_BUILTIN_TYPES = {
+    'text', 'uuid', 'json', 'jsonb', 'integer', 'int', 'int2', 'int4', 'int8', 'bigint', 'smallint', 'numeric',
+    'decimal', 'real', 'float4', 'float8', 'double', 'boolean', 'bool', 'date', 'time', 'timetz', 'timestamp',
+    'timestamptz', 'interval', 'bytea', 'inet', 'cidr', 'macaddr', 'money', 'serial', 'serial4', 'bigserial',
+    'serial8', 'smallserial', 'character', 'char', 'varchar', 'bpchar', 'bit', 'varbit', 'name', 'oid',
+    'regclass', 'regproc', 'regprocedure', 'regtype', 'regrole', 'regnamespace', 'tsvector', 'tsquery', 'point',
+    'line', 'lseg', 'box', 'path', 'polygon', 'circle', 'xml', 'void', 'trigger', 'event_trigger', 'record',
+    'anyelement', 'anyarray', 'anynonarray', 'anyenum', 'anyrange', 'cstring', 'internal', 'language_handler',
+    'int4range', 'int8range', 'numrange', 'tsrange', 'tstzrange', 'daterange', 'txid_snapshot', 'pg_lsn',
+}
+# DO 块中“对象已存在”的异常名，捕获后什么都不做等同于 IF NOT EXISTS
+_DUPLICATE_ERRORS = {'duplicate_object', 'duplicate_column', 'duplicate_table'}
+
+
+def quote_ident(name: str) -> str:
+    if _SIMPLE_IDENT.match(name) and name not in _RESERVED:
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+def display_name(key: str) -> str:
+    """schema.name 键在 SQL 中的写法，public 模式省略"""
+    schema, _, name = key.partition('.')
+    if schema == DEFAULT_SCHEMA:
+        return quote_ident(name)
+    return f'{quote_ident(schema)}.{quote_ident(name)}'
+
+
+def short_name(key: str) -> str:
+    return key.partition('.')[2]
+
+
+def migration_files(directory: str = MIGRATIONS_DIR) -> List[str]:
+    """按 supabase 的执行顺序列出迁移文件"""
+    names = sorted(name for name in os.listdir(directory) if _MIGRATION_NAME.match(name))
+    return [os.path.join(directory, name) for name in names]
+
+
+def _default_name(*parts: str) -> str:
+    """Postgres 生成的约束 / 索引名：各部分以 _ 连接，最长 63 字节"""
+    return '_'.join(parts)[:63]
+
+
+class Column(NamedTuple):
+    name: str
+    type: str
+    default: Optional[str] = None
+    not_null: bool = False
+    # GENERATED / COLLATE 等其余列属性，原文
+    extra: Tuple[str, ...] = ()
+
+    def to_sql(self) -> str:
+        parts = [quote_ident(self.name), self.type]
+        if self.default is not None:
+            parts.append(f'DEFAULT {self.default}')
+        if self.not_null:
+            parts.append('NOT NULL')
+        parts.extend(self.extra)
+        return ' '.join(parts)
+
+
+class Constraint(NamedTuple):
+    name: str
+    # primary / unique / check / foreign / exclude
+    kind: str
+    # 不含 CONSTRAINT 名字前缀的定义
+    definition: str
+    columns: Tuple[str, ...] = ()
+    # 外键指向的表和列
+    target: str = ''
+    target_columns: Tuple[str, ...] = ()
+
+
+class Table(NamedTuple):
+    key: str
+    columns: Dict[str, Column]
+    constraints: Dict[str, Constraint]
+    rls: bool = False
+    force_rls: bool = False
+    # CREATE TABLE ... AS / PARTITION OF 等不建模列的表，原样输出
+    raw: str = ''
+    source: str = ''
+
+
+class Index(NamedTuple):
+    key: str
+    table: str
+    unique: bool
+    # 索引键表达式（列名或表达式原文）
+    columns: Tuple[str, ...]
+    # USING 方法、INCLUDE、WHERE 等键之后的原文
+    method: str = ''
+    tail: str = ''
+    source: str = ''
+
+    @property
+    def partial(self) -> bool:
+        """带 WHERE 条件的部分索引，只覆盖满足条件的行"""
+        return any(token.kind == WORD and token.value == 'where' for token in tokenize_sql(self.tail))
+
+    @property
+    def not_null_only(self) -> bool:
+        """部分索引的条件只是“首列 IS NOT NULL”：等值查找首列时与完整索引相同"""
+        tokens = tokenize_sql(self.tail)
+        where = next((i for i, token in enumerate(tokens) if token.kind == WORD and token.value == 'where'), None)
+        leading = tokenize_sql(self.columns[0]) if self.columns else []
+        if where is None or len(leading) != 1 or leading[0].kind not in (WORD, QUOTED):
+            return False
+        condition = tokens[where + 1:]
+        while len(condition) > 2 and condition[0].text == '(' and condition[-1].text == ')':
+            condition = condition[1:-1]
+        return (len(condition) == 4 and condition[0].kind in (WORD, QUOTED)
+                and condition[0].value == leading[0].value
+                and [token.value for token in condition[1:]] == ['is', 'not', 'null'])
+
+    def to_sql(self) -> str:
+        unique = 'UNIQUE ' if self.unique else ''
+        method = f' USING {self.method}' if self.method else ''
+        tail = f' {self.tail}' if self.tail else ''
+        return (f'CREATE {unique}INDEX {quote_ident(short_name(self.key))} ON {display_name(self.table)}'
+                f'{method} ({", ".join(self.columns)}){tail};')
+
+
+class Function(NamedTuple):
+    # schema.name(参数类型, ...)
+    key: str
+    name: str
+    text: str
+    # 规范化的参数类型与返回类型原文
+    arguments: Tuple[str, ...] = ()
+    returns: str = ''
+    language: str = ''
+    volatility: str = 'volatile'
+    security_definer: bool = False
+    source: str = ''
+
+
+class Policy(NamedTuple):
+    name: str
+    table: str
+    permissive: bool = True
+    # all / select / insert / update / delete
+    command: str = 'all'
+    roles: Tuple[str, ...] = ()
+    using: Optional[str] = None
+    check: Optional[str] = None
+    source: str = ''
+
+    @property
+    def key(self) -> str:
+        return f'{self.table}:{self.name}'
+
+    def to_sql(self) -> str:
+        parts = [f'CREATE POLICY {quote_ident(self.name)} ON {display_name(self.table)}']
+        if not self.permissive:
+            parts.append('AS RESTRICTIVE')
+        if self.command != 'all':
+            parts.append(f'FOR {self.command.upper()}')
+        if self.roles:
+            parts.append('TO ' + ', '.join(self.roles))
+        if self.using is not None:
+            parts.append(f'USING ({self.using})')
+        if self.check is not None:
+            parts.append(f'WITH CHECK ({self.check})')
+        return '\n  '.join(parts) + ';'
+
+
+class Trigger(NamedTuple):
+    name: str
+    table: str
+    # 触发器调用的函数（schema.name）
+    function: str
+    text: str
+    source: str = ''
+
+    @property
+    def key(self) -> str:
+        return f'{self.table}:{self.name}'
+
+
+class View(NamedTuple):
+    key: str
+    text: str
+    materialized: bool = False
+    # 定义中出现的名字，用于级联删除
+    references: frozenset = frozenset()
+    source: str = ''
+
+
+class TypeDef(NamedTuple):
+    key: str
+    text: str
+    # 枚举值（带引号的原文），非枚举类型为 None
+    labels: Optional[Tuple[str, ...]] = None
+    source: str = ''
+
+    def to_sql(self) -> str:
+        if self.labels is None:
+            return self.text
+        labels = ',\n  '.join(self.labels)
+        return f'CREATE TYPE {display_name(self.key)} AS ENUM (\n  {labels}\n);'
+
+
+class Attached(NamedTuple):
+    """GRANT / COMMENT / 其他 ALTER 等附属语句"""
+    # 依附的对象：('table', 键) / ('column', 表键, 列) / ('function', 键) 等，空元组表示没有目标
+    target: Tuple[str, ...]
+    text: str
+    # 原始顺序
+    order: int
+    source: str = ''
+
+
+class Skipped(NamedTuple):
+    # data / dynamic / session / orphan / invalid
+    category: str
+    source: str
+    summary: str
+
+
+def _summary(text: str) -> str:
+    first = text.strip().split('\n', 1)[0].strip()
+    return first if len(first) <= 80 else first[:77] + '...'
+
+
+def _ensure_semicolon(text: str) -> str:
+    text = text.rstrip()
+    return text if text.endswith(';') else text + '\n;'
+
+
+class _Parser:
+    """单条语句的 token 游标"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize_sql(text)
+        if self.tokens and self.tokens[-1].kind == PUNCT and self.tokens[-1].text == ';':
+            self.tokens.pop()
+        self.i = 0
+        # 开括号下标 -> 配对的闭括号下标
+        self.pairs: Dict[int, int] = {}
+        stack = []
+        for index, token in enumerate(self.tokens):
+            if token.kind != PUNCT:
+                continue
+            if token.text in '([':
+                stack.append(index)
+            elif token.text in ')]' and stack:
+                self.pairs[stack.pop()] = index
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def word(self, offset: int = 0) -> str:
+        index = self.i + offset
+        if 0 <= index < len(self.tokens) and self.tokens[index].kind == WORD:
+            return self.tokens[index].value
+        return ''
+
+    def punct(self, value: str, offset: int = 0) -> bool:
+        index = self.i + offset
+        return 0 <= index < len(self.tokens) and self.tokens[index].kind == PUNCT and self.tokens[index].text == value
+
+    def at_end(self) -> bool:
+        return self.i >= len(self.tokens)
+
+    def accept(self, *words: str) -> bool:
+        """接下来的单词依次为 words 时前进并返回 True"""
+        for offset, word in enumerate(words):
+            if self.word(offset) != word:
+                return False
+        self.i += len(words)
+        return True
+
+    def ident(self) -> Optional[str]:
+        if self.i < len(self.tokens) and self.tokens[self.i].kind in (WORD, QUOTED):
+            self.i += 1
+            return self.tokens[self.i - 1].value
+        return None
+
+    def qualified(self) -> Optional[str]:
+        """schema.name 或 name（默认 public），返回键"""
+        first = self.ident()
+        if first is None:
+            return None
+        if self.punct('.'):
+            self.i += 1
+            second = self.ident()
+            if second is not None:
+                return f'{first}.{second}'
+        return f'{DEFAULT_SCHEMA}.{first}'
+
+    def slice(self, start: int, end: int) -> str:
+        """tokens[start:end] 覆盖的原文"""
+        if start >= end:
+            return ''
+        return self.text[self.tokens[start].start:self.tokens[end - 1].end]
+
+    def rest(self) -> str:
+        return self.slice(self.i, len(self.tokens))
+
+    def group(self) -> Tuple[int, int]:
+        """当前为 ( 时返回括号内的 token 范围并前进到 ) 之后"""
+        close = self.pairs.get(self.i, len(self.tokens))
+        start = self.i + 1
+        self.i = close + 1
+        return start, close
+
+    def split(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """按顶层逗号切分 tokens[start:end]"""
+        parts = []
+        index = part = start
+        while index < end:
+            token = self.tokens[index]
+            if index in self.pairs:
+                index = self.pairs[index] + 1
+                continue
+            if token.kind == PUNCT and token.text == ',':
+                parts.append((part, index))
+                part = index + 1
+            index += 1
+        if part < end:
+            parts.append((part, end))
+        return parts
+
+    def find_word(self, word: str, start: Optional[int] = None, end: Optional[int] = None) -> int:
+        """顶层（括号外）第一个为 word 的下标，找不到时返回 -1"""
+        index = self.i if start is None else start
+        end = len(self.tokens) if end is None else end
+        while index < end:
+            if index in self.pairs:
+                index = self.pairs[index] + 1
+                continue
+            token = self.tokens[index]
+            if token.kind == WORD and token.value == word:
+                return index
+            index += 1
+        return -1
+
+    def names(self) -> List[str]:
+        """逗号分隔的限定名列表"""
+        names = []
+        while True:
+            name = self.qualified()
+            if name is None:
+                return names
+            names.append(name)
+            if not self.punct(','):
+                return names
+            self.i += 1
+
+
+def _normalize_type(parser: _Parser, start: int, end: int) -> str:
+    """函数签名中的参数类型：去掉类型修饰符，统一别名和 public 前缀"""
+    words = []
+    index = start
+    while index < end:
+        token = parser.tokens[index]
+        if token.kind == PUNCT and token.text == '(' and index in parser.pairs:
+            index = parser.pairs[index] + 1
+            continue
+        if token.kind == PUNCT:
+            words.append(token.text)
+        else:
+            words.append(token.value)
+        index += 1
+    text = ' '.join(words).replace(' [ ]', '[]').replace(' . ', '.')
+    if text.startswith(DEFAULT_SCHEMA + '.'):
+        text = text[len(DEFAULT_SCHEMA) + 1:]
+    base, brackets, suffix = text.partition('[')
+    base = _TYPE_ALIASES.get(base.strip(), base.strip())
+    return base + (brackets + suffix if brackets else '')
+
+
+def _argument_types(parser: _Parser, start: int, end: int) -> Tuple[str, ...]:
+    """参数列表 tokens[start:end] 的规范化类型（OUT 参数不属于签名）"""
+    types = []
+    for part_start, part_end in parser.split(start, end):
+        tokens = parser.tokens
+        index = part_start
+        mode = tokens[index].value if tokens[index].kind == WORD else ''
+        if mode in ('in', 'out', 'inout', 'variadic') and part_end - index > 1:
+            index += 1
+            if mode == 'out':
+                continue
+        stop = part_end
+        for cursor in range(index, part_end):
+            token = tokens[cursor]
+            if (token.kind == WORD and token.value == 'default') or (token.kind == PUNCT and token.text == '='):
+                stop = cursor
+                break
+        if stop - index > 1:
+            first, second = tokens[index], tokens[index + 1]
+            multiword = first.kind == WORD and second.kind == WORD and \
+                second.value in _MULTIWORD_TYPES.get(first.value, ())
+            if second.kind in (WORD, QUOTED) and not multiword:
+                index += 1
+        types.append(_normalize_type(parser, index, stop))
+    return tuple(types)
+
+
+def _function_key(name: str, types: Sequence[str]) -> str:
+    return f'{name}({",".join(types)})'
+
+
+def _type_reference(tokens: Sequence, index: int) -> Optional[str]:
+    """tokens[index] 开始的类型名引用的自定义类型键；内置类型、其他模式中的类型返回 None"""
+    if index >= len(tokens) or tokens[index].kind not in (WORD, QUOTED):
+        return None
+    if tokens[index].kind == WORD and tokens[index].value == 'setof':
+        index += 1
+        if index >= len(tokens) or tokens[index].kind not in (WORD, QUOTED):
+            return None
+    name = tokens[index].value
+    if index + 2 < len(tokens) and tokens[index + 1].kind == PUNCT and tokens[index + 1].text == '.' \
+            and tokens[index + 2].kind in (WORD, QUOTED):
+        # auth.users、extensions.citext 等由平台或扩展提供
+        return f'{name}.{tokens[index + 2].value}' if name == DEFAULT_SCHEMA else None
+    if tokens[index].kind == WORD and name in _BUILTIN_TYPES:
+        return None
+    return f'{DEFAULT_SCHEMA}.{name}'
+
+
+def _created_objects(text: str) -> List[str]:
+    """DO 块中静态 CREATE TYPE / CREATE TABLE 建的对象键（EXECUTE 的字符串不算）"""
+    body = _do_body(_Parser(text))
+    tokens = tokenize_sql(body) if body is not None else []
+    found = []
+    for index, token in enumerate(tokens[:-2]):
+        if token.kind != WORD or token.value != 'create' or tokens[index + 1].value not in ('type', 'table'):
+            continue
+        start = index + 2
+        if tokens[start].value == 'if':
+            start += 3
+        key = _type_reference(tokens, start)
+        if key is not None:
+            found.append(key)
+    return found
+
+
+def _do_body(parser: _Parser) -> Optional[str]:
+    """DO [LANGUAGE plpgsql] $$...$$ 的函数体，不是 plpgsql 时返回 None"""
+    body = None
+    language = 'plpgsql'
+    parser.i = 1
+    while not parser.at_end():
+        token = parser.tokens[parser.i]
+        if parser.accept('language'):
+            language = parser.ident() or ''
+        elif token.kind == DOLLAR and body is None:
+            tag = token.text[:token.text.index('$', 1) + 1]
+            body = token.text[len(tag):-len(tag)]
+            parser.i += 1
+        else:
+            return None
+    return body if language.lower() == 'plpgsql' else None
+
+
+def _guarded_statements(body: str) -> Optional[Tuple[bool, List[Tuple[bool, str]]]]:
+    """拆出 DO 块中按“已存在则跳过”方式执行的 DDL
+
+    支持两种写法（可以混用）：
+      BEGIN <DDL>; ... EXCEPTION WHEN duplicate_object [OR ...] THEN null; END
+      BEGIN IF NOT EXISTS (SELECT ...) THEN <DDL>; ... END IF; ... END
+    返回 (是否整块原子执行, [(是否在 IF NOT EXISTS 中, 语句)])；含 DECLARE、EXECUTE、
+    数据语句、ELSE 分支等其他内容时返回 None
+    """
+    tokens = tokenize_sql(body)
+    if len(tokens) < 2 or tokens[0].kind != WORD or tokens[0].value != 'begin':
+        return None
+    end = len(tokens) - 1
+    if tokens[end].kind == PUNCT and tokens[end].text == ';':
+        end -= 1
+    if tokens[end].kind != WORD or tokens[end].value != 'end':
+        return None
+    statements: List[Tuple[bool, str]] = []
+    atomic = False
+    guarded = False
+    for statement in split_sql(body[tokens[0].end:tokens[end].start]):
+        parser = _Parser(statement.text)
+        if atomic:
+            return None
+        if parser.accept('exception'):
+            errors = set()
+            while parser.accept('when'):
+                errors.add(parser.ident())
+                while parser.accept('or'):
+                    errors.add(parser.ident())
+                if not parser.accept('then', 'null'):
+                    return None
+            if not errors or not errors <= _DUPLICATE_ERRORS or not parser.at_end() or guarded:
+                return None
+            atomic = True
+            continue
+        if parser.accept('end', 'if'):
+            if not guarded or not parser.at_end():
+                return None
+            guarded = False
+            continue
+        if parser.accept('if', 'not', 'exists'):
+            if guarded or not parser.punct('('):
+                return None
+            parser.group()
+            if not parser.accept('then'):
+                return None
+            guarded = True
+        if parser.word() not in ('create', 'alter', 'comment'):
+            return None
+        statements.append((guarded, parser.rest()))
+    if guarded or not statements:
+        return None
+    return atomic, statements
+
+
+# ALTER TABLE 动作的目标列不存在
+_MISSING = object()
+
+
+class Schema:
+    """按顺序重放迁移得到的最终结构"""
+
+    def __init__(self):
+        self.tables: Dict[str, Table] = {}
+        self.indexes: Dict[str, Index] = {}
+        self.functions: Dict[str, Function] = {}
+        self.policies: Dict[str, Policy] = {}
+        self.triggers: Dict[str, Trigger] = {}
+        self.views: Dict[str, View] = {}
+        self.types: Dict[str, TypeDef] = {}
+        self.sequences: Dict[str, str] = {}
+        self.extensions: Dict[str, str] = {}
+        self.schemas: Dict[str, str] = {}
+        # 附属语句：键 -> Attached（COMMENT 以目标为键，后一次覆盖前一次）
+        self.attached: Dict[Tuple, Attached] = {}
+        # 无法离线重放的 DO 块，按原顺序；最终结构用到其中建的对象时原样带进基线
+        self.dynamic: List[Attached] = []
+        self.skipped: List[Skipped] = []
+        self.statements = 0
+        self._order = 0
+        self._source = ''
+
+    # ---- 入口 ----
+
+    def apply_file(self, path: str):
+        name = os.path.basename(path)
+        for statement in split_file(path):
+            self.apply(statement, f'{name}:{statement.line}')
+
+    def apply(self, statement: Statement, source: str = ''):
+        self.statements += 1
+        self._source = source
+        parser = _Parser(statement.text)
+        command = parser.word()
+        if not command:
+            self._skip('invalid', statement.text)
+            return
+        handler = getattr(self, f'_{command}', None)
+        if handler is not None and handler(parser):
+            return
+        if command in _DATA_COMMANDS:
+            self._skip('data', statement.text)
+        elif command == 'do':
+            self._skip('dynamic', statement.text)
+            self._order += 1
+            self.dynamic.append(Attached((), _ensure_semicolon(statement.text), self._order, source))
+        elif command in _SESSION_COMMANDS:
+            self._skip('session', statement.text)
+        elif command in _DDL_COMMANDS:
+            self._attach((), statement.text)
+        else:
+            self._skip('invalid', statement.text)
+
+    def _skip(self, category: str, text: str):
+        self.skipped.append(Skipped(category, self._source, _summary(text)))
+
+    def _attach(self, target: Tuple[str, ...], text: str, key: Optional[Tuple] = None):
+        self._order += 1
+        if key is None:
+            key = ('order', self._order)
+        self.attached.pop(key, None)
+        self.attached[key] = Attached(target, _ensure_semicolon(text), self._order, self._source)
+
+    # ---- DO ----
+
+    def _do(self, parser: _Parser) -> bool:
+        """只是“已存在则跳过”地建对象的 DO 块，按顶层语句重放
+
+        EXCEPTION WHEN duplicate_object 包裹的语句中任一对象已存在时整块不生效
+        （plpgsql 回滚整个块）；IF NOT EXISTS 中的语句各自判断
+        """
+        body = _do_body(parser)
+        guarded = _guarded_statements(body) if body is not None else None
+        if guarded is None:
+            return False
+        atomic, statements = guarded
+        exists = [self._exists(text) for _, text in statements]
+        if None in exists:
+            return False
+        if atomic and any(exists):
+            return True
+        for (_, text), found in zip(statements, exists):
+            if found:
+                continue
+            sub = _Parser(text)
+            handler = getattr(self, f'_{sub.word()}', None)
+            if handler is None or not handler(sub):
+                self._attach((), text)
+        return True
+
+    def _exists(self, text: str) -> Optional[bool]:
+        """语句要建的对象此时是否已存在；不是可判断的 CREATE / ADD 语句时返回 None"""
+        parser = _Parser(text)
+        if parser.accept('create'):
+            parser.accept('unique')
+            if parser.accept('type'):
+                return parser.qualified() in self.types
+            if parser.accept('table'):
+                parser.accept('if', 'not', 'exists')
+                return parser.qualified() in self.tables
+            if parser.accept('index'):
+                parser.accept('concurrently')
+                parser.accept('if', 'not', 'exists')
+                name = parser.ident()
+                if name is None or not parser.accept('on'):
+                    return None
+                parser.accept('only')
+                table = parser.qualified()
+                return table is not None and f'{table.partition(".")[0]}.{name}' in self.indexes
+            return None
+        if not parser.accept('alter', 'table'):
+            return None
+        parser.accept('if', 'exists')
+        parser.accept('only')
+        key = parser.qualified()
+        if key is None or len(parser.split(parser.i, len(parser.tokens))) != 1 or not parser.accept('add'):
+            return None
+        table = self.tables.get(key)
+        if parser.accept('constraint'):
+            name = parser.ident()
+            return None if name is None else table is not None and name in table.constraints
+        if parser.word() in _TABLE_CONSTRAINTS:
+            return None
+        parser.accept('column')
+        parser.accept('if', 'not', 'exists')
+        name = parser.ident()
+        return None if name is None else table is not None and name in table.columns
+
+    # ---- CREATE ----
+
+    def _create(self, parser: _Parser) -> bool:
+        parser.i = 1
+        parser.accept('or', 'replace')
+        if parser.word() in ('temp', 'temporary'):
+            self._skip('session', parser.text)
+            return True
+        parser.accept('unlogged')
+        if parser.accept('table'):
+            return self._create_table(parser)
+        unique = parser.accept('unique')
+        if parser.accept('index'):
+            return self._create_index(parser, unique)
+        if parser.word() in ('function', 'procedure'):
+            parser.i += 1
+            return self._create_function(parser)
+        if parser.accept('policy'):
+            return self._create_policy(parser)
+        parser.accept('constraint')
+        if parser.accept('trigger'):
+            return self._create_trigger(parser)
+        materialized = parser.accept('materialized')
+        parser.accept('recursive')
+        if parser.accept('view'):
+            return self._create_view(parser, materialized)
+        if parser.accept('type'):
+            return self._create_type(parser)
+        if parser.accept('sequence'):
+            parser.accept('if', 'not', 'exists')
+            key = parser.qualified()
+            if key is None:
+                return False
+            if key not in self.sequences or not parser.text.lower().count('if not exists'):
+                self.sequences[key] = _ensure_semicolon(parser.text)
+            return True
+        if parser.accept('extension'):
+            parser.accept('if', 'not', 'exists')
+            name = parser.ident()
+            if name is None:
+                return False
+            self.extensions.setdefault(name, _ensure_semicolon(parser.text))
+            return True
+        if parser.accept('schema'):
+            parser.accept('if', 'not', 'exists')
+            name = parser.ident()
+            if name is None:
+                return False
+            self.schemas.setdefault(name, _ensure_semicolon(parser.text))
+            return True
+        return False
+
+    def _create_table(self, parser: _Parser) -> bool:
+        if_not_exists = parser.accept('if', 'not', 'exists')
+        key = parser.qualified()
+        if key is None:
+            return False
+        if if_not_exists and key in self.tables:
+            return True
+        if key in self.tables:
+            self._drop_table(key)
+        if not parser.punct('(') or parser.find_word('as') >= 0 or parser.find_word('partition') >= 0:
+            self.tables[key] = Table(key, {}, {}, raw=_ensure_semicolon(parser.text), source=self._source)
+            return True
+        start, end = parser.group()
+        table = Table(key, {}, {}, source=self._source)
+        self.tables[key] = table
+        for part_start, part_end in parser.split(start, end):
+            sub = _Sub(parser, part_start, part_end)
+            if sub.word() in _TABLE_CONSTRAINTS:
+                if self._add_constraint(key, sub) is _MISSING:
+                    self._skip('orphan', f'{display_name(key)} {parser.slice(part_start, part_end)}'
+                                         '（目标表不存在，外键不保留）')
+            elif sub.word() == 'like':
+                # LIKE 其他表：列无法静态确定，整表原样保留
+                self.tables[key] = Table(key, {}, {}, raw=_ensure_semicolon(parser.text), source=self._source)
+                return True
+            else:
+                self._add_column(key, sub)
+        return True
+
+    def _add_column(self, table_key: str, sub: '_Sub'):
+        """添加一列及其列约束"""
+        name = sub.ident()
+        if name is None:
+            return
+        parser = sub.parser
+        type_start = sub.i
+        while not sub.at_end() and sub.word() not in _COLUMN_CONSTRAINTS:
+            sub.skip()
+        column = Column(name, parser.slice(type_start, sub.i))
+        pending_name = None
+        constraints: List[Constraint] = []
+        while not sub.at_end():
+            word = sub.word()
+            if word == 'constraint':
+                sub.i += 1
+                pending_name = sub.ident()
+                continue
+            if word == 'default':
+                sub.i += 1
+                start = sub.i
+                sub.skip()
+                while not sub.at_end() and sub.word() not in _COLUMN_CONSTRAINTS:
+                    sub.skip()
+                column = column._replace(default=parser.slice(start, sub.i))
+            elif word == 'not' and sub.word(1) == 'null':
+                sub.i += 2
+                column = column._replace(not_null=True)
+            elif word == 'null':
+                sub.i += 1
+                column = column._replace(not_null=False)
+            elif word == 'primary':
+                sub.i += 2
+                constraints.append(Constraint(
+                    pending_name or _default_name(short_name(table_key), 'pkey'), 'primary',
+                    f'PRIMARY KEY ({quote_ident(name)})', (name,)))
+            elif word == 'unique':
+                sub.i += 1
+                constraints.append(Constraint(
+                    pending_name or self._unique_name(table_key, name, 'key'), 'unique',
+                    f'UNIQUE ({quote_ident(name)})', (name,)))
+            elif word == 'check':
+                sub.i += 1
+                start = sub.i
+                sub.skip()
+                if sub.word() == 'no' and sub.word(1) == 'inherit':
+                    sub.i += 2
+                constraints.append(Constraint(
+                    pending_name or self._unique_name(table_key, name, 'check'), 'check',
+                    'CHECK ' + parser.slice(start, sub.i)))
+            elif word == 'references':
+                sub.i += 1
+                target = sub.qualified() or ''
+                target_columns: Tuple[str, ...] = ()
+                if sub.punct('('):
+                    inner_start, inner_end = sub.group()
+                    target_columns = tuple(parser.tokens[i].value for i in range(inner_start, inner_end)
+                                           if parser.tokens[i].kind in (WORD, QUOTED))
+                action_start = sub.i
+                sub.reference_actions()
+                actions = parser.slice(action_start, sub.i)
+                if self._missing_table(target, table_key):
+                    self._skip('orphan', f'{display_name(table_key)}.{name} REFERENCES {display_name(target)}'
+                                         '（目标表不存在，外键不保留）')
+                    pending_name = None
+                    continue
+                columns = f' ({", ".join(quote_ident(c) for c in target_columns)})' if target_columns else ''
+                definition = f'FOREIGN KEY ({quote_ident(name)}) REFERENCES {display_name(target)}{columns}'
+                constraints.append(Constraint(
+                    pending_name or self._unique_name(table_key, name, 'fkey'), 'foreign',
+                    definition + (f' {actions}' if actions else ''), (name,), target, target_columns))
+            else:
+                start = sub.i
+                sub.skip()
+                while not sub.at_end() and sub.word() not in _COLUMN_CONSTRAINTS:
+                    sub.skip()
+                column = column._replace(extra=column.extra + (parser.slice(start, sub.i),))
+            pending_name = None
+        self.tables[table_key].columns[name] = column
+        for constraint in constraints:
+            self._put_constraint(table_key, constraint)
+
+    def _missing_table(self, target: str, table_key: str = '') -> bool:
+        """public 中的表此时不存在（按文件名顺序重放时，被引用的表可能在更晚的文件中才创建）
+
+        其他模式（auth、storage 等）中的表不在模型中，视为存在
+        """
+        return target.startswith(DEFAULT_SCHEMA + '.') and target != table_key and \
+            target not in self.tables and target not in self.views
+
+    def _missing_index_column(self, table_key: str, parser: _Parser, start: int, end: int) -> bool:
+        """索引键中的某个列此时不在表中（表达式键不检查）"""
+        table = self.tables.get(table_key)
+        if table is None or table.raw:
+            return False
+        for a, b in parser.split(start, end):
+            token = parser.tokens[a]
+            following = parser.tokens[a + 1] if a + 1 < b else None
+            if token.kind not in (WORD, QUOTED) or (following is not None and following.text in ('(', '.')):
+                continue
+            if token.value not in table.columns:
+                return True
+        return False
+
+    def _unique_name(self, table_key: str, column: str, suffix: str) -> str:
+        table = self.tables.get(table_key)
+        base = _default_name(short_name(table_key), column, suffix)
+        if table is None or base not in table.constraints:
+            return base
+        number = 1
+        while f'{base}{number}' in table.constraints:
+            number += 1
+        return f'{base}{number}'
+
+    def _put_constraint(self, table_key: str, constraint: Constraint):
+        table = self.tables.get(table_key)
+        if table is not None:
+            table.constraints[constraint.name] = constraint
+
+    def _add_constraint(self, table_key: str, sub: '_Sub'):
+        """添加表约束：成功返回 True，无法识别返回 False，外键指向的表不存在时返回 _MISSING"""
+        parser = sub.parser
+        name = None
+        if sub.word() == 'constraint':
+            sub.i += 1
+            name = sub.ident()
+        kind = sub.word()
+        start = sub.i
+        columns: Tuple[str, ...] = ()
+        target = ''
+        target_columns: Tuple[str, ...] = ()
+        table = short_name(table_key)
+        if kind == 'primary':
+            sub.i += 2
+            columns = sub.column_list()
+            name = name or _default_name(table, 'pkey')
+        elif kind == 'unique':
+            sub.i += 1
+            if sub.word() == 'nulls':
+                sub.i += 3 if sub.word(1) == 'not' else 2
+            columns = sub.column_list()
+            name = name or self._unique_name(table_key, '_'.join(columns), 'key')
+        elif kind == 'check':
+            sub.i += 1
+            group_start = sub.i
+            sub.skip()
+            words = [parser.tokens[i].value for i in range(group_start, sub.i) if parser.tokens[i].kind == WORD]
+            table_columns = self.tables[table_key].columns if table_key in self.tables else {}
+            first = next((word for word in words if word in table_columns), '')
+            if name is None:
+                name = self._unique_name(table_key, first, 'check') if first else \
+                    self._unique_name(table_key, '', 'check').replace('__', '_')
+        elif kind == 'foreign':
+            sub.i += 2
+            columns = sub.column_list()
+            if sub.word() == 'references':
+                sub.i += 1
+                target = sub.qualified() or ''
+                if self._missing_table(target, table_key):
+                    return _MISSING
+                target_columns = sub.column_list()
+            name = name or self._unique_name(table_key, '_'.join(columns), 'fkey')
+        elif kind == 'exclude':
+            name = name or self._unique_name(table_key, '', 'excl').replace('__', '_')
+        else:
+            return False
+        definition = parser.slice(start, sub.end)
+        self._put_constraint(table_key, Constraint(name, kind, definition, columns, target, target_columns))
+        return True
+
+    def _create_index(self, parser: _Parser, unique: bool) -> bool:
+        parser.accept('concurrently')
+        if_not_exists = parser.accept('if', 'not', 'exists')
+        name = None
+        if parser.word() != 'on':
+            name = parser.ident()
+        if not parser.accept('on'):
+            return False
+        parser.accept('only')
+        table = parser.qualified()
+        if table is None:
+            return False
+        if self._missing_table(table):
+            self._skip('orphan', parser.text)
+            return True
+        method = ''
+        if parser.accept('using'):
+            method = parser.ident() or ''
+        if not parser.punct('('):
+            return False
+        start, end = parser.group()
+        columns = tuple(parser.slice(a, b) for a, b in parser.split(start, end))
+        if self._missing_index_column(table, parser, start, end):
+            self._skip('orphan', parser.text)
+            return True
+        tail = parser.rest()
+        if name is None:
+            first = parser.tokens[start].value if start < end and parser.tokens[start].kind in (WORD, QUOTED) else 'expr'
+            name = _default_name(short_name(table), first, 'idx')
+        key = f'{table.partition(".")[0]}.{name}'
+        if if_not_exists and key in self.indexes:
+            return True
+        self.indexes[key] = Index(key, table, unique, columns, method, tail, self._source)
+        return True
+
+    def _create_function(self, parser: _Parser) -> bool:
+        key = parser.qualified()
+        if key is None or not parser.punct('('):
+            return False
+        start, end = parser.group()
+        arguments = _argument_types(parser, start, end)
+        returns = ''
+        language = ''
+        volatility = 'volatile'
+        security_definer = False
+        if parser.accept('returns'):
+            returns_start = parser.i
+            while not parser.at_end() and parser.word() not in _FUNCTION_ATTRIBUTES:
+                parser.i = parser.pairs.get(parser.i, parser.i) + 1
+            returns = parser.slice(returns_start, parser.i)
+        while not parser.at_end():
+            word = parser.word()
+            if word == 'language':
+                parser.i += 1
+                language = parser.ident() or ''
+                continue
+            if word in _VOLATILITY:
+                volatility = word
+            elif word == 'security' and parser.word(1) == 'definer':
+                security_definer = True
+            parser.i = parser.pairs.get(parser.i, parser.i) + 1
+        function_key = _function_key(key, arguments)
+        self.functions[function_key] = Function(function_key, key, _ensure_semicolon(parser.text), arguments,
+                                                returns, language.lower(), volatility, security_definer,
+                                                self._source)
+        return True
+
+    def _create_policy(self, parser: _Parser) -> bool:
+        name = parser.ident()
+        if name is None or not parser.accept('on'):
+            return False
+        table = parser.qualified()
+        if table is None:
+            return False
+        if self._missing_table(table):
+            self._skip('orphan', parser.text)
+            return True
+        policy = Policy(name, table, source=self._source)
+        policy = self._policy_clauses(parser, policy)
+        if policy is None:
+            return False
+        self.policies[policy.key] = policy
+        return True
+
+    def _policy_clauses(self, parser: _Parser, policy: Policy) -> Optional[Policy]:
+        while not parser.at_end():
+            if parser.accept('as'):
+                policy = policy._replace(permissive=parser.word() != 'restrictive')
+                parser.i += 1
+            elif parser.accept('for'):
+                policy = policy._replace(command=parser.word())
+                parser.i += 1
+            elif parser.accept('to'):
+                roles = []
+                while True:
+                    role = parser.ident()
+                    if role is None:
+                        break
+                    roles.append(role)
+                    if not parser.punct(','):
+                        break
+                    parser.i += 1
+                policy = policy._replace(roles=tuple(roles))
+            elif parser.accept('using') and parser.punct('('):
+                start, end = parser.group()
+                policy = policy._replace(using=parser.slice(start, end))
+            elif parser.accept('with', 'check') and parser.punct('('):
+                start, end = parser.group()
+                policy = policy._replace(check=parser.slice(start, end))
+            else:
+                return None
+        return policy
+
+    def _create_trigger(self, parser: _Parser) -> bool:
+        name = parser.ident()
+        on = parser.find_word('on')
+        execute = parser.find_word('execute')
+        if name is None or on < 0 or execute < 0:
+            return False
+        parser.i = on + 1
+        table = parser.qualified()
+        parser.i = execute + 1
+        parser.i += 1
+        function = parser.qualified()
+        if table is None or function is None:
+            return False
+        if self._missing_table(table):
+            self._skip('orphan', parser.text)
+            return True
+        trigger = Trigger(name, table, function, _ensure_semicolon(parser.text), self._source)
+        self.triggers[trigger.key] = trigger
+        return True
+
+    def _create_view(self, parser: _Parser, materialized: bool) -> bool:
+        parser.accept('if', 'not', 'exists')
+        key = parser.qualified()
+        if key is None:
+            return False
+        references = frozenset(token.value for token in parser.tokens[parser.i:] if token.kind in (WORD, QUOTED))
+        self.views[key] = View(key, _ensure_semicolon(parser.text), materialized, references, self._source)
+        return True
+
+    def _create_type(self, parser: _Parser) -> bool:
+        key = parser.qualified()
+        if key is None:
+            return False
+        labels = None
+        if parser.accept('as', 'enum') and parser.punct('('):
+            start, end = parser.group()
+            labels = tuple(parser.tokens[i].text for i in range(start, end) if parser.tokens[i].kind == STRING)
+        self.types[key] = TypeDef(key, _ensure_semicolon(parser.text), labels, self._source)
+        return True
+
+    # ---- ALTER ----
+
+    def _alter(self, parser: _Parser) -> bool:
+        parser.i = 1
+        if parser.accept('table'):
+            return self._alter_table(parser)
+        if parser.accept('policy'):
+            return self._alter_policy(parser)
+        if parser.accept('type'):
+            return self._alter_type(parser)
+        if parser.accept('index'):
+            parser.accept('if', 'exists')
+            key = parser.qualified()
+            if key in self.indexes and parser.accept('rename', 'to'):
+                name = parser.ident()
+                index = self.indexes.pop(key)
+                new_key = f'{key.partition(".")[0]}.{name}'
+                self.indexes[new_key] = index._replace(key=new_key)
+                return True
+            self._attach(('index', key) if key else (), parser.text)
+            return True
+        if parser.word() in ('function', 'procedure'):
+            parser.i += 1
+            return self._alter_function(parser)
+        if parser.word() in ('view', 'sequence') or parser.accept('materialized'):
+            kind = parser.word()
+            parser.i += 1
+            parser.accept('if', 'exists')
+            key = parser.qualified()
+            self._attach((kind, key) if key else (), parser.text)
+            return True
+        return False
+
+    def _alter_table(self, parser: _Parser) -> bool:
+        parser.accept('if', 'exists')
+        parser.accept('only')
+        key = parser.qualified()
+        if key is None:
+            return False
+        table = self.tables.get(key)
+        if table is None:
+            if key.startswith(DEFAULT_SCHEMA + '.'):
+                # 此时表不存在，原迁移中这条语句会失败
+                self._skip('orphan', parser.text)
+            else:
+                # 其他模式中的表（如 auth.users）不在模型中，原样保留
+                self._attach((), parser.text)
+            return True
+        if table.raw:
+            self._attach(('table', key), parser.text)
+            return True
+        for start, end in parser.split(parser.i, len(parser)):
+            action = f'ALTER TABLE {display_name(key)} {parser.slice(start, end)}'
+            result = self._alter_table_action(key, _Sub(parser, start, end))
+            if result is None:
+                self._attach(('table', key), action)
+            elif result is _MISSING:
+                # 列此时不存在，原迁移中这个动作会失败
+                self._skip('orphan', action)
+            else:
+                key = result
+        return True
+
+    def _alter_table_action(self, key: str, sub: '_Sub'):
+        """处理 ALTER TABLE 的一个动作，返回动作之后的表键（RENAME TO 会改变）
+
+        无法建模的动作返回 None（原样保留），列不存在时返回 _MISSING
+        """
+        table = self.tables[key]
+        word = sub.word()
+        if word == 'add':
+            sub.i += 1
+            if sub.word() in _TABLE_CONSTRAINTS:
+                result = self._add_constraint(key, sub)
+                return key if result is True else (None if result is False else _MISSING)
+            sub.accept('column')
+            if sub.accept('if', 'not', 'exists'):
+                name = sub.peek_ident()
+                if name in table.columns:
+                    return key
+            self._add_column(key, sub)
+            return key
+        if word == 'drop':
+            sub.i += 1
+            if sub.accept('constraint'):
+                sub.accept('if', 'exists')
+                name = sub.ident()
+                table.constraints.pop(name, None)
+                return key
+            sub.accept('column')
+            sub.accept('if', 'exists')
+            name = sub.ident()
+            if name is None:
+                return None
+            self._drop_column(key, name, cascade=sub.word() == 'cascade')
+            return key
+        if word == 'alter':
+            sub.i += 1
+            sub.accept('column')
+            name = sub.ident()
+            column = table.columns.get(name)
+            if column is None:
+                return _MISSING
+            if sub.accept('set', 'data', 'type') or sub.accept('type'):
+                start = sub.i
+                while not sub.at_end() and sub.word() not in ('using', 'collate'):
+                    sub.skip()
+                column = column._replace(type=sub.parser.slice(start, sub.i))
+            elif sub.accept('set', 'default'):
+                column = column._replace(default=sub.parser.slice(sub.i, sub.end))
+            elif sub.accept('drop', 'default'):
+                column = column._replace(default=None)
+            elif sub.accept('set', 'not', 'null'):
+                column = column._replace(not_null=True)
+            elif sub.accept('drop', 'not', 'null'):
+                column = column._replace(not_null=False)
+            else:
+                return None
+            table.columns[name] = column
+            return key
+        if word == 'rename':
+            sub.i += 1
+            if sub.accept('to'):
+                new_key = f'{key.partition(".")[0]}.{sub.ident()}'
+                self._rename_table(key, new_key)
+                return new_key
+            if sub.accept('constraint'):
+                old = sub.ident()
+                sub.accept('to')
+                new = sub.ident()
+                if old in table.constraints and new:
+                    table.constraints[new] = table.constraints.pop(old)._replace(name=new)
+                return key
+            sub.accept('column')
+            old = sub.ident()
+            if not sub.accept('to'):
+                return None
+            new = sub.ident()
+            if new is None:
+                return None
+            if old not in table.columns:
+                return _MISSING
+            self._rename_column(key, old, new)
+            return key
+        if sub.accept('enable', 'row', 'level', 'security'):
+            self.tables[key] = table._replace(rls=True)
+            return key
+        if sub.accept('disable', 'row', 'level', 'security'):
+            self.tables[key] = table._replace(rls=False)
+            return key
+        if sub.accept('force', 'row', 'level', 'security'):
+            self.tables[key] = table._replace(force_rls=True)
+            return key
+        if sub.accept('no', 'force', 'row', 'level', 'security'):
+            self.tables[key] = table._replace(force_rls=False)
+            return key
+        return None
+
+    def _rename_table(self, key: str, new_key: str):
+        table = self.tables.pop(key)
+        self.tables[new_key] = table._replace(key=new_key)
+        for index_key, index in list(self.indexes.items()):
+            if index.table == key:
+                self.indexes[index_key] = index._replace(table=new_key)
+        for policy_key, policy in list(self.policies.items()):
+            if policy.table == key:
+                del self.policies[policy_key]
+                policy = policy._replace(table=new_key)
+                self.policies[policy.key] = policy
+        for trigger_key, trigger in list(self.triggers.items()):
+            if trigger.table == key:
+                del self.triggers[trigger_key]
+                trigger = trigger._replace(table=new_key)
+                self.triggers[trigger.key] = trigger
+        for other in self.tables.values():
+            for name, constraint in list(other.constraints.items()):
+                if constraint.target == key:
+                    other.constraints[name] = constraint._replace(
+                        target=new_key, definition=constraint.definition.replace(
+                            f'REFERENCES {display_name(key)}', f'REFERENCES {display_name(new_key)}'))
+
+    def _rename_column(self, key: str, old: str, new: str):
+        table = self.tables[key]
+        # 保持列的顺序
+        columns = [(new, column._replace(name=new)) if name == old else (name, column)
+                   for name, column in table.columns.items()]
+        table.columns.clear()
+        table.columns.update(columns)
+        pattern = re.compile(r'(?<![\w$"])' + re.escape(quote_ident(old)) + r'(?![\w$"])')
+        for name, constraint in list(table.constraints.items()):
+            if old in constraint.columns or constraint.kind == 'check':
+                table.constraints[name] = constraint._replace(
+                    columns=tuple(new if c == old else c for c in constraint.columns),
+                    definition=pattern.sub(quote_ident(new), constraint.definition))
+        for index_key, index in list(self.indexes.items()):
+            if index.table == key:
+                self.indexes[index_key] = index._replace(
+                    columns=tuple(pattern.sub(quote_ident(new), c) for c in index.columns))
+
+    def _drop_column(self, key: str, name: str, cascade: bool = False):
+        table = self.tables[key]
+        table.columns.pop(name, None)
+        pattern = re.compile(r'(?<![\w$])' + re.escape(name) + r'(?![\w$])')
+        for constraint_name, constraint in list(table.constraints.items()):
+            # CHECK 约束不记录列，按表达式中出现的列名判断
+            if name in constraint.columns or (constraint.kind == 'check' and pattern.search(constraint.definition)):
+                del table.constraints[constraint_name]
+        for index_key, index in list(self.indexes.items()):
+            if index.table == key and any(pattern.search(column) for column in index.columns):
+                del self.indexes[index_key]
+        if cascade:
+            for policy_key, policy in list(self.policies.items()):
+                if policy.table == key and pattern.search(f'{policy.using or ""} {policy.check or ""}'):
+                    del self.policies[policy_key]
+        for attached_key, attached in list(self.attached.items()):
+            if attached.target == ('column', key, name):
+                del self.attached[attached_key]
+
+    def _alter_policy(self, parser: _Parser) -> bool:
+        name = parser.ident()
+        if name is None or not parser.accept('on'):
+            return False
+        table = parser.qualified()
+        policy = self.policies.get(f'{table}:{name}')
+        if policy is None:
+            return True
+        if parser.accept('rename', 'to'):
+            new = parser.ident()
+            del self.policies[policy.key]
+            policy = policy._replace(name=new)
+            self.policies[policy.key] = policy
+            return True
+        updated = self._policy_clauses(parser, policy)
+        if updated is None:
+            return False
+        self.policies[policy.key] = updated
+        return True
+
+    def _alter_type(self, parser: _Parser) -> bool:
+        key = parser.qualified()
+        type_def = self.types.get(key)
+        if type_def is not None and type_def.labels is not None and parser.accept('add', 'value'):
+            parser.accept('if', 'not', 'exists')
+            label = parser.tokens[parser.i].text if not parser.at_end() else None
+            parser.i += 1
+            labels = list(type_def.labels)
+            if label is None:
+                return False
+            if label in labels:
+                return True
+            position = len(labels)
+            if parser.word() in ('before', 'after'):
+                relative = parser.word()
+                parser.i += 1
+                anchor = parser.tokens[parser.i].text if not parser.at_end() else None
+                if anchor in labels:
+                    position = labels.index(anchor) + (1 if relative == 'after' else 0)
+            labels.insert(position, label)
+            self.types[key] = type_def._replace(labels=tuple(labels))
+            return True
+        if type_def is not None and type_def.labels is not None and parser.accept('rename', 'value'):
+            old = parser.tokens[parser.i].text if not parser.at_end() else None
+            parser.i += 1
+            parser.accept('to')
+            new = parser.tokens[parser.i].text if not parser.at_end() else None
+            self.types[key] = type_def._replace(labels=tuple(new if label == old else label
+                                                             for label in type_def.labels))
+            return True
+        if type_def is not None and type_def.labels is not None and parser.accept('rename', 'to'):
+            new = parser.ident()
+            if new is None:
+                return False
+            self._rename_type(key, f'{key.partition(".")[0]}.{new}')
+            return True
+        self._attach(('type', key) if key else (), parser.text)
+        return True
+
+    def _rename_type(self, key: str, new_key: str):
+        """枚举改名：列按类型 OID 引用，列类型跟着改名；挂在旧名上的附属语句写的是旧名，一并删除"""
+        self.types[new_key] = self.types.pop(key)._replace(key=new_key)
+        self._drop_attached(lambda target: target == ('type', key))
+        pattern = re.compile(r'^(?:' + re.escape(key.partition('.')[0]) + r'\.)?"?' + re.escape(short_name(key))
+                             + r'"?(\[\])?$')
+        for table in self.tables.values():
+            for name, column in list(table.columns.items()):
+                match = pattern.match(column.type)
+                if match:
+                    table.columns[name] = column._replace(type=display_name(new_key) + (match.group(1) or ''))
+
+    def _alter_function(self, parser: _Parser) -> bool:
+        parser.accept('if', 'exists')
+        keys = self._function_targets(parser)
+        attributes = {parser.tokens[i].value for i in range(parser.i, len(parser)) if parser.tokens[i].kind == WORD}
+        for key in keys:
+            function = self.functions[key]
+            volatility = next((word for word in _VOLATILITY if word in attributes), function.volatility)
+            security_definer = function.security_definer
+            if 'definer' in attributes:
+                security_definer = True
+            elif 'invoker' in attributes:
+                security_definer = False
+            self.functions[key] = function._replace(volatility=volatility, security_definer=security_definer)
+        target = ('function', keys[0]) if len(keys) == 1 else ()
+        self._attach(target, parser.text)
+        return True
+
+    def _function_targets(self, parser: _Parser) -> List[str]:
+        """DROP / ALTER FUNCTION 中的一个函数引用：带参数列表时精确匹配，否则匹配所有重载"""
+        name = parser.qualified()
+        if name is None:
+            return []
+        if parser.punct('('):
+            start, end = parser.group()
+            key = _function_key(name, _argument_types(parser, start, end))
+            return [key] if key in self.functions else []
+        return [key for key, function in self.functions.items() if function.name == name]
+
+    # ---- DROP ----
+
+    def _drop(self, parser: _Parser) -> bool:
+        parser.i = 1
+        cascade = parser.find_word('cascade') >= 0
+        materialized = parser.accept('materialized')
+        kind = parser.word()
+        parser.i += 1
+        if kind == 'index':
+            parser.accept('concurrently')
+        parser.accept('if', 'exists')
+        if kind == 'table':
+            for key in parser.names():
+                self._drop_table(key)
+            return True
+        if kind == 'index':
+            for key in parser.names():
+                self.indexes.pop(key, None)
+            return True
+        if kind in ('function', 'procedure'):
+            while True:
+                for key in self._function_targets(parser):
+                    self._drop_function(key, cascade)
+                if not parser.punct(','):
+                    return True
+                parser.i += 1
+        if kind == 'policy':
+            name = parser.ident()
+            if not parser.accept('on'):
+                return False
+            self.policies.pop(f'{parser.qualified()}:{name}', None)
+            return True
+        if kind == 'trigger':
+            name = parser.ident()
+            if not parser.accept('on'):
+                return False
+            self.triggers.pop(f'{parser.qualified()}:{name}', None)
+            return True
+        if kind == 'view' or materialized:
+            for key in parser.names():
+                self._drop_view(key)
+            return True
+        if kind == 'type':
+            for key in parser.names():
+                self._drop_type(key, cascade)
+            return True
+        if kind == 'sequence':
+            for key in parser.names():
+                self.sequences.pop(key, None)
+            return True
+        if kind == 'extension':
+            while True:
+                name = parser.ident()
+                if name is None:
+                    return True
+                self.extensions.pop(name, None)
+                if not parser.punct(','):
+                    return True
+                parser.i += 1
+        if kind == 'schema':
+            while True:
+                name = parser.ident()
+                if name is None:
+                    return True
+                self._drop_schema(name)
+                if not parser.punct(','):
+                    return True
+                parser.i += 1
+        return False
+
+    def _drop_table(self, key: str):
+        if self.tables.pop(key, None) is None:
+            return
+        for index_key in [k for k, index in self.indexes.items() if index.table == key]:
+            del self.indexes[index_key]
+        for policy_key in [k for k, policy in self.policies.items() if policy.table == key]:
+            del self.policies[policy_key]
+        for trigger_key in [k for k, trigger in self.triggers.items() if trigger.table == key]:
+            del self.triggers[trigger_key]
+        for table in self.tables.values():
+            for name in [n for n, constraint in table.constraints.items() if constraint.target == key]:
+                del table.constraints[name]
+        self._drop_attached(lambda target: len(target) > 1 and target[0] in ('table', 'column', 'constraint') and
+                            target[1] == key)
+        self._drop_dependent_views(short_name(key))
+
+    def _drop_view(self, key: str):
+        if self.views.pop(key, None) is None:
+            return
+        self._drop_attached(lambda target: target == ('view', key))
+        self._drop_dependent_views(short_name(key))
+
+    def _drop_dependent_views(self, name: str):
+        for view_key in [k for k, view in self.views.items() if name in view.references]:
+            self._drop_view(view_key)
+
+    def _drop_function(self, key: str, cascade: bool):
+        function = self.functions.pop(key, None)
+        if function is None:
+            return
+        self._drop_attached(lambda target: target == ('function', key))
+        if not cascade:
+            return
+        for trigger_key in [k for k, trigger in self.triggers.items() if trigger.function == function.name]:
+            del self.triggers[trigger_key]
+        pattern = re.compile(r'(?<![\w$])' + re.escape(short_name(function.name)) + r'\s*\(')
+        for policy_key in [k for k, policy in self.policies.items()
+                           if pattern.search(f'{policy.using or ""} {policy.check or ""}')]:
+            del self.policies[policy_key]
+        for table in self.tables.values():
+            for name, column in list(table.columns.items()):
+                if column.default and pattern.search(column.default):
+                    table.columns[name] = column._replace(default=None)
+
+    def _drop_type(self, key: str, cascade: bool):
+        if self.types.pop(key, None) is None:
+            return
+        self._drop_attached(lambda target: target == ('type', key))
+        if not cascade:
+            return
+        name = short_name(key)
+        pattern = re.compile(r'^(?:' + re.escape(key.partition('.')[0]) + r'\.)?"?' + re.escape(name) + r'"?(?:\[\])?$')
+        for table_key, table in list(self.tables.items()):
+            for column_name, column in list(table.columns.items()):
+                if pattern.match(column.type):
+                    self._drop_column(table_key, column_name)
+        for function_key in [k for k, function in self.functions.items()
+                             if name in function.arguments or f'{name}[]' in function.arguments]:
+            self._drop_function(function_key, cascade)
+
+    def _drop_schema(self, name: str):
+        prefix = f'{name}.'
+        for key in [k for k in self.tables if k.startswith(prefix)]:
+            self._drop_table(key)
+        for key in [k for k in self.views if k.startswith(prefix)]:
+            self._drop_view(key)
+        for key in [k for k in self.functions if k.startswith(prefix)]:
+            self._drop_function(key, cascade=True)
+        for key in [k for k in self.types if k.startswith(prefix)]:
+            self._drop_type(key, cascade=True)
+        for mapping in (self.indexes, self.sequences):
+            for key in [k for k in mapping if k.startswith(prefix)]:
+                del mapping[key]
+        for key in [k for k, trigger in self.triggers.items() if trigger.table.startswith(prefix)]:
+            del self.triggers[key]
+        for key in [k for k, policy in self.policies.items() if policy.table.startswith(prefix)]:
+            del self.policies[key]
+        self.schemas.pop(name, None)
+
+    def _drop_attached(self, predicate):
+        for key in [k for k, attached in self.attached.items() if attached.target and predicate(attached.target)]:
+            del self.attached[key]
+
+    # ---- GRANT / REVOKE / COMMENT ----
+
+    def _grant(self, parser: _Parser) -> bool:
+        on = parser.find_word('on')
+        if on < 0:
+            # 角色授权（GRANT role TO user）
+            self._attach((), parser.text)
+            return True
+        parser.i = on + 1
+        kind = parser.word()
+        target: Tuple[str, ...] = ()
+        text = parser.text
+        if kind in ('function', 'procedure'):
+            parser.i += 1
+            start = parser.i
+            keys = self._function_targets(parser)
+            if len(keys) != 1:
+                # 没有匹配的函数，或省略参数列表而函数有多个重载：原迁移中会失败
+                self._skip('orphan' if not keys else 'invalid', parser.text)
+                return True
+            target = ('function', keys[0])
+            text = self._with_signature(parser, start, keys[0])
+        elif kind not in ('all', 'schema', 'database', 'sequence', 'type', 'language', 'foreign', 'large'):
+            parser.accept('table')
+            names = parser.names()
+            if len(names) == 1:
+                target = ('table', names[0]) if names[0] in self.tables else (
+                    ('view', names[0]) if names[0] in self.views else ())
+                if not target and names[0].startswith(DEFAULT_SCHEMA + '.'):
+                    self._skip('orphan', parser.text)
+                    return True
+        self._attach(target, text)
+        return True
+
+    _revoke = _grant
+
+    def _with_signature(self, parser: _Parser, start: int, key: str) -> str:
+        """把语句中 tokens[start:parser.i] 的函数引用换成完整签名
+
+        省略参数列表的引用在当时唯一，之后新增重载时会变得有歧义
+        """
+        function = self.functions[key]
+        signature = f'{display_name(function.name)}({", ".join(function.arguments)})'
+        return parser.text[:parser.tokens[start].start] + signature + parser.text[parser.tokens[parser.i - 1].end:]
+
+    def _comment(self, parser: _Parser) -> bool:
+        if not parser.accept('comment', 'on'):
+            return False
+        kind = parser.word()
+        parser.i += 1
+        target: Tuple[str, ...] = ()
+        text = parser.text
+        if kind == 'table':
+            key = parser.qualified()
+            target = ('table', key) if key in self.tables else ()
+        elif kind == 'column':
+            first = parser.qualified()
+            if first is not None and parser.punct('.'):
+                parser.i += 1
+                column = parser.ident()
+                table = first
+            elif first is not None:
+                # schema.table.column 被读成 table.column
+                table, column = f'{DEFAULT_SCHEMA}.{first.partition(".")[0]}', short_name(first)
+            else:
+                return False
+            if table in self.tables and column in self.tables[table].columns:
+                target = ('column', table, column)
+        elif kind in ('function', 'procedure'):
+            start = parser.i
+            keys = self._function_targets(parser)
+            if len(keys) > 1:
+                self._skip('invalid', parser.text)
+                return True
+            if keys:
+                target = ('function', keys[0])
+                text = self._with_signature(parser, start, keys[0])
+        elif kind == 'view':
+            key = parser.qualified()
+            target = ('view', key) if key in self.views else ()
+        elif kind == 'type':
+            key = parser.qualified()
+            target = ('type', key) if key in self.types else ()
+        elif kind == 'index':
+            key = parser.qualified()
+            target = ('index', key) if key in self.indexes else ()
+        elif kind == 'constraint':
+            name = parser.ident()
+            if parser.accept('on'):
+                table = parser.qualified()
+                if table in self.tables and name in self.tables[table].constraints:
+                    target = ('constraint', table, name)
+                elif table is not None and not table.startswith(DEFAULT_SCHEMA + '.'):
+                    # 其他模式（如租户模式）中的表不在模型中，原样保留
+                    self._attach((), text)
+                    return True
+        elif kind in ('policy', 'trigger'):
+            name = parser.ident()
+            if parser.accept('on'):
+                table = parser.qualified()
+                mapping = self.policies if kind == 'policy' else self.triggers
+                target = (kind, f'{table}:{name}') if f'{table}:{name}' in mapping else ()
+        if not target:
+            # 目标不在模型中：已被删除（原迁移中这条注释会失败），或由 DO 块动态创建
+            if kind in ('table', 'column', 'constraint', 'function', 'view', 'type', 'index', 'policy', 'trigger'):
+                self._skip('orphan', parser.text)
+                return True
+            self._attach((), parser.text)
+            return True
+        self._attach(target, text, key=('comment',) + target)
+        return True
+
+    # ---- 查询 ----
+
+    def index_keys(self, table: str, lookup: bool = False) -> List[Tuple[str, ...]]:
+        """表上每个索引（含主键、唯一约束）的键列；表达式键记为空串，之后的键不再计入
+
+        部分索引（带 WHERE）只覆盖部分行，不能替所有查询兜底，不计入。lookup 为 True 时
+        用于按首列等值查找（过滤值、外键值都不是 NULL），条件只是“首列 IS NOT NULL”的部分索引也计入
+        """
+        keys = []
+        for index in self.indexes.values():
+            if index.table != table or (index.partial and not (lookup and index.not_null_only)):
+                continue
+            columns = []
+            for expression in index.columns:
+                # 键可能带 DESC、操作符类等，只取开头的列名
+                tokens = tokenize_sql(expression)
+                if not tokens or tokens[0].kind not in (WORD, QUOTED) or (len(tokens) > 1 and tokens[1].text in ('(', '.')):
+                    columns.append('')
+                    break
+                columns.append(tokens[0].value)
+            keys.append(tuple(columns))
+        if table in self.tables:
+            for constraint in self.tables[table].constraints.values():
+                if constraint.kind in ('primary', 'unique') and constraint.columns:
+                    keys.append(constraint.columns)
+        return keys
+
+    # ---- 引用检查 ----
+
+    def _undefined(self, defined: Iterable[str] = ()) -> List[Tuple[str, str]]:
+        """(位置, 对象键)：列类型、类型转换、函数签名和外键引用了、但结构中没有定义的类型或表"""
+        known = set(self.types) | set(self.tables) | set(self.views) | set(defined)
+        found: List[Tuple[str, str]] = []
+
+        def check(where: str, tokens: Sequence, index: int):
+            key = _type_reference(tokens, index)
+            if key is not None and key not in known:
+                found.append((where, key))
+
+        def casts(where: str, text: Optional[str]):
+            tokens = tokenize_sql(text or '')
+            for index, token in enumerate(tokens):
+                if token.kind == PUNCT and token.text == '::':
+                    check(where, tokens, index + 1)
+
+        for table in self.tables.values():
+            name = display_name(table.key)
+            if table.raw:
+                casts(name, table.raw)
+                continue
+            for column in table.columns.values():
+                check(f'{name}.{column.name}', tokenize_sql(column.type), 0)
+                casts(f'{name}.{column.name}', column.default)
+            for constraint in table.constraints.values():
+                casts(f'{name}.{constraint.name}', constraint.definition)
+                if constraint.kind == 'foreign' and constraint.target.startswith(f'{DEFAULT_SCHEMA}.') \
+                        and constraint.target not in known:
+                    found.append((f'{name}.{constraint.name}', constraint.target))
+        for function in self.functions.values():
+            for argument in function.arguments:
+                check(function.key, tokenize_sql(argument), 0)
+            returns = _Parser(function.returns)
+            if returns.accept('table') and returns.punct('('):
+                start, end = returns.group()
+                for a, _ in returns.split(start, end):
+                    check(function.key, returns.tokens, a + 1)
+            else:
+                check(function.key, returns.tokens, 0)
+        for policy in self.policies.values():
+            casts(f'策略 {policy.key}', policy.using)
+            casts(f'策略 {policy.key}', policy.check)
+        for view in self.views.values():
+            casts(display_name(view.key), view.text)
+        return found
+
+    def carried_dynamic(self) -> List[Attached]:
+        """最终结构引用的类型或表只在 DO 块中创建时，最后一个创建它的 DO 块原样进入基线"""
+        carried: Dict[int, Attached] = {}
+        for _, key in self._undefined():
+            for block in reversed(self.dynamic):
+                if key in _created_objects(block.text):
+                    carried[block.order] = block
+                    break
+        return [carried[order] for order in sorted(carried)]
+
+    def undefined_references(self) -> List[str]:
+        """基线中引用了、但基线没有定义的类型和表（原样带入的 DO 块建的对象算已定义）
+
+        基线在新库上执行到这些语句时会失败，返回 '位置: 名字' 列表
+        """
+        defined = [key for block in self.carried_dynamic() for key in _created_objects(block.text)]
+        return list(dict.fromkeys(f'{where}: {display_name(key)}' for where, key in self._undefined(defined)))
+
+    # ---- 输出 ----
+
+    def live_attached(self) -> List[Attached]:
+        """目标仍然存在的附属语句，按原顺序"""
+        def alive(target: Tuple[str, ...]) -> bool:
+            if not target:
+                return True
+            kind = target[0]
+            if kind == 'table':
+                return target[1] in self.tables
+            if kind == 'column':
+                return target[1] in self.tables and target[2] in self.tables[target[1]].columns
+            if kind == 'constraint':
+                return target[1] in self.tables and target[2] in self.tables[target[1]].constraints
+            mapping = {'function': self.functions, 'view': self.views, 'type': self.types,
+                       'index': self.indexes, 'policy': self.policies, 'trigger': self.triggers,
+                       'sequence': self.sequences, 'materialized': self.views}.get(kind)
+            return mapping is None or target[1] in mapping
+        return sorted((a for a in self.attached.values() if alive(a.target)), key=lambda a: a.order)
+
+    def _late_function(self, function: Function) -> bool:
+        """参数或返回值用到表的行类型的函数必须在表之后创建"""
+        names = {short_name(key) for key in self.tables} | {short_name(key) for key in self.views}
+        words = set(re.findall(r'[\w$]+', f'{function.returns} {" ".join(function.arguments)}'.lower()))
+        return bool(names & words)
+
+    def to_sql(self, header: str = '') -> str:
+        out: List[str] = []
+
+        def section(title: str, items: Iterable[str]):
+            items = list(items)
+            if items:
+                out.append(f'-- ===== {title} =====\n')
+                out.extend(item.rstrip() + '\n' for item in items)
+                out.append('')
+
+        if header:
+            out.append(header.rstrip() + '\n')
+        out.append('SET check_function_bodies = false;\n')
+        section('扩展', self.extensions.values())
+        section('模式', self.schemas.values())
+        section('类型', (type_def.to_sql() for type_def in self.types.values()))
+        section('DO 块（最终结构用到其中创建的对象）', (block.text for block in self.carried_dynamic()))
+        section('序列', self.sequences.values())
+        early = [f for f in self.functions.values() if not self._late_function(f)]
+        late = [f for f in self.functions.values() if self._late_function(f)]
+        section('函数', (function.text for function in early))
+        tables = []
+        foreign_keys = []
+        for table in self.tables.values():
+            if table.raw:
+                tables.append(table.raw)
+                continue
+            lines = [column.to_sql() for column in table.columns.values()]
+            for constraint in table.constraints.values():
+                if constraint.kind == 'foreign':
+                    foreign_keys.append(f'ALTER TABLE {display_name(table.key)} ADD CONSTRAINT '
+                                        f'{quote_ident(constraint.name)} {constraint.definition};')
+                else:
+                    lines.append(f'CONSTRAINT {quote_ident(constraint.name)} {constraint.definition}')
+            body = ',\n  '.join(lines)
+            tables.append(f'CREATE TABLE {display_name(table.key)} (\n  {body}\n);')
+        section('表', tables)
+        section('依赖表的函数', (function.text for function in late))
+        section('外键', foreign_keys)
+        section('索引', (index.to_sql() for index in self.indexes.values()))
+        section('视图', (view.text for view in self.views.values()))
+        rls = []
+        for table in self.tables.values():
+            if table.rls:
+                rls.append(f'ALTER TABLE {display_name(table.key)} ENABLE ROW LEVEL SECURITY;')
+            if table.force_rls:
+                rls.append(f'ALTER TABLE {display_name(table.key)} FORCE ROW LEVEL SECURITY;')
+        section('行级安全', rls)
+        section('策略', (policy.to_sql() for policy in self.policies.values()))
+        section('触发器', (trigger.text for trigger in self.triggers.values()))
+        section('授权、注释与其他', (attached.text for attached in self.live_attached()))
+        return '\n'.join(out)
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            'tables': len(self.tables),
+            'columns': sum(len(table.columns) for table in self.tables.values()),
+            'indexes': len(self.indexes),
+            'functions': len(self.functions),
+            'policies': len(self.policies),
+            'triggers': len(self.triggers),
+            'views': len(self.views),
+            'types': len(self.types),
+        }
+
+
+class _Sub:
+    """_Parser 中 [start, end) 范围内的子游标（ALTER TABLE 的一个动作、CREATE TABLE 的一项）"""
+
+    def __init__(self, parser: _Parser, start: int, end: int):
+        self.parser = parser
+        self.i = start
+        self.end = end
+
+    def at_end(self) -> bool:
+        return self.i >= self.end
+
+    def word(self, offset: int = 0) -> str:
+        index = self.i + offset
+        if index < self.end and self.parser.tokens[index].kind == WORD:
+            return self.parser.tokens[index].value
+        return ''
+
+    def punct(self, value: str) -> bool:
+        return self.i < self.end and self.parser.tokens[self.i].kind == PUNCT and self.parser.tokens[self.i].text == value
+
+    def accept(self, *words: str) -> bool:
+        for offset, word in enumerate(words):
+            if self.word(offset) != word:
+                return False
+        self.i += len(words)
+        return True
+
+    def skip(self):
+        """跳过一个 token（开括号时跳过整个括号组）"""
+        self.i = self.parser.pairs.get(self.i, self.i) + 1
+
+    def group(self) -> Tuple[int, int]:
+        close = min(self.parser.pairs.get(self.i, self.end), self.end)
+        start = self.i + 1
+        self.i = close + 1
+        return start, close
+
+    def peek_ident(self) -> Optional[str]:
+        if self.i < self.end and self.parser.tokens[self.i].kind in (WORD, QUOTED):
+            return self.parser.tokens[self.i].value
+        return None
+
+    def ident(self) -> Optional[str]:
+        name = self.peek_ident()
+        if name is not None:
+            self.i += 1
+        return name
+
+    def qualified(self) -> Optional[str]:
+        first = self.ident()
+        if first is None:
+            return None
+        if self.punct('.'):
+            self.i += 1
+            second = self.ident()
+            if second is not None:
+                return f'{first}.{second}'
+        return f'{DEFAULT_SCHEMA}.{first}'
+
+    def reference_actions(self):
+        """跳过 REFERENCES 之后的 ON DELETE / ON UPDATE / MATCH / DEFERRABLE 子句"""
+        while not self.at_end():
+            if self.accept('on'):
+                self.i += 1
+                if not (self.accept('set', 'null') or self.accept('set', 'default') or self.accept('no', 'action')):
+                    self.i += 1
+            elif self.accept('match') or self.accept('initially'):
+                self.i += 1
+            elif not (self.accept('deferrable') or self.accept('not', 'deferrable')):
+                return
+
+    def column_list(self) -> Tuple[str, ...]:
+        if not self.punct('('):
+            return ()
+        start, end = self.group()
+        return tuple(self.parser.tokens[i].value for i in range(start, end)
+                     if self.parser.tokens[i].kind in (WORD, QUOTED))
+
+
+def replay(files: Sequence[str]) -> Schema:
+    """按顺序重放迁移文件"""
+    schema = Schema()
+    for path in files:
+        schema.apply_file(path)
+    return schema
+
+
+def definition_key(text: str) -> Optional[Tuple[str, str]]:
+    """CREATE 语句定义的对象：('function', 签名键) / ('policy', 表:名) / ('trigger', 表:名) / ('view', 键)
+
+    与 Schema 中对象的键一致；不是这几类定义时返回 None
+    """
+    parser = _Parser(text)
+    if not parser.accept('create'):
+        return None
+    parser.accept('or', 'replace')
+    if parser.word() in ('function', 'procedure'):
+        parser.i += 1
+        name = parser.qualified()
+        if name is None or not parser.punct('('):
+            return None
+        start, end = parser.group()
+        return 'function', _function_key(name, _argument_types(parser, start, end))
+    if parser.accept('policy'):
+        name = parser.ident()
+        if name is None or not parser.accept('on'):
+            return None
+        table = parser.qualified()
+        return ('policy', f'{table}:{name}') if table else None
+    parser.accept('constraint')
+    if parser.accept('trigger'):
+        name = parser.ident()
+        on = parser.find_word('on')
+        if name is None or on < 0:
+            return None
+        parser.i = on + 1
+        table = parser.qualified()
+        return ('trigger', f'{table}:{name}') if table else None
+    parser.accept('materialized')
+    parser.accept('recursive')
+    if parser.accept('view'):
+        parser.accept('if', 'not', 'exists')
+        key = parser.qualified()
+        return ('view', key) if key else None
+    return None
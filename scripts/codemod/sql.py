@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+流式 SQL 语句切分
+
+按块读取迁移文件，只在普通代码中的分号处切分：单引号字符串（含 '' 转义和
+E'...' 的反斜杠转义）、双引号标识符、-- 行注释、可嵌套的 /* */ 块注释以及
+$$ / $tag$ 美元引号函数体中的分号都不算语句结束。内存中只保留当前语句和
+一个读取块，几十 MB 的迁移也是常数内存。
+
+语句文本从第一个有效字符开始（语句之间的注释和空白丢弃），到分号为止。
+tokenize_sql 再把单条语句分成 token，供 DDL 重放、策略检查等按 token 解析。
+"""
+
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, TextIO
+
+READ_SIZE = 64 * 1024
+# 美元引号标签最长 63 字节（NAMEDATALEN - 1）；块尾这么长的范围内出现的
+# 特殊符号可能被截断，等读入下一块再判断
+_LOOKAHEAD = 64
+
+_SPECIAL = re.compile(r"""['";]|--|/\*|\$(?:[^\W\d]\w*)?\$""")
+_BLOCK_COMMENT = re.compile(r'/\*|\*/')
+_ESCAPE_STRING = re.compile(r"\\.|'", re.DOTALL)
+_SPACE = re.compile(r'\S')
+
+
+WORD = 'word'
+# 双引号标识符
+QUOTED = 'quoted'
+STRING = 'string'
+# 美元引号字符串（函数体）
+DOLLAR = 'dollar'
+NUMBER = 'number'
+# $1 等位置参数
+PARAM = 'param'
+PUNCT = 'punct'
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+|--[^\n]*)
+  | (?P<comment>/\*)
+  | (?P<string>[eE]'(?:[^'\\]|\\.|'')*'|'(?:[^']|'')*')
+  | (?P<word>[^\W\d][\w$]*)
+  | (?P<quoted>"(?:[^"]|"")*")
+  | (?P<dollar>\$(?P<tag>(?:[^\W\d]\w*)?)\$.*?\$(?P=tag)\$)
+  | (?P<param>\$\d+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<punct>::|<=|>=|<>|!=|=>|->>|->|\|\||[^\s\w'"$])
+""", re.VERBOSE | re.DOTALL)
+
+
+class SqlToken(NamedTuple):
+    kind: str
+    # 原文
+    text: str
+    start: int
+    end: int
+
+    @property
+    def value(self) -> str:
+        """不带引号的标识符写法：普通单词转小写，双引号标识符去掉引号、保留大小写"""
+        if self.kind == QUOTED:
+            return self.text[1:-1].replace('""', '"')
+        if self.kind == WORD:
+            return self.text.lower()
+        return self.text
+
+
+def _skip_block_comment(text: str, pos: int) -> int:
+    """pos 指向 /* 之后，返回配对的 */ 之后的位置（支持嵌套）"""
+    depth = 1
+    while depth:
+        match = _BLOCK_COMMENT.search(text, pos)
+        if match is None:
+            return len(text)
+        pos = match.end()
+        depth += 1 if match.group() == '/*' else -1
+    return pos
+
+
+def tokenize_sql(text: str) -> List[SqlToken]:
+    """把一条语句分成 token，跳过空白和注释；未闭合的字符串 / 函数体到文本末尾为止"""
+    tokens: List[SqlToken] = []
+    pos = 0
+    length = len(text)
+    while pos < length:
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            # 未闭合的引号或美元引号
+            kind = DOLLAR if text[pos] == '$' else (QUOTED if text[pos] == '"' else STRING)
+            tokens.append(SqlToken(kind, text[pos:], pos, length))
+            break
+        kind = match.lastgroup
+        if kind == 'comment':
+            pos = _skip_block_comment(text, match.end())
+            continue
+        if kind != 'space':
+            tokens.append(SqlToken(kind, match.group(), pos, match.end()))
+        pos = match.end()
+    return tokens
+
+
+class Statement(NamedTuple):
+    # 语句文本，含结尾的分号（文件末尾没有分号的语句除外）
+    text: str
+    # 第一个有效字符所在行（从 1 开始）
+    line: int
+    # 第一个有效字符在文件中的字符偏移
+    offset: int
+
+
+def _is_word_char(char: str) -> bool:
+    return char == '$' or char == '_' or char.isalnum()
+
+
+def split_statements(chunks: Iterable[str]) -> Iterator[Statement]:
+    """把依次读入的文本块切分成语句，边读边产出"""
+    chunks = iter(chunks)
+    buffer = ''
+    # buffer[0] 在整个文件中的偏移
+    base = 0
+    # 上一次计算行号的位置（buffer 内），与该位置的行号
+    line_pos = 0
+    line_no = 1
+    pos = 0
+    # 当前语句第一个有效字符在 buffer 中的位置
+    start: Optional[int] = None
+    # None / line / block / quote / escape / ident / dollar
+    state: Optional[str] = None
+    depth = 0
+    tag = ''
+    eof = False
+
+    def begin(index: int):
+        nonlocal start
+        if start is None:
+            start = index
+
+    def emit(end: int) -> Statement:
+        nonlocal line_pos, line_no, start
+        line_no += buffer.count('\n', line_pos, start)
+        line_pos = start
+        statement = Statement(buffer[start:end], line_no, base + start)
+        start = None
+        return statement
+
+    while True:
+        need_more = False
+        limit = len(buffer) if eof else len(buffer) - _LOOKAHEAD
+
+        if state is None:
+            match = _SPECIAL.search(buffer, pos)
+            stop = match.start() if match is not None and match.start() < max(limit, 0) else None
+            if start is None:
+                first = _SPACE.search(buffer, pos, stop if stop is not None else max(limit, pos))
+                if first is not None:
+                    begin(first.start())
+            if stop is None:
+                pos = max(pos, limit)
+                need_more = True
+            else:
+                token = match.group()
+                pos = match.end()
+                if token == ';':
+                    if start is not None:
+                        yield emit(pos)
+                elif token == '--':
+                    state = 'line'
+                elif token == '/*':
+                    state = 'block'
+                    depth = 1
+                elif token == "'":
+                    begin(match.start())
+                    prefix = match.start() - 1
+                    escape = prefix >= 0 and buffer[prefix] in 'eE' and \
+                        (prefix == 0 or not _is_word_char(buffer[prefix - 1]))
+                    state = 'escape' if escape else 'quote'
+                elif token == '"':
+                    begin(match.start())
+                    state = 'ident'
+                elif match.start() > 0 and _is_word_char(buffer[match.start() - 1]):
+                    # 标识符中的 $（如 a$b$），不是美元引号
+                    begin(match.start())
+                    pos = match.start() + 1
+                else:
+                    begin(match.start())
+                    state = 'dollar'
+                    tag = token
+        elif state == 'line':
+            end = buffer.find('\n', pos)
+            if end < 0:
+                pos = len(buffer)
+                need_more = True
+            else:
+                pos = end + 1
+                state = None
+        elif state == 'block':
+            match = _BLOCK_COMMENT.search(buffer, pos)
+            if match is None:
+                pos = max(pos, len(buffer) - 1)
+                need_more = True
+            else:
+                pos = match.end()
+                depth += 1 if match.group() == '/*' else -1
+                if depth == 0:
+                    state = None
+        elif state in ('quote', 'ident'):
+            quote = "'" if state == 'quote' else '"'
+            end = buffer.find(quote, pos)
+            if end < 0 or (end + 1 == len(buffer) and not eof):
+                pos = len(buffer) if end < 0 else end
+                need_more = True
+            elif end + 1 < len(buffer) and buffer[end + 1] == quote:
+                pos = end + 2
+            else:
+                pos = end + 1
+                state = None
+        elif state == 'escape':
+            match = _ESCAPE_STRING.search(buffer, pos)
+            if match is None or (match.end() == len(buffer) and not eof):
+                pos = len(buffer) if match is None else match.start()
+                need_more = True
+            elif match.group() == "'" and match.end() < len(buffer) and buffer[match.end()] == "'":
+                pos = match.end() + 1
+            else:
+                pos = match.end()
+                if match.group() == "'":
+                    state = None
+        else:
+            end = buffer.find(tag, pos)
+            if end < 0:
+                pos = max(pos, len(buffer) - len(tag) + 1)
+                need_more = True
+            else:
+                pos = end + len(tag)
+                state = None
+
+        if not need_more:
+            continue
+        if eof:
+            break
+        # 丢弃已经处理完的部分，只保留当前语句
+        keep = min(pos, start) if start is not None else pos
+        line_no += buffer.count('\n', line_pos, keep)
+        line_pos = 0
+        base += keep
+        buffer = buffer[keep:]
+        pos -= keep
+        if start is not None:
+            start -= keep
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+        else:
+            buffer += chunk
+
+    if start is not None:
+        # 文件末尾没有分号的语句（或未闭合的字符串 / 函数体，交给数据库报错）
+        text = buffer[start:].rstrip()
+        if text:
+            yield emit(start + len(text))
+
+
+def read_chunks(stream: TextIO, size: int = READ_SIZE) -> Iterator[str]:
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def split_file(path, encoding: str = 'utf-8') -> Iterator[Statement]:
+    """流式切分 SQL 文件"""
+    with open(path, 'r', encoding=encoding) as stream:
+        yield from split_statements(read_chunks(stream))
+
+
+def split_sql(text: str) -> Iterator[Statement]:
+    """切分内存中的 SQL 文本"""
+    return split_statements([text])
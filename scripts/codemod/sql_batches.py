@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+迁移语句分批与执行
+
+plan_batches 把 codemod/sql.py 切出的语句流按大小和条数分成若干批，每批在一个
+事务中执行，失败时只回滚这一批。迁移文件自己写的 BEGIN ... COMMIT 之间的语句
+不拆开（BEGIN/COMMIT 本身由执行器代替，BEGIN ISOLATION LEVEL ... 之类的事务模式
+改写成批首的 SET TRANSACTION）；以 ROLLBACK / ABORT 结束的事务块整块丢弃，与 psql
+执行原文件的结果相同，事务块之外的 ROLLBACK 本来就不起作用，同样丢弃。
+CREATE INDEX CONCURRENTLY、VACUUM 这类不能放进事务块的语句单独成批、不包事务。
+分批也是流式的，攒满一批就产出。
+
+run_batches 把每批交给执行器并计时。PsqlExecutor 调用 psql 连接本地
+Postgres（例如 supabase start 起的库），不需要安装 Python 驱动。
+"""
+
+import re
+import subprocess
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from codemod.sql import Statement
+
+# 每批最多的字符数与语句数
+DEFAULT_BATCH_SIZE = 256 * 1024
+DEFAULT_BATCH_STATEMENTS = 200
+PSQL_COMMAND = ['psql']
+
+# BEGIN / START TRANSACTION 之后可以跟事务模式：ISOLATION LEVEL ...、READ WRITE / ONLY、[NOT] DEFERRABLE
+_BEGIN = re.compile(r'(?:BEGIN|START\s+TRANSACTION)(?:\s+(?:WORK|TRANSACTION))?'
+                    r'(?P<modes>\s+(?:ISOLATION|READ|NOT|DEFERRABLE)\b[^;]*?)?\s*;?\s*$', re.IGNORECASE)
+# AND CHAIN 结束后立即以相同的事务模式开始新事务；ROLLBACK TO SAVEPOINT / PREPARED 不是事务结束
+_COMMIT = re.compile(r'(?:COMMIT|END)(?:\s+(?:WORK|TRANSACTION))?(?:\s+AND\s+(?P<no>NO\s+)?(?P<chain>CHAIN))?'
+                     r'\s*;?\s*$', re.IGNORECASE)
+_ROLLBACK = re.compile(r'(?:ROLLBACK|ABORT)(?:\s+(?:WORK|TRANSACTION))?(?:\s+AND\s+(?P<no>NO\s+)?(?P<chain>CHAIN))?'
+                       r'\s*;?\s*$', re.IGNORECASE)
+_CONTROLS = (('begin', _BEGIN), ('commit', _COMMIT), ('rollback', _ROLLBACK))
+_NON_TRANSACTIONAL = re.compile(
+    r'(?:VACUUM|CREATE\s+DATABASE|DROP\s+DATABASE|ALTER\s+SYSTEM|CREATE\s+TABLESPACE|DROP\s+TABLESPACE'
+    r'|(?:CREATE\s+(?:UNIQUE\s+)?|DROP\s+|REINDEX\s+(?:\w+\s+)?)INDEX\s+CONCURRENTLY'
+    r'|REINDEX\s+\(?[^;]*\bCONCURRENTLY)\b',
+    re.IGNORECASE)
+
+
+class Batch(NamedTuple):
+    # 从 1 开始
+    index: int
+    statements: List[Statement]
+    # 字符数
+    size: int
+    # False 表示不能放进事务块，逐条直接执行
+    transactional: bool = True
+
+    @property
+    def sql(self) -> str:
+        # 文件末尾没有分号的语句可能以行注释结束，分号另起一行
+        return '\n'.join(statement.text if statement.text.endswith(';') else statement.text + '\n;'
+                         for statement in self.statements) + '\n'
+
+
+class BatchResult(NamedTuple):
+    batch: Batch
+    # 执行耗时（秒）
+    seconds: float
+    error: Optional[str] = None
+
+
+def _transaction_control(statement: Statement):
+    """(类别, 匹配结果)，不是事务控制语句时为 None"""
+    for kind, pattern in _CONTROLS:
+        match = pattern.match(statement.text)
+        if match is not None:
+            return kind, match
+    return None
+
+
+def is_transaction_control(statement: Statement) -> Optional[str]:
+    """BEGIN 类语句返回 'begin'，COMMIT 类返回 'commit'，ROLLBACK 类返回 'rollback'，其他返回 None"""
+    control = _transaction_control(statement)
+    return control[0] if control is not None else None
+
+
+def is_transactional(statement: Statement) -> bool:
+    return _NON_TRANSACTIONAL.match(statement.text) is None
+
+
+def plan_batches(statements: Iterable[Statement], max_size: int = DEFAULT_BATCH_SIZE,
+                 max_statements: int = DEFAULT_BATCH_STATEMENTS) -> Iterator[Batch]:
+    """把语句流分成有大小上限的批次；单条语句超过上限时独占一批"""
+    index = 0
+    current: List[Statement] = []
+    size = 0
+    # 处于文件自己的 BEGIN ... COMMIT 之间
+    explicit = False
+    # 文件的 BEGIN 带的事务模式，改写成事务块第一条语句
+    modes: Optional[Statement] = None
+
+    def flush(transactional: bool = True) -> Iterator[Batch]:
+        nonlocal index, current, size
+        if current:
+            index += 1
+            yield Batch(index, current, size, transactional)
+        current = []
+        size = 0
+
+    def start():
+        nonlocal current, size
+        if modes is not None:
+            current = [modes]
+            size = len(modes.text)
+
+    for statement in statements:
+        control = _transaction_control(statement)
+        if control is not None:
+            kind, match = control
+            if kind == 'begin':
+                yield from flush()
+                explicit = True
+                mode_text = match.group('modes')
+                modes = Statement(f'SET TRANSACTION{mode_text};', statement.line, statement.offset) \
+                    if mode_text else None
+                start()
+                continue
+            if kind == 'commit' or explicit:
+                if kind == 'commit':
+                    yield from flush()
+                else:
+                    # 事务块回滚，其中的语句都不生效
+                    current = []
+                    size = 0
+                explicit = bool(match.group('chain')) and not match.group('no')
+                if explicit:
+                    start()
+                else:
+                    modes = None
+            # 事务块之外的 ROLLBACK 不起作用，不能放进当前批，否则会回滚这一批
+            continue
+        if not is_transactional(statement):
+            yield from flush()
+            current = [statement]
+            size = len(statement.text)
+            yield from flush(transactional=False)
+            continue
+        length = len(statement.text)
+        if current and not explicit and (size + length > max_size or len(current) >= max_statements):
+            yield from flush()
+        current.append(statement)
+        size += length
+    yield from flush()
+
+
+class PsqlExecutor:
+    """通过 psql 执行一批语句；事务批用 --single-transaction，出错即停并回滚"""
+
+    def __init__(self, dsn: str, command: Sequence[str] = PSQL_COMMAND):
+        self.dsn = dsn
+        self.command = list(command)
+
+    def execute(self, batch: Batch):
+        args = self.command + ['-X', '-q', '-v', 'ON_ERROR_STOP=1', '-d', self.dsn]
+        if batch.transactional:
+            args.append('--single-transaction')
+        result = subprocess.run(args, input=batch.sql, capture_output=True, text=True, encoding='utf-8')
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f'psql 退出码 {result.returncode}')
+
+
+def run_batches(batches: Iterable[Batch], executor, stop_on_error: bool = True) -> Iterator[BatchResult]:
+    """逐批执行并计时；stop_on_error 时第一批失败后不再执行后面的批次"""
+    for batch in batches:
+        started = time.perf_counter()
+        try:
+            executor.execute(batch)
+        except Exception as e:
+            yield BatchResult(batch, time.perf_counter() - started, str(e))
+            if stop_on_error:
+                return
+            continue
+        yield BatchResult(batch, time.perf_counter() - started)
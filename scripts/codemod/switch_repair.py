@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+修复删除日志后产生的孤立 switch 语句
+
+日志清理误删函数头后，switch 会直接出现在外层作用域里，
+这里根据 switch 的参数和返回内容补回函数定义。
+"""
+
+import re
+from typing import Tuple
+
+from codemod.lexer import IDENT, Lexed, tokenize_file
+
+
+def switch_body(lexed: Lexed, line_index: int) -> str:
+    """返回第 line_index 行 switch 语句 {...} 中的内容
+
+    用词法分析的括号配对定位，字符串和注释中的花括号不会干扰
+    """
+    line_start = lexed.line_starts[line_index]
+    index = lexed.token_index_at(line_start)
+    tokens = lexed.tokens
+    # 找到本行的 switch 关键字
+    while index < len(tokens) and (tokens[index].start < line_start or lexed.value(tokens[index]) != 'switch'):
+        index += 1
+    if index >= len(tokens) or tokens[index].kind != IDENT:
+        return ''
+    paren = lexed.next_significant(index)
+    close_paren = lexed.matching(tokens[paren].start) if lexed.is_punct(paren, '(') else None
+    if close_paren is None:
+        return ''
+    brace = lexed.next_significant(lexed.token_index_at(close_paren))
+    if not lexed.is_punct(brace, '{'):
+        return ''
+    open_brace = tokens[brace].start
+    close_brace = lexed.matching(open_brace)
+    if close_brace is None:
+        close_brace = len(lexed.text)
+    return lexed.text[open_brace + 1:close_brace]
+
+
+def repair_orphan_switches(content: str, file_path) -> Tuple[str, int]:
+    """为孤立的 switch 补回函数定义，返回 (新内容, 修复处数)"""
+    # 括号全部配对的文件结构完好，不需要修复
+    lexed = tokenize_file(file_path, content)
+    if not lexed.unmatched:
+        return content, 0
+    
+    # 修复孤立的switch语句 - 添加函数定义
+    # 模式：直接出现的switch语句，前面应该有函数定义
+    lines = content.split('\n')
+    fixed_lines = []
+    repaired = 0
+    i = 0
+    
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        
+        # 检测孤立的switch语句（缩进为2或4空格，前一行是}或空行）
+        if i > 0 and re.match(r'^\s{2,4}switch\s*\(', line):
+            prev_line = lines[i-1].strip()
+            # 如果前一行是}或空行，说明这是一个孤立的switch
+            if prev_line == '}' or prev_line == '' or prev_line.startswith('//'):
+                # 需要添加函数定义
+                # 分析switch的参数来推断函数名
+                match = re.search(r'switch\s*\(\s*(\w+)\s*\)', stripped)
+                if match:
+                    param = match.group(1)
+                    indent = re.match(r'^(\s*)', line).group(1)
+                    
+                    # 根据参数推断可能的函数名
+                    if param == 'type':
+                        # 分析switch返回的内容类型
+                        switch_text = switch_body(lexed, i)
+                        if 'i-mdi-' in switch_text or 'icon' in switch_text.lower():
+                            func_name = 'getNotificationIcon'
+                            func_def = f'{indent}const {func_name} = (type: string) => {{'
+                        elif '病假' in switch_text or '事假' in switch_text:
+                            func_name = 'getLeaveTypeName'
+                            func_def = f'{indent}const {func_name} = (type: string) => {{'
+                        else:
+                            func_name = 'getTypeName'
+                            func_def = f'{indent}const {func_name} = (type: string) => {{'
+                    elif param == 'status':
+                        switch_text = switch_body(lexed, i)
+                        if 'text-' in switch_text and 'color' in str(file_path).lower() or 'Color' in switch_text:
+                            func_name = 'getStatusColor'
+                            func_def = f'{indent}const {func_name} = (status: string) => {{'
+                        else:
+                            func_name = 'getStatusText'
+                            func_def = f'{indent}const {func_name} = (status: string) => {{'
+                    elif param == 'dateStr':
+                        func_name = 'formatDate'
+                        func_def = f'{indent}const {func_name} = (dateStr: string) => {{'
+                    else:
+                        func_name = f'handle{param.capitalize()}'
+                        func_def = f'{indent}const {func_name} = ({param}: any) => {{'
+                    
+                    fixed_lines.append(func_def)
+                    repaired += 1
+        
+        fixed_lines.append(line)
+        i += 1
+    
+    content = '\n'.join(fixed_lines)
+    
+    # 修复孤立的}后面跟着代码块的情况
+    # 模式：} 后面直接跟着if/const等，应该是函数结束
+    content = re.sub(
+        r'(\n\s*\})\n(\s{2,4}if\s*\()',
+        r'\1\n\2',
+        content
+    )
+    
+    return content, repaired
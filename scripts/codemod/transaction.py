@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+事务式写回：只写内容变化的文件，临时文件 + 改名，运行结束时统一落盘
+
+Transaction.write 不直接覆盖目标文件：与磁盘上的字节相同时什么都不做，
+否则把新内容写到同目录的临时文件，并把原内容备份进本次运行的日志。
+commit 时先检查目标文件在暂存之后没有被其他进程修改，再对所有临时文件、
+备份和清单做一次集中的 fsync，最后逐个 os.replace 改名。改名之前出任何
+异常（或 Ctrl-C），abort 删除临时文件，目录树保持原样，不会改到一半。
+
+每个脚本的日志保存在 .codemod-journal/<脚本名>/，只保留最近一次运行；
+--rollback 按日志恢复上次运行之前的原内容，不依赖 git。恢复前比较文件
+当前的哈希与上次写入的哈希，之后又被修改过的文件跳过（--force 仍然恢复）；
+日志中只保留被跳过的文件，全部恢复后才删除日志。
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from codemod.cache import content_hash
+from codemod.preview import Preview, preview_from_argv
+
+JOURNAL_DIR = '.codemod-journal'
+JOURNAL_VERSION = 1
+_MANIFEST = 'manifest.json'
+_TEMP_SUFFIX = '.codemod-tmp'
+
+
+class TransactionConflict(Exception):
+    """commit 时发现目标文件在暂存之后被其他进程修改"""
+
+
+class JournalEntry(NamedTuple):
+    # 目标文件的绝对路径
+    path: str
+    # 运行前文件是否存在；不存在时回滚即删除
+    existed: bool
+    # 原内容在日志目录中的备份文件名，existed 为 False 时为空
+    backup: str
+    # 本次写入内容的哈希，回滚时用来判断文件之后是否又被修改
+    after: str
+
+
+class _Staged(NamedTuple):
+    temp: str
+    entry: JournalEntry
+    # 暂存时目标文件的 (mtime_ns, 大小)，不存在时为 None
+    stat: Optional[Tuple[int, int]]
+    # 原内容的哈希，再次写回原内容时取消暂存
+    before: str
+
+
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _fsync_path(path: str, directory: bool = False):
+    flags = os.O_RDONLY | (getattr(os, 'O_DIRECTORY', 0) if directory else 0)
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        # 部分平台不能打开目录
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _display(path: str) -> str:
+    try:
+        return os.path.relpath(path)
+    except ValueError:
+        return path
+
+
+class Transaction:
+    """一次运行中的所有写回，commit 时一起生效"""
+
+    def __init__(self, name: Optional[str] = None, journal_dir: str = JOURNAL_DIR):
+        # name 为 None 时不记录日志（仍然是临时文件 + 改名）
+        self.name = name
+        self.journal_dir = journal_dir
+        self.staged: Dict[str, _Staged] = {}
+        # 内容与磁盘相同而没有写的次数
+        self.unchanged = 0
+        self.committed: List[str] = []
+        self._pending: Optional[str] = None
+        self._backups = 0
+
+    def _pending_dir(self) -> str:
+        if self._pending is None:
+            self._pending = os.path.join(self.journal_dir, f'{self.name}.pending')
+            # 上次运行中途被杀掉留下的未完成日志
+            shutil.rmtree(self._pending, ignore_errors=True)
+            os.makedirs(self._pending)
+        return self._pending
+
+    def write(self, path, data: bytes) -> bool:
+        """暂存 path 的新内容，与当前内容（磁盘上的或本次已暂存的）相同时返回 False"""
+        path = os.path.abspath(str(path))
+        staged = self.staged.get(path)
+        if staged is not None:
+            after = content_hash(data)
+            if after == staged.entry.after:
+                self.unchanged += 1
+                return False
+            if after == staged.before:
+                # 又改回了原内容，等于没有改
+                self._unstage(path)
+                return True
+            self._write_temp(staged.temp, data, path)
+            self.staged[path] = staged._replace(entry=staged.entry._replace(after=after))
+            return True
+
+        stat = _stat(path)
+        original = None
+        if stat is not None:
+            with open(path, 'rb') as f:
+                original = f.read()
+            if original == data:
+                self.unchanged += 1
+                return False
+        backup = ''
+        if original is not None and self.name is not None:
+            self._backups += 1
+            backup = f'{self._backups:06d}'
+            with open(os.path.join(self._pending_dir(), backup), 'wb') as f:
+                f.write(original)
+        temp = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.{os.getpid()}{_TEMP_SUFFIX}')
+        self._write_temp(temp, data, path)
+        entry = JournalEntry(path, original is not None, backup, content_hash(data))
+        before = content_hash(original) if original is not None else ''
+        self.staged[path] = _Staged(temp, entry, stat, before)
+        return True
+
+    @staticmethod
+    def _write_temp(temp: str, data: bytes, path: str):
+        with open(temp, 'wb') as f:
+            f.write(data)
+        try:
+            shutil.copymode(path, temp)
+        except OSError:
+            pass
+
+    def _unstage(self, path: str):
+        staged = self.staged.pop(path)
+        _remove(staged.temp)
+        if staged.entry.backup and self._pending is not None:
+            _remove(os.path.join(self._pending, staged.entry.backup))
+
+    def abort(self):
+        """丢弃所有暂存的写回，目标文件保持原样"""
+        for staged in self.staged.values():
+            _remove(staged.temp)
+        self.staged.clear()
+        if self._pending is not None:
+            shutil.rmtree(self._pending, ignore_errors=True)
+            self._pending = None
+
+    def commit(self) -> List[str]:
+        """检查冲突、集中落盘、改名，返回写入的路径
+
+        有冲突时抛出 TransactionConflict，此时已经 abort，没有写入任何文件。
+        """
+        conflicts = [path for path, staged in self.staged.items() if _stat(path) != staged.stat]
+        if conflicts:
+            self.abort()
+            raise TransactionConflict(f'文件在读入后被修改: {", ".join(_display(p) for p in sorted(conflicts))}')
+        paths = sorted(self.staged)
+        if not paths:
+            self.abort()
+            return []
+
+        barrier = [self.staged[path].temp for path in paths]
+        if self.name is not None:
+            pending = self._pending_dir()
+            manifest = os.path.join(pending, _MANIFEST)
+            with open(manifest, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': JOURNAL_VERSION,
+                    'name': self.name,
+                    'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'entries': [self.staged[path].entry._asdict() for path in paths],
+                }, f, ensure_ascii=False, indent=1)
+            barrier += [os.path.join(pending, entry.backup)
+                        for entry in (self.staged[path].entry for path in paths) if entry.backup]
+            barrier.append(manifest)
+        # 唯一的落盘屏障：改名之前，新内容和日志都已经在磁盘上
+        for path in barrier:
+            _fsync_path(path)
+        directories = sorted({os.path.dirname(path) for path in paths})
+
+        if self.name is not None:
+            final = os.path.join(self.journal_dir, self.name)
+            shutil.rmtree(final, ignore_errors=True)
+            os.replace(self._pending, final)
+            self._pending = None
+            directories.append(self.journal_dir)
+        for path in paths:
+            os.replace(self.staged[path].temp, path)
+        for directory in directories:
+            _fsync_path(directory, directory=True)
+        self.staged.clear()
+        self.committed.extend(paths)
+        return paths
+
+    def finish(self):
+        """提交并打印汇总（与 Preview.finish 对应）"""
+        paths = self.commit()
+        if paths or self.unchanged:
+            note = f'，{self.unchanged} 次写回内容未变已跳过' if self.unchanged else ''
+            undo = f'，撤销用 --rollback' if paths and self.name is not None else ''
+            print(f'💾 写入 {len(paths)} 个文件{note}{undo}')
+
+    def __enter__(self) -> 'Transaction':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.abort()
+        return False
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def atomic_write(path, data: bytes) -> bool:
+    """单个文件的临时文件 + 改名写回，不记日志；内容相同时不写"""
+    transaction = Transaction()
+    if not transaction.write(path, data):
+        return False
+    transaction.commit()
+    return True
+
+
+Writer = Union[Preview, Transaction, None]
+
+
+def write_text(path, content: str, writer: Writer = None,
+               encoding: str = 'utf-8', newline: Optional[str] = None) -> bool:
+    """按 open(path, 'w', encoding=encoding, newline=newline) 的语义写回 content
+
+    writer 为 Preview 时只输出差异，为 Transaction 时暂存到提交，
+    为 None 时立即用临时文件 + 改名写回。与磁盘上的字节相同时不写。
+    返回文件内容是否（将要）改变。
+    """
+    if newline is None:
+        newline = os.linesep
+    text = content.replace('\n', newline) if newline not in ('', '\n') else content
+    data = text.encode(encoding)
+    if isinstance(writer, Preview):
+        try:
+            with open(path, 'rb') as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = b''
+        if current == data:
+            return False
+        return writer.record(path, current.decode(encoding, errors='replace'), text)
+    if writer is None:
+        return atomic_write(path, data)
+    return writer.write(path, data)
+
+
+def script_name(argv0: Optional[str] = None) -> str:
+    """日志名默认取脚本文件名（不含扩展名）"""
+    return Path(sys.argv[0] if argv0 is None else argv0).stem or 'codemod'
+
+
+def writer_from_argv(name: Optional[str] = None, argv: Optional[Sequence[str]] = None) -> Union[Preview, Transaction]:
+    """--preview[=补丁文件] 时返回 Preview，否则返回记录日志的 Transaction"""
+    preview = preview_from_argv(argv)
+    if preview is not None:
+        return preview
+    return Transaction(name or script_name())
+
+
+class RollbackResult(NamedTuple):
+    restored: List[str]
+    # (路径, 原因)
+    skipped: List[Tuple[str, str]]
+
+
+def rollback(name: str, journal_dir: str = JOURNAL_DIR, force: bool = False) -> Optional[RollbackResult]:
+    """按日志恢复 name 上次运行之前的内容，没有日志时返回 None
+
+    恢复本身也是一次事务（临时文件 + 改名）。全部恢复后删除日志；有文件被跳过时
+    日志只保留这些文件的条目和备份，之后仍可用 force=True 恢复。
+    """
+    directory = os.path.join(journal_dir, name)
+    try:
+        with open(os.path.join(directory, _MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    restore = Transaction()
+    removals = []
+    skipped = []
+    remaining = []
+    for item in manifest['entries']:
+        entry = JournalEntry(**item)
+        try:
+            with open(entry.path, 'rb') as f:
+                current = content_hash(f.read())
+        except FileNotFoundError:
+            current = None
+        if current != entry.after and not force:
+            skipped.append((entry.path, '上次运行之后又被修改' if current else '文件已不存在'))
+            remaining.append(item)
+            continue
+        if entry.existed:
+            with open(os.path.join(directory, entry.backup), 'rb') as f:
+                restore.write(entry.path, f.read())
+        elif current is not None:
+            removals.append(entry.path)
+    restored = restore.commit()
+    for path in removals:
+        _remove(path)
+    if not remaining:
+        shutil.rmtree(directory, ignore_errors=True)
+        return RollbackResult(sorted(restored + removals), skipped)
+    # 先把清单换成只含跳过条目的版本，再删除已恢复文件的备份
+    temp = os.path.join(directory, _MANIFEST + _TEMP_SUFFIX)
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(dict(manifest, entries=remaining), f, ensure_ascii=False, indent=1)
+    _fsync_path(temp)
+    os.replace(temp, os.path.join(directory, _MANIFEST))
+    kept = {item['backup'] for item in remaining if item['backup']}
+    for item in manifest['entries']:
+        if item['backup'] and item['backup'] not in kept:
+            _remove(os.path.join(directory, item['backup']))
+    return RollbackResult(sorted(restored + removals), skipped)
+
+
+def rollback_from_argv(name: Optional[str] = None, argv: Optional[Sequence[str]] = None) -> Optional[int]:
+    """有 --rollback 参数时执行回滚并返回退出码，否则返回 None"""
+    argv = sys.argv[1:] if argv is None else argv
+    if '--rollback' not in argv:
+        return None
+    return print_rollback(name or script_name(), force='--force' in argv)
+
+
+def print_rollback(name: str, journal_dir: str = JOURNAL_DIR, force: bool = False) -> int:
+    result = rollback(name, journal_dir, force)
+    if result is None:
+        print(f'ℹ️  没有 {name} 的运行日志，无需回滚')
+        return 0
+    for path in result.restored:
+        print(f'↩️  {_display(path)}')
+    for path, reason in result.skipped:
+        print(f'⚠️  {_display(path)}: {reason}，未恢复（--force 强制恢复）')
+    print(f'✅ 已恢复 {len(result.restored)} 个文件到 {name} 上次运行之前的状态')
+    if result.skipped:
+        print(f'📒 未恢复的 {len(result.skipped)} 个文件仍保留在日志中')
+        return 1
+    return 0
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+修复删除日志后产生的未使用变量
+
+除了按固定模式清理的规则外，fix_reported_unused 按 Biome 报告的位置
+（noUnusedVariables / noUnusedImports）精确修复：未使用的绑定加 _ 前缀，
+未使用的导入从 import 语句中删除。
+"""
+
+import re
+from typing import List, Sequence, Tuple
+
+from codemod.imports import parse_imports
+from codemod.lexer import CLOSE_BRACKETS, IDENT, OPEN_BRACKETS, PUNCT, Lexed, tokenize
+
+
+def fix_unused_callback_params(content: str) -> Tuple[str, int]:
+    """修复回调函数中未使用的参数，返回 (新内容, 修改处数)"""
+    # .subscribe((status) => {}) => .subscribe()
+    content, subscribe_count = re.subn(r'\.subscribe\(\([^)]*\)\s*=>\s*\{\s*\}\)', '.subscribe()', content)
+    
+    # .on(..., (payload) => {}) => .on(..., () => {})  
+    content, payload_count = re.subn(r'\(payload\)\s*=>\s*\{\s*\}', '() => {}', content)
+    
+    return content, subscribe_count + payload_count
+
+
+def fix_unused_destructuring(content: str) -> Tuple[str, int]:
+    """修复解构中未使用的变量，返回 (新内容, 修改行数)"""
+    lines = content.split('\n')
+    result = []
+    changed = 0
+    
+    for line in lines:
+        # const {data} = ... => const {} = ... 或者整行删除
+        if re.search(r'const\s*\{\s*(data|status|payload)\s*\}\s*=', line):
+            changed += 1
+            if 'await' in line:
+                # 改为直接调用
+                line = re.sub(r'const\s*\{\s*(data|status|payload)\s*\}\s*=\s*', '', line)
+            else:
+                continue  # 删除整行
+        
+        # const _formatTime = ... => 删除整个函数定义
+        if re.match(r'\s*const\s+_\w+\s*=', line):
+            # 跳过函数定义直到下一个空行或新函数
+            if '=>' in line or 'function' in line:
+                changed += 1
+                continue
+        
+        result.append(line)
+    
+    return '\n'.join(result), changed
+
+
+def fix_unused_vars(content: str) -> Tuple[str, int]:
+    """依次应用所有未使用变量修复"""
+    content, callback_count = fix_unused_callback_params(content)
+    content, destructuring_count = fix_unused_destructuring(content)
+    return content, callback_count + destructuring_count
+
+
+def _enclosing_opener(lexed: Lexed, index: int) -> str:
+    """index 处 token 所在的最内层括号，顶层返回空串"""
+    tokens = lexed.tokens
+    depth = 0
+    for i in range(index - 1, -1, -1):
+        token = tokens[i]
+        if token.kind != PUNCT:
+            continue
+        value = lexed.value(token)
+        if value in CLOSE_BRACKETS:
+            depth += 1
+        elif value in OPEN_BRACKETS:
+            if depth == 0:
+                return value
+            depth -= 1
+    return ''
+
+
+def _rename_unused(lexed: Lexed, start: int) -> List[Tuple[int, int, str]]:
+    """把 start 处未使用的绑定改成 _ 前缀，对象解构简写 {data} 改成 {data: _data}"""
+    index = lexed.token_index_at(start)
+    if index < 0 or lexed.tokens[index].kind != IDENT or lexed.tokens[index].start != start:
+        return []
+    token = lexed.tokens[index]
+    name = lexed.value(token)
+    if name.startswith('_'):
+        return []
+    prev = lexed.prev_significant(index)
+    following = lexed.next_significant(index)
+    shorthand = ((lexed.is_punct(prev, '{') or lexed.is_punct(prev, ','))
+                 and any(lexed.is_punct(following, p) for p in (',', '}', '='))
+                 and _enclosing_opener(lexed, index) == '{')
+    if shorthand:
+        return [(token.start, token.end, f'{name}: _{name}')]
+    return [(token.start, token.end, f'_{name}')]
+
+
+def _remove_unused_imports(content: str, lexed: Lexed, spans: Sequence[Tuple[int, int]]
+                           ) -> Tuple[List[Tuple[int, int, str]], int]:
+    """按报告位置删除未使用的导入，返回 (编辑列表, 修复处数)"""
+    edits = []
+    fixed = 0
+    for decl in parse_imports(lexed):
+        inside = [(s, e) for s, e in spans if decl.start <= s < decl.end]
+        if not inside:
+            continue
+        whole = any(s == decl.start for s, _ in inside)
+        names = {content[s:e] for s, e in inside}
+        specifiers = [spec for spec in decl.specifiers or () if spec.local not in names]
+        default = None if decl.default in names else decl.default
+        namespace = None if decl.namespace in names else decl.namespace
+        fixed += len(inside)
+        end = decl.end
+        if whole or not (specifiers or default or namespace):
+            # 整条语句删除，连同行尾换行
+            if content.startswith('\r\n', end):
+                end += 2
+            elif content.startswith('\n', end):
+                end += 1
+            edits.append((decl.start, end, ''))
+            continue
+        original = content[decl.start:decl.end]
+        space = ' ' if '{ ' in original else ''
+        clause = []
+        if default:
+            clause.append(default)
+        if namespace:
+            clause.append(f'* as {namespace}')
+        if specifiers:
+            inner = ', '.join(content[spec.start:spec.end] for spec in specifiers)
+            clause.append(f'{{{space}{inner}{space}}}')
+        keyword = 'import type ' if decl.type_only else 'import '
+        semicolon = ';' if original.rstrip().endswith(';') else ''
+        edits.append((decl.start, decl.end,
+                      f'{keyword}{", ".join(clause)} from {decl.quote}{decl.source}{decl.quote}{semicolon}'))
+    return edits, fixed
+
+
+def fix_reported_unused(content: str, unused_variables: Sequence[Tuple[int, int]],
+                        unused_imports: Sequence[Tuple[int, int]] = (), jsx: bool = False) -> Tuple[str, int]:
+    """按诊断位置（字符偏移 (start, end)）修复，返回 (新内容, 修复处数)"""
+    if not unused_variables and not unused_imports:
+        return content, 0
+    lexed = tokenize(content, jsx=jsx)
+    edits, fixed = _remove_unused_imports(content, lexed, unused_imports)
+    removed = [(start, end) for start, end, _ in edits]
+    for start, _ in sorted(set(unused_variables)):
+        if any(s <= start < e for s, e in removed):
+            continue
+        renames = _rename_unused(lexed, start)
+        edits.extend(renames)
+        fixed += len(renames)
+    last = len(content) + 1
+    for start, end, replacement in sorted(edits, reverse=True):
+        # 重叠的编辑只保留靠后的一处
+        if end > last:
+            continue
+        content = content[:start] + replacement + content[end:]
+        last = start
+    return content, fixed
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+监视模式：文件保存后只对变化的文件重跑规则
+
+Linux 上用 inotify（ctypes 调用 libc，不需要第三方包）等待 close_write /
+moved_to 事件；其他平台或 inotify 不可用时退回 stat 轮询。一次保存常常
+产生一串事件（编辑器先写临时文件再改名、格式化工具紧接着再写一次），
+在 debounce 时间内没有新事件后才把这一批文件交给执行器。
+
+进程常驻，规则、Aho-Corasick 自动机和缓存索引只加载一次；
+每批只处理变化的文件，延迟在毫秒级。
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from codemod.cache import FileCache
+from codemod.rules import Rule
+from codemod.runner import EXCLUDE_DIRS, FileResult, iter_source_files, run
+
+# 一批事件结束后等待的秒数
+DEFAULT_DEBOUNCE = 0.2
+# 轮询模式下两次扫描的间隔秒数
+DEFAULT_INTERVAL = 0.5
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_CREATE | _IN_DELETE
+# struct inotify_event 的固定部分：wd, mask, cookie, len
+_EVENT = struct.Struct('iIII')
+
+
+def _iter_dirs(root: str) -> Iterator[str]:
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in EXCLUDE_DIRS]
+        yield dirpath
+
+
+class PollingWatcher:
+    """每隔 interval 秒 stat 一遍目标文件，比较 (mtime, 大小)"""
+
+    name = 'polling'
+
+    def __init__(self, roots: Sequence, suffixes: Sequence[str], interval: float = DEFAULT_INTERVAL):
+        self.roots = list(roots)
+        self.suffixes = tuple(suffixes)
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for path in iter_source_files(self.roots, self.suffixes):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: Optional[float] = None) -> Set[str]:
+        time.sleep(self.interval if timeout is None else timeout)
+        snapshot = self._scan()
+        changed = {path for path, stat in snapshot.items() if self.snapshot.get(path) != stat}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """inotify 监视 roots 下的所有目录，新建的子目录自动加入"""
+
+    name = 'inotify'
+
+    def __init__(self, roots: Sequence, suffixes: Sequence[str]):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify 只在 Linux 上可用')
+        self.suffixes = tuple(suffixes)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        # wd -> 目录
+        self.dirs: Dict[int, str] = {}
+        # 整个目录都在监视范围内的 wd；其余 wd 只为直接指定的文件而监视
+        self.trees: Set[int] = set()
+        self.files: Set[str] = set()
+        try:
+            for root in roots:
+                root = str(root)
+                if os.path.isfile(root):
+                    self.files.add(os.path.normpath(root))
+                    self._add_dir(os.path.dirname(root) or '.', tree=False)
+                else:
+                    for directory in _iter_dirs(root):
+                        self._add_dir(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_dir(self, directory: str, tree: bool = True):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            # ENOSPC 通常是 fs.inotify.max_user_watches 不够
+            raise OSError(ctypes.get_errno(), f'无法监视目录 {directory}')
+        self.dirs[wd] = directory
+        if tree:
+            self.trees.add(wd)
+
+    def _wanted(self, wd: int, path: str) -> bool:
+        if not path.endswith(self.suffixes):
+            return False
+        return wd in self.trees or os.path.normpath(path) in self.files
+
+    def changes(self, timeout: Optional[float] = None) -> Set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+                offset += _EVENT.size + length
+                directory = self.dirs.get(wd)
+                if mask & _IN_Q_OVERFLOW or directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & _IN_ISDIR:
+                    if mask & (_IN_CREATE | _IN_MOVED_TO) and wd in self.trees \
+                            and os.path.basename(path) not in EXCLUDE_DIRS:
+                        # 新目录（或移入的目录）里已有的文件也算变化
+                        for sub in _iter_dirs(path):
+                            self._add_dir(sub)
+                        changed.update(str(p) for p in iter_source_files([path], self.suffixes))
+                elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO) and self._wanted(wd, path):
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def open_watcher(roots: Sequence, suffixes: Sequence[str], poll: bool = False,
+                 interval: float = DEFAULT_INTERVAL):
+    """优先使用 inotify，不可用（非 Linux、监视数量超限等）时退回轮询"""
+    if not poll:
+        try:
+            return InotifyWatcher(roots, suffixes)
+        except (OSError, AttributeError) as e:
+            print(f'ℹ️  inotify 不可用（{e}），改用轮询')
+    return PollingWatcher(roots, suffixes, interval)
+
+
+def debounced(watcher, debounce: float = DEFAULT_DEBOUNCE) -> Iterator[Set[str]]:
+    """等到有变化，再等到 debounce 秒内没有新变化，交出这一批文件"""
+    while True:
+        pending = watcher.changes()
+        if not pending:
+            continue
+        while True:
+            more = watcher.changes(debounce)
+            if not more:
+                break
+            pending |= more
+        yield pending
+
+
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def watch(roots: Sequence, rules: Sequence[Rule], cache: Optional[FileCache] = None,
+          debounce: float = DEFAULT_DEBOUNCE, poll: bool = False, interval: float = DEFAULT_INTERVAL,
+          write: bool = True, max_batches: Optional[int] = None) -> int:
+    """常驻监视 roots，每批只处理变化的文件，返回处理的批数
+
+    每个文件只执行接受其后缀的规则（由 Rule.accepts 决定），规则集与全量
+    运行相同，缓存条目通用。
+
+    规则自己写回的文件会再触发一次事件；写回后记下 stat，下一批中 stat
+    未变的这些文件直接忽略，不会循环处理。
+    """
+    suffixes = sorted({suffix for rule in rules for suffix in rule.suffixes})
+    watcher = open_watcher(roots, suffixes, poll, interval)
+    print(f'👀 监视 {", ".join(str(r) for r in roots)}（{watcher.name}，去抖 {debounce * 1000:.0f}ms），Ctrl-C 退出')
+    written: Dict[str, Tuple[int, int]] = {}
+    count = 0
+    try:
+        for batch in debounced(watcher, debounce):
+            paths = sorted(path for path in batch
+                           if os.path.isfile(path) and written.pop(path, None) != _stat(path))
+            if not paths:
+                continue
+            started = time.perf_counter()
+            results = run(paths, rules, write=write, cache=cache)
+            elapsed = (time.perf_counter() - started) * 1000
+            for result in results:
+                if result.changed:
+                    written[result.path] = _stat(result.path)
+            _print_batch(results, elapsed)
+            count += 1
+            if max_batches is not None and count >= max_batches:
+                break
+    except KeyboardInterrupt:
+        print('\n👋 停止监视')
+    finally:
+        watcher.close()
+    return count
+
+
+def _print_batch(results: List[FileResult], elapsed: float):
+    stamp = time.strftime('%H:%M:%S')
+    changed = [r for r in results if r.changed]
+    for result in changed:
+        detail = ', '.join(f'{name} {count}' for name, count in result.counts.items())
+        print(f'[{stamp}] ✓ {result.path}: {detail}')
+    for result in results:
+        if result.error:
+            print(f'[{stamp}] ✗ {result.path}: {result.error}')
+    print(f'[{stamp}] {len(results)} 个文件，修改 {len(changed)} 个，{elapsed:.1f}ms')
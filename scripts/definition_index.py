@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+查询函数 / 策略 / 视图 / 触发器的历史定义
+
+在 supabase/migrations 和备份目录中按（对象, 规范化内容哈希）索引每条定义，
+标出哪一条最终生效，哪些是重复、被覆盖或对象已删除的死定义。索引缓存在
+.codemod-parse-cache.json 中，文件没变时不重新读取迁移。
+
+用法：
+    python scripts/definition_index.py                      # 各类定义的状态统计和重定义最多的对象
+    python scripts/definition_index.py is_admin is_boss     # 列出这些对象的每条定义及状态
+    python scripts/definition_index.py --files              # 每个文件中的死定义数，按数量排序
+    python scripts/definition_index.py --no-cache
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from codemod.definitions import DEFAULT_ROOTS, KINDS, LIVE, STATUSES, build_definition_index
+
+REPO_ROOT = SCRIPTS_DIR.parent
+
+STATUS_ICONS = {'live': '✅', 'duplicate': '♻️ ', 'superseded': '🪦', 'dropped': '🗑️ '}
+
+
+def print_summary(index, limit: int):
+    counts = index.counts()
+    print(f'{"":10}' + ''.join(f'{status:>12}' for status in STATUSES))
+    for kind in KINDS:
+        print(f'{kind:10}' + ''.join(f'{counts[kind][status]:>12}' for status in STATUSES))
+    print(f'\n🔁 重定义最多的对象:')
+    for (kind, key), count in index.most_redefined(limit):
+        digests = len({d.digest for d in index.by_key[(kind, key)]})
+        live = '生效' if index.live_definition(kind, key) else '已删除'
+        print(f'  {count:4} 次  {digests:3} 种内容  [{kind}] {key}（{live}）')
+
+
+def print_object(index, name: str):
+    objects = index.objects(name)
+    if not objects:
+        print(f'❓ 没有名为 {name} 的定义')
+        return
+    for kind, key in objects:
+        definitions = index.by_key[(kind, key)]
+        live = index.live_definition(kind, key)
+        print(f'\n[{kind}] {key}: {len(definitions)} 条定义，{len({d.digest for d in definitions})} 种内容')
+        for definition in definitions:
+            status = index.status(definition)
+            same = '' if status == LIVE or live is None or definition.digest != live.digest else '  = 生效定义'
+            print(f'  {STATUS_ICONS[status]} {status:10} {definition.digest}  '
+                  f'{os.path.relpath(definition.location, REPO_ROOT)}{same}')
+
+
+def print_files(index):
+    dead = Counter()
+    total = Counter()
+    for definition in index.definitions:
+        total[definition.path] += 1
+        if index.status(definition) != LIVE:
+            dead[definition.path] += 1
+    for path, count in dead.most_common():
+        print(f'  {count:4}/{total[path]:<4} {os.path.relpath(path, REPO_ROOT)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='查询函数 / 策略 / 视图 / 触发器的历史定义')
+    parser.add_argument('names', nargs='*', help='对象名（函数名、策略名、视图名、触发器名）')
+    parser.add_argument('--files', action='store_true', help='按文件统计死定义')
+    parser.add_argument('--top', type=int, default=20, help='统计中列出的重定义对象数（默认 20）')
+    parser.add_argument('--no-cache', action='store_true', help='不读写解析缓存')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    roots = [str(REPO_ROOT / root) for root in DEFAULT_ROOTS]
+    index = build_definition_index(roots, roots[0], use_cache=not args.no_cache,
+                                   cache_file=REPO_ROOT / '.codemod-parse-cache.json')
+    print(f'📚 {len(index.definitions)} 条定义，{len(index.by_key)} 个对象，'
+          f'耗时 {time.perf_counter() - started:.2f}s')
+
+    if args.names:
+        for name in args.names:
+            print_object(index, name)
+    elif args.files:
+        print_files(index)
+    else:
+        print()
+        print_summary(index, args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
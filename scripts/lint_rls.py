@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+检查最终生效的 RLS 策略中的性能问题
+
+按顺序重放 supabase/migrations，只检查最后仍然生效的策略以及它们调用的辅助
+函数，规则见 codemod/rls_lint.py。有问题时退出码为 1，可以放进 CI。
+
+用法：
+    python scripts/lint_rls.py                                  # 各规则的问题数和全部问题
+    python scripts/lint_rls.py --rules unwrapped-call,volatile-helper
+    python scripts/lint_rls.py --table warehouses --summary
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from codemod.rls_lint import RULES, lint_policies
+from codemod.schema import DEFAULT_SCHEMA, MIGRATIONS_DIR, migration_files, replay
+
+REPO_ROOT = SCRIPTS_DIR.parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检查最终生效的 RLS 策略中的性能问题')
+    parser.add_argument('--dir', default=str(REPO_ROOT / MIGRATIONS_DIR), help='迁移目录')
+    parser.add_argument('--rules', help=f'逗号分隔的规则（{",".join(RULES)}），默认全部')
+    parser.add_argument('--table', help='只看这张表（或函数）的问题')
+    parser.add_argument('--summary', action='store_true', help='只输出统计')
+    args = parser.parse_args()
+
+    rules = args.rules.split(',') if args.rules else list(RULES)
+    unknown = [rule for rule in rules if rule not in RULES]
+    if unknown:
+        print(f'❌ 未知规则: {", ".join(unknown)}')
+        return 2
+
+    started = time.perf_counter()
+    schema = replay(migration_files(args.dir))
+    findings = lint_policies(schema, rules)
+    if args.table:
+        table = args.table if '.' in args.table else f'{DEFAULT_SCHEMA}.{args.table}'
+        findings = [finding for finding in findings if finding.table in (table, args.table)]
+    print(f'🔍 {len(schema.policies)} 条生效策略，{len(findings)} 个问题，'
+          f'耗时 {time.perf_counter() - started:.2f}s')
+
+    counts = Counter(finding.rule for finding in findings)
+    for rule in rules:
+        print(f'  {rule:22} {counts[rule]:5}  {RULES[rule]}')
+
+    if not args.summary:
+        for rule in rules:
+            selected = [finding for finding in findings if finding.rule == rule]
+            if not selected:
+                continue
+            print(f'\n[{rule}] {RULES[rule]}')
+            for finding in sorted(selected, key=lambda item: (item.table, item.policy, item.source)):
+                where = f'{finding.table} / {finding.policy}' if finding.policy else finding.table
+                print(f'  {where}: {finding.message}  ({finding.source})')
+    return 1 if findings else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
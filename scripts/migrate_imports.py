@@ -2,7 +2,8 @@
 """
 自动迁移导入语句到模块化导入的脚本
 
-将 `from '@/db/api'` 导入迁移到模块化导入：
+将 `from '@/db/api'` 导入迁移到模块化导入。函数所属模块由 src/db/api
+的导出索引（codemod/api_index.py）自动推出，不再手工维护映射表：
 - 用户管理 → '@/db/api/users'
 - 车辆管理 → '@/db/api/vehicles'
 - 考勤管理 → '@/db/api/attendance'
@@ -15,256 +16,65 @@
 - 工具函数 → '@/db/api/utils'
 """
 
-import re
-import os
+import sys
 from pathlib import Path
-from typing import Dict, List, Set
-
-# 定义函数到模块的映射
-FUNCTION_TO_MODULE = {
-    # 用户管理模块
-    'getCurrentUserProfile': 'users',
-    'getCurrentUserWithRealName': 'users',
-    'getCurrentUserRole': 'users',
-    'getCurrentUserRoleAndTenant': 'users',
-    'getCurrentUserPermissions': 'users',
-    'getAllProfiles': 'users',
-    'getAllUsers': 'users',
-    'getAllDrivers': 'users',
-    'getAllDriversWithRealName': 'users',
-    'getAllDriverIds': 'users',
-    'getAllManagers': 'users',
-    'getAllSuperAdmins': 'users',
-    'getProfileById': 'users',
-    'getUserById': 'users',
-    'getDriverProfiles': 'users',
-    'getManagerProfiles': 'users',
-    'updateProfile': 'users',
-    'updateUserProfile': 'users',
-    'updateUserInfo': 'users',
-    'updateUserRole': 'users',
-    'createUser': 'users',
-    'createDriver': 'users',
-    'resetUserPassword': 'users',
-    'uploadAvatar': 'users',
-    'changePassword': 'users',
-    'submitFeedback': 'users',
-    'getUserFeedbackList': 'users',
-    'getAllFeedbackList': 'users',
-    'updateFeedbackStatus': 'users',
-    'getManagerPermission': 'users',
-    'upsertManagerPermission': 'users',
-    'updateManagerPermissionsEnabled': 'users',
-    'getManagerPermissionsEnabled': 'users',
-    'getManagerWarehouseIds': 'users',
-    'setManagerWarehouses': 'users',
-    'debugAuthStatus': 'users',
-    'deleteTenantWithLog': 'users',
-    'getDatabaseTables': 'users',
-    'getTableColumns': 'users',
-    'getTableConstraints': 'users',
-    
-    # 车辆管理模块
-    'getAllVehiclesWithDrivers': 'vehicles',
-    'getVehicleById': 'vehicles',
-    'getVehicleByPlateNumber': 'vehicles',
-    'getVehiclesByDriverId': 'vehicles',
-    'getDriverVehicles': 'vehicles',
-    'getVehicleWithDriverDetails': 'vehicles',
-    'insertVehicle': 'vehicles',
-    'updateVehicle': 'vehicles',
-    'deleteVehicle': 'vehicles',
-    'returnVehicle': 'vehicles',
-    'getDriverLicense': 'vehicles',
-    'upsertDriverLicense': 'vehicles',
-    'updateDriverLicense': 'vehicles',
-    'deleteDriverLicense': 'vehicles',
-    'getPendingReviewVehicles': 'vehicles',
-    'approveVehicle': 'vehicles',
-    'submitVehicleForReview': 'vehicles',
-    'requireSupplement': 'vehicles',
-    'getRequiredPhotos': 'vehicles',
-    'lockPhoto': 'vehicles',
-    'unlockPhoto': 'vehicles',
-    'lockVehiclePhotos': 'vehicles',
-    'supplementPhoto': 'vehicles',
-    'markPhotoForDeletion': 'vehicles',
-    'getDriverDetailInfo': 'vehicles',
-    'getDriverDisplayName': 'vehicles',
-    'getDriverName': 'vehicles',
-    
-    # 考勤管理模块
-    'createClockIn': 'attendance',
-    'updateClockOut': 'attendance',
-    'getTodayAttendance': 'attendance',
-    'getMonthlyAttendance': 'attendance',
-    'getAllAttendanceRecords': 'attendance',
-    'getAttendanceRecordsByUserAndWarehouse': 'attendance',
-    'getAttendanceRecordsByWarehouse': 'attendance',
-    'getAllAttendanceRules': 'attendance',
-    'getAttendanceRuleByWarehouseId': 'attendance',
-    'createAttendanceRule': 'attendance',
-    'updateAttendanceRule': 'attendance',
-    'deleteAttendanceRule': 'attendance',
-    
-    # 请假管理模块
-    'createLeaveApplication': 'leave',
-    'saveDraftLeaveApplication': 'leave',
-    'submitDraftLeaveApplication': 'leave',
-    'updateDraftLeaveApplication': 'leave',
-    'deleteDraftLeaveApplication': 'leave',
-    'getDraftLeaveApplications': 'leave',
-    'getLeaveApplicationsByUser': 'leave',
-    'getLeaveApplicationsByWarehouse': 'leave',
-    'getAllLeaveApplications': 'leave',
-    'reviewLeaveApplication': 'leave',
-    'validateLeaveApplication': 'leave',
-    'createResignationApplication': 'leave',
-    'saveDraftResignationApplication': 'leave',
-    'submitDraftResignationApplication': 'leave',
-    'updateDraftResignationApplication': 'leave',
-    'deleteDraftResignationApplication': 'leave',
-    'getDraftResignationApplications': 'leave',
-    'getResignationApplicationsByUser': 'leave',
-    'getResignationApplicationsByWarehouse': 'leave',
-    'getAllResignationApplications': 'leave',
-    'reviewResignationApplication': 'leave',
-    'validateResignationDate': 'leave',
-    
-    # 计件管理模块
-    'createPieceWorkRecord': 'piecework',
-    'updatePieceWorkRecord': 'piecework',
-    'deletePieceWorkRecord': 'piecework',
-    'getPieceWorkRecordsByUser': 'piecework',
-    'getPieceWorkRecordsByUserAndWarehouse': 'piecework',
-    'getPieceWorkRecordsByWarehouse': 'piecework',
-    'getAllPieceWorkRecords': 'piecework',
-    'calculatePieceWorkStats': 'piecework',
-    'getAllCategories': 'piecework',
-    'getActiveCategories': 'piecework',
-    'createCategory': 'piecework',
-    'updateCategory': 'piecework',
-    'deleteCategory': 'piecework',
-    'deleteUnusedCategories': 'piecework',
-    'upsertCategoryPrice': 'piecework',
-    'batchUpsertCategoryPrices': 'piecework',
-    'getCategoryPrice': 'piecework',
-    'getCategoryPriceForDriver': 'piecework',
-    'getCategoryPricesByWarehouse': 'piecework',
-    'deleteCategoryPrice': 'piecework',
-    
-    # 仓库管理模块
-    'getAllWarehouses': 'warehouses',
-    'getActiveWarehouses': 'warehouses',
-    'getWarehouseById': 'warehouses',
-    'createWarehouse': 'warehouses',
-    'updateWarehouse': 'warehouses',
-    'deleteWarehouse': 'warehouses',
-    'getWarehouseWithRule': 'warehouses',
-    'getWarehousesWithRules': 'warehouses',
-    'getAllWarehousesWithRules': 'warehouses',
-    'getWarehouseSettings': 'warehouses',
-    'updateWarehouseSettings': 'warehouses',
-    'getWarehouseCategories': 'warehouses',
-    'getWarehouseCategoriesWithDetails': 'warehouses',
-    'setWarehouseCategories': 'warehouses',
-    'getDriverWarehouses': 'warehouses',
-    'getAllDriverWarehouses': 'warehouses',
-    'getDriverWarehouseIds': 'warehouses',
-    'setDriverWarehouses': 'warehouses',
-    'assignWarehouseToDriver': 'warehouses',
-    'removeWarehouseFromDriver': 'warehouses',
-    'getWarehouseAssignmentsByDriver': 'warehouses',
-    'insertWarehouseAssignment': 'warehouses',
-    'deleteWarehouseAssignmentsByDriver': 'warehouses',
-    'getDriversByWarehouse': 'warehouses',
-    'getDriverIdsByWarehouse': 'warehouses',
-    'getManagerWarehouses': 'warehouses',
-    'getWarehouseAssignmentsByManager': 'warehouses',
-    'addManagerWarehouse': 'warehouses',
-    'removeManagerWarehouse': 'warehouses',
-    'insertManagerWarehouseAssignment': 'warehouses',
-    'getWarehouseManager': 'warehouses',
-    'getWarehouseManagers': 'warehouses',
-    
-    # 通知系统模块
-    'getNotificationTemplates': 'notifications',
-    'createNotificationTemplate': 'notifications',
-    'updateNotificationTemplate': 'notifications',
-    'deleteNotificationTemplate': 'notifications',
-    'createNotification': 'notifications',
-    'createNotificationForAllManagers': 'notifications',
-    'createNotificationForAllSuperAdmins': 'notifications',
-    'createNotificationRecord': 'notifications',
-    'createNotificationSendRecord': 'notifications',
-    'sendNotificationToDrivers': 'notifications',
-    'getNotifications': 'notifications',
-    'markNotificationAsRead': 'notifications',
-    'markAllNotificationsAsRead': 'notifications',
-    'deleteNotification': 'notifications',
-    'getUnreadNotificationCount': 'notifications',
-    'getNotificationSendRecords': 'notifications',
-    'getScheduledNotifications': 'notifications',
-    'createScheduledNotification': 'notifications',
-    'updateScheduledNotificationStatus': 'notifications',
-    'getAutoReminderRules': 'notifications',
-    'createAutoReminderRule': 'notifications',
-    'updateAutoReminderRule': 'notifications',
-    'deleteAutoReminderRule': 'notifications',
-    'sendVerificationReminder': 'notifications',
-    
-    # 仪表盘统计模块
-    'getWarehouseDashboardStats': 'dashboard',
-    'getAllWarehousesDashboardStats': 'dashboard',
-    'getDriverStats': 'dashboard',
-    'getManagerStats': 'dashboard',
-    'getSuperAdminStats': 'dashboard',
-    'getDriverAttendanceStats': 'dashboard',
-    'getBatchDriverAttendanceStats': 'dashboard',
-    'getMonthlyLeaveCount': 'dashboard',
-    'getMonthlyPendingLeaveCount': 'dashboard',
-    'getApprovedLeaveForToday': 'dashboard',
-    'getWarehouseDriverCount': 'dashboard',
-    'getWarehouseDataVolume': 'dashboard',
-    'getWarehousesDataVolume': 'dashboard',
-    
-    # 平级账号管理模块
-    'createPeerAccount': 'peer-accounts',
-    'getPeerAccounts': 'peer-accounts',
-    'isPrimaryAccount': 'peer-accounts',
-    
-    # 工具函数模块
-    'getLocalDateString': 'utils',
-    'convertTenantProfileToProfile': 'utils',
-}
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.api_index import default_export_index
+from codemod.edits import Edit, apply_edits, merge_edits
+from codemod.imports import ImportDecl, parse_imports
+from codemod.lexer import CLOSE_BRACKETS, IDENT, OPEN_BRACKETS, PUNCT, tokenize, tokenize_file
+from codemod.preview import Preview
+from codemod.profiling import measure, profiler_from_argv
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+
+API_MODULE = '@/db/api'
+
+
+def module_namespace(module: str) -> str:
+    """模块的命名空间导入名：users -> UsersAPI，peer-accounts -> PeerAccountsAPI"""
+    return ''.join(part.capitalize() for part in module.split('-')) + 'API'
+
+
+def _api_imports(lexed) -> Tuple[List[ImportDecl], Dict[str, str]]:
+    """返回 (从 @/db/api 命名导入的声明, 已有的 @/db/api/<模块> 命名空间导入 {模块: 名字})"""
+    api_imports = []
+    namespaces = {}
+    for decl in parse_imports(lexed):
+        if decl.source == API_MODULE and decl.specifiers is not None and not decl.type_only \
+                and decl.default is None and decl.namespace is None:
+            api_imports.append(decl)
+        elif decl.source.startswith(API_MODULE + '/') and decl.namespace and not decl.type_only:
+            namespaces.setdefault(decl.source[len(API_MODULE) + 1:], decl.namespace)
+    return api_imports, namespaces
 
 
 def extract_imports_from_file(file_path: str) -> List[str]:
-    """从文件中提取所有从 @/db/api 导入的函数"""
+    """从文件中提取所有从 @/db/api 导入的函数（导出名，不含类型导入）"""
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
-    # 匹配所有从 @/db/api 导入的语句
-    pattern = r"import\s+\{([^}]+)\}\s+from\s+['\"]@/db/api['\"]"
-    matches = re.findall(pattern, content)
-    
-    functions = []
-    for match in matches:
-        # 分割函数名，处理多行导入
-        funcs = [f.strip() for f in match.split(',')]
-        functions.extend(funcs)
-    
-    return functions
+    api_imports, _ = _api_imports(tokenize_file(file_path, content))
+    return [spec.imported for decl in api_imports for spec in decl.specifiers if not spec.type_only]
 
 
-def group_functions_by_module(functions: List[str]) -> Dict[str, List[str]]:
+def function_map() -> Dict[str, str]:
+    """函数 -> 模块映射，来自当前目录下 src/db/api 的导出索引"""
+    return default_export_index().function_to_module
+
+
+def group_functions_by_module(functions: List[str],
+                              function_to_module: Optional[Dict[str, str]] = None) -> Dict[str, List[str]]:
     """将函数按模块分组"""
+    function_to_module = function_map() if function_to_module is None else function_to_module
     modules = {}
     unknown_functions = []
     
     for func in functions:
-        if func in FUNCTION_TO_MODULE:
-            module = FUNCTION_TO_MODULE[func]
+        if func in function_to_module:
+            module = function_to_module[func]
             if module not in modules:
                 modules[module] = []
             modules[module].append(func)
@@ -277,104 +87,296 @@ def group_functions_by_module(functions: List[str]) -> Dict[str, List[str]]:
     return modules
 
 
-def generate_new_imports(modules: Dict[str, List[str]]) -> str:
+def generate_new_imports(modules: Dict[str, List[str]], quote: str = "'") -> str:
     """生成新的导入语句"""
     import_lines = []
     
-    for module, functions in sorted(modules.items()):
+    for module in sorted(modules):
         # 使用 import * as 的方式
-        module_name = module.replace('-', '_').title().replace('_', '')
-        if module == 'peer-accounts':
-            module_name = 'PeerAccountsAPI'
-        elif module == 'piecework':
-            module_name = 'PieceworkAPI'
-        else:
-            module_name = f"{module.title()}API"
-        
-        import_lines.append(f"import * as {module_name} from '@/db/api/{module}'")
+        import_lines.append(f"import * as {module_namespace(module)} from {quote}{API_MODULE}/{module}{quote}")
     
     return '\n'.join(import_lines)
 
 
-def replace_function_calls(content: str, modules: Dict[str, List[str]]) -> str:
-    """替换函数调用为模块化调用"""
-    for module, functions in modules.items():
-        module_name = module.replace('-', '_').title().replace('_', '')
-        if module == 'peer-accounts':
-            module_name = 'PeerAccountsAPI'
-        elif module == 'piecework':
-            module_name = 'PieceworkAPI'
-        else:
-            module_name = f"{module.title()}API"
-        
-        for func in functions:
-            # 替换函数调用（确保不是在导入语句中）
-            # 匹配 funcName( 但不匹配 import { funcName }
-            pattern = r'\b' + func + r'\s*\('
-            replacement = f'{module_name}.{func}('
-            content = re.sub(pattern, replacement, content)
-    
-    return content
+class Migration(NamedTuple):
+    content: str
+    # 模块 -> 迁移到该模块的导出名
+    modules: Dict[str, List[str]]
+    # 映射表中没有的导出名（保留在原导入中）
+    unknown: List[str]
+    # 改写的引用处数
+    references: int
+    # 新增的导入语句
+    new_imports: str
+    # 在文件中被重新声明或从导出列表再导出的本地名，非空时文件不做任何改写
+    conflicts: List[str] = []
+
+
+def _enclosing_opener(lexed, index: int) -> int:
+    """index 处 token 所在的最内层括号的下标，不在括号中时返回 -1"""
+    tokens = lexed.tokens
+    index = lexed.prev_significant(index)
+    while index >= 0:
+        token = tokens[index]
+        if token.kind == PUNCT:
+            value = lexed.value(token)
+            if value in CLOSE_BRACKETS:
+                opener = lexed.matching(token.start)
+                if opener is None:
+                    return -1
+                index = lexed.token_index_at(opener)
+            elif value in OPEN_BRACKETS:
+                return index
+        index = lexed.prev_significant(index)
+    return -1
 
 
-def migrate_file(file_path: str, dry_run: bool = False) -> bool:
-    """迁移单个文件的导入语句"""
+_DECLARATION_KEYWORDS = ('let', 'const', 'var', 'function', 'class')
+_CONTROL_KEYWORDS = ('if', 'for', 'while', 'switch', 'with', 'return', 'typeof', 'await')
+
+
+def _is_parameter_list(lexed, opener: int) -> bool:
+    """opener 处的 '(' 是函数参数列表或 catch 子句"""
+    tokens = lexed.tokens
+    close = lexed.matching(tokens[opener].start)
+    if close is None:
+        return False
+    before = lexed.prev_significant(opener)
+    before_value = lexed.value(tokens[before]) if before >= 0 else ''
+    if before_value in ('function', 'catch'):
+        return True
+    if before >= 0 and tokens[before].kind == IDENT:
+        keyword = lexed.prev_significant(before)
+        if keyword >= 0 and lexed.value(tokens[keyword]) == 'function':
+            return True
+    after = lexed.next_significant(lexed.token_index_at(close))
+    if lexed.is_punct(after, '=>'):
+        return True
+    # 类方法 / 对象方法：name(params) {
+    return lexed.is_punct(after, '{') and before >= 0 and tokens[before].kind == IDENT and \
+        before_value not in _CONTROL_KEYWORDS
+
+
+def _is_binding(lexed, index: int) -> bool:
+    """index 处的标识符是声明的名字：变量、函数、类、参数、catch 变量或解构目标"""
+    tokens = lexed.tokens
+    prev = lexed.prev_significant(index)
+    nxt = lexed.next_significant(index)
+    prev_value = lexed.value(tokens[prev]) if prev >= 0 else ''
+    if prev_value in _DECLARATION_KEYWORDS or lexed.is_punct(nxt, '=>'):
+        return True
+    if prev_value not in ('(', '[', '{', ',', '...', ':'):
+        return False
+    # 沿解构模式向外找到声明关键字或参数列表
+    opener = _enclosing_opener(lexed, index)
+    in_object = opener >= 0 and lexed.is_punct(opener, '{')
+    if in_object and lexed.is_punct(nxt, ':'):
+        # { key: target } 中的键
+        return False
+    if prev_value == ':' and not in_object:
+        # 参数的类型注解
+        return False
+    while opener >= 0:
+        value = lexed.value(tokens[opener])
+        if value == '(':
+            return _is_parameter_list(lexed, opener)
+        before = lexed.prev_significant(opener)
+        before_value = lexed.value(tokens[before]) if before >= 0 else ''
+        if before_value in ('let', 'const', 'var'):
+            return True
+        if before_value not in ('{', '[', ',', ':', '...', '('):
+            return False
+        opener = _enclosing_opener(lexed, opener)
+    return False
+
+
+def _in_export_list(lexed, index: int) -> bool:
+    """index 处的标识符在 export { ... } 列表中"""
+    opener = _enclosing_opener(lexed, index)
+    if opener < 0 or not lexed.is_punct(opener, '{'):
+        return False
+    before = lexed.prev_significant(opener)
+    return before >= 0 and lexed.value(lexed.tokens[before]) == 'export'
+
+
+def _reference_edit(lexed, index: int, target: str) -> Optional[str]:
+    """index 处的标识符引用应改写成的文本，不是对导入绑定的引用时返回 None"""
+    tokens = lexed.tokens
+    prev = lexed.prev_significant(index)
+    nxt = lexed.next_significant(index)
+    prev_value = lexed.value(tokens[prev]) if prev >= 0 else ''
+    next_value = lexed.value(tokens[nxt]) if nxt < len(tokens) else ''
+    # obj.name / obj?.name 是属性访问
+    if prev_value in ('.', '?.'):
+        return None
+    # JSX 属性名或赋值目标
+    if next_value == '=':
+        return None
+    if prev_value in ('{', ','):
+        # { name: ... } 中的键，或 (a, name: Type) 参数声明
+        if next_value == ':':
+            return None
+        # { name } 简写属性
+        if next_value in ('}', ','):
+            opener = _enclosing_opener(lexed, index)
+            if opener >= 0 and lexed.is_punct(opener, '{'):
+                return f'{lexed.value(tokens[index])}: {target}'
+    return target
+
+
+def migrate_source(content: str, jsx: bool = False, function_to_module: Dict[str, str] = None) -> Migration:
+    """一次扫描完成单个文件的迁移
+
+    词法分析给出标识符边界，字符串、模板字符串文本、注释和 import 语句中的
+    同名文本不会被改写；每个标识符在导入绑定表中查一次，与导入的函数数量无关。
+    `foo as bar` 形式的别名按本地名 bar 查找引用，改写为 <模块>API.foo。
+    导入的名字在文件中又被声明（参数、局部变量、解构、catch 变量等，可能遮蔽导入），
+    或出现在 export { ... } 列表中时，单靠词法无法安全改写：整个文件保持原样，
+    这些名字记入 conflicts，交给人工处理。
+    映射中没有的名字（包括多个模块同名定义的函数）和类型导入保留在原来的
+    @/db/api 导入中。function_to_module 默认取 src/db/api 的导出索引。
+    """
+    if API_MODULE not in content:
+        return Migration(content, {}, [], 0, '')
+    lexed = tokenize(content, jsx=jsx)
+    api_imports, namespaces = _api_imports(lexed)
+    if api_imports and function_to_module is None:
+        function_to_module = function_map()
+    if not api_imports:
+        return Migration(content, {}, [], 0, '')
+
+    # 本地绑定名 -> 改写目标
+    bindings: Dict[str, str] = {}
+    modules: Dict[str, List[str]] = {}
+    unknown: List[str] = []
+    # 每条旧导入替换成的文本
+    replacements: List[str] = []
+    for decl in api_imports:
+        kept = []
+        for spec in decl.specifiers:
+            module = None if spec.type_only else function_to_module.get(spec.imported)
+            if module is None:
+                if not spec.type_only:
+                    unknown.append(spec.imported)
+                kept.append(content[spec.start:spec.end])
+                continue
+            namespace = namespaces.get(module) or module_namespace(module)
+            bindings[spec.local] = f'{namespace}.{spec.imported}'
+            functions = modules.setdefault(module, [])
+            if spec.imported not in functions:
+                functions.append(spec.imported)
+        replacements.append(
+            f'import {{{", ".join(kept)}}} from {decl.quote}{API_MODULE}{decl.quote}' if kept else '')
+
+    if not modules:
+        return Migration(content, {}, unknown, 0, '')
+
+    quote = api_imports[0].quote
+    new_imports = generate_new_imports({m: f for m, f in modules.items() if m not in namespaces}, quote)
+    if new_imports:
+        replacements[0] = new_imports + ('\n' + replacements[0] if replacements[0] else '')
+
+    # 编辑列表：对原始内容的 (起始, 结束, 新文本)，合并时检查重叠
+    edits = []
+    for decl, replacement in zip(api_imports, replacements):
+        start, end = decl.start, decl.end
+        if not replacement:
+            # 整行删除（连同换行）
+            line_end = lexed.line_end(end)
+            if content[end:line_end].strip() == '' and content[lexed.line_start(start):start].strip() == '':
+                start = lexed.line_start(start)
+                end = min(line_end + 1, len(content))
+        edits.append(Edit(start, end, replacement, 'import'))
+
+    import_spans = [(decl.start, decl.end) for decl in parse_imports(lexed)]
+    span_index = 0
+    references = 0
+    conflicts: List[str] = []
+    for index, token in enumerate(lexed.tokens):
+        if token.kind != IDENT:
+            continue
+        # 跳过所有 import 语句内部
+        while span_index < len(import_spans) and import_spans[span_index][1] <= token.start:
+            span_index += 1
+        if span_index < len(import_spans) and import_spans[span_index][0] <= token.start:
+            continue
+        name = content[token.start:token.end]
+        target = bindings.get(name)
+        if target is None:
+            continue
+        if lexed.is_punct(lexed.prev_significant(index), '.') or lexed.is_punct(lexed.prev_significant(index), '?.'):
+            continue
+        if _is_binding(lexed, index) or _in_export_list(lexed, index):
+            if name not in conflicts:
+                conflicts.append(name)
+            continue
+        text = _reference_edit(lexed, index, target)
+        if text is not None:
+            edits.append(Edit(token.start, token.end, text, 'reference'))
+            references += 1
+
+    if conflicts:
+        return Migration(content, {}, unknown, 0, '', conflicts)
+    accepted, overlaps = merge_edits(edits)
+    if overlaps:
+        conflict = overlaps[0]
+        raise ValueError(f'改写位置重叠: {conflict.edit.start}..{conflict.edit.end} '
+                         f'与 {conflict.winner.start}..{conflict.winner.end}')
+    return Migration(apply_edits(content, accepted), modules, unknown, references, new_imports)
+
+
+def migrate_file(file_path: str, dry_run: bool = False, profiler=None, content: Optional[str] = None,
+                 writer=None) -> bool:
+    """迁移单个文件的导入语句
+
+    content 为调用方已经读取的文件内容，传入时不再重复读取；
+    传入 profiler 时记录迁移的耗时、改写处数和内存；
+    writer 为 Preview 时不写文件、输出迁移的差异，为 Transaction 时暂存到运行结束一起提交
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if content is None:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
         
         # 检查是否有需要迁移的导入
-        if "from '@/db/api'" not in content:
+        if not has_api_import(content):
             return False
         
         print(f"\n📄 处理文件: {file_path}")
         
-        # 提取导入的函数
-        functions = extract_imports_from_file(file_path)
-        if not functions:
-            print("  ℹ️  没有找到需要迁移的函数")
-            return False
+        jsx = Path(file_path).suffix in ('.tsx', '.jsx')
+        migration = None
         
-        print(f"  📦 找到 {len(functions)} 个函数")
+        def apply(text):
+            nonlocal migration
+            migration = migrate_source(text, jsx)
+            return migration.content, migration.references
         
-        # 按模块分组
-        modules = group_functions_by_module(functions)
-        print(f"  🗂️  分组到 {len(modules)} 个模块")
-        
-        # 生成新的导入语句
-        new_imports = generate_new_imports(modules)
-        
-        # 删除旧的导入语句
-        old_import_pattern = r"import\s+\{[^}]+\}\s+from\s+['\"]@/db/api['\"]"
-        content = re.sub(old_import_pattern, '', content)
-        
-        # 在第一个 import 语句之后插入新的导入
-        # 找到第一个 import 语句的位置
-        first_import_match = re.search(r'^import\s+', content, re.MULTILINE)
-        if first_import_match:
-            # 找到这一行的结束位置
-            line_end = content.find('\n', first_import_match.start())
-            if line_end != -1:
-                # 在这一行之后插入新的导入
-                content = content[:line_end+1] + new_imports + '\n' + content[line_end+1:]
-        else:
-            # 如果没有找到 import 语句，在文件开头插入
-            content = new_imports + '\n\n' + content
+        content, _ = measure(profiler, 'migrate-imports', file_path, apply, content)
         
-        # 替换函数调用
-        content = replace_function_calls(content, modules)
+        if migration.conflicts:
+            print(f"  ⚠️  跳过：{', '.join(migration.conflicts)} 在文件中被重新声明或再导出，需要手工迁移")
+            return False
+        if migration.unknown:
+            print(f"  ⚠️  未知函数（保留原导入）: {', '.join(migration.unknown)}")
+        if not migration.modules:
+            print("  ℹ️  没有找到需要迁移的函数")
+            return False
         
-        # 清理多余的空行
-        content = re.sub(r'\n{3,}', '\n\n', content)
+        functions = sum(len(names) for names in migration.modules.values())
+        print(f"  📦 找到 {functions} 个函数，改写 {migration.references} 处引用")
+        print(f"  🗂️  分组到 {len(migration.modules)} 个模块")
         
-        if not dry_run:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+        preview = isinstance(writer, Preview)
+        if not dry_run and not preview:
+            write_text(file_path, content, writer)
             print("  ✅ 迁移完成")
         else:
             print("  🔍 预览模式（未写入文件）")
             print("\n新的导入语句:")
-            print(new_imports)
+            print(migration.new_imports)
+            if preview:
+                write_text(file_path, content, writer)
         
         return True
         
@@ -383,36 +385,59 @@ def migrate_file(file_path: str, dry_run: bool = False) -> bool:
         return False
 
 
+def has_api_import(content: str) -> bool:
+    """快速判断是否可能有从 @/db/api 的导入（单双引号都算）"""
+    return f"'{API_MODULE}'" in content or f'"{API_MODULE}"' in content
+
+
 def main():
     """主函数"""
-    import sys
-    
-    dry_run = '--dry-run' in sys.argv
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        sys.exit(code)
+    # --preview[=补丁文件] 输出完整差异；--dry-run 同样输出差异但不保存补丁
+    writer = writer_from_argv()
+    if '--dry-run' in sys.argv and not isinstance(writer, Preview):
+        writer = Preview()
+    dry_run = isinstance(writer, Preview)
+    # --profile[=文件] 记录每个文件迁移的耗时和内存
+    profiler = profiler_from_argv()
     
     # 获取所有需要迁移的文件
     src_dir = Path('src/pages')
     files = list(src_dir.rglob('*.tsx')) + list(src_dir.rglob('*.ts'))
     
-    # 过滤出包含 @/db/api 导入的文件
+    # 过滤出包含 @/db/api 导入的文件，内容只读一次，迁移时直接使用
     files_to_migrate = []
     for file in files:
         with open(file, 'r', encoding='utf-8') as f:
-            if "from '@/db/api'" in f.read():
-                files_to_migrate.append(str(file))
+            content = f.read()
+        if has_api_import(content):
+            files_to_migrate.append((str(file), content))
     
     print(f"🚀 开始迁移导入语句")
     print(f"📊 找到 {len(files_to_migrate)} 个需要迁移的文件")
     
+    index = default_export_index()
+    print(f"🗂️  导出索引: {len(index.modules)} 个模块，{len(index.function_to_module)} 个函数"
+          f"（分词 {index.parsed} 个文件，其余命中缓存）")
+    for name, modules in sorted(index.ambiguous.items()):
+        print(f"  ⚠️  {name} 在多个模块中定义（{', '.join(modules)}），不自动迁移")
+    
     if dry_run:
         print("🔍 预览模式（不会修改文件）")
     
     success_count = 0
-    for file_path in files_to_migrate:
-        if migrate_file(file_path, dry_run):
-            success_count += 1
+    with writer:
+        for file_path, content in files_to_migrate:
+            if migrate_file(file_path, dry_run, profiler, content, writer):
+                success_count += 1
     
     print(f"\n✅ 迁移完成！")
     print(f"📊 成功迁移 {success_count}/{len(files_to_migrate)} 个文件")
+    if profiler is not None:
+        profiler.finish()
 
 
 if __name__ == '__main__':
@@ -5,12 +5,19 @@
 
 import os
 import re
+import sys
 from pathlib import Path
 
-def find_profiles_usage():
-    """查找所有使用 profiles 的地方"""
-    api_file = Path('/workspace/app-7cdqf07mbu9t/src/db/api.ts')
-    
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.functions import build_function_index
+from codemod.lexer import tokenize_file
+
+API_FILE = Path('src/db/api.ts')
+API_DIR = Path('src/db/api')
+
+def find_profiles_usage(api_file=API_FILE):
+    """查找 api_file 中所有使用 profiles 的地方，返回数量"""
     with open(api_file, 'r', encoding='utf-8') as f:
         content = f.read()
     
@@ -18,7 +25,13 @@ def find_profiles_usage():
     pattern = r"\.from\(['\"]profiles['\"]\)"
     matches = list(re.finditer(pattern, content))
     
-    print(f"🔍 在 api.ts 中找到 {len(matches)} 处使用 profiles 视图的地方\n")
+    if not matches:
+        return 0
+    print(f"🔍 在 {api_file} 中找到 {len(matches)} 处使用 profiles 视图的地方\n")
+    
+    # 分词一次，函数区间索引一次建好，每个匹配只做一次二分查找
+    lexed = tokenize_file(api_file, content)
+    functions = build_function_index(lexed)
     
     # 显示每个匹配的上下文
     for i, match in enumerate(matches, 1):
@@ -26,12 +39,10 @@ def find_profiles_usage():
         end = min(len(content), match.end() + 100)
         context = content[start:end]
         
-        # 找到函数名
-        func_match = re.search(r'export\s+(?:async\s+)?function\s+(\w+)', content[:match.start()][::-1])
-        func_name = func_match.group(1)[::-1] if func_match else "未知函数"
+        func_name = functions.describe(match.start()) or "未知函数"
         
         print(f"📍 匹配 {i}: 函数 {func_name}")
-        print(f"   位置: {match.start()}")
+        print(f"   位置: {api_file}:{lexed.line_of(match.start()) + 1}")
         print(f"   上下文: ...{context}...")
         print()
     
@@ -44,7 +55,9 @@ def main():
     print()
     
     # 查找使用情况
-    count = find_profiles_usage()
+    # api.ts 已拆分为 src/db/api/ 下的模块，一并检查
+    files = [API_FILE] + sorted(API_DIR.glob('*.ts'))
+    count = sum(find_profiles_usage(path) for path in files if path.exists())
     
     print("=" * 80)
     print(f"📊 总结: 找到 {count} 处需要迁移的地方")
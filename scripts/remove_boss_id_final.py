@@ -4,8 +4,14 @@ git config --global user.name  boss_id 引用
 """
 
 import re
+import sys
+from pathlib import Path
 
-def process_file(file_path):
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+
+def process_file(file_path, writer=None):
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
@@ -35,10 +41,15 @@ def process_file(file_path):
     print(f'处理后大小: {new_length} 字符')
     print(f'删除了: {original_length - new_length} 字符')
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    write_text(file_path, content, writer)
     
     print('✅ 最后一步处理完成')
 
 if __name__ == '__main__':
-    process_file('src/db/api.ts')
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        sys.exit(code)
+    # --preview[=补丁文件] 只输出差异，不写文件
+    with writer_from_argv() as writer:
+        process_file('src/db/api.ts', writer)
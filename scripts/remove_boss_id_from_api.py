@@ -5,53 +5,76 @@
 
 import re
 import sys
+from pathlib import Path
 
-def remove_boss_id_patterns(content):
-    """删除 boss_id 相关的代码模式"""
-    
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.profiling import profiler_from_argv
+from codemod.regex_rules import RegexRule, RegexRuleEngine
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+
+# 替换规则，加载时会检查回溯风险，执行时每条规则有时间预算；
+# 同一阶段的规则匹配同一份内容，依赖前面删除结果的清理规则放在阶段 1
+BOSS_ID_RULES = [
     # 1. 删除获取 boss_id 的代码块
     # 匹配从 "获取当前用户的 boss_id" 注释到 boss_id 检查的整个代码块
-    pattern1 = r"// \d+\. 获取当前用户的 boss_id\s+const \{data: profile\}.*?\.maybeSingle\(\)\s+if \(!profile\?\.boss_id\) \{[^}]+\}"
-    content = re.sub(pattern1, '', content, flags=re.DOTALL)
+    RegexRule('boss-id-fetch-block',
+              r"// \d+\. 获取当前用户的 boss_id\s+const \{data: profile\}.*?\.maybeSingle\(\)\s+if \(!profile\?\.boss_id\) \{[^}]+\}",
+              '', re.DOTALL),
     
     # 2. 删除单独的 boss_id 查询
-    pattern2 = r"const \{data: profile\} = await supabase\s+\.from\('profiles'\)\s+\.select\('boss_id'\)\s+\.eq\('id', user\.id\)\s+\.maybeSingle\(\)\s+if \(!profile\?\.boss_id\) \{[^}]+return[^}]+\}"
-    content = re.sub(pattern2, '', content, flags=re.DOTALL)
+    RegexRule('boss-id-query',
+              r"const \{data: profile\} = await supabase\s+\.from\('profiles'\)\s+\.select\('boss_id'\)\s+\.eq\('id', user\.id\)\s+\.maybeSingle\(\)\s+if \(!profile\?\.boss_id\) \{[^}]+return[^}]+\}",
+              '', re.DOTALL),
     
     # 3. 删除 .eq('boss_id', ...) 过滤条件
-    content = re.sub(r"\.eq\('boss_id',\s*[^)]+\)\s*", '', content)
+    RegexRule('boss-id-eq-filter', r"\.eq\('boss_id',\s*[^)]+\)\s*", ''),
     
     # 4. 删除插入数据时的 boss_id 字段
-    content = re.sub(r",?\s*boss_id:\s*profile\.boss_id", '', content)
-    content = re.sub(r",?\s*boss_id:\s*bossId", '', content)
-    content = re.sub(r",?\s*boss_id:\s*[^,\n}]+", '', content)
+    RegexRule('boss-id-field-profile', r",?\s*boss_id:\s*profile\.boss_id", ''),
+    RegexRule('boss-id-field-var', r",?\s*boss_id:\s*bossId", ''),
+    RegexRule('boss-id-field', r",?\s*boss_id:\s*[^,\n}]+", ''),
     
     # 5. 删除 boss_id 相关的注释
-    content = re.sub(r"//.*boss_id.*\n", '', content, flags=re.IGNORECASE)
-    content = re.sub(r"/\*.*?boss_id.*?\*/", '', content, flags=re.DOTALL | re.IGNORECASE)
+    RegexRule('boss-id-line-comment', r"//.*boss_id.*\n", '', re.IGNORECASE),
+    RegexRule('boss-id-block-comment', r"/\*.*?boss_id.*?\*/", '', re.DOTALL | re.IGNORECASE),
     
     # 6. 删除 getCurrentUserBossId 函数调用
-    content = re.sub(r"const\s+\w*[Bb]oss[Ii]d\w*\s*=\s*await\s+getCurrentUserBossId\([^)]*\)\s*", '', content)
+    RegexRule('boss-id-helper-call',
+              r"const\s+\w*[Bb]oss[Ii]d\w*\s*=\s*await\s+getCurrentUserBossId\([^)]*\)\s*", ''),
     
     # 7. 删除 getCurrentUserBossId 函数定义
-    pattern7 = r"export\s+async\s+function\s+getCurrentUserBossId\s*\([^)]*\)[^{]*\{[^}]*\}"
-    content = re.sub(pattern7, '', content, flags=re.DOTALL)
+    RegexRule('boss-id-helper-definition',
+              r"export\s+async\s+function\s+getCurrentUserBossId\s*\([^)]*\)[^{]*\{[^}]*\}",
+              '', re.DOTALL),
     
     # 8. 清理多余的空行
-    content = re.sub(r'\n{3,}', '\n\n', content)
+    RegexRule('blank-lines', r'\n{3,}', '\n\n', phase=1),
     
     # 9. 清理多余的逗号
-    content = re.sub(r',\s*,', ',', content)
-    content = re.sub(r',\s*\)', ')', content)
-    content = re.sub(r',\s*\}', '}', content)
-    
-    return content
+    RegexRule('double-comma', r',\s*,', ',', phase=1),
+    RegexRule('trailing-comma-paren', r',\s*\)', ')', phase=1),
+    RegexRule('trailing-comma-brace', r',\s*\}', '}', phase=1),
+]
+
+def remove_boss_id_patterns(content, engine, file_path=''):
+    """删除 boss_id 相关的代码模式，返回 (新内容, 每条规则的执行结果)"""
+    return engine.apply(content, file_path)
 
 def main():
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        sys.exit(code)
     file_path = 'src/db/api.ts'
     
     print(f'正在处理文件: {file_path}')
     
+    # --profile[=文件] 记录每条规则的耗时和内存
+    profiler = profiler_from_argv()
+    # --preview[=补丁文件] 只输出差异，不写文件
+    writer = writer_from_argv()
+    engine = RegexRuleEngine(BOSS_ID_RULES, profiler=profiler)
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
@@ -59,22 +82,28 @@ def main():
         original_length = len(content)
         print(f'原始文件大小: {original_length} 字符')
         
-        # 应用所有替换模式
-        content = remove_boss_id_patterns(content)
+        # 应用所有替换模式（超时的规则会被跳过并报告）
+        content, outcomes = remove_boss_id_patterns(content, engine, file_path)
+        engine.print_report(outcomes)
         
         new_length = len(content)
         print(f'处理后文件大小: {new_length} 字符')
         print(f'删除了 {original_length - new_length} 字符')
         
         # 写回文件
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        with writer:
+            write_text(file_path, content, writer)
         
         print('✅ 文件处理完成')
         
     except Exception as e:
         print(f'❌ 处理文件失败: {e}')
         sys.exit(1)
+    finally:
+        engine.close()
+    
+    if profiler is not None:
+        profiler.finish()
 
 if __name__ == '__main__':
     main()
@@ -4,8 +4,14 @@
 """
 
 import re
+import sys
+from pathlib import Path
 
-def process_behavior_tracker(file_path):
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+
+def process_behavior_tracker(file_path, writer=None):
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
@@ -29,12 +35,11 @@ def process_behavior_tracker(file_path):
     # 删除 boss_id 过滤
     content = re.sub(r"\.eq\('boss_id', this\.bossId\)\s*", "", content)
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    write_text(file_path, content, writer)
     
     print(f'✅ 处理完成: {file_path}')
 
-def process_performance_monitor(file_path):
+def process_performance_monitor(file_path, writer=None):
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
@@ -48,11 +53,16 @@ def process_performance_monitor(file_path):
     content = re.sub(r",?\s*boss_id: this\.bossId,?\s*", "", content)
     content = re.sub(r"\.eq\('boss_id', this\.bossId\)\s*", "", content)
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    write_text(file_path, content, writer)
     
     print(f'✅ 处理完成: {file_path}')
 
 if __name__ == '__main__':
-    process_behavior_tracker('src/utils/behaviorTracker.ts')
-    process_performance_monitor('src/utils/performanceMonitor.ts')
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        sys.exit(code)
+    # --preview[=补丁文件] 只输出差异；两个文件在同一个事务中，要么都改要么都不改
+    with writer_from_argv() as writer:
+        process_behavior_tracker('src/utils/behaviorTracker.ts', writer)
+        process_performance_monitor('src/utils/performanceMonitor.ts', writer)
@@ -4,27 +4,46 @@ git config --global user.name  boss_id 的代码块
 """
 
 import re
+import sys
+from pathlib import Path
 
-def process_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    original_length = len(content)
-    
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.profiling import profiler_from_argv
+from codemod.regex_rules import RegexRule, RegexRuleEngine
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+
+STEP2_RULES = [
     # 1. 删除获取 boss_id 的代码块（包括注释、查询和检查）
     # 模式：// 2. 获取当前用户的 boss_id ... if (!profile?.boss_id) { ... }
-    pattern1 = r"// \d+\. 获取当前用户的 boss_id\s+const \{data: profile\} = await supabase\.from\('profiles'\)\.select\('id'\)\.eq\('id', user\.id\)\.maybeSingle\(\)\s+if \(!profile\?\.boss_id\) \{[^}]+\}"
-    content = re.sub(pattern1, '', content, flags=re.DOTALL)
+    RegexRule('boss-id-fetch-block',
+              r"// \d+\. 获取当前用户的 boss_id\s+const \{data: profile\} = await supabase\.from\('profiles'\)\.select\('id'\)\.eq\('id', user\.id\)\.maybeSingle\(\)\s+if \(!profile\?\.boss_id\) \{[^}]+\}",
+              '', re.DOTALL),
     
     # 2. 删除类似的模式但没有注释的
-    pattern2 = r"const \{data: profile\} = await supabase\.from\('profiles'\)\.select\('id'\)\.eq\('id', user\.id\)\.maybeSingle\(\)\s+if \(!profile\?\.boss_id\) \{[^}]+\}"
-    content = re.sub(pattern2, '', content, flags=re.DOTALL)
+    RegexRule('boss-id-query',
+              r"const \{data: profile\} = await supabase\.from\('profiles'\)\.select\('id'\)\.eq\('id', user\.id\)\.maybeSingle\(\)\s+if \(!profile\?\.boss_id\) \{[^}]+\}",
+              '', re.DOTALL),
     
     # 3. 删除 boss_id 相关的注释
-    content = re.sub(r"// .*?boss_id.*?\n", '', content, flags=re.IGNORECASE)
+    RegexRule('boss-id-comment', r"// .*?boss_id.*?\n", '', re.IGNORECASE),
     
     # 4. 删除多余的空行
-    content = re.sub(r'\n{3,}', '\n\n', content)
+    RegexRule('blank-lines', r'\n{3,}', '\n\n', phase=1),
+]
+
+def process_file(file_path, profiler=None, writer=None):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    original_length = len(content)
+    
+    engine = RegexRuleEngine(STEP2_RULES, profiler=profiler)
+    try:
+        content, outcomes = engine.apply(content, file_path)
+    finally:
+        engine.close()
+    engine.print_report(outcomes)
     
     new_length = len(content)
     
@@ -32,10 +51,19 @@ def process_file(file_path):
     print(f'处理后大小: {new_length} 字符')
     print(f'删除了: {original_length - new_length} 字符')
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    write_text(file_path, content, writer)
     
     print('✅ 第二步处理完成')
 
 if __name__ == '__main__':
-    process_file('src/db/api.ts')
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        sys.exit(code)
+    # --profile[=文件] 记录每条规则的耗时和内存
+    profiler = profiler_from_argv()
+    # --preview[=补丁文件] 只输出差异，不写文件
+    with writer_from_argv() as writer:
+        process_file('src/db/api.ts', profiler, writer)
+    if profiler is not None:
+        profiler.finish()
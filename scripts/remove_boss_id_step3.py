@@ -4,42 +4,62 @@ git config --global user.name  boss_id 引用
 """
 
 import re
+import sys
+from pathlib import Path
 
-def process_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    original_length = len(content)
-    
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.profiling import profiler_from_argv
+from codemod.regex_rules import RegexRule, RegexRuleEngine
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+
+STEP3_RULES = [
     # 1. 删除 select 中的 boss_id 字段
-    content = re.sub(r"\.select\('boss_id,\s*([^']+)'\)", r".select('\1')", content)
-    content = re.sub(r"\.select\('([^']+),\s*boss_id'\)", r".select('\1')", content)
-    content = re.sub(r"\.select\('boss_id'\)", ".select('id')", content)
+    RegexRule('select-boss-id-first', r"\.select\('boss_id,\s*([^']+)'\)", r".select('\1')"),
+    RegexRule('select-boss-id-last', r"\.select\('([^']+),\s*boss_id'\)", r".select('\1')"),
+    RegexRule('select-boss-id-only', r"\.select\('boss_id'\)", ".select('id')"),
     
     # 2. 删除 boss_id 比较逻辑
     # 删除整个 if 语句块：if (xxx.boss_id !== yyy.boss_id) { ... }
-    pattern1 = r"if \([a-zA-Z_][a-zA-Z0-9_]*\.boss_id !== [a-zA-Z_][a-zA-Z0-9_]*\.boss_id\) \{[^}]+\}"
-    content = re.sub(pattern1, '', content, flags=re.DOTALL)
+    RegexRule('boss-id-compare-block',
+              r"if \([a-zA-Z_][a-zA-Z0-9_]*\.boss_id !== [a-zA-Z_][a-zA-Z0-9_]*\.boss_id\) \{[^}]+\}",
+              '', re.DOTALL),
     
     # 3. 删除 boss_id 赋值语句
-    content = re.sub(r"[a-zA-Z_][a-zA-Z0-9_]*\.boss_id\s*=\s*[^;\n]+[;\n]", '', content)
+    RegexRule('boss-id-assignment', r"[a-zA-Z_][a-zA-Z0-9_]*\.boss_id\s*=\s*[^;\n]+[;\n]", ''),
     
     # 4. 删除包含 boss_id 的 console.log
-    content = re.sub(r"console\.log\([^)]*boss_id[^)]*\)\s*", '', content, flags=re.IGNORECASE)
-    content = re.sub(r"console\.error\([^)]*boss_id[^)]*\)\s*", '', content, flags=re.IGNORECASE)
+    RegexRule('boss-id-console-log', r"console\.log\([^)]*boss_id[^)]*\)\s*", '', re.IGNORECASE),
+    RegexRule('boss-id-console-error', r"console\.error\([^)]*boss_id[^)]*\)\s*", '', re.IGNORECASE),
     
     # 5. 删除 boss_id 变量声明
-    content = re.sub(r"const\s+[a-zA-Z_][a-zA-Z0-9_]*boss_id[a-zA-Z0-9_]*\s*=\s*[^;\n]+[;\n]", '', content, flags=re.IGNORECASE)
-    content = re.sub(r"let\s+[a-zA-Z_][a-zA-Z0-9_]*boss_id[a-zA-Z0-9_]*\s*=\s*[^;\n]+[;\n]", '', content, flags=re.IGNORECASE)
+    RegexRule('boss-id-const',
+              r"const\s+[a-zA-Z_][a-zA-Z0-9_]*boss_id[a-zA-Z0-9_]*\s*=\s*[^;\n]+[;\n]", '', re.IGNORECASE),
+    RegexRule('boss-id-let',
+              r"let\s+[a-zA-Z_][a-zA-Z0-9_]*boss_id[a-zA-Z0-9_]*\s*=\s*[^;\n]+[;\n]", '', re.IGNORECASE),
     
     # 6. 删除对象中的 boss_id 属性
-    content = re.sub(r",?\s*boss_id:\s*[^,\n}]+", '', content)
-    content = re.sub(r",?\s*[a-zA-Z_][a-zA-Z0-9_]*_boss_id:\s*[^,\n}]+", '', content)
+    RegexRule('boss-id-field', r",?\s*boss_id:\s*[^,\n}]+", ''),
+    RegexRule('prefixed-boss-id-field', r",?\s*[a-zA-Z_][a-zA-Z0-9_]*_boss_id:\s*[^,\n}]+", ''),
     
     # 7. 清理多余的逗号和空行
-    content = re.sub(r',\s*\)', ')', content)
-    content = re.sub(r',\s*\}', '}', content)
-    content = re.sub(r'\n{3,}', '\n\n', content)
+    RegexRule('trailing-comma-paren', r',\s*\)', ')', phase=1),
+    RegexRule('trailing-comma-brace', r',\s*\}', '}', phase=1),
+    RegexRule('blank-lines', r'\n{3,}', '\n\n', phase=1),
+]
+
+def process_file(file_path, profiler=None, writer=None):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    original_length = len(content)
+    
+    engine = RegexRuleEngine(STEP3_RULES, profiler=profiler)
+    try:
+        content, outcomes = engine.apply(content, file_path)
+    finally:
+        engine.close()
+    engine.print_report(outcomes)
     
     new_length = len(content)
     
@@ -47,10 +67,19 @@ def process_file(file_path):
     print(f'处理后大小: {new_length} 字符')
     print(f'删除了: {original_length - new_length} 字符')
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    write_text(file_path, content, writer)
     
     print('✅ 第三步处理完成')
 
 if __name__ == '__main__':
-    process_file('src/db/api.ts')
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        sys.exit(code)
+    # --profile[=文件] 记录每条规则的耗时和内存
+    profiler = profiler_from_argv()
+    # --preview[=补丁文件] 只输出差异，不写文件
+    with writer_from_argv() as writer:
+        process_file('src/db/api.ts', profiler, writer)
+    if profiler is not None:
+        profiler.finish()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+一次遍历执行多条改写规则
+
+替代依次运行 clean_logs.py、fix_unused_vars.py、fix_syntax_errors.py、
+fix_encoding_全局.py：每个文件只读一次、写一次。
+
+用法：
+    python scripts/run_codemods.py                     # 对 src 执行默认规则（不含 unused-vars）
+    python scripts/run_codemods.py --rules logs,encoding src/pages
+    python scripts/run_codemods.py --jobs 8            # 8 个进程并行
+    python scripts/run_codemods.py --no-cache          # 忽略缓存重新检查
+    python scripts/run_codemods.py --profile           # 按规则、按文件剖析耗时和内存
+    python scripts/run_codemods.py --watch             # 先全量执行一遍，之后文件保存时只处理变化的文件
+    python scripts/run_codemods.py --pipeline          # 逐条规则处理整棵树，每步校验，失败时全部回滚
+    python scripts/run_codemods.py --preview=fix.patch # 不写文件，输出差异并保存为可 git apply 的补丁
+    python scripts/run_codemods.py --rollback          # 恢复上次运行之前的文件内容
+    python scripts/run_codemods.py --list              # 列出可用规则
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.cache import CACHE_FILE, FileCache
+from codemod.preview import Preview
+from codemod.profiling import DEFAULT_TOP, PROFILE_FILE, Profiler
+from codemod.rules import RULES, get_rules
+from codemod.runner import print_report, run, run_pipeline
+from codemod.transaction import Transaction, print_rollback
+from codemod.watch import DEFAULT_DEBOUNCE, DEFAULT_INTERVAL, watch
+
+
+JOURNAL_NAME = 'run_codemods'
+
+
+def run_pipeline_mode(paths, rules, preview=None, transaction=None):
+    print(f'🚀 流水线: {" → ".join(rule.name for rule in rules)}')
+    result, overlay = run_pipeline(paths, rules, preview=preview, transaction=transaction)
+    if not result.ok:
+        stage, path, reason = result.failure
+        print(f'❌ 阶段 {stage} 在 {path} 上校验失败：{reason}')
+        print(f'↩️  已回滚全部阶段，没有写入任何文件（读取 {overlay.reads} 个文件）')
+        return 1
+    for path, counts in sorted(result.counts.items()):
+        detail = ', '.join(f'{name} {count}' for name, count in counts.items())
+        print(f'✓ {path}: {detail}')
+    print(f'📊 读取 {overlay.reads} 个文件，写入 {overlay.writes} 个')
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='一次遍历执行多条改写规则')
+    parser.add_argument('paths', nargs='*', default=['src'], help='要处理的目录或文件（默认 src）')
+    parser.add_argument('--rules', help='逗号分隔的规则名，默认为全部默认规则，按注册顺序执行')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='并行进程数，0 表示使用全部 CPU 核心（默认 1）')
+    parser.add_argument('--no-cache', action='store_true', help='忽略缓存，重新检查所有文件')
+    parser.add_argument('--cache-file', default=CACHE_FILE, help=f'缓存索引文件（默认 {CACHE_FILE}）')
+    parser.add_argument('--profile', nargs='?', const=PROFILE_FILE, metavar='FILE',
+                        help=f'记录每条规则在每个文件上的耗时、匹配数、改动字节和峰值内存，'
+                             f'导出为 JSON（默认 {PROFILE_FILE}）')
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP, metavar='N',
+                        help=f'剖析结束时列出的热点条数（默认 {DEFAULT_TOP}）')
+    parser.add_argument('--watch', action='store_true', help='执行后常驻监视，文件保存时只对变化的文件重跑规则')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE * 1000, metavar='MS',
+                        help=f'监视模式下一批事件结束后等待的毫秒数（默认 {DEFAULT_DEBOUNCE * 1000:.0f}）')
+    parser.add_argument('--poll', action='store_true', help='监视模式不用 inotify，改用 stat 轮询')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL * 1000, metavar='MS',
+                        help=f'轮询间隔毫秒数（默认 {DEFAULT_INTERVAL * 1000:.0f}）')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='按规则分阶段在内存中处理全部文件，每个阶段后校验括号配对，'
+                             '任一文件失败时整条链回滚，成功后每个文件只写一次')
+    parser.add_argument('--preview', nargs='?', const='', metavar='PATCH',
+                        help='不写任何文件，把将要做的修改输出为统一差异；给出 PATCH 时同时写成'
+                             '可以 git apply 的补丁文件')
+    parser.add_argument('--rollback', action='store_true',
+                        help='按日志把上次运行改写的文件恢复成运行之前的内容，之后又被修改过的文件跳过')
+    parser.add_argument('--force', action='store_true', help='与 --rollback 一起使用，之后被修改过的文件也恢复')
+    parser.add_argument('--list', action='store_true', help='列出可用规则')
+    args = parser.parse_args()
+    if args.preview is not None and args.watch:
+        parser.error('--preview 不能与 --watch 同时使用')
+
+    if args.rollback:
+        return print_rollback(JOURNAL_NAME, force=args.force)
+
+    if args.list:
+        for rule in RULES.values():
+            mark = '' if rule.default else '（需用 --rules 指定）'
+            print(f'{rule.name:15} {rule.description}{mark}')
+            if rule.exclude:
+                print(f'{"":15} 不处理: {", ".join(rule.exclude)}')
+        return 0
+
+    try:
+        rules = get_rules(args.rules.split(',') if args.rules else None)
+    except KeyError as e:
+        print(f'❌ {e.args[0]}')
+        return 2
+
+    preview = Preview(args.preview or None) if args.preview is not None else None
+    # 所有写回暂存在事务中，结束时一起改名生效，并记录日志供 --rollback 使用
+    transaction = Transaction(JOURNAL_NAME) if preview is None else None
+    if args.pipeline:
+        with preview or transaction:
+            return run_pipeline_mode(args.paths, rules, preview, transaction)
+
+    jobs = args.jobs or os.cpu_count() or 1
+    print(f'🚀 执行规则: {", ".join(rule.name for rule in rules)}（{jobs} 个进程）')
+    cache = None if args.no_cache else FileCache(args.cache_file)
+    profiler = Profiler(args.profile, args.profile_top).start() if args.profile else None
+    with preview or transaction:
+        results = run(args.paths, rules, jobs=jobs, cache=cache, profiler=profiler, preview=preview,
+                      transaction=transaction)
+        print_report(results, rules)
+    if profiler is not None:
+        profiler.finish()
+    if args.watch:
+        watch(args.paths, rules, cache, args.debounce / 1000, args.poll, args.interval / 1000)
+        return 0
+    return 1 if any(r.error for r in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
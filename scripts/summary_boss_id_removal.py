@@ -1,35 +1,65 @@
 #!/usr/bin/env python3
 """
  boss_id 删除工作
+
+用法：
+    python scripts/summary_boss_id_removal.py               # 统计 boss_id / bossId 的剩余引用
+    python scripts/summary_boss_id_removal.py --files       # 列出每个文件的引用及所在函数
+    python scripts/summary_boss_id_removal.py tenant_id     # 统计其他标识符 / 列名
 """
 
-import subprocess
-import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from codemod.functions import build_function_index
+from codemod.lexer import tokenize_file
+from codemod.references import scan_references
+
+DEFAULT_SYMBOLS = ['boss_id', 'bossId']
 
-def count_boss_id_references():
-    """统计 boss_id 引用数量"""
-    try:
-        result = subprocess.run(
-            ['grep', '-r', 'boss_id\\|bossId', 'src', '--include=*.ts', '--include=*.tsx'],
-            capture_output=True,
-            text=True,
-            cwd='/workspace/app-7cdqf07mbu9t'
-        )
-        lines = result.stdout.strip().split('\n') if result.stdout.strip() else []
-        return len(lines)
-    except Exception as e:
-        print(f'错误: {e}')
-        return 0
+def count_boss_id_references(symbols=None):
+    """统计引用：src 与 supabase/migrations 中每个文件、每个符号的出现次数
+
+    与原来的 grep 一样按子串匹配，结果按文件指纹缓存，第二次运行只做 stat
+    """
+    return scan_references(symbols or DEFAULT_SYMBOLS, substring=True)
+
+def print_file_references(report):
+    """逐个文件列出引用；TS 文件标出每处命中所在的函数"""
+    for item in report.files:
+        detail = ', '.join(f'{symbol} {count}' for symbol, count in item.counts.items())
+        print(f'  - {item.path}: {detail}')
+        if not item.path.endswith(('.ts', '.tsx')):
+            continue
+        lexed = tokenize_file(item.path)
+        functions = build_function_index(lexed)
+        for line in item.lines:
+            start = lexed.line_starts[line - 1]
+            text = lexed.text[start:lexed.line_end(start)]
+            name = functions.describe(start + len(text) - len(text.lstrip()))
+            print(f'      {line}: {name or "（顶层）"}')
 
 def main():
     print('=' * 80)
     print('boss_id 删除工作总结')
     print('=' * 80)
     
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
     # 统计当前引用数量
-    current_count = count_boss_id_references()
+    report = count_boss_id_references(args)
+    current_count = report.line_count('src')
+    
+    print(f'\n✅ 当前 {" / ".join(report.symbols)} 引用数量: {current_count}（src 中命中的行数）')
+    for symbol, total in report.totals().items():
+        print(f'  - {symbol}: {total} 处')
+    print(f'  - supabase/migrations 中命中 {report.line_count("supabase")} 行')
+    print(f'  （扫描 {report.scanned} 个文件，其中 {report.parsed} 个重新读取）')
     
-    print(f'\n✅ 当前 boss_id 引用数量: {current_count}')
+    if '--files' in sys.argv:
+        print('\n🔎 引用所在文件:')
+        print_file_references(report)
     
     # 列出已删除的文件
     deleted_files = [
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+缺失索引建议：部分索引的覆盖判断、索引重名
+
+带 WHERE 的部分索引只覆盖部分行，不算作覆盖索引，也不算唯一键；条件只是
+“首列 IS NOT NULL”的部分索引可用于按非 NULL 值等值查找首列和外键查找。
+建议的索引名与已有索引重名时改名保留。
+
+用法：
+    python -m pytest -q scripts/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from codemod.index_advisor import EQUALITY, SORT, CallSite, ColumnUse, IndexAdvisor
+from codemod.schema import Schema
+from codemod.sql import split_sql
+
+
+def replay_sql(text: str) -> Schema:
+    schema = Schema()
+    for statement in split_sql(text):
+        schema.apply(statement)
+    return schema
+
+
+def site(table: str, *columns: str, kind: str = EQUALITY, method: str = 'eq') -> CallSite:
+    return CallSite(table, 'api.ts', 1, tuple(ColumnUse(column, kind, 1, method) for column in columns))
+
+
+class PartialIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = replay_sql("""
+            create table t (id int primary key, a int, b int, c int);
+            create unique index t_a on t (a) where b is not null;
+            create index t_b on t (b) include (c);
+            create index t_c on t (c) WHERE c > 0;
+        """)
+
+    def test_partial_flag(self):
+        flags = {key: index.partial for key, index in self.schema.indexes.items()}
+        self.assertEqual(flags, {'public.t_a': True, 'public.t_b': False, 'public.t_c': True})
+
+    def test_partial_indexes_do_not_cover(self):
+        self.assertEqual(sorted(self.schema.index_keys('public.t')), [('b',), ('id',)])
+
+    def test_partial_unique_index_is_not_unique_key(self):
+        advisor = IndexAdvisor(self.schema, [site('public.t', 'a', 'c')])
+        suggested = sorted(item.columns for item in advisor.suggestions())
+        self.assertEqual(suggested, [('a',), ('c',)])
+
+
+
+class NotNullPartialIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = replay_sql("""
+            create table u (id int primary key);
+            create table t (id int primary key, owner int references u (id), b int, c int);
+            create index t_owner on t (owner) where owner is not null;
+            create index t_b on t (b) where (b IS NOT NULL);
+            create index t_c on t (c) where b is not null;
+        """)
+
+    def suggested(self, *sites):
+        return sorted(item.columns for item in IndexAdvisor(self.schema, sites).suggestions())
+
+    def test_not_null_only(self):
+        flags = {key: index.not_null_only for key, index in self.schema.indexes.items()}
+        self.assertEqual(flags, {'public.t_owner': True, 'public.t_b': True, 'public.t_c': False})
+
+    def test_covers_lookups_only(self):
+        self.assertEqual(sorted(self.schema.index_keys('public.t')), [('id',)])
+        self.assertEqual(sorted(self.schema.index_keys('public.t', lookup=True)), [('b',), ('id',), ('owner',)])
+
+    def test_covers_foreign_key(self):
+        self.assertEqual(list(IndexAdvisor(self.schema, []).uncovered_foreign_keys()), [])
+
+    def test_covers_equality(self):
+        self.assertEqual(self.suggested(site('public.t', 'owner', 'b', 'c')), [('c',)])
+
+    def test_is_null_and_sort_not_covered(self):
+        self.assertEqual(self.suggested(site('public.t', 'b', method='is')), [('b',)])
+        self.assertEqual(self.suggested(site('public.t', 'b', kind=SORT, method='order')), [('b',)])
+
+
+class NameCollisionTest(unittest.TestCase):
+
+    def test_colliding_name_is_renamed(self):
+        schema = replay_sql("""
+            create table t (id int primary key, a int, b int);
+            create index idx_t_a on t (b);
+            create index idx_t_a_2 on t (b, id);
+        """)
+        suggestions = IndexAdvisor(schema, [site('public.t', 'a')]).suggestions()
+        self.assertEqual([(item.columns, item.default_name, item.name) for item in suggestions],
+                         [(('a',), 'idx_t_a', 'idx_t_a_3')])
+        self.assertIn('EXISTS idx_t_a_3 ON', suggestions[0].to_sql())
+
+
+if __name__ == '__main__':
+    unittest.main()
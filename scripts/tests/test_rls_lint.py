@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+RLS 策略检查：未包成 (select ...) 的调用
+
+辅助函数调用报出之后，其参数里的 auth.uid() 等调用随外层一起只求值一次，
+不再单独报；参数引用了行内列的外层调用不能包起来，里面的调用照常报。
+
+用法：
+    python -m pytest -q scripts/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from codemod.rls_lint import RlsLinter
+from codemod.schema import Schema
+from codemod.sql import split_sql
+
+
+def unwrapped(text: str):
+    schema = Schema()
+    for statement in split_sql(text):
+        schema.apply(statement)
+    return sorted(finding.message.split(' ')[0] for finding in RlsLinter(schema).lint(['unwrapped-call']))
+
+
+SCHEMA = """
+    create table t (id int primary key, owner uuid);
+    create function is_admin(uid uuid) returns boolean language sql stable as $$ select true $$;
+    create function is_owner(uid uuid, row_owner uuid) returns boolean language sql stable as $$ select uid = row_owner $$;
+"""
+
+
+class NestedCallTest(unittest.TestCase):
+
+    def test_inner_call_not_reported_twice(self):
+        found = unwrapped(SCHEMA + 'create policy p on t using (is_admin(auth.uid()));')
+        self.assertEqual(found, ['is_admin(auth.uid())'])
+
+    def test_row_dependent_outer_call(self):
+        found = unwrapped(SCHEMA + 'create policy p on t using (is_owner(auth.uid(), owner));')
+        self.assertEqual(found, ['auth.uid()'])
+
+    def test_wrapped_outer_call(self):
+        self.assertEqual(unwrapped(SCHEMA + 'create policy p on t using ((select is_admin(auth.uid())));'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
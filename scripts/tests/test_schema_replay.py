@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+迁移重放：关键 DDL 语义与 Postgres 一致
+
+每个用例是一小段迁移，断言重放后的结构与在 Postgres 中执行的结果相同：
+DROP ... CASCADE 的连带删除、函数重载按参数类型区分、IF NOT EXISTS 不覆盖
+已有对象、表和列改名后索引/约束/外键/策略跟着走、键列不存在的索引被跳过、
+“已存在则跳过”的 DO 块按顶层语句执行。最后对全部迁移做一次 squash 自检：重放输出的
+基线得到逐字相同的 SQL，且引用的类型和表在基线中都有定义。
+
+用法：
+    python -m pytest -q scripts/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from codemod.schema import MIGRATIONS_DIR, Schema, migration_files, replay
+from codemod.sql import split_sql
+
+MIGRATIONS = SCRIPTS_DIR.parent / MIGRATIONS_DIR
+
+
+def replay_sql(text: str) -> Schema:
+    schema = Schema()
+    for statement in split_sql(text):
+        schema.apply(statement)
+    return schema
+
+
+class DropCascadeTest(unittest.TestCase):
+
+    def test_drop_table_cascade(self):
+        schema = replay_sql("""
+            create table a (id uuid primary key);
+            create table b (id uuid primary key, a_id uuid references a(id));
+            create index b_a on b (a_id);
+            create index a_id on a (id);
+            create view v as select * from a;
+            alter table a enable row level security;
+            create policy p on a for select using (true);
+            create function f() returns trigger language plpgsql as $$ begin return new; end $$;
+            create trigger t before insert on a for each row execute function f();
+            drop table a cascade;
+        """)
+        self.assertEqual(list(schema.tables), ['public.b'])
+        # 指向 a 的外键被删，b 上的索引保留
+        self.assertEqual(list(schema.tables['public.b'].constraints), ['b_pkey'])
+        self.assertEqual(list(schema.indexes), ['public.b_a'])
+        self.assertEqual(schema.views, {})
+        self.assertEqual(schema.policies, {})
+        self.assertEqual(schema.triggers, {})
+        # 触发器函数本身不依赖表，仍然存在
+        self.assertEqual(list(schema.functions), ['public.f()'])
+
+    def test_drop_function_cascade(self):
+        schema = replay_sql("""
+            create table a (id uuid primary key, owner uuid);
+            create function is_owner(x uuid) returns boolean language sql as $$ select true $$;
+            alter table a enable row level security;
+            create policy p on a for select using (is_owner(owner));
+            create function f() returns trigger language plpgsql as $$ begin return new; end $$;
+            create trigger t before insert on a for each row execute function f();
+            drop function is_owner(uuid) cascade;
+            drop function f cascade;
+        """)
+        self.assertEqual(schema.functions, {})
+        self.assertEqual(schema.policies, {})
+        self.assertEqual(schema.triggers, {})
+        self.assertIn('public.a', schema.tables)
+
+
+class OverloadTest(unittest.TestCase):
+
+    def test_overloads_are_distinct(self):
+        schema = replay_sql("""
+            create function g(x int) returns int language sql as $$ select x $$;
+            create function g(x text) returns text language sql as $$ select x $$;
+        """)
+        self.assertEqual(sorted(schema.functions), ['public.g(integer)', 'public.g(text)'])
+
+    def test_replace_matches_normalized_types(self):
+        # int 与 integer 是同一类型，参数名不参与签名
+        schema = replay_sql("""
+            create function g(x int) returns int language sql as $$ select x $$;
+            create function g(x text) returns text language sql as $$ select x $$;
+            create or replace function g(y integer) returns int language sql as $$ select y + 1 $$;
+        """)
+        self.assertEqual(sorted(schema.functions), ['public.g(integer)', 'public.g(text)'])
+        self.assertIn('y + 1', schema.functions['public.g(integer)'].text)
+
+    def test_drop_one_overload(self):
+        schema = replay_sql("""
+            create function g(x int) returns int language sql as $$ select x $$;
+            create function g(x text) returns text language sql as $$ select x $$;
+            drop function g(text);
+            drop function if exists g(character varying);
+        """)
+        self.assertEqual(list(schema.functions), ['public.g(integer)'])
+
+
+class IfNotExistsTest(unittest.TestCase):
+
+    def test_existing_objects_are_kept(self):
+        schema = replay_sql("""
+            create table if not exists c (id int);
+            create table if not exists c (id int, extra text);
+            create index if not exists c_i on c (id);
+            create index if not exists c_i on c (id) where id > 0;
+            alter table c add column if not exists id text;
+            create extension if not exists pgcrypto;
+            create extension if not exists pgcrypto;
+        """)
+        table = schema.tables['public.c']
+        self.assertEqual(list(table.columns), ['id'])
+        self.assertEqual(table.columns['id'].type, 'int')
+        self.assertEqual(schema.indexes['public.c_i'].tail, '')
+        self.assertEqual(list(schema.extensions), ['pgcrypto'])
+        self.assertEqual(schema.skipped, [])
+
+
+class RenameTest(unittest.TestCase):
+
+    def test_rename_table_and_column(self):
+        schema = replay_sql("""
+            create table a (id uuid primary key, email text unique);
+            create table b (id int, a_id uuid references a(id));
+            alter table a enable row level security;
+            create policy p on a for select using (true);
+            create index a_email on a (email);
+            alter table a rename to accounts;
+            alter table accounts rename column email to mail;
+        """)
+        self.assertEqual(sorted(schema.tables), ['public.accounts', 'public.b'])
+        accounts = schema.tables['public.accounts']
+        self.assertEqual(list(accounts.columns), ['id', 'mail'])
+        # Postgres 改名不改约束名，只改约束里的列
+        self.assertEqual(accounts.constraints['a_email_key'].columns, ('mail',))
+        foreign = schema.tables['public.b'].constraints['b_a_id_fkey']
+        self.assertEqual(foreign.target, 'public.accounts')
+        index = schema.indexes['public.a_email']
+        self.assertEqual((index.table, index.columns), ('public.accounts', ('mail',)))
+        self.assertEqual(list(schema.policies), ['public.accounts:p'])
+
+
+class OrphanIndexTest(unittest.TestCase):
+    """键列此时不在表中的 CREATE INDEX 在 Postgres 中会失败，记为 orphan，不进入基线"""
+
+    def test_index_on_missing_column_is_skipped(self):
+        schema = replay_sql("""
+            create table t (id int primary key, a int);
+            create index t_a on t (a);
+            create index t_missing on t (missing);
+            create index t_expr on t (lower(missing));
+        """)
+        self.assertEqual(sorted(schema.indexes), ['public.t_a', 'public.t_expr'])
+        self.assertEqual([(item.category, 'missing' in item.summary) for item in schema.skipped],
+                         [('orphan', True)])
+        baseline = schema.to_sql()
+        self.assertNotIn('t_missing', baseline)
+        self.assertIn('CREATE INDEX t_a ON t (a);', baseline)
+
+    def test_index_after_column_is_added(self):
+        schema = replay_sql("""
+            create table t (id int primary key);
+            create index t_early on t (a);
+            alter table t add column a int;
+            create index t_late on t (a);
+        """)
+        self.assertEqual(list(schema.indexes), ['public.t_late'])
+
+
+class GuardedDoBlockTest(unittest.TestCase):
+    """只是“已存在则跳过”地建对象的 DO 块按顶层语句重放"""
+
+    def test_duplicate_object_wrapper(self):
+        schema = replay_sql("""
+            DO $$ BEGIN
+              CREATE TYPE driver_type AS ENUM ('pure', 'with_vehicle');
+            EXCEPTION
+              WHEN duplicate_object THEN null;
+            END $$;
+            DO $$ BEGIN
+              CREATE TYPE driver_type AS ENUM ('other');
+            EXCEPTION
+              WHEN duplicate_object THEN null;
+            END $$;
+            create table users (id uuid primary key, driver_type driver_type);
+        """)
+        self.assertEqual(schema.types['public.driver_type'].labels, ("'pure'", "'with_vehicle'"))
+        self.assertEqual(schema.skipped, [])
+        self.assertEqual(schema.undefined_references(), [])
+
+    def test_wrapper_is_atomic(self):
+        # 块中任一语句因对象已存在失败，整块回滚
+        schema = replay_sql("""
+            create type a as enum ('x');
+            DO $$ BEGIN
+              CREATE TYPE b AS ENUM ('y');
+              CREATE TYPE a AS ENUM ('z');
+            EXCEPTION WHEN duplicate_object THEN null;
+            END $$;
+        """)
+        self.assertEqual(list(schema.types), ['public.a'])
+
+    def test_if_not_exists_guard(self):
+        schema = replay_sql("""
+            create table vehicles (id int primary key, brand text);
+            DO $$
+            BEGIN
+              IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                             WHERE table_name = 'vehicles' AND column_name = 'brand') THEN
+                ALTER TABLE vehicles ADD COLUMN brand integer;
+              END IF;
+              IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                             WHERE table_name = 'vehicles' AND column_name = 'vin') THEN
+                ALTER TABLE vehicles ADD COLUMN vin TEXT;
+                CREATE INDEX IF NOT EXISTS vehicles_vin ON vehicles (vin);
+              END IF;
+            END $$;
+        """)
+        columns = schema.tables['public.vehicles'].columns
+        self.assertEqual([(name, column.type) for name, column in columns.items()],
+                         [('id', 'int'), ('brand', 'text'), ('vin', 'TEXT')])
+        self.assertEqual(list(schema.indexes), ['public.vehicles_vin'])
+
+    def test_other_do_blocks_are_dynamic(self):
+        schema = replay_sql("""
+            DO $$ DECLARE n int; BEGIN
+              SELECT count(*) INTO n FROM pg_type;
+              CREATE TYPE c AS ENUM ('x');
+            END $$;
+        """)
+        self.assertEqual(schema.types, {})
+        self.assertEqual([item.category for item in schema.skipped], ['dynamic'])
+
+    def test_referenced_dynamic_block_is_carried(self):
+        schema = replay_sql("""
+            DO $$ DECLARE n int; BEGIN
+              SELECT count(*) INTO n FROM pg_type WHERE typname = 'status';
+              IF n = 0 THEN CREATE TYPE status AS ENUM ('on', 'off'); END IF;
+            END $$;
+            DO $$ BEGIN RAISE NOTICE 'unrelated'; END $$;
+            create table t (id int, s status default 'on'::status);
+        """)
+        self.assertEqual([block.text.count('CREATE TYPE status') for block in schema.carried_dynamic()], [1])
+        self.assertEqual(schema.undefined_references(), [])
+        baseline = schema.to_sql()
+        self.assertLess(baseline.index('CREATE TYPE status'), baseline.index('CREATE TABLE t'))
+        self.assertNotIn('unrelated', baseline)
+
+    def test_undefined_references(self):
+        schema = replay_sql("""
+            create table t (id int primary key, s status, owner uuid references auth.users(id),
+                            p int references parent(id));
+            create function f(x mood) returns setof t language sql as $$ select * from t $$;
+            alter table t enable row level security;
+            create policy p on t for select using (s = 'on'::status);
+        """)
+        self.assertEqual(sorted(schema.undefined_references()), [
+            'public.f(mood): mood',
+            't.s: status',
+            '策略 public.t:p: status',
+        ])
+
+    def test_enum_rename(self):
+        schema = replay_sql("""
+            create type role as enum ('a');
+            create type role_new as enum ('a', 'b');
+            create table u (id int, role role_new, roles role_new[]);
+            drop type role cascade;
+            alter type role_new rename to role;
+        """)
+        self.assertEqual(list(schema.types), ['public.role'])
+        self.assertEqual([column.type for column in schema.tables['public.u'].columns.values()],
+                         ['int', 'role', 'role[]'])
+        self.assertEqual(schema.undefined_references(), [])
+
+
+class SquashSelfCheckTest(unittest.TestCase):
+
+    def test_baseline_replays_to_same_schema(self):
+        files = migration_files(str(MIGRATIONS))
+        if not files:
+            self.skipTest(f'{MIGRATIONS} 下没有迁移文件')
+        schema = replay(files)
+        baseline = schema.to_sql()
+        again = replay_sql(baseline)
+        self.assertEqual(again.to_sql(), baseline)
+        self.assertEqual([item for item in again.skipped if item.category not in ('session', 'dynamic')], [])
+        self.assertEqual(again.undefined_references(), [])
+
+    def test_enums_created_in_do_blocks_are_in_baseline(self):
+        files = migration_files(str(MIGRATIONS))
+        if not files:
+            self.skipTest(f'{MIGRATIONS} 下没有迁移文件')
+        baseline = replay(files).to_sql()
+        for name in ('driver_type', 'attendance_status', 'application_status', 'leave_type', 'review_status'):
+            with self.subTest(name=name):
+                self.assertIn(f'CREATE TYPE {name} AS ENUM', baseline)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+迁移分批：文件自己的事务控制语句
+
+BEGIN / START TRANSACTION 带事务模式时改写成批首的 SET TRANSACTION，
+COMMIT / END 结束事务块所在的批，ROLLBACK / ABORT 结束的事务块整块丢弃，
+事务块之外的 ROLLBACK 不进入任何批。
+
+用法：
+    python -m pytest -q scripts/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from codemod.sql import split_sql
+from codemod.sql_batches import is_transaction_control, plan_batches
+
+
+def batch_texts(text: str):
+    return [[statement.text for statement in batch.statements] for batch in plan_batches(split_sql(text))]
+
+
+class TransactionControlTest(unittest.TestCase):
+
+    def test_kinds(self):
+        cases = {
+            'BEGIN;': 'begin',
+            'begin work;': 'begin',
+            'BEGIN ISOLATION LEVEL SERIALIZABLE;': 'begin',
+            'BEGIN TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;': 'begin',
+            'START TRANSACTION READ WRITE;': 'begin',
+            'COMMIT;': 'commit',
+            'END TRANSACTION;': 'commit',
+            'COMMIT AND CHAIN;': 'commit',
+            'ROLLBACK;': 'rollback',
+            'abort work;': 'rollback',
+            'ROLLBACK AND NO CHAIN;': 'rollback',
+            'ROLLBACK TO SAVEPOINT s;': None,
+            "ROLLBACK PREPARED 'x';": None,
+            "COMMIT PREPARED 'x';": None,
+            'BEGIN_TABLE;': None,
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                statement = next(iter(split_sql(text)))
+                self.assertEqual(is_transaction_control(statement), expected)
+
+    def test_isolation_level_kept(self):
+        batches = batch_texts("""
+            create table a (id int);
+            BEGIN TRANSACTION ISOLATION LEVEL SERIALIZABLE;
+            insert into a values (1);
+            COMMIT;
+            insert into a values (2);
+        """)
+        self.assertEqual(batches, [
+            ['create table a (id int);'],
+            ['SET TRANSACTION ISOLATION LEVEL SERIALIZABLE;', 'insert into a values (1);'],
+            ['insert into a values (2);'],
+        ])
+
+    def test_rollback_discards_block(self):
+        batches = batch_texts("""
+            create table a (id int);
+            BEGIN;
+            insert into a values (1);
+            ROLLBACK;
+            insert into a values (2);
+        """)
+        self.assertEqual(batches, [['create table a (id int);'], ['insert into a values (2);']])
+
+    def test_rollback_outside_block_ignored(self):
+        batches = batch_texts('insert into a values (1); ROLLBACK; insert into a values (2);')
+        self.assertEqual(batches, [['insert into a values (1);', 'insert into a values (2);']])
+
+    def test_chain_keeps_modes(self):
+        batches = batch_texts("""
+            START TRANSACTION ISOLATION LEVEL REPEATABLE READ;
+            insert into a values (1);
+            COMMIT AND CHAIN;
+            insert into a values (2);
+            ABORT AND CHAIN;
+            insert into a values (3);
+            COMMIT;
+            insert into a values (4);
+        """)
+        modes = 'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;'
+        self.assertEqual(batches, [
+            [modes, 'insert into a values (1);'],
+            [modes, 'insert into a values (3);'],
+            ['insert into a values (4);'],
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+SQL 切分：流式读取时任意块大小都得到相同的语句
+
+对 supabase/migrations 下的每个文件，分别按 1、7、4096 字符和默认块大小
+读入切分，结果（文本、行号、偏移）应与整段文本一次切分完全相同。
+块边界会落在 $$ 定界符、注释、引号和 E'' 转义的中间，1 字符的块覆盖所有位置。
+
+用法：
+    python -m pytest -q scripts/tests
+"""
+
+import io
+import sys
+import unittest
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from codemod.schema import MIGRATIONS_DIR, migration_files
+from codemod.sql import READ_SIZE, read_chunks, split_sql, split_statements
+
+MIGRATIONS = SCRIPTS_DIR.parent / MIGRATIONS_DIR
+CHUNK_SIZES = (1, 7, 4096, READ_SIZE)
+
+
+def split_chunked(text: str, size: int):
+    return list(split_statements(read_chunks(io.StringIO(text), size)))
+
+
+class SplitChunkSizeTest(unittest.TestCase):
+
+    def test_edge_cases(self):
+        text = (
+            "-- 注释里的 ; 和 $$\n"
+            "CREATE FUNCTION f() RETURNS text AS $body$ SELECT ';' $body$ LANGUAGE sql;\n"
+            "SELECT E'it\\'s; fine', 'a''b;c', \"semi;colon\";\n"
+            "/* 块注释 /* 嵌套 */ ; */ SELECT 1;\n"
+            "SELECT 2"
+        )
+        expected = list(split_sql(text))
+        self.assertEqual(len(expected), 4)
+        self.assertEqual(expected[-1].text, 'SELECT 2')
+        for size in CHUNK_SIZES:
+            with self.subTest(size=size):
+                self.assertEqual(split_chunked(text, size), expected)
+
+    def test_all_migrations(self):
+        files = migration_files(str(MIGRATIONS))
+        if not files:
+            self.skipTest(f'{MIGRATIONS} 下没有迁移文件')
+        for path in files:
+            text = Path(path).read_text(encoding='utf-8')
+            expected = list(split_sql(text))
+            for size in CHUNK_SIZES:
+                with self.subTest(file=Path(path).name, size=size):
+                    self.assertEqual(split_chunked(text, size), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,80 +4,82 @@
 只删除完整的日志语句，保留console.error和logger.error
 """
 
-import re
-import os
+import sys
 from pathlib import Path
-import ast
 
-def smart_clean_logs(file_path):
-    """智能清理日志，保持代码结构完整"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    result_lines = []
-    i = 0
-    removed_count = 0
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'scripts'))
+
+from codemod.cache import FileCache
+from codemod.logs import remove_log_statements
+from codemod.profiling import measure, profiler_from_argv
+from codemod.rules import get_rules, ruleset_key
+from codemod.transaction import rollback_from_argv, write_text, writer_from_argv
+
+def smart_clean_logs(file_path, cache=None, cache_key=None, profiler=None, writer=None):
+    """智能清理日志，保持代码结构完整
+
+    传入 cache 时跳过上次运行后没有变化、且已知没有日志的文件；
+    writer 为 Preview 时只输出差异，为 Transaction 时暂存到运行结束一起提交
+    """
+    if cache is not None:
+        stale = cache.read_stale(file_path, cache_key)
+        if stale is None:
+            return 0
+        data, fingerprint = stale
+        content = data.decode('utf-8')
+    else:
+        with open(file_path, 'rb') as f:
+            content = f.read().decode('utf-8')
     
-    while i < len(lines):
-        line = lines[i]
-        stripped = line.strip()
-        
-        # 检查是否是要删除的日志语句的开始
-        should_remove = False
-        log_patterns = [
-            r'^\s*console\.(log|info|debug|warn)\s*\(',
-            r'^\s*logger\.(info|debug|warn)\s*\(',
-        ]
-        
-        for pattern in log_patterns:
-            if re.match(pattern, stripped):
-                should_remove = True
-                break
-        
-        if should_remove:
-            # 找到日志语句的结束位置（处理多行日志）
-            paren_count = line.count('(') - line.count(')')
-            end_line = i
-            
-            # 如果括号未闭合，继续往下找
-            while paren_count > 0 and end_line < len(lines) - 1:
-                end_line += 1
-                paren_count += lines[end_line].count('(') - lines[end_line].count(')')
-            
-            # 跳过整个日志语句
-            removed_count += 1
-            i = end_line + 1
-            continue
-        
-        # 保留这一行
-        result_lines.append(line)
-        i += 1
+    # 按词法分析找到完整的日志语句（处理多行日志、字符串中的括号等）
+    jsx = Path(file_path).suffix == '.tsx'
+    cleaned, removed_count = measure(profiler, 'logs', file_path,
+                                     lambda text: remove_log_statements(text, jsx=jsx), content)
     
     if removed_count > 0:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.writelines(result_lines)
+        write_text(file_path, cleaned, writer, newline='')
         return removed_count
+    if cache is not None:
+        cache.mark_clean(file_path, cache_key, fingerprint)
     return 0
 
 def main():
     """主函数"""
+    # --rollback 恢复上次运行之前的内容
+    code = rollback_from_argv()
+    if code is not None:
+        sys.exit(code)
     src_dir = Path('src')
-    ts_files = list(src_dir.rglob('*.ts')) + list(src_dir.rglob('*.tsx'))
+    rule = get_rules(['logs'])[0]
+    # 测试文件和日志实现不处理（codemod.rules.LOG_EXCLUDE）
+    ts_files = [path for path in list(src_dir.rglob('*.ts')) + list(src_dir.rglob('*.tsx')) if rule.accepts(path)]
     
+    # 与 run_codemods.py --rules logs 共用缓存
+    cache = None if '--no-cache' in sys.argv else FileCache()
+    cache_key = ruleset_key([rule])
+    # --profile[=文件] 记录每个文件的耗时和内存
+    profiler = profiler_from_argv()
     total_removed = 0
     fixed_files = 0
     
-    for file_path in ts_files:
-        try:
-            count = smart_clean_logs(file_path)
-            if count > 0:
-                print(f'✓ {file_path}: 删除 {count} 条日志')
-                total_removed += count
-                fixed_files += 1
-        except Exception as e:
-            print(f'✗ {file_path}: {e}')
+    # --preview[=补丁文件] 只输出差异；否则所有写回在结束时一起生效
+    with writer_from_argv() as writer:
+        for file_path in ts_files:
+            try:
+                count = smart_clean_logs(file_path, cache, cache_key, profiler, writer)
+                if count > 0:
+                    print(f'✓ {file_path}: 删除 {count} 条日志')
+                    total_removed += count
+                    fixed_files += 1
+            except Exception as e:
+                print(f'✗ {file_path}: {e}')
+    
+    if cache is not None:
+        cache.save()
     
     print(f'\n共处理 {fixed_files} 个文件，删除 {total_removed} 条日志')
+    if profiler is not None:
+        profiler.finish()
 
 if __name__ == '__main__':
     main()